@@ -0,0 +1,233 @@
+"""
+Alta masiva de clientes (bulk-create JSON e importación CSV).
+
+La validación es por conjuntos: cada fila se valida sin consultas (formato y
+longitudes), los duplicados dentro de la importación se detectan con
+diccionarios clave -> posición y los duplicados contra la base de datos con
+una consulta por clave única (email, número de documento, nombre completo)
+por bloque de filas. Los clientes se insertan con bulk_create y, como
+bulk_create no dispara señales, el contador total_clientes del dashboard se
+ajusta una sola vez al final.
+"""
+import csv
+import io
+
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework import serializers
+
+from .models import Customer
+
+
+CUSTOMER_FIELDS = ('first_name', 'last_name', 'email', 'phone', 'address', 'document_type', 'document_number')
+
+# Campos únicos que admiten NULL: un valor vacío se guarda como NULL
+NULLABLE_UNIQUE_FIELDS = ('email', 'document_number')
+
+# Claves únicas verificadas por conjuntos y su etiqueta en los mensajes
+UNIQUE_KEYS = {
+    'email': _("El email"),
+    'document_number': _("El número de documento"),
+    'name': _("El cliente"),
+}
+
+BATCH_SIZE = 1000
+MAX_ERRORS = 100
+
+
+class CustomerRowSerializer(serializers.ModelSerializer):
+    """
+    Validación de una fila sin consultas: los validadores de unicidad se
+    reemplazan por la verificación por conjuntos de CustomerImporter.
+    """
+
+    class Meta:
+        model = Customer
+        fields = list(CUSTOMER_FIELDS)
+        extra_kwargs = {
+            'email': {'validators': []},
+            'document_number': {'validators': []},
+        }
+        validators = []
+
+    def to_internal_value(self, data):
+        if not isinstance(data, dict):
+            raise serializers.ValidationError({'non_field_errors': [_("Se esperaba un objeto con los datos del cliente.")]})
+        # Celdas vacías o ausentes (CSV) como cadena vacía
+        data = {
+            field: value.strip() if isinstance(value, str) else ('' if value is None else value)
+            for field, value in data.items() if field in CUSTOMER_FIELDS
+        }
+        for field in NULLABLE_UNIQUE_FIELDS:
+            if not data.get(field):
+                data[field] = None
+        return super().to_internal_value(data)
+
+
+class CustomerImporter:
+    """
+    Valida e inserta clientes por bloques dentro de una importación.
+
+    Los bloques sucesivos comparten los conjuntos de claves ya vistas, así
+    que un duplicado entre el primer y el último bloque también se detecta.
+    Las posiciones de los errores son 1-based (fila del lote o del CSV).
+    """
+
+    def __init__(self, created_by=None):
+        self.created_by = created_by
+        self.row_serializer = CustomerRowSerializer()
+        self.seen = {key: {} for key in UNIQUE_KEYS}
+        self.errors = []
+        self.created_count = 0
+
+    def add_error(self, position, message):
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append(
+                _("Cliente en la posición {position}: {message}").format(position=position, message=message)
+            )
+
+    def validate(self, rows, start=1):
+        """Retorna las filas válidas como (posición, datos); los errores se acumulan en self.errors."""
+        valid = []
+        for position, data in enumerate(rows, start=start):
+            try:
+                cleaned = self.row_serializer.run_validation(data)
+            except serializers.ValidationError as exc:
+                detail = exc.detail if isinstance(exc.detail, dict) else {'non_field_errors': exc.detail}
+                for field, messages in detail.items():
+                    self.add_error(position, f"{field}: {' '.join(str(message) for message in messages)}")
+                continue
+
+            keys = {
+                'email': cleaned.get('email'),
+                'document_number': cleaned.get('document_number'),
+                'name': (cleaned['first_name'], cleaned['last_name']),
+            }
+            duplicated = False
+            for key, value in keys.items():
+                if value is None:
+                    continue
+                previous = self.seen[key].get(value)
+                if previous is not None:
+                    self.add_error(position, _("{label} '{value}' está duplicado con la posición {previous}.").format(
+                        label=UNIQUE_KEYS[key], value=self._display(value), previous=previous
+                    ))
+                    duplicated = True
+                else:
+                    self.seen[key][value] = position
+            if not duplicated:
+                valid.append((position, cleaned))
+
+        self._check_existing(valid)
+        return valid
+
+    def _check_existing(self, valid):
+        """Una consulta por clave única para todo el bloque."""
+        if not valid:
+            return
+
+        rows = [data for position, data in valid]
+        emails = {data['email'] for data in rows if data.get('email')}
+        documents = {data['document_number'] for data in rows if data.get('document_number')}
+        first_names = {data['first_name'] for data in rows}
+        last_names = {data['last_name'] for data in rows}
+
+        existing = {
+            'email': set(Customer.objects.filter(email__in=emails).values_list('email', flat=True)) if emails else set(),
+            'document_number': set(
+                Customer.objects.filter(document_number__in=documents).values_list('document_number', flat=True)
+            ) if documents else set(),
+            # Superconjunto de los pares (nombres, apellidos); se compara el par exacto
+            'name': set(
+                Customer.objects.filter(first_name__in=first_names, last_name__in=last_names)
+                .values_list('first_name', 'last_name')
+            ),
+        }
+
+        rejected = set()
+        for position, data in valid:
+            keys = {
+                'email': data.get('email'),
+                'document_number': data.get('document_number'),
+                'name': (data['first_name'], data['last_name']),
+            }
+            for key, value in keys.items():
+                if value is not None and value in existing[key]:
+                    self.add_error(position, _("{label} '{value}' ya existe en la base de datos.").format(
+                        label=UNIQUE_KEYS[key], value=self._display(value)
+                    ))
+                    rejected.add(position)
+        valid[:] = [(position, data) for position, data in valid if position not in rejected]
+
+    @staticmethod
+    def _display(value):
+        return ' '.join(value) if isinstance(value, tuple) else value
+
+    def save(self, valid):
+        """Inserta las filas validadas con bulk_create y retorna los clientes creados."""
+        customers = Customer.objects.bulk_create(
+            [Customer(created_by=self.created_by, **data) for position, data in valid],
+            batch_size=BATCH_SIZE,
+        )
+        self.created_count += len(customers)
+        return customers
+
+    def finish(self):
+        """Ajusta el contador del dashboard (bulk_create no dispara señales)."""
+        from dashboard.models import DashboardCounters
+        DashboardCounters.apply_deltas(total_clientes=self.created_count)
+
+
+def compact_customer(customer):
+    """Representación reducida de un cliente recién creado."""
+    return {
+        'id': customer.id,
+        'full_name': customer.full_name,
+        'email': customer.email,
+        'document_number': customer.document_number,
+    }
+
+
+def import_csv(uploaded_file, created_by=None):
+    """
+    Importa clientes desde un CSV (cabecera con los nombres de CUSTOMER_FIELDS)
+    leyéndolo por bloques de BATCH_SIZE filas. Todo o nada: si alguna fila es
+    inválida no se crea ningún cliente. Retorna el importador con el conteo
+    de creados y los errores.
+    """
+    importer = CustomerImporter(created_by=created_by)
+    reader = csv.DictReader(io.TextIOWrapper(uploaded_file, encoding='utf-8-sig', newline=''))
+
+    missing = {'first_name', 'last_name'} - set(reader.fieldnames or ())
+    if missing:
+        importer.errors.append(_("Faltan columnas obligatorias en el CSV: {columns}").format(
+            columns=', '.join(sorted(missing))
+        ))
+        return importer
+
+    with transaction.atomic():
+        chunk = []
+        # La fila 1 es la cabecera
+        start = 2
+        for row in reader:
+            chunk.append(row)
+            if len(chunk) == BATCH_SIZE:
+                _import_chunk(importer, chunk, start)
+                start += len(chunk)
+                chunk = []
+        if chunk:
+            _import_chunk(importer, chunk, start)
+
+        if importer.errors:
+            transaction.set_rollback(True)
+            importer.created_count = 0
+        else:
+            importer.finish()
+    return importer
+
+
+def _import_chunk(importer, chunk, start):
+    valid = importer.validate(chunk, start=start)
+    # Con errores ya no se insertará nada: solo se sigue validando el resto
+    if not importer.errors:
+        importer.save(valid)
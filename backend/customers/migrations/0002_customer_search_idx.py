@@ -0,0 +1,19 @@
+# Generated by Django 4.2.10 on 2026-10-19 07:34
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customer',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.search.SearchVector('first_name', 'last_name', 'document_number', 'email', config='simple'), name='customer_search_idx'),
+        ),
+    ]
@@ -1,13 +1,21 @@
+from django.contrib.postgres.indexes import GinIndex
 from django.db import models
 from django.conf import settings
 from django.utils.functional import cached_property
 from django.utils.translation import gettext_lazy as _
 from decimal import Decimal
 
+from villanueva_project.search import search_vector
+
+# Campos del documento de búsqueda (?search=) y de su índice GIN
+CUSTOMER_SEARCH_FIELDS = ('first_name', 'last_name', 'document_number', 'email')
+
 class Customer(models.Model):
     """
     Modelo para representar a un cliente con nueva arquitectura basada en ventas.
     """
+    SEARCH_FIELDS = CUSTOMER_SEARCH_FIELDS
+
     first_name = models.CharField(_("Nombres"), max_length=100)
     last_name = models.CharField(_("Apellidos"), max_length=100)
     email = models.EmailField(_("Correo Electrónico"), unique=True, blank=True, null=True)
@@ -57,10 +65,14 @@ class Customer(models.Model):
     def total_payments(self):
         """Devuelve el total de pagos realizados por el cliente a través de sus ventas."""
         from django.db.models import Sum
-        # Sumar pagos de todas las ventas del cliente
-        total_from_ventas = self.ventas.aggregate(
-            total=Sum('payments__amount')
-        )['total'] or Decimal('0.00')
+        # Sumar pagos de todas las ventas del cliente, también los archivados
+        # (los pagos de una venta están en una sola de las tablas: los dos
+        # joins no multiplican filas)
+        totals = self.ventas.aggregate(
+            total=Sum('payments__amount'),
+            archived=Sum('archived_payments__amount'),
+        )
+        total_from_ventas = (totals['total'] or Decimal('0.00')) + (totals['archived'] or Decimal('0.00'))
         
         return total_from_ventas
 
@@ -94,17 +106,23 @@ class Customer(models.Model):
         
         # Estadísticas de pagos
         total_payments_amount = self.total_payments
-        total_payments_count = self.ventas.aggregate(
-            count=Count('payments')
-        )['count'] or 0
-        
-        # Estadísticas de cronogramas
-        schedules = self.ventas.aggregate(
-            total_schedules=Count('payment_schedules'),
-            paid_schedules=Count('payment_schedules', filter=models.Q(payment_schedules__status='paid')),
-            pending_schedules=Count('payment_schedules', filter=models.Q(payment_schedules__status='pending')),
-            overdue_schedules=Count('payment_schedules', filter=models.Q(payment_schedules__status='overdue'))
+        payment_counts = self.ventas.aggregate(
+            count=Count('payments'),
+            archived=Count('archived_payments'),
         )
+        total_payments_count = payment_counts['count'] + payment_counts['archived']
+        
+        # Estadísticas de cronogramas (tablas activas y archivo, ver total_payments)
+        schedules = {}
+        for relation in ('payment_schedules', 'archived_schedules'):
+            counts = self.ventas.aggregate(
+                total_schedules=Count(relation),
+                paid_schedules=Count(relation, filter=models.Q(**{f'{relation}__status': 'paid'})),
+                pending_schedules=Count(relation, filter=models.Q(**{f'{relation}__status': 'pending'})),
+                overdue_schedules=Count(relation, filter=models.Q(**{f'{relation}__status': 'overdue'}))
+            )
+            for name, count in counts.items():
+                schedules[name] = schedules.get(name, 0) + count
         
         return {
             'ventas': {
@@ -132,6 +150,9 @@ class Customer(models.Model):
         constraints = [
             models.UniqueConstraint(fields=['first_name', 'last_name'], name='unique_customer_name')
         ]
+        indexes = [
+            GinIndex(search_vector(CUSTOMER_SEARCH_FIELDS), name='customer_search_idx'),
+        ]
 
     def __str__(self):
         return self.full_name
\ No newline at end of file
@@ -1,3 +1,69 @@
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import TestCase
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from dashboard.models import DashboardCounters
+from users.models import User
+from .models import Customer
+
+
+class BulkCustomerCreateTests(TestCase):
+    """El alta masiva valida por conjuntos e inserta con bulk_create."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='registro', email='registro@example.com', password='x', role='admin'
+        )
+        Customer.objects.create(first_name='Ana', last_name='Pérez', email='ana@example.com', document_number='100')
+        DashboardCounters.reconcile()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def rows(self, count):
+        return [
+            {'first_name': f'Cliente {i}', 'last_name': 'Masivo', 'email': f'cliente{i}@example.com',
+             'document_number': f'D{i}'}
+            for i in range(count)
+        ]
+
+    def test_constant_queries(self):
+        # 3 claves únicas, savepoint, INSERT, contador + notificación y release,
+        # sin importar el tamaño del lote
+        with self.assertNumQueries(8):
+            response = self.client.post('/api/v1/customers/bulk-create/', {'customers': self.rows(300)}, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created_count'], 300)
+        self.assertEqual(set(response.data['customers'][0]), {'id', 'full_name', 'email', 'document_number'})
+        self.assertEqual(Customer.objects.filter(last_name='Masivo', created_by=self.user).count(), 300)
+        self.assertEqual(DashboardCounters.objects.get().total_clientes, 301)
+
+    def test_duplicates_reject_whole_batch(self):
+        rows = self.rows(3)
+        rows[2]['email'] = rows[0]['email']
+        rows.append({'first_name': 'Ana', 'last_name': 'Pérez'})
+
+        response = self.client.post('/api/v1/customers/bulk-create/', {'customers': rows}, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        errors = [str(error) for error in response.data['customers']]
+        self.assertEqual(len(errors), 2)
+        self.assertIn('posición 3', errors[0])
+        self.assertIn('posición 4', errors[1])
+        self.assertFalse(Customer.objects.filter(last_name='Masivo').exists())
+
+    def test_import_csv(self):
+        content = 'first_name,last_name,email,document_number\nLuis,Gómez,,200\nRosa,Díaz,rosa@example.com,\n'
+        upload = SimpleUploadedFile('clientes.csv', content.encode('utf-8'), content_type='text/csv')
+
+        response = self.client.post('/api/v1/customers/import-csv/', {'file': upload}, format='multipart')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created_count'], 2)
+        luis = Customer.objects.get(first_name='Luis')
+        self.assertIsNone(luis.email)
+        self.assertEqual(luis.document_number, '200')
+        self.assertIsNone(Customer.objects.get(first_name='Rosa').document_number)
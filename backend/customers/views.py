@@ -1,11 +1,14 @@
 from django.shortcuts import render
 from rest_framework import viewsets, permissions, filters
 from django_filters.rest_framework import DjangoFilterBackend
+from villanueva_project.search import RankedSearchFilter
 from .models import Customer
 from .serializers import CustomerSerializer, BulkCustomerCreateSerializer
+from .bulk import import_csv
 from users.permissions import IsWorkerOrAdmin
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.parsers import MultiPartParser
 from django.db.models import Q
 
 class CustomerViewSet(viewsets.ModelViewSet):
@@ -22,15 +25,15 @@ class CustomerViewSet(viewsets.ModelViewSet):
     # Herramientas de filtrado y búsqueda
     filter_backends = [
         DjangoFilterBackend, 
-        filters.SearchFilter, 
-        filters.OrderingFilter
+        filters.OrderingFilter,
+        RankedSearchFilter,
     ]
 
     # Campos por los que se puede filtrar (ej: /api/v1/customers/?phone=12345)
     filterset_fields = ['phone', 'document_type', 'email']
     
-    # Campos por los que se puede buscar (ej: /api/v1/customers/?search=Juan)
-    search_fields = ['first_name', 'last_name', 'email', 'document_number']
+    # Búsqueda indexada por nombre, apellido, email y documento (ej: /api/v1/customers/?search=Juan)
+    search_documents = [('', Customer)]
     
     # Campos por los que se puede ordenar (ej: /api/v1/customers/?ordering=-created_at)
     ordering_fields = ['first_name', 'last_name', 'created_at', 'total_payments', 'total_ventas_value']
@@ -38,6 +41,14 @@ class CustomerViewSet(viewsets.ModelViewSet):
     # Orden por defecto
     ordering = ['-created_at']
 
+    # Acciones que consultan las ventas por su cuenta: no necesitan el prefetch
+    PLAIN_ACTIONS = ('sales_history', 'statement', 'statement_export')
+
+    def get_queryset(self):
+        if self.action in self.PLAIN_ACTIONS:
+            return Customer.objects.all()
+        return super().get_queryset()
+
     @action(detail=True, methods=['get'])
     def sales_history(self, request, pk=None):
         """
@@ -46,7 +57,12 @@ class CustomerViewSet(viewsets.ModelViewSet):
         customer = self.get_object()
         
         # Obtener todas las ventas del cliente con información relacionada
-        ventas = customer.ventas.select_related('lote').prefetch_related('payments', 'payment_schedules').order_by('-sale_date')
+        # Saldo pendiente anotado (with_balances): sin consultas por venta
+        ventas = (
+            customer.ventas.select_related('lote').with_balances()
+            .prefetch_related('payments', 'payment_schedules', 'archived_payments', 'archived_schedules')
+            .order_by('-sale_date')
+        )
         
         data = []
         for venta in ventas:
@@ -74,7 +90,7 @@ class CustomerViewSet(viewsets.ModelViewSet):
                         'payment_type': payment.payment_type,
                         'receipt_number': payment.receipt_number
                     }
-                    for payment in venta.payments.all()
+                    for payment in venta.get_payments()
                 ],
                 'payment_schedules': [
                     {
@@ -85,13 +101,74 @@ class CustomerViewSet(viewsets.ModelViewSet):
                         'due_date': schedule.due_date,
                         'status': schedule.status
                     }
-                    for schedule in venta.payment_schedules.all()
+                    for schedule in venta.get_payment_schedules()
                 ]
             }
             data.append(venta_data)
         
         return Response(data)
 
+    @action(detail=True, methods=['get'])
+    def statement(self, request, pk=None):
+        """
+        Estado de cuenta del cliente: movimientos (cargos, pagos y
+        condonaciones) en orden cronológico con saldo acumulado, a la fecha
+        de corte ?as_of= (por defecto hoy). Se guarda en caché según la
+        versión de los datos del cliente.
+        """
+        statement = self._statement_from_request(request, [self.get_object().pk])
+        if statement is None:
+            return Response({'error': 'Formato de fecha inválido para as_of. Use YYYY-MM-DD'}, status=400)
+        return Response(statement.get())
+
+    @action(detail=True, methods=['get'], url_path='statement/export')
+    def statement_export(self, request, pk=None):
+        """Exporta en CSV el estado de cuenta del cliente (transmitido por partes)."""
+        customer = self.get_object()
+        return self._statement_csv_response(request, {customer.pk: customer.full_name})
+
+    @action(detail=False, methods=['get'], url_path='statements/export')
+    def statements_export(self, request):
+        """
+        Exporta en CSV los estados de cuenta de varios clientes: los de
+        ?ids=1,2,3 o, sin ids, los de todos los clientes con ventas. Los
+        movimientos se leen y transmiten por bloques, sin cargarlos en memoria.
+        """
+        customers = Customer.objects.filter(ventas__isnull=False).distinct()
+        ids = request.query_params.get('ids')
+        if ids:
+            try:
+                customers = customers.filter(pk__in=[int(value) for value in ids.split(',') if value.strip()])
+            except ValueError:
+                return Response({'error': 'ids debe ser una lista de números separados por comas'}, status=400)
+        names = {
+            customer_id: f'{first_name} {last_name}'.strip()
+            for customer_id, first_name, last_name in customers.values_list('id', 'first_name', 'last_name')
+        }
+        return self._statement_csv_response(request, names)
+
+    def _statement_csv_response(self, request, customer_names):
+        from reports.streaming import streaming_csv_response
+
+        statement = self._statement_from_request(request, list(customer_names))
+        if statement is None:
+            return Response({'error': 'Formato de fecha inválido para as_of. Use YYYY-MM-DD'}, status=400)
+        # Bajo ASGI se transmite con un generador async (ver reports.streaming)
+        return streaming_csv_response(
+            request, statement.stream_csv(customer_names), f'estado_de_cuenta_{statement.as_of.isoformat()}.csv'
+        )
+
+    @staticmethod
+    def _statement_from_request(request, customer_ids):
+        from datetime import date
+        from reports.statement import CustomerStatement
+
+        as_of = request.query_params.get('as_of')
+        try:
+            return CustomerStatement(customer_ids, as_of=date.fromisoformat(as_of) if as_of else None)
+        except ValueError:
+            return None
+
     @action(detail=True, methods=['get'])
     def payment_summary(self, request, pk=None):
         """
@@ -181,4 +258,28 @@ class CustomerViewSet(viewsets.ModelViewSet):
             result = serializer.save()
             return Response(result, status=201)
         
-        return Response(serializer.errors, status=400)
\ No newline at end of file
+        return Response(serializer.errors, status=400)
+
+    @action(detail=False, methods=['post'], url_path='import-csv', parser_classes=[MultiPartParser])
+    def import_csv(self, request):
+        """
+        Importación masiva de clientes desde un archivo CSV, leído por bloques.
+
+        POST /api/v1/customers/import-csv/ (multipart, campo 'file')
+
+        Cabecera: first_name,last_name,email,phone,address,document_type,document_number
+        (solo first_name y last_name son obligatorias). Si alguna fila es
+        inválida no se crea ningún cliente y se devuelven los errores.
+        """
+        uploaded_file = request.FILES.get('file')
+        if uploaded_file is None:
+            return Response({'error': 'Se requiere el archivo CSV en el campo "file"'}, status=400)
+
+        importer = import_csv(uploaded_file, created_by=request.user)
+        if importer.errors:
+            return Response({'error': 'El archivo contiene errores', 'errors': importer.errors}, status=400)
+
+        return Response({
+            'message': f'Se crearon {importer.created_count} clientes exitosamente.',
+            'created_count': importer.created_count,
+        }, status=201)
\ No newline at end of file
@@ -0,0 +1,206 @@
+"""
+Eventos en vivo del dashboard (Server-Sent Events).
+
+Las rutas de escritura publican eventos con pg_notify() sobre el canal
+EVENTS_CHANNEL. Como NOTIFY es transaccional, PostgreSQL solo entrega el
+evento si la transacción confirma, así que un rollback nunca llega a los
+clientes.
+
+Cada worker ASGI mantiene un único Broadcaster: una conexión psycopg2 en
+modo LISTEN registrada en el event loop (add_reader) que reparte cada
+notificación a las colas de todos los clientes conectados al stream. La
+conexión (bloqueante en psycopg2) se abre en un hilo aparte para no detener
+el event loop del worker.
+"""
+import asyncio
+import json
+import logging
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+EVENTS_CHANNEL = 'dashboard_events'
+
+# PostgreSQL limita el payload de NOTIFY a 8000 bytes
+MAX_PAYLOAD_BYTES = 7900
+
+
+def publish(event, data):
+    """
+    Publica un evento para los clientes del stream.
+
+    Se ejecuta sobre la conexión de la petición, dentro de la transacción en
+    curso: el evento se entrega únicamente al confirmarse.
+    """
+    if connection.vendor != 'postgresql':
+        return
+
+    payload = json.dumps({'event': event, 'data': data}, cls=DjangoJSONEncoder, separators=(',', ':'))
+    if len(payload.encode()) > MAX_PAYLOAD_BYTES:
+        logger.warning("Evento '%s' descartado: payload demasiado grande", event)
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_notify(%s, %s)', [EVENTS_CHANNEL, payload])
+
+
+def format_sse(event, data):
+    """Serializa un evento en el formato de texto de Server-Sent Events."""
+    body = json.dumps(data, cls=DjangoJSONEncoder, separators=(',', ':'))
+    return f'event: {event}\ndata: {body}\n\n'
+
+
+class Broadcaster:
+    """
+    Reparte las notificaciones de PostgreSQL entre los clientes conectados.
+
+    La conexión LISTEN se abre con el primer suscriptor y se cierra cuando se
+    va el último. Si la conexión se cae, una tarea la vuelve a abrir
+    (reintentando cada retry_seconds mientras queden suscriptores) y luego
+    envía 'resync', porque los eventos de ese intervalo se perdieron.
+    """
+    queue_size = 100
+    retry_seconds = 3
+
+    def __init__(self, channel=EVENTS_CHANNEL):
+        self.channel = channel
+        self.subscribers = set()
+        self.conn = None
+        self.loop = None
+        self.fd = None  # descriptor registrado en el loop (la conexión caída ya no lo da)
+        self._starting = None  # tarea que abre la conexión
+        self._restarting = None  # tarea que la reabre tras una caída
+
+    # --- Suscripciones --------------------------------------------------------
+
+    async def subscribe(self):
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self.subscribers.add(queue)
+        try:
+            await self._ensure_listening()
+        except BaseException:
+            self.unsubscribe(queue)
+            raise
+        return queue
+
+    def unsubscribe(self, queue):
+        self.subscribers.discard(queue)
+        if not self.subscribers:
+            self._close()
+
+    # --- Conexión LISTEN ------------------------------------------------------
+
+    async def _ensure_listening(self):
+        """Abre la conexión si hace falta; los suscriptores simultáneos esperan la misma apertura."""
+        if self.conn is not None:
+            return
+        if self._starting is None:
+            self._starting = asyncio.ensure_future(self._start())
+        # shield: si un suscriptor se cancela, la apertura sigue para los demás
+        await asyncio.shield(self._starting)
+
+    async def _start(self):
+        try:
+            conn = await sync_to_async(self._connect, thread_sensitive=False)()
+        finally:
+            self._starting = None
+        if not self.subscribers:
+            # Se fueron todos mientras se abría
+            conn.close()
+            return
+        self.loop = asyncio.get_running_loop()
+        self.fd = conn.fileno()
+        self.loop.add_reader(self.fd, self._on_readable)
+        self.conn = conn
+
+    def _connect(self):
+        """Abre la conexión y ejecuta LISTEN (bloqueante: corre fuera del event loop)."""
+        import psycopg2
+        from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+
+        db = getattr(settings, 'DASHBOARD_EVENTS_DATABASE', settings.DATABASES['default'])
+        conn = psycopg2.connect(
+            dbname=db['NAME'],
+            user=db.get('USER') or None,
+            password=db.get('PASSWORD') or None,
+            host=db.get('HOST') or None,
+            port=db.get('PORT') or None,
+        )
+        try:
+            conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+            with conn.cursor() as cursor:
+                cursor.execute(f'LISTEN "{self.channel}"')
+        except Exception:
+            conn.close()
+            raise
+        return conn
+
+    async def _restart(self):
+        """Reabre la conexión tras una caída mientras queden suscriptores."""
+        try:
+            while self.subscribers and self.conn is None:
+                try:
+                    await self._ensure_listening()
+                except Exception:
+                    logger.warning(
+                        "No se pudo reabrir la conexión LISTEN del dashboard; reintento en %s s",
+                        self.retry_seconds, exc_info=True,
+                    )
+                    await asyncio.sleep(self.retry_seconds)
+                else:
+                    if self.conn is not None:
+                        self._dispatch({'event': 'resync', 'data': {}})
+        finally:
+            self._restarting = None
+
+    def _close(self):
+        if self.conn is None:
+            return
+        try:
+            self.loop.remove_reader(self.fd)
+        except Exception:
+            pass
+        try:
+            self.conn.close()
+        except Exception:
+            pass
+        self.conn = None
+        self.loop = None
+        self.fd = None
+
+    def _on_readable(self):
+        try:
+            self.conn.poll()
+        except Exception:
+            logger.exception("Se perdió la conexión LISTEN del dashboard")
+            loop = self.loop
+            self._close()
+            if self.subscribers and self._restarting is None:
+                self._restarting = loop.create_task(self._restart())
+            return
+
+        while self.conn.notifies:
+            notify = self.conn.notifies.pop(0)
+            try:
+                message = json.loads(notify.payload)
+            except ValueError:
+                continue
+            self._dispatch(message)
+
+    def _dispatch(self, message):
+        for queue in list(self.subscribers):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # Cliente lento: descartamos sus eventos pendientes y le pedimos
+                # que recargue el estado completo.
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait({'event': 'resync', 'data': {}})
+
+
+broadcaster = Broadcaster()
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from dashboard.models import DashboardCounters
+
+
+class Command(BaseCommand):
+    help = 'Recalcula los contadores del dashboard desde las tablas de origen y corrige desviaciones'
+
+    def handle(self, *args, **options):
+        previous = DashboardCounters.objects.filter(pk=DashboardCounters.SINGLETON_ID).first()
+        previous_values = previous.as_dict() if previous else {}
+
+        counters = DashboardCounters.reconcile()
+
+        drift = {
+            field: value - previous_values[field]
+            for field, value in counters.as_dict().items()
+            if field in previous_values and value != previous_values[field]
+        }
+
+        timestamp = timezone.now().strftime("%Y-%m-%d %H:%M:%S")
+        if drift:
+            details = ', '.join(f'{field}: {delta:+d}' for field, delta in drift.items())
+            self.stdout.write(
+                self.style.WARNING(f'[{timestamp}] Contadores corregidos ({details})')
+            )
+        else:
+            self.stdout.write(
+                self.style.SUCCESS(f'[{timestamp}] Contadores del dashboard sin desviaciones')
+            )
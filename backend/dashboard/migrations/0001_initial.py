@@ -0,0 +1,63 @@
+# Generated by Django 4.2.10 on 2026-10-19 07:00
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def seed_counters(apps, schema_editor):
+    """Inicializa la fila de contadores con los totales actuales."""
+    DashboardCounters = apps.get_model('dashboard', 'DashboardCounters')
+    Customer = apps.get_model('customers', 'Customer')
+    Lote = apps.get_model('lotes', 'Lote')
+    PaymentSchedule = apps.get_model('payments', 'PaymentSchedule')
+
+    lotes = Lote.objects.aggregate(
+        total=Count('id'),
+        disponibles=Count('id', filter=Q(status='disponible')),
+        vendidos=Count('id', filter=Q(status='vendido')),
+    )
+    DashboardCounters.objects.update_or_create(
+        pk=1,
+        defaults={
+            'total_clientes': Customer.objects.count(),
+            'total_lotes': lotes['total'],
+            'lotes_disponibles': lotes['disponibles'],
+            'lotes_vendidos': lotes['vendidos'],
+            'cuotas_vencidas': PaymentSchedule.objects.filter(
+                status='overdue', venta__status='active'
+            ).count(),
+        }
+    )
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('customers', '0001_initial'),
+        ('lotes', '0002_remove_lote_contract_date_remove_lote_contract_file_and_more'),
+        ('payments', '0007_payment_boleta_image'),
+        ('sales', '0004_venta_schedule_start_date'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DashboardCounters',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_clientes', models.IntegerField(default=0, verbose_name='Total de Clientes')),
+                ('total_lotes', models.IntegerField(default=0, verbose_name='Total de Lotes')),
+                ('lotes_disponibles', models.IntegerField(default=0, verbose_name='Lotes Disponibles')),
+                ('lotes_vendidos', models.IntegerField(default=0, verbose_name='Lotes Vendidos')),
+                ('cuotas_vencidas', models.IntegerField(default=0, help_text='Cuotas en estado vencido de ventas activas', verbose_name='Cuotas Vencidas')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('reconciled_at', models.DateTimeField(blank=True, null=True, verbose_name='Última Reconciliación')),
+            ],
+            options={
+                'verbose_name': 'Contadores del Dashboard',
+                'verbose_name_plural': 'Contadores del Dashboard',
+            },
+        ),
+        migrations.RunPython(seed_counters, migrations.RunPython.noop),
+    ]
@@ -1,3 +1,140 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
+from django.utils.translation import gettext_lazy as _
 
-# Create your models here.
+
+class DashboardCounters(models.Model):
+    """
+    Fila única con los contadores del dashboard.
+    Se mantiene de forma incremental desde las rutas de escritura de clientes,
+    lotes, ventas y cuotas (ver dashboard/signals.py), y se reconcilia
+    periódicamente con el comando reconcile_dashboard_counters.
+    """
+    SINGLETON_ID = 1
+
+    total_clientes = models.IntegerField(_("Total de Clientes"), default=0)
+    total_lotes = models.IntegerField(_("Total de Lotes"), default=0)
+    lotes_disponibles = models.IntegerField(_("Lotes Disponibles"), default=0)
+    lotes_vendidos = models.IntegerField(_("Lotes Vendidos"), default=0)
+    cuotas_vencidas = models.IntegerField(
+        _("Cuotas Vencidas"),
+        default=0,
+        help_text=_("Cuotas en estado vencido de ventas activas")
+    )
+
+    updated_at = models.DateTimeField(auto_now=True)
+    reconciled_at = models.DateTimeField(_("Última Reconciliación"), null=True, blank=True)
+
+    COUNTER_FIELDS = [
+        'total_clientes',
+        'total_lotes',
+        'lotes_disponibles',
+        'lotes_vendidos',
+        'cuotas_vencidas',
+    ]
+
+    # Estado de lote -> contador que lo representa
+    LOTE_STATUS_COUNTERS = {
+        'disponible': 'lotes_disponibles',
+        'vendido': 'lotes_vendidos',
+    }
+
+    class Meta:
+        verbose_name = _("Contadores del Dashboard")
+        verbose_name_plural = _("Contadores del Dashboard")
+
+    def __str__(self):
+        return f"Contadores del dashboard (actualizado {self.updated_at})"
+
+    def as_dict(self):
+        return {field: getattr(self, field) for field in self.COUNTER_FIELDS}
+
+    @classmethod
+    def get_solo(cls):
+        """
+        Retorna la fila de contadores, creándola y reconciliándola si no existe.
+        """
+        counters = cls.objects.filter(pk=cls.SINGLETON_ID).first()
+        if counters is None:
+            counters = cls.reconcile()
+        return counters
+
+    @classmethod
+    async def aget_solo(cls):
+        """Versión async de get_solo()."""
+        counters = await cls.objects.filter(pk=cls.SINGLETON_ID).afirst()
+        if counters is None:
+            from asgiref.sync import sync_to_async
+            counters = await sync_to_async(cls.reconcile)()
+        return counters
+
+    @classmethod
+    def apply_deltas(cls, **deltas):
+        """
+        Aplica incrementos/decrementos a los contadores con un único UPDATE
+        atómico (F-expressions), dentro de la transacción en curso, y los
+        publica en el stream del dashboard.
+        """
+        deltas = {field: delta for field, delta in deltas.items() if delta}
+        if not deltas:
+            return
+
+        unknown = set(deltas) - set(cls.COUNTER_FIELDS)
+        if unknown:
+            raise ValueError(f"Contadores desconocidos: {', '.join(sorted(unknown))}")
+
+        updated = cls.objects.filter(pk=cls.SINGLETON_ID).update(
+            **{field: F(field) + delta for field, delta in deltas.items()}
+        )
+        if not updated:
+            # Primera escritura: la reconciliación ya incluye el cambio actual
+            cls.reconcile()
+            return
+
+        from .events import publish
+        publish('counters', deltas)
+
+    @classmethod
+    def compute(cls):
+        """
+        Calcula los contadores desde cero a partir de las tablas de origen.
+        """
+        from customers.models import Customer
+        from lotes.models import Lote
+        from payments.models import PaymentSchedule
+        from django.db.models import Count, Q
+
+        lotes = Lote.objects.aggregate(
+            total=Count('id'),
+            disponibles=Count('id', filter=Q(status='disponible')),
+            vendidos=Count('id', filter=Q(status='vendido')),
+        )
+
+        return {
+            'total_clientes': Customer.objects.count(),
+            'total_lotes': lotes['total'],
+            'lotes_disponibles': lotes['disponibles'],
+            'lotes_vendidos': lotes['vendidos'],
+            'cuotas_vencidas': PaymentSchedule.objects.filter(
+                status='overdue',
+                venta__status='active'
+            ).count(),
+        }
+
+    @classmethod
+    def reconcile(cls):
+        """
+        Recalcula todos los contadores y los guarda. Retorna la fila actualizada.
+        """
+        from django.utils import timezone
+
+        with transaction.atomic():
+            values = cls.compute()
+            counters, _created = cls.objects.select_for_update().update_or_create(
+                pk=cls.SINGLETON_ID,
+                defaults={**values, 'reconciled_at': timezone.now()}
+            )
+
+            from .events import publish
+            publish('counters_snapshot', values)
+        return counters
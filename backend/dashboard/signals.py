@@ -0,0 +1,154 @@
+"""
+Mantenimiento incremental de DashboardCounters.
+
+Cada escritura sobre clientes, lotes, ventas y cuotas traduce su cambio en
+deltas sobre la fila de contadores. Los cambios masivos con QuerySet.update()
+o bulk_create() no disparan señales: quien los ejecute debe llamar a
+DashboardCounters.apply_deltas() explícitamente.
+
+Además se publican en el stream del dashboard (ver dashboard/events.py) los
+pagos registrados y las cuotas que pasan a vencidas.
+"""
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+
+from customers.models import Customer
+from lotes.models import Lote
+from payments.models import Payment, PaymentSchedule
+from sales.models import Venta
+from .models import DashboardCounters
+from .events import publish
+
+
+def _remember_status(instance):
+    # Leer desde __dict__ para no disparar consultas con campos diferidos
+    instance._dashboard_status = instance.__dict__.get('status')
+
+
+def _status_saved(update_fields):
+    return update_fields is None or 'status' in update_fields
+
+
+def _venta_is_active(schedule):
+    """Verifica si la venta de la cuota está activa, usando la venta en caché si existe."""
+    venta = schedule._state.fields_cache.get('venta')
+    if venta is not None:
+        return venta.status == 'active'
+    return Venta.objects.filter(pk=schedule.venta_id, status='active').exists()
+
+
+# --- Clientes ---------------------------------------------------------------
+
+@receiver(post_save, sender=Customer)
+def customer_saved(sender, instance, created, **kwargs):
+    if created:
+        DashboardCounters.apply_deltas(total_clientes=1)
+
+
+@receiver(post_delete, sender=Customer)
+def customer_deleted(sender, instance, **kwargs):
+    DashboardCounters.apply_deltas(total_clientes=-1)
+
+
+# --- Lotes ------------------------------------------------------------------
+
+@receiver(post_init, sender=Lote)
+def lote_loaded(sender, instance, **kwargs):
+    _remember_status(instance)
+
+
+@receiver(post_save, sender=Lote)
+def lote_saved(sender, instance, created, update_fields=None, **kwargs):
+    deltas = {}
+    new_counter = DashboardCounters.LOTE_STATUS_COUNTERS.get(instance.status)
+
+    if created:
+        deltas['total_lotes'] = 1
+        if new_counter:
+            deltas[new_counter] = 1
+    elif _status_saved(update_fields) and instance._dashboard_status != instance.status:
+        old_counter = DashboardCounters.LOTE_STATUS_COUNTERS.get(instance._dashboard_status)
+        if old_counter:
+            deltas[old_counter] = deltas.get(old_counter, 0) - 1
+        if new_counter:
+            deltas[new_counter] = deltas.get(new_counter, 0) + 1
+
+    DashboardCounters.apply_deltas(**deltas)
+    _remember_status(instance)
+
+
+@receiver(post_delete, sender=Lote)
+def lote_deleted(sender, instance, **kwargs):
+    deltas = {'total_lotes': -1}
+    counter = DashboardCounters.LOTE_STATUS_COUNTERS.get(instance.status)
+    if counter:
+        deltas[counter] = -1
+    DashboardCounters.apply_deltas(**deltas)
+
+
+# --- Ventas -----------------------------------------------------------------
+
+@receiver(post_init, sender=Venta)
+def venta_loaded(sender, instance, **kwargs):
+    _remember_status(instance)
+
+
+@receiver(post_save, sender=Venta)
+def venta_saved(sender, instance, created, update_fields=None, **kwargs):
+    old_status = instance._dashboard_status
+    _remember_status(instance)
+
+    if created or not _status_saved(update_fields):
+        return
+
+    was_active = old_status == 'active'
+    is_active = instance.status == 'active'
+    if was_active == is_active:
+        return
+
+    # Las cuotas vencidas solo cuentan mientras la venta está activa
+    overdue = PaymentSchedule.objects.filter(venta=instance, status='overdue').count()
+    DashboardCounters.apply_deltas(cuotas_vencidas=overdue if is_active else -overdue)
+
+
+# --- Cuotas -----------------------------------------------------------------
+
+@receiver(post_init, sender=PaymentSchedule)
+def schedule_loaded(sender, instance, **kwargs):
+    _remember_status(instance)
+
+
+@receiver(post_save, sender=PaymentSchedule)
+def schedule_saved(sender, instance, created, update_fields=None, **kwargs):
+    old_status = None if created else instance._dashboard_status
+    _remember_status(instance)
+
+    if not created and not _status_saved(update_fields):
+        return
+
+    delta = int(instance.status == 'overdue') - int(old_status == 'overdue')
+    if delta and _venta_is_active(instance):
+        DashboardCounters.apply_deltas(cuotas_vencidas=delta)
+        if delta > 0:
+            publish('overdue', {'schedule_ids': [instance.pk], 'count': 1})
+
+
+@receiver(post_delete, sender=PaymentSchedule)
+def schedule_deleted(sender, instance, **kwargs):
+    if instance.status == 'overdue' and _venta_is_active(instance):
+        DashboardCounters.apply_deltas(cuotas_vencidas=-1)
+
+
+# --- Pagos ------------------------------------------------------------------
+
+@receiver(post_save, sender=Payment)
+def payment_saved(sender, instance, created, **kwargs):
+    if created:
+        publish('payment', {
+            'id': instance.pk,
+            'venta_id': instance.venta_id,
+            'payment_schedule_id': instance.payment_schedule_id,
+            'amount': instance.amount,
+            'payment_date': instance.payment_date,
+            'payment_type': instance.payment_type,
+        })
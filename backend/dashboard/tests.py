@@ -1,3 +1,271 @@
-from django.test import TestCase
+import asyncio
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import AsyncClient, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from customers.models import Customer
+from lotes.models import Lote
+from payments.models import PaymentSchedule
+from sales.models import Venta
+from users.models import User
+from . import events
+from .events import Broadcaster, format_sse, publish
+from .models import DashboardCounters
+
+
+class DashboardCountersSignalTests(TestCase):
+    """
+    Los contadores mantenidos por señales (y por los deltas explícitos de las
+    actualizaciones masivas) coinciden siempre con DashboardCounters.compute().
+    """
+
+    def setUp(self):
+        self.customer = Customer.objects.create(first_name='Eva', last_name='Torres')
+        DashboardCounters.reconcile()
+
+    def assertCountersInSync(self):
+        counters = DashboardCounters.objects.get(pk=DashboardCounters.SINGLETON_ID)
+        self.assertEqual(counters.as_dict(), DashboardCounters.compute())
+
+    def create_sale(self, lot_number='1', financing_months=6):
+        lote = Lote.objects.create(
+            block='D', lot_number=lot_number, area=Decimal('100.00'), price=Decimal('10000.00')
+        )
+        return Venta.create_sale(
+            lote=lote, customer=self.customer, sale_price=Decimal('6000.00'), payment_day=5,
+            financing_months=financing_months,
+        )
+
+    def make_overdue(self, venta, *installment_numbers):
+        """Cuotas con vencimiento pasado guardadas una a una (save recalcula el estado)."""
+        for installment_number in installment_numbers:
+            schedule = venta.payment_schedules.get(installment_number=installment_number)
+            schedule.due_date = date.today() - timedelta(days=installment_number)
+            schedule.save()
+            self.assertEqual(schedule.status, 'overdue')
+
+    def test_customers_created_and_deleted(self):
+        other = Customer.objects.create(first_name='Iván', last_name='Soto')
+        self.assertCountersInSync()
+        other.delete()
+        self.assertCountersInSync()
+
+    def test_lote_status_transitions(self):
+        lote = Lote.objects.create(block='D', lot_number='9', area=Decimal('90.00'), price=Decimal('9000.00'))
+        self.assertCountersInSync()
+
+        for status in ('reservado', 'vendido', 'liquidado', 'disponible', 'vendido'):
+            lote.status = status
+            lote.save()
+            self.assertCountersInSync()
+
+        # Cambios que no guardan el estado no mueven los contadores
+        lote.status = 'disponible'
+        lote.save(update_fields=['price'])
+        self.assertCountersInSync()
+
+        Lote.objects.get(pk=lote.pk).delete()
+        self.assertCountersInSync()
+
+    def test_schedule_save_and_delete(self):
+        venta = self.create_sale()
+        self.assertCountersInSync()
+
+        self.make_overdue(venta, 1, 2)
+        self.assertEqual(DashboardCounters.get_solo().cuotas_vencidas, 2)
+        self.assertCountersInSync()
+
+        # Pagar una cuota vencida la saca del contador
+        venta.payment_schedules.get(installment_number=1).register_payment(amount=Decimal('1000.00'))
+        self.assertCountersInSync()
+
+        venta.payment_schedules.get(installment_number=2).delete()
+        self.assertEqual(DashboardCounters.get_solo().cuotas_vencidas, 0)
+        self.assertCountersInSync()
+
+    def test_venta_activation_moves_overdue_count(self):
+        venta = self.create_sale()
+        self.make_overdue(venta, 1, 2, 3)
+        self.assertCountersInSync()
+
+        venta.cancel_sale(reason='Desistimiento')
+        self.assertEqual(DashboardCounters.get_solo().cuotas_vencidas, 0)
+        self.assertCountersInSync()
+
+        # Las cuotas de una venta inactiva no cuentan al vencer ni al borrarse
+        self.make_overdue(venta, 4)
+        venta.payment_schedules.get(installment_number=3).delete()
+        self.assertCountersInSync()
+
+        venta = Venta.objects.get(pk=venta.pk)
+        venta.status = 'active'
+        venta.save()
+        self.assertEqual(DashboardCounters.get_solo().cuotas_vencidas, 3)
+        self.assertCountersInSync()
+
+    def test_overdue_bulk_update(self):
+        active = self.create_sale('1')
+        cancelled = self.create_sale('2')
+        cancelled.cancel_sale(reason='Reventa')
+        # QuerySet.update no dispara señales: las cuotas quedan pendientes
+        for venta in (active, cancelled):
+            PaymentSchedule.objects.filter(venta=venta, installment_number__lte=2).update(
+                due_date=date.today() - timedelta(days=10)
+            )
+        self.assertCountersInSync()
+
+        call_command('update_overdue_installments', stdout=StringIO())
+
+        self.assertEqual(PaymentSchedule.objects.filter(status='overdue').count(), 4)
+        self.assertEqual(DashboardCounters.get_solo().cuotas_vencidas, 2)
+        self.assertCountersInSync()
+
+
+class BroadcasterOverflowTests(SimpleTestCase):
+    def test_slow_subscriber_gets_resync(self):
+        broadcaster = Broadcaster()
+        fast, slow = asyncio.Queue(), asyncio.Queue(maxsize=2)
+        broadcaster.subscribers.update({fast, slow})
+
+        for number in range(3):
+            broadcaster._dispatch({'event': 'payment', 'data': {'n': number}})
+
+        self.assertEqual(fast.qsize(), 3)
+        # Al llenarse la cola se descartan los eventos pendientes y queda solo resync
+        self.assertEqual(slow.qsize(), 1)
+        self.assertEqual(slow.get_nowait(), {'event': 'resync', 'data': {}})
+
+
+class DashboardEventsTests(TransactionTestCase):
+    """
+    publish() llega a los suscriptores por LISTEN/NOTIFY solo al confirmarse
+    la transacción, y el stream lo reenvía como Server-Sent Events.
+    """
+
+    def setUp(self):
+        # El listener debe escuchar en la base de datos de pruebas
+        override = override_settings(DASHBOARD_EVENTS_DATABASE=connection.settings_dict)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    @staticmethod
+    def publish_rolled_back():
+        try:
+            with transaction.atomic():
+                publish('payment', {'amount': Decimal('999.00')})
+                raise RuntimeError
+        except RuntimeError:
+            pass
+
+    async def test_publish_reaches_subscribers(self):
+        broadcaster = Broadcaster()
+        queues = [await broadcaster.subscribe(), await broadcaster.subscribe()]
+        try:
+            await sync_to_async(self.publish_rolled_back)()
+            await sync_to_async(publish)('payment', {'amount': Decimal('150.00')})
+
+            for queue in queues:
+                message = await asyncio.wait_for(queue.get(), timeout=5)
+                self.assertEqual(message, {'event': 'payment', 'data': {'amount': '150.00'}})
+                self.assertTrue(queue.empty())
+        finally:
+            for queue in queues:
+                broadcaster.unsubscribe(queue)
+        self.assertIsNone(broadcaster.conn)
+
+    async def test_subscribe_does_not_block_the_loop(self):
+        broadcaster = Broadcaster()
+        connect = broadcaster._connect
+
+        def slow_connect():
+            time.sleep(0.3)  # servidor lento
+            return connect()
+
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticking = asyncio.ensure_future(ticker())
+        try:
+            with mock.patch.object(broadcaster, '_connect', side_effect=slow_connect) as patched:
+                queues = await asyncio.gather(broadcaster.subscribe(), broadcaster.subscribe())
+        finally:
+            ticking.cancel()
+        try:
+            # El event loop siguió atendiendo mientras se abría la única conexión
+            self.assertGreater(ticks, 10)
+            self.assertEqual(patched.call_count, 1)
+            self.assertIsNotNone(broadcaster.conn)
+        finally:
+            for queue in queues:
+                broadcaster.unsubscribe(queue)
+        self.assertIsNone(broadcaster.conn)
+
+    async def test_listener_restarts_after_failure(self):
+        broadcaster = Broadcaster()
+        broadcaster.retry_seconds = 0.1
+        queue = await broadcaster.subscribe()
+        try:
+            first = broadcaster.conn
+            await sync_to_async(self.terminate_backend)(first.get_backend_pid())
+
+            # Se reabre solo, sin cerrar los streams, y avisa que recarguen el estado
+            self.assertEqual(await asyncio.wait_for(queue.get(), timeout=5), {'event': 'resync', 'data': {}})
+            self.assertIsNotNone(broadcaster.conn)
+            self.assertIsNot(broadcaster.conn, first)
+
+            await sync_to_async(publish)('overdue', {'count': 1})
+            self.assertEqual(
+                await asyncio.wait_for(queue.get(), timeout=5), {'event': 'overdue', 'data': {'count': 1}}
+            )
+        finally:
+            broadcaster.unsubscribe(queue)
+        self.assertIsNone(broadcaster.conn)
+
+    @staticmethod
+    def terminate_backend(pid):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_terminate_backend(%s)', [pid])
+
+    async def test_stream(self):
+        client = AsyncClient()
+        response = await client.get('/api/v1/dashboard/stream/')
+        self.assertEqual(response.status_code, 401)
+
+        user = await sync_to_async(User.objects.create_user)(
+            username='stream', email='stream@example.com', password='x'
+        )
+        token = str(RefreshToken.for_user(user).access_token)
+        # Con la fila ya creada, get_solo() no publica su propio snapshot
+        await sync_to_async(DashboardCounters.reconcile)()
+        response = await client.get('/api/v1/dashboard/stream/', {'token': token})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+
+        # Un stream corto: al vencer el plazo se cierra y libera la suscripción
+        with mock.patch('dashboard.views.STREAM_MAX_SECONDS', 1):
+            chunks = aiter(response.streaming_content)
+            self.assertEqual(await anext(chunks), b'retry: 3000\n\n')
+            snapshot = await sync_to_async(DashboardCounters.compute)()
+            self.assertEqual(await anext(chunks), format_sse('counters_snapshot', snapshot).encode())
+
+            await sync_to_async(publish)('overdue', {'count': 2})
+            self.assertEqual(
+                await asyncio.wait_for(anext(chunks), timeout=5), format_sse('overdue', {'count': 2}).encode()
+            )
+            # Hasta el cierre solo quedan comentarios de keep-alive
+            self.assertLessEqual({chunk async for chunk in chunks}, {b': ping\n\n'})
+        self.assertFalse(events.broadcaster.subscribers)
+        self.assertIsNone(events.broadcaster.conn)
@@ -1,8 +1,11 @@
 from django.urls import path
-from .views import DashboardSummaryView, AllDueDatesView
+from .views import AllDueDatesView, dashboard_summary, dashboard_stream
 
 urlpatterns = [
+    # Vista async (ORM async + asyncio.gather)
+    path('summary/', dashboard_summary, name='dashboard-summary'),
     # Al ser una APIView, usamos .as_view()
-    path('summary/', DashboardSummaryView.as_view(), name='dashboard-summary'),
     path('due-dates/', AllDueDatesView.as_view(), name='dashboard-due-dates'),
+    # Server-Sent Events (vista async, requiere ASGI)
+    path('stream/', dashboard_stream, name='dashboard-stream'),
 ]
\ No newline at end of file
@@ -1,74 +1,80 @@
 ######################################################
 # ACA SE MOIFICA LO QUE ENTREGA LA API DE DASHBOARD
 ######################################################
+import asyncio
+import time
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import render
 
 
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.pagination import PageNumberPagination
+from payments.pagination import KeysetPagination
 from django.db.models import Sum, Count, Q
 from payments.models import PaymentSchedule, Payment
 from sales.models import Venta
-from lotes.models import Lote
-from django.utils.decorators import method_decorator
-from django.views.decorators.cache import cache_page
 from payments.serializers import PaymentSerializer, PaymentScheduleSerializer
-from customers.models import Customer
+from .models import DashboardCounters
+from villanueva_project.db_router import ReplicaReadMixin, replica_read
+from .events import broadcaster, format_sse
 
 
-class DueDatesPagination(PageNumberPagination):
+class DueDatesPagination(KeysetPagination):
     page_size = 20
     page_size_query_param = 'page_size'
     max_page_size = 100
+    ordering = ('due_date', 'id')
+
+
+async def _aserialize(serializer_class, queryset):
+    """Materializa el queryset con el ORM async y lo serializa fuera del event loop."""
+    rows = [obj async for obj in queryset]
+    return await sync_to_async(lambda: serializer_class(rows, many=True).data)()
+
+
+@replica_read
+async def dashboard_summary(request):
+    """
+    Resumen del dashboard: contadores, últimos pagos y próximas cuotas.
+
+    Los contadores y las dos listas son independientes, así que se piden en
+    paralelo con asyncio.gather en lugar de ocupar un hilo por petición
+    durante todo el recorrido.
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return JsonResponse({'error': f'Método "{request.method}" no permitido'}, status=405)
+
+    counters, ultimos_pagos, cuotas_proximas_a_vencer = await asyncio.gather(
+        DashboardCounters.aget_solo(),
+        _aserialize(
+            PaymentSerializer,
+            Payment.objects.select_related('venta__customer').order_by('-created_at')[:5]
+        ),
+        _aserialize(
+            PaymentScheduleSerializer,
+            PaymentSchedule.objects.filter(
+                status='pending',
+                venta__status='active'  # Solo ventas activas
+            ).order_by('due_date', 'id')[:5]
+        ),
+    )
+
+    return JsonResponse({
+        "info": counters.as_dict(),
+        "results": {
+            "ultimos_pagos": ultimos_pagos,
+            "cuotas_proximas_a_vencer": cuotas_proximas_a_vencer
+        }
+    })
 
-class DashboardSummaryView(APIView):
-    @method_decorator(cache_page(60 * 20)) # Cache por 2 minutos
-    def get(self, request):
-        # 1. Agregaciones rápidas (SQL puro mediante ORM)
-        total_clientes = Customer.objects.count()
-        total_lotes = Lote.objects.count()
-        lotes_disponibles = Lote.objects.filter(status='disponible').count()
-        lotes_vendidos = Lote.objects.filter(status='vendido').count()
-        cuotas_vencidas = PaymentSchedule.objects.filter(
-            status='overdue',
-            venta__status='active'  # Solo ventas activas
-        ).count()
-        
-        
-        # 2. Datos para gráficos (Agrupación)
-        # Aquí puedes usar TruncMonth para agrupar por mes
-        
-        # 3. Listas limitadas (Solo lo último)
-        ultimos_pagos = Payment.objects.select_related('venta__customer').order_by('-created_at')[:5]
-        ultimos_pagos_serializer = PaymentSerializer(ultimos_pagos, many=True)
-
-        cuotas_proximas_a_vencer = PaymentSchedule.objects.filter(
-            status='pending',
-            venta__status='active'  # Solo ventas activas
-        ).order_by('due_date')[:5]
-        cuotas_proximas_a_vencer_serializer = PaymentScheduleSerializer(cuotas_proximas_a_vencer, many=True)
-        
 
-        return Response({
-            "info": {
-                "total_clientes": total_clientes,
-                "total_lotes": total_lotes,
-                "lotes_disponibles": lotes_disponibles,
-                "lotes_vendidos": lotes_vendidos,
-                "cuotas_vencidas": cuotas_vencidas,
-            },
-            "results": {
-                "ultimos_pagos": ultimos_pagos_serializer.data,
-                "cuotas_proximas_a_vencer": cuotas_proximas_a_vencer_serializer.data
-            }
-        })
-
-
-class AllDueDatesView(APIView):
+class AllDueDatesView(ReplicaReadMixin, APIView):
     """
     Vista para obtener todas las cuotas pendientes y vencidas de ventas activas.
-    Soporta paginación y filtrado por estado.
+    Soporta filtrado por estado y paginación por cursor sobre (due_date, id);
+    el total solo se calcula con ?count=exact o ?count=approx.
     """
     pagination_class = DueDatesPagination
     
@@ -80,6 +86,9 @@ class AllDueDatesView(APIView):
         # Obtener parámetro de ordenamiento (asc o desc)
         ordering = request.query_params.get('ordering', 'asc')
         
+        # Orden del cursor: por defecto las más próximas primero
+        keyset_ordering = ('due_date', 'id')
+        
         # Query base: solo ventas activas
         queryset = PaymentSchedule.objects.filter(
             venta__status='active'
@@ -95,13 +104,11 @@ class AllDueDatesView(APIView):
                 queryset = queryset.filter(
                     due_date__gte=today,
                     due_date__lte=max_date
-                ).order_by('due_date')
-            else:
-                queryset = queryset.order_by('due_date')
+                )
         elif status_filter == 'overdue':
             queryset = queryset.filter(status='overdue')
             # Para vencidas, mostrar las más recientes primero (las que vencieron hace menos tiempo)
-            queryset = queryset.order_by('-due_date')
+            keyset_ordering = ('-due_date', '-id')
         else:
             # 'all' - pendientes y vencidas
             queryset = queryset.filter(status__in=['pending', 'overdue'])
@@ -112,12 +119,11 @@ class AllDueDatesView(APIView):
                 queryset = queryset.filter(
                     due_date__gte=today,
                     due_date__lte=max_date
-                ).order_by('due_date')
-            else:
-                queryset = queryset.order_by('due_date')
+                )
         
         # Paginación
         paginator = self.pagination_class()
+        paginator.ordering = keyset_ordering
         page = paginator.paginate_queryset(queryset, request)
         
         if page is not None:
@@ -125,4 +131,70 @@ class AllDueDatesView(APIView):
             return paginator.get_paginated_response(serializer.data)
         
         serializer = PaymentScheduleSerializer(queryset, many=True)
-        return Response(serializer.data)
\ No newline at end of file
+        return Response(serializer.data)
+
+# Segundos entre comentarios de keep-alive, para que proxies no corten la conexión
+STREAM_HEARTBEAT_SECONDS = 15
+# Duración máxima de un stream. Django 4.2 no detecta la desconexión del cliente
+# mientras transmite, así que cerramos periódicamente y EventSource se reconecta
+# solo (recibiendo un snapshot nuevo).
+STREAM_MAX_SECONDS = 300
+STREAM_RETRY_MILLISECONDS = 3000
+
+
+async def dashboard_stream(request):
+    """
+    Stream Server-Sent Events con las novedades del dashboard:
+    - counters_snapshot: contadores completos al conectarse
+    - counters: deltas aplicados a los contadores
+    - payment: pago registrado
+    - overdue: cuotas que pasaron a vencidas
+    - resync: el cliente se atrasó o se reabrió el listener; debe recargar los datos
+
+    Requiere ejecutarse bajo ASGI. El token JWT puede enviarse en la cabecera
+    Authorization o en ?token= (EventSource no permite cabeceras).
+    """
+    from users.authentication import authenticate_request
+
+    user = await sync_to_async(authenticate_request)(request)
+    if user is None:
+        return JsonResponse({'error': 'Autenticación requerida'}, status=401)
+
+    # Suscribirse antes de leer el snapshot para no perder eventos intermedios
+    queue = await broadcaster.subscribe()
+    try:
+        counters = await sync_to_async(DashboardCounters.get_solo)()
+    except Exception:
+        broadcaster.unsubscribe(queue)
+        raise
+
+    response = StreamingHttpResponse(
+        _event_stream(queue, counters.as_dict()),
+        content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+async def _event_stream(queue, snapshot):
+    deadline = time.monotonic() + STREAM_MAX_SECONDS
+    try:
+        yield f'retry: {STREAM_RETRY_MILLISECONDS}\n\n'
+        yield format_sse('counters_snapshot', snapshot)
+
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                message = await asyncio.wait_for(
+                    queue.get(), timeout=min(STREAM_HEARTBEAT_SECONDS, remaining)
+                )
+            except asyncio.TimeoutError:
+                yield ': ping\n\n'
+                continue
+
+            yield format_sse(message['event'], message['data'])
+    finally:
+        broadcaster.unsubscribe(queue)
@@ -0,0 +1,228 @@
+"""
+Alta masiva de lotes (bulk-create JSON e importación CSV).
+
+La unicidad de un lote es el par (manzana, número). Filtrar con block__in y
+lot_number__in compara el producto cruzado de ambos conjuntos y reporta
+falsos duplicados (A-2 y B-1 existentes "bloquean" A-1), así que los
+duplicados contra la base de datos se buscan por pares exactos: una
+condición Q(block=..., lot_number=...) | ... por cada PAIR_CHUNK_SIZE pares,
+resuelta con el índice único (block, lot_number). Los duplicados dentro de
+la importación se detectan con un diccionario par -> posición. Los lotes se
+insertan con bulk_create y, como bulk_create no dispara señales, los
+contadores del dashboard se ajustan una sola vez al final.
+"""
+import csv
+import io
+from collections import Counter
+from functools import reduce
+from operator import or_
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils.translation import gettext_lazy as _
+from rest_framework import serializers
+
+from .models import Lote
+
+
+LOTE_FIELDS = ('block', 'lot_number', 'area', 'price', 'status')
+
+REQUIRED_COLUMNS = ('block', 'lot_number', 'area', 'price')
+
+BATCH_SIZE = 1000
+PAIR_CHUNK_SIZE = 500
+MAX_ERRORS = 100
+
+
+def lotes_by_pairs(pairs, *fields):
+    """
+    Lotes (como diccionarios con los campos dados) de los pares (manzana,
+    número) indicados, con una consulta por cada PAIR_CHUNK_SIZE pares.
+    """
+    pairs = list(pairs)
+    lotes = []
+    for offset in range(0, len(pairs), PAIR_CHUNK_SIZE):
+        condition = reduce(or_, (
+            Q(block=block, lot_number=lot_number) for block, lot_number in pairs[offset:offset + PAIR_CHUNK_SIZE]
+        ))
+        lotes.extend(Lote.objects.filter(condition).values(*fields))
+    return lotes
+
+
+class LoteRowSerializer(serializers.ModelSerializer):
+    """
+    Validación de una fila sin consultas: el validador de la restricción
+    unique_lote se reemplaza por la verificación por pares de LoteImporter.
+    """
+
+    class Meta:
+        model = Lote
+        fields = list(LOTE_FIELDS)
+        validators = []
+
+    def to_internal_value(self, data):
+        if not isinstance(data, dict):
+            raise serializers.ValidationError({'non_field_errors': [_("Se esperaba un objeto con los datos del lote.")]})
+        data = {
+            field: value.strip() if isinstance(value, str) else ('' if value is None else value)
+            for field, value in data.items() if field in LOTE_FIELDS
+        }
+        # Estado vacío o ausente: el valor por defecto del modelo
+        if not data.get('status'):
+            data.pop('status', None)
+        return super().to_internal_value(data)
+
+    def validate_price(self, value):
+        if value <= 0:
+            raise serializers.ValidationError(_("El precio debe ser mayor a 0."))
+        return value
+
+    def validate_area(self, value):
+        if value <= 0:
+            raise serializers.ValidationError(_("El área debe ser mayor a 0."))
+        return value
+
+
+class LoteImporter:
+    """
+    Valida e inserta lotes por bloques dentro de una importación.
+
+    Los bloques sucesivos comparten los pares ya vistos, así que un
+    duplicado entre el primer y el último bloque también se detecta. Las
+    posiciones de los errores son 1-based (fila del lote o del CSV).
+    """
+
+    def __init__(self, created_by=None):
+        self.created_by = created_by
+        self.row_serializer = LoteRowSerializer()
+        self.seen = {}
+        self.errors = []
+        self.created_count = 0
+        self.status_counts = Counter()
+
+    def add_error(self, position, message):
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append(
+                _("Lote en la posición {position}: {message}").format(position=position, message=message)
+            )
+
+    def validate(self, rows, start=1):
+        """Retorna las filas válidas como (posición, datos); los errores se acumulan en self.errors."""
+        valid = []
+        for position, data in enumerate(rows, start=start):
+            try:
+                cleaned = self.row_serializer.run_validation(data)
+            except serializers.ValidationError as exc:
+                detail = exc.detail if isinstance(exc.detail, dict) else {'non_field_errors': exc.detail}
+                for field, messages in detail.items():
+                    self.add_error(position, f"{field}: {' '.join(str(message) for message in messages)}")
+                continue
+
+            pair = (cleaned['block'], cleaned['lot_number'])
+            previous = self.seen.get(pair)
+            if previous is not None:
+                self.add_error(position, _("Mz. {block} - Lt. {lot_number} está duplicado con la posición {previous}.").format(
+                    block=pair[0], lot_number=pair[1], previous=previous
+                ))
+                continue
+            self.seen[pair] = position
+            valid.append((position, cleaned))
+
+        self._check_existing(valid)
+        return valid
+
+    def _check_existing(self, valid):
+        """Pares (manzana, número) ya registrados: una consulta por PAIR_CHUNK_SIZE pares."""
+        if not valid:
+            return
+
+        pairs = [(data['block'], data['lot_number']) for position, data in valid]
+        existing = {(lote['block'], lote['lot_number']) for lote in lotes_by_pairs(pairs, 'block', 'lot_number')}
+        if not existing:
+            return
+
+        rejected = set()
+        for position, data in valid:
+            pair = (data['block'], data['lot_number'])
+            if pair in existing:
+                self.add_error(position, _("Ya existe un registro con la Manzana '{block}' y Lote '{lot_number}'.").format(
+                    block=pair[0], lot_number=pair[1]
+                ))
+                rejected.add(position)
+        valid[:] = [(position, data) for position, data in valid if position not in rejected]
+
+    def save(self, valid):
+        """Inserta las filas validadas con bulk_create y retorna los lotes creados."""
+        lotes = Lote.objects.bulk_create(
+            [Lote(created_by=self.created_by, **data) for position, data in valid],
+            batch_size=BATCH_SIZE,
+        )
+        self.created_count += len(lotes)
+        self.status_counts.update(lote.status for lote in lotes)
+        return lotes
+
+    def finish(self):
+        """Ajusta los contadores del dashboard (bulk_create no dispara señales)."""
+        from dashboard.models import DashboardCounters
+        deltas = {'total_lotes': self.created_count}
+        for lote_status, count in self.status_counts.items():
+            counter = DashboardCounters.LOTE_STATUS_COUNTERS.get(lote_status)
+            if counter:
+                deltas[counter] = deltas.get(counter, 0) + count
+        DashboardCounters.apply_deltas(**deltas)
+
+
+def compact_lote(lote):
+    """Representación reducida de un lote recién creado."""
+    return {
+        'id': lote.id,
+        'block': lote.block,
+        'lot_number': lote.lot_number,
+        'display_name': lote.display_name,
+        'status': lote.status,
+    }
+
+
+def import_csv(uploaded_file, created_by=None):
+    """
+    Importa lotes desde un CSV (cabecera con los nombres de LOTE_FIELDS)
+    leyéndolo por bloques de BATCH_SIZE filas. Todo o nada: si alguna fila es
+    inválida no se crea ningún lote. Retorna el importador con el conteo de
+    creados y los errores.
+    """
+    importer = LoteImporter(created_by=created_by)
+    reader = csv.DictReader(io.TextIOWrapper(uploaded_file, encoding='utf-8-sig', newline=''))
+
+    missing = set(REQUIRED_COLUMNS) - set(reader.fieldnames or ())
+    if missing:
+        importer.errors.append(_("Faltan columnas obligatorias en el CSV: {columns}").format(
+            columns=', '.join(sorted(missing))
+        ))
+        return importer
+
+    with transaction.atomic():
+        chunk = []
+        # La fila 1 es la cabecera
+        start = 2
+        for row in reader:
+            chunk.append(row)
+            if len(chunk) == BATCH_SIZE:
+                _import_chunk(importer, chunk, start)
+                start += len(chunk)
+                chunk = []
+        if chunk:
+            _import_chunk(importer, chunk, start)
+
+        if importer.errors:
+            transaction.set_rollback(True)
+            importer.created_count = 0
+        else:
+            importer.finish()
+    return importer
+
+
+def _import_chunk(importer, chunk, start):
+    valid = importer.validate(chunk, start=start)
+    # Con errores ya no se insertará nada: solo se sigue validando el resto
+    if not importer.errors:
+        importer.save(valid)
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.10 on 2026-10-19 07:34
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lotes', '0002_remove_lote_contract_date_remove_lote_contract_file_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='lote',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.search.SearchVector('block', 'lot_number', config='simple'), name='lote_search_idx'),
+        ),
+    ]
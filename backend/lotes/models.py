@@ -1,13 +1,21 @@
+from django.contrib.postgres.indexes import GinIndex
 from django.db import models
 from django.conf import settings
 from django.utils.translation import gettext_lazy as _
 from decimal import Decimal
 
+from villanueva_project.search import search_vector
+
+# Campos del documento de búsqueda (?search=) y de su índice GIN
+LOTE_SEARCH_FIELDS = ('block', 'lot_number')
+
 class Lote(models.Model):
     """
     Modelo para representar un lote o terreno con nueva arquitectura simplificada.
     Solo maneja información básica del lote. Las ventas se gestionan a través del modelo Venta.
     """
+    SEARCH_FIELDS = LOTE_SEARCH_FIELDS
+
     STATUS_CHOICES = [
         ('disponible', _('Disponible')),
         ('vendido', _('Vendido')),
@@ -45,6 +53,9 @@ class Lote(models.Model):
         constraints = [
             models.UniqueConstraint(fields=['block', 'lot_number'], name='unique_lote')
         ]
+        indexes = [
+            GinIndex(search_vector(LOTE_SEARCH_FIELDS), name='lote_search_idx'),
+        ]
 
     def __str__(self):
         return f"Manzana {self.block}, Lote {self.lot_number}"
@@ -106,29 +117,43 @@ class Lote(models.Model):
         if not active_sale:
             return Decimal('0.00')
         
-        return active_sale.total_payments
+        from django.db.models import Sum
+        return active_sale.payments.aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
 
 
     def get_sales_history(self):
-        """Obtiene el historial de ventas del lote."""
+        """
+        Obtiene el historial de ventas del lote. Las ventas archivadas siguen
+        aquí; with_balances() y for_listing() leen sus cuotas y pagos del archivo.
+        """
         from sales.models import Venta
         return Venta.objects.filter(lote=self).order_by('-created_at')
 
     def get_payment_history(self):
-        """Obtiene el historial de pagos del lote a través de sus ventas."""
-        from sales.models import Venta
-        from payments.models import Payment
-        
-        ventas = Venta.objects.filter(lote=self)
-        return Payment.objects.filter(venta__in=ventas).order_by('-payment_date')
+        """
+        Obtiene el historial de pagos del lote a través de sus ventas, de las
+        tablas activas y del archivo (lista, del más reciente al más antiguo).
+        """
+        from payments.models import ArchivedPayment, Payment
+
+        payments = [
+            *Payment.objects.filter(venta__lote=self),
+            *ArchivedPayment.objects.filter(venta__lote=self),
+        ]
+        return sorted(payments, key=lambda payment: payment.payment_date, reverse=True)
 
     def get_payment_schedules(self):
-        """Obtiene los cronogramas de pago del lote a través de sus ventas."""
-        from sales.models import Venta
-        from payments.models import PaymentSchedule
-        
-        ventas = Venta.objects.filter(lote=self)
-        return PaymentSchedule.objects.filter(venta__in=ventas).order_by('installment_number')
+        """
+        Obtiene los cronogramas de pago del lote a través de sus ventas, de las
+        tablas activas y del archivo (lista, en orden de cuota).
+        """
+        from payments.models import ArchivedPaymentSchedule, PaymentSchedule
+
+        schedules = [
+            *PaymentSchedule.objects.filter(venta__lote=self),
+            *ArchivedPaymentSchedule.objects.filter(venta__lote=self),
+        ]
+        return sorted(schedules, key=lambda schedule: schedule.installment_number)
 
     def update_status_from_sales(self):
         """
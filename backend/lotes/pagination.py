@@ -0,0 +1,26 @@
+"""
+Paginación por cursor de los historiales de un lote (ventas, pagos y
+cuotas): un lote revendido con cientos de pagos se recorre por páginas sin
+OFFSET ni COUNT (ver payments.pagination.KeysetPagination).
+"""
+from payments.pagination import KeysetPagination
+
+
+class LoteSalesHistoryPagination(KeysetPagination):
+    """Ventas del lote, de la más reciente a la más antigua."""
+    page_size = 20
+    ordering = ('-sale_date', '-id')
+
+
+class LotePaymentHistoryPagination(KeysetPagination):
+    """Pagos del lote, del más reciente al más antiguo."""
+    page_size = 50
+    max_page_size = 200
+    ordering = ('-payment_date', '-id')
+
+
+class LotePaymentSchedulesPagination(KeysetPagination):
+    """Cuotas del lote: las de la venta más reciente primero, en orden de cuota."""
+    page_size = 50
+    max_page_size = 200
+    ordering = ('-venta_id', 'installment_number', 'id')
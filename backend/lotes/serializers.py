@@ -2,8 +2,9 @@ from rest_framework import serializers
 from django.utils.translation import gettext_lazy as _
 from django.db import transaction
 from .models import Lote, LoteHistory
+from .bulk import LoteImporter, compact_lote
 from users.serializers import UserSerializer
-from customers.serializers import CustomerSerializer
+from customers.serializers import CustomerSerializer, CustomerReferenceSerializer
 
 class LoteHistorySerializer(serializers.ModelSerializer):
     """Serializador para el historial de un lote."""
@@ -118,6 +119,64 @@ class LoteSerializer(serializers.ModelSerializer):
             return None
 
 
+class LoteHistoryVentaSerializer(serializers.Serializer):
+    """Referencia a la venta en los historiales de pagos y cuotas del lote."""
+    id = serializers.IntegerField()
+    status = serializers.CharField()
+    sale_price = serializers.FloatField()
+    sale_date = serializers.DateTimeField()
+
+
+class LoteSalesHistorySerializer(serializers.Serializer):
+    """
+    Venta en el historial del lote. Espera Venta.objects.for_listing(): el
+    saldo pendiente y el total pagado vienen anotados, sin consultas por venta.
+    """
+    id = serializers.IntegerField()
+    status = serializers.CharField()
+    sale_price = serializers.FloatField()
+    initial_payment = serializers.FloatField()
+    sale_date = serializers.DateTimeField()
+    contract_date = serializers.DateField()
+    remaining_balance = serializers.FloatField(source='pending_balance')
+    total_payments = serializers.FloatField(source='total_paid')
+    payment_completion_percentage = serializers.SerializerMethodField()
+    customer = CustomerReferenceSerializer()
+
+    def get_payment_completion_percentage(self, obj):
+        """Porcentaje pagado del precio de venta (como en el resumen del cliente)."""
+        if obj.sale_price <= 0:
+            return 0
+        return round(float(obj.total_paid / obj.sale_price * 100), 2)
+
+
+class LotePaymentHistorySerializer(serializers.Serializer):
+    """Pago en el historial del lote (venta y cliente vía select_related)."""
+    id = serializers.IntegerField()
+    amount = serializers.FloatField()
+    payment_date = serializers.DateTimeField()
+    method = serializers.CharField()
+    payment_type = serializers.CharField()
+    receipt_number = serializers.CharField()
+    receipt_date = serializers.DateField()
+    notes = serializers.CharField()
+    venta = LoteHistoryVentaSerializer()
+    customer = CustomerReferenceSerializer(source='venta.customer')
+
+
+class LotePaymentScheduleSerializer(serializers.Serializer):
+    """Cuota en el cronograma del lote (venta y cliente vía select_related)."""
+    id = serializers.IntegerField()
+    installment_number = serializers.IntegerField()
+    scheduled_amount = serializers.FloatField()
+    paid_amount = serializers.FloatField()
+    due_date = serializers.DateField()
+    status = serializers.CharField()
+    payment_date = serializers.DateTimeField()
+    venta = LoteHistoryVentaSerializer()
+    customer = CustomerReferenceSerializer(source='venta.customer')
+
+
 class BulkLoteCreateSerializer(serializers.Serializer):
     """
     Serializer para crear múltiples lotes en una sola petición.
@@ -131,108 +190,32 @@ class BulkLoteCreateSerializer(serializers.Serializer):
     
     def validate_lotes(self, value):
         """
-        Valida cada lote individualmente y verifica duplicados en el lote.
+        Valida el lote por conjuntos (ver lotes.bulk.LoteImporter): sin
+        consultas por lote y con duplicados buscados por pares exactos
+        (manzana, número), no por el producto cruzado de ambos conjuntos.
         """
         if not value:
             raise serializers.ValidationError(_("La lista de lotes no puede estar vacía."))
-        
-        # Validar estructura básica de cada lote
-        required_fields = ['block', 'lot_number', 'area', 'price']
-        for i, lote_data in enumerate(value):
-            for field in required_fields:
-                if field not in lote_data or lote_data[field] is None or lote_data[field] == '':
-                    raise serializers.ValidationError(
-                        _("El lote en la posición {position} debe tener {field}.").format(
-                            position=i+1, field=field
-                        )
-                    )
-        
-        # Verificar duplicados dentro del lote (misma manzana y número)
-        lote_identifiers = []
-        
-        for i, lote_data in enumerate(value):
-            block = str(lote_data['block']).strip()
-            lot_number = str(lote_data['lot_number']).strip()
-            identifier = f"{block}-{lot_number}"
-            
-            if identifier in lote_identifiers:
-                raise serializers.ValidationError(
-                    _("El lote Mz. {block} - Lt. {lot_number} está duplicado en el lote de lotes.").format(
-                        block=block, lot_number=lot_number
-                    )
-                )
-            lote_identifiers.append(identifier)
-        
-        # Verificar duplicados con la base de datos
-        existing_lotes = Lote.objects.filter(
-            block__in=[str(lote['block']).strip() for lote in value],
-            lot_number__in=[str(lote['lot_number']).strip() for lote in value]
-        ).values_list('block', 'lot_number')
-        
-        if existing_lotes:
-            duplicates = [f"Mz. {block} - Lt. {lot_number}" for block, lot_number in existing_lotes]
-            raise serializers.ValidationError(
-                _("Los siguientes lotes ya existen en la base de datos: {duplicates}").format(
-                    duplicates=', '.join(duplicates)
-                )
-            )
-        
-        # Validar valores numéricos
-        for i, lote_data in enumerate(value):
-            try:
-                area = float(lote_data['area'])
-                price = float(lote_data['price'])
-                
-                if area <= 0:
-                    raise serializers.ValidationError(
-                        _("El lote en la posición {position} debe tener un área mayor a 0.").format(
-                            position=i+1
-                        )
-                    )
-                
-                if price <= 0:
-                    raise serializers.ValidationError(
-                        _("El lote en la posición {position} debe tener un precio mayor a 0.").format(
-                            position=i+1
-                        )
-                    )
-            except (ValueError, TypeError):
-                raise serializers.ValidationError(
-                    _("El lote en la posición {position} tiene valores de área o precio inválidos.").format(
-                        position=i+1
-                    )
-                )
-        
-        return value
-    
+
+        request = self.context.get('request')
+        created_by = request.user if request and request.user.is_authenticated else None
+        self.importer = LoteImporter(created_by=created_by)
+        valid = self.importer.validate(value)
+        if self.importer.errors:
+            raise serializers.ValidationError(self.importer.errors)
+        return valid
+
     def create(self, validated_data):
         """
-        Crea múltiples lotes en una transacción.
+        Crea los lotes con bulk_create en una transacción y responde con
+        una representación reducida de cada uno.
         """
-        lotes_data = validated_data['lotes']
-        request = self.context.get('request')
-        created_by = request.user if request and hasattr(request, 'user') else None
-        
-        created_lotes = []
-        
         with transaction.atomic():
-            for lote_data in lotes_data:
-                # Agregar el usuario que crea el lote
-                if created_by:
-                    lote_data['created_by'] = created_by
-                
-                # Establecer estado por defecto si no se especifica
-                if 'status' not in lote_data:
-                    lote_data['status'] = 'disponible'
-                
-                # Crear el lote usando el serializer individual
-                serializer = LoteSerializer(data=lote_data, context=self.context)
-                if serializer.is_valid(raise_exception=True):
-                    lote = serializer.save()
-                    created_lotes.append(lote)
-        
+            created_lotes = self.importer.save(validated_data['lotes'])
+            self.importer.finish()
+
         return {
             'message': _("Se crearon {count} lotes exitosamente.").format(count=len(created_lotes)),
             'created_count': len(created_lotes),
-            'lotes': LoteSerializer(created_lotes, many=True, context=self.context).data
-        }
\ No newline at end of file
+            'lotes': [compact_lote(lote) for lote in created_lotes]
+        }
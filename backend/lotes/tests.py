@@ -1,3 +1,179 @@
+from decimal import Decimal
+
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from dashboard.models import DashboardCounters
+from users.models import User
+from .models import Lote
+
+
+class BulkLoteCreateTests(TestCase):
+    """El alta masiva valida por pares (manzana, número) e inserta con bulk_create."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='lotes', email='lotes@example.com', password='x', role='admin'
+        )
+        for block, lot_number in (('A', '2'), ('B', '1')):
+            Lote.objects.create(block=block, lot_number=lot_number, area=Decimal('100.00'), price=Decimal('1000.00'))
+        DashboardCounters.reconcile()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def rows(self, count, block='M'):
+        return [
+            {'block': block, 'lot_number': str(i), 'area': '120.50', 'price': '15000.00'}
+            for i in range(count)
+        ]
+
+    def test_constant_queries(self):
+        # Pares existentes (2 bloques de pares), savepoint, INSERT, contador
+        # + notificación y release, sin importar el tamaño del lote
+        rows = self.rows(600)
+        rows[0]['status'] = 'vendido'
+        with self.assertNumQueries(7):
+            response = self.client.post('/api/v1/lotes/bulk-create/', {'lotes': rows}, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created_count'], 600)
+        self.assertEqual(set(response.data['lotes'][0]), {'id', 'block', 'lot_number', 'display_name', 'status'})
+        self.assertEqual(Lote.objects.filter(block='M', created_by=self.user).count(), 600)
+        counters = DashboardCounters.objects.get()
+        self.assertEqual(counters.total_lotes, 602)
+        self.assertEqual(counters.lotes_disponibles, 601)
+        self.assertEqual(counters.lotes_vendidos, 1)
+
+    def test_pairs_not_cross_product(self):
+        # A-2 y B-1 existen: A-1 y B-2 no son duplicados
+        rows = [
+            {'block': 'A', 'lot_number': '1', 'area': '100', 'price': '1000'},
+            {'block': 'B', 'lot_number': '2', 'area': '100', 'price': '1000'},
+        ]
+
+        response = self.client.post('/api/v1/lotes/bulk-create/', {'lotes': rows}, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created_count'], 2)
+
+    def test_duplicates_reject_whole_batch(self):
+        rows = self.rows(3)
+        rows[2]['lot_number'] = rows[0]['lot_number']
+        rows.append({'block': 'A', 'lot_number': '2', 'area': '100', 'price': '1000'})
+        rows.append({'block': 'M', 'lot_number': '9', 'area': '0', 'price': '1000'})
+
+        response = self.client.post('/api/v1/lotes/bulk-create/', {'lotes': rows}, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        errors = [str(error) for error in response.data['lotes']]
+        self.assertEqual(len(errors), 3)
+        self.assertIn('posición 3', errors[0])
+        self.assertIn('posición 5', errors[1])
+        self.assertIn('posición 4', errors[2])
+        self.assertFalse(Lote.objects.filter(block='M').exists())
+
+    def test_import_csv(self):
+        content = 'block,lot_number,area,price,status\nC, 1 ,150.00,20000.00,\nC,2,150.00,20000.00,reservado\n'
+        upload = SimpleUploadedFile('lotes.csv', content.encode('utf-8'), content_type='text/csv')
+
+        response = self.client.post('/api/v1/lotes/import-csv/', {'file': upload}, format='multipart')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created_count'], 2)
+        self.assertEqual(Lote.objects.get(block='C', lot_number='1').status, 'disponible')
+        self.assertEqual(Lote.objects.get(block='C', lot_number='2').status, 'reservado')
+
+
+class LoteHistoryTests(TestCase):
+    """
+    Los historiales del lote se paginan por cursor con una consulta por
+    página (una por nivel, activo y archivo, en pagos y cuotas).
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        from customers.models import Customer
+        from sales.models import Venta
+
+        cls.user = User.objects.create_user(
+            username='historial', email='historial@example.com', password='x', role='admin'
+        )
+        cls.lote = Lote.objects.create(block='H', lot_number='1', area=Decimal('90.00'), price=Decimal('9000.00'))
+        first = Venta.create_sale(
+            lote=cls.lote, customer=Customer.objects.create(first_name='Primer', last_name='Dueño'),
+            sale_price=Decimal('6000.00'), payment_day=5, financing_months=6,
+        )
+        first.payment_schedules.get(installment_number=1).register_payment(amount=Decimal('1000.00'))
+        first.cancel_sale(reason='Reventa')
+        cls.first_sale = first
+        cls.lote.refresh_from_db()
+        cls.resale = Venta.create_sale(
+            lote=cls.lote, customer=Customer.objects.create(first_name='Segundo', last_name='Dueño'),
+            sale_price=Decimal('8000.00'), payment_day=10, financing_months=8,
+        )
+        for installment_number in (1, 2, 3):
+            cls.resale.payment_schedules.get(installment_number=installment_number).register_payment(
+                amount=Decimal('1000.00')
+            )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def walk(self, endpoint, page_size, queries=2):
+        """Recorre todas las páginas y retorna las filas y las consultas por página."""
+        url, params = f'/api/v1/lotes/{self.lote.id}/{endpoint}/', {'page_size': page_size}
+        rows = []
+        while url:
+            with self.assertNumQueries(queries):
+                response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            rows.extend(response.data['results'])
+            url, params = response.data['next'], None
+        return rows
+
+    def test_sales_history(self):
+        rows = self.walk('sales_history', page_size=1)
+
+        self.assertEqual([row['id'] for row in rows], [self.resale.id, self.first_sale.id])
+        self.assertEqual(rows[0]['total_payments'], 3000.0)
+        self.assertEqual(rows[0]['remaining_balance'], float(self.resale.remaining_balance))
+        self.assertEqual(rows[0]['payment_completion_percentage'], 37.5)
+        self.assertEqual(rows[0]['customer']['full_name'], 'Segundo Dueño')
+
+    def test_payment_history_and_schedules(self):
+        payments = self.walk('payment_history', page_size=3, queries=3)
+        self.assertEqual(len(payments), 4)
+        self.assertEqual({payment['customer']['first_name'] for payment in payments}, {'Primer', 'Segundo'})
+
+        schedules = self.walk('payment_schedules', page_size=5, queries=3)
+        self.assertEqual(
+            [(row['venta']['id'], row['installment_number']) for row in schedules],
+            [(self.resale.id, number) for number in range(1, 9)]
+            + [(self.first_sale.id, number) for number in range(1, 7)],
+        )
+
+    def test_histories_include_archived_sale(self):
+        from payments.archive import archive_ventas
+
+        histories = [
+            self.walk('sales_history', page_size=1),
+            self.walk('payment_history', page_size=3, queries=3),
+            self.walk('payment_schedules', page_size=5, queries=3),
+        ]
+        self.assertEqual(archive_ventas([self.first_sale.id, self.resale.id])['ventas'], 1)
 
-# Create your tests here.
+        self.assertEqual(
+            [
+                self.walk('sales_history', page_size=1),
+                self.walk('payment_history', page_size=3, queries=3),
+                self.walk('payment_schedules', page_size=5, queries=3),
+            ],
+            histories,
+        )
+        self.assertEqual(len(self.lote.get_payment_history()), 4)
+        self.assertEqual(len(self.lote.get_payment_schedules()), 14)
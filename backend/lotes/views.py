@@ -6,8 +6,16 @@ from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 
 from users.permissions import IsWorkerOrAdmin
+from villanueva_project.search import RankedSearchFilter
 from .models import Lote, LoteHistory
-from .serializers import LoteSerializer, BulkLoteCreateSerializer
+from .serializers import (
+    LoteSerializer, BulkLoteCreateSerializer, LoteSalesHistorySerializer, LotePaymentHistorySerializer,
+    LotePaymentScheduleSerializer
+)
+from .pagination import (
+    LoteSalesHistoryPagination, LotePaymentHistoryPagination, LotePaymentSchedulesPagination
+)
+from .bulk import import_csv
 
 
 class LoteViewSet(viewsets.ModelViewSet):
@@ -24,9 +32,9 @@ class LoteViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated, IsWorkerOrAdmin]
     parser_classes = [MultiPartParser, FormParser, JSONParser]
     
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, RankedSearchFilter]
     filterset_fields = ['status', 'block']
-    search_fields = ['block', 'lot_number']
+    search_documents = [('', Lote)]
     ordering_fields = ['price', 'area', 'created_at', 'block', 'lot_number']
     ordering = ['block', 'lot_number']
 
@@ -64,103 +72,58 @@ class LoteViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['get'])
     def sales_history(self, request, pk=None):
         """
-        Devuelve el historial de ventas del lote.
+        Devuelve el historial de ventas del lote, paginado por cursor sobre
+        (sale_date, id), con saldo pendiente y total pagado anotados.
         """
+        from sales.models import Venta
+
         lote = self.get_object()
-        sales_history = lote.get_sales_history()
-        
-        data = []
-        for sale in sales_history:
-            sale_data = {
-                'id': sale.id,
-                'status': sale.status,
-                'sale_price': float(sale.sale_price),
-                'initial_payment': float(sale.initial_payment) if sale.initial_payment else 0,
-                'sale_date': sale.sale_date,
-                'contract_date': sale.contract_date,
-                'remaining_balance': float(sale.remaining_balance),
-                'total_payments': float(sale.total_payments),
-                'payment_completion_percentage': round(sale.payment_completion_percentage, 2),
-                'customer': {
-                    'id': sale.customer.id,
-                    'full_name': sale.customer.full_name,
-                    'document_number': sale.customer.document_number,
-                    'phone': sale.customer.phone,
-                    'email': sale.customer.email
-                } if sale.customer else None
-            }
-            data.append(sale_data)
-        
-        return Response(data)
+        ventas = Venta.objects.filter(lote=lote).for_listing()
+        return self._keyset_paginated_response(
+            ventas, request, LoteSalesHistoryPagination, LoteSalesHistorySerializer
+        )
 
     @action(detail=True, methods=['get'])
     def payment_history(self, request, pk=None):
         """
-        Devuelve el historial de pagos del lote a través de sus ventas.
+        Devuelve el historial de pagos del lote a través de sus ventas,
+        paginado por cursor sobre (payment_date, id), incluidos los pagos
+        archivados.
         """
+        from payments.models import ArchivedPayment, Payment
+
         lote = self.get_object()
-        payment_history = lote.get_payment_history()
-        
-        data = []
-        for payment in payment_history:
-            payment_data = {
-                'id': payment.id,
-                'amount': float(payment.amount),
-                'payment_date': payment.payment_date,
-                'method': payment.method,
-                'payment_type': payment.payment_type,
-                'receipt_number': payment.receipt_number,
-                'receipt_date': payment.receipt_date,
-                'notes': payment.notes,
-                'venta': {
-                    'id': payment.venta.id,
-                    'status': payment.venta.status,
-                    'sale_price': float(payment.venta.sale_price),
-                    'sale_date': payment.venta.sale_date
-                },
-                'customer': {
-                    'id': payment.venta.customer.id,
-                    'full_name': payment.venta.customer.full_name,
-                    'document_number': payment.venta.customer.document_number
-                } if payment.venta.customer else None
-            }
-            data.append(payment_data)
-        
-        return Response(data)
+        payments = [
+            model.objects.filter(venta__lote=lote).select_related('venta__customer')
+            for model in (Payment, ArchivedPayment)
+        ]
+        return self._keyset_paginated_response(
+            payments, request, LotePaymentHistoryPagination, LotePaymentHistorySerializer
+        )
 
     @action(detail=True, methods=['get'])
     def payment_schedules(self, request, pk=None):
         """
-        Devuelve los cronogramas de pago del lote a través de sus ventas.
+        Devuelve los cronogramas de pago del lote a través de sus ventas,
+        paginados por cursor (venta más reciente primero, en orden de cuota),
+        incluidas las cuotas archivadas.
         """
+        from payments.models import ArchivedPaymentSchedule, PaymentSchedule
+
         lote = self.get_object()
-        payment_schedules = lote.get_payment_schedules()
-        
-        data = []
-        for schedule in payment_schedules:
-            schedule_data = {
-                'id': schedule.id,
-                'installment_number': schedule.installment_number,
-                'scheduled_amount': float(schedule.scheduled_amount),
-                'paid_amount': float(schedule.paid_amount),
-                'due_date': schedule.due_date,
-                'status': schedule.status,
-                'payment_date': schedule.payment_date,
-                'venta': {
-                    'id': schedule.venta.id,
-                    'status': schedule.venta.status,
-                    'sale_price': float(schedule.venta.sale_price),
-                    'sale_date': schedule.venta.sale_date
-                },
-                'customer': {
-                    'id': schedule.venta.customer.id,
-                    'full_name': schedule.venta.customer.full_name,
-                    'document_number': schedule.venta.customer.document_number
-                } if schedule.venta.customer else None
-            }
-            data.append(schedule_data)
-        
-        return Response(data)
+        schedules = [
+            model.objects.filter(venta__lote=lote).select_related('venta__customer')
+            for model in (PaymentSchedule, ArchivedPaymentSchedule)
+        ]
+        return self._keyset_paginated_response(
+            schedules, request, LotePaymentSchedulesPagination, LotePaymentScheduleSerializer
+        )
+
+    def _keyset_paginated_response(self, queryset, request, pagination_class, serializer_class):
+        paginator = pagination_class()
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        serializer = serializer_class(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
 
     @action(detail=False, methods=['get'])
     def available(self, request):
@@ -253,4 +216,30 @@ class LoteViewSet(viewsets.ModelViewSet):
             result = serializer.save()
             return Response(result, status=status.HTTP_201_CREATED)
         
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    @action(detail=False, methods=['post'], url_path='import-csv', parser_classes=[MultiPartParser])
+    def import_csv(self, request):
+        """
+        Importación masiva de lotes desde un archivo CSV, leído por bloques.
+
+        POST /api/v1/lotes/import-csv/ (multipart, campo 'file')
+
+        Cabecera: block,lot_number,area,price,status (status es opcional y por
+        defecto 'disponible'). Si alguna fila es inválida no se crea ningún
+        lote y se devuelven los errores.
+        """
+        uploaded_file = request.FILES.get('file')
+        if uploaded_file is None:
+            return Response({'error': 'Se requiere el archivo CSV en el campo "file"'}, status=status.HTTP_400_BAD_REQUEST)
+
+        importer = import_csv(uploaded_file, created_by=request.user)
+        if importer.errors:
+            return Response(
+                {'error': 'El archivo contiene errores', 'errors': importer.errors}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return Response({
+            'message': f'Se crearon {importer.created_count} lotes exitosamente.',
+            'created_count': importer.created_count,
+        }, status=status.HTTP_201_CREATED)
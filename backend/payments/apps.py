@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class PaymentsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'payments'
+
+    def ready(self):
+        # Invalidación de los totales en caché de PaymentsPagination
+        from . import signals  # noqa: F401
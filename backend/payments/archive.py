@@ -0,0 +1,185 @@
+"""
+Archivo de cuotas y pagos de ventas cerradas.
+
+Las ventas completadas o canceladas conservan todas sus cuotas y pagos en
+payments_paymentschedule y payments_payment, y cada recorrido de cuotas
+pendientes o agregado por cliente carga con esas filas. archive_ventas()
+las mueve (con su id y sus relaciones) a ArchivedPaymentSchedule y
+ArchivedPayment y marca la venta con archived_at; restore_ventas() hace el
+camino inverso.
+
+- Cada lote de ventas se mueve en una transacción, con INSERT ... SELECT y
+  DELETE por conjuntos (sin cargar filas en Python, sin señales). Las
+  ventas del lote se bloquean con SELECT ... FOR UPDATE SKIP LOCKED, así que
+  dos ejecuciones simultáneas no se pisan.
+- Se archivan las ventas cerradas hace más de ARCHIVE_RETENTION_DAYS días
+  (por fecha de finalización o cancelación).
+- Las filas de una venta están siempre en una sola de las dos tablas. Los
+  historiales (Lote.get_sales_history y las anotaciones de VentaQuerySet,
+  history_by_lote, los historiales paginados del lote, el estado de cuenta)
+  leen de ambas.
+- Reabrir una venta archivada (volver a 'active') la restaura primero.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import ArchivedPayment, ArchivedPaymentSchedule, Payment, PaymentSchedule
+from .pagination import bump_totals_version
+
+
+ARCHIVABLE_STATUSES = ('completed', 'cancelled')
+DEFAULT_RETENTION_DAYS = 365
+DEFAULT_BATCH_SIZE = 100
+
+# (tabla activa, tabla de archivo): las cuotas antes que los pagos que las
+# referencian, y las relaciones cuota-pago al final
+_TIERS = (
+    (PaymentSchedule, ArchivedPaymentSchedule),
+    (Payment, ArchivedPayment),
+)
+
+
+def retention_days():
+    return getattr(settings, 'ARCHIVE_RETENTION_DAYS', DEFAULT_RETENTION_DAYS)
+
+
+def batch_size():
+    return getattr(settings, 'ARCHIVE_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+
+
+def archivable_ventas(retention=None, now=None):
+    """Ventas cerradas hace más de `retention` días y aún no archivadas."""
+    from sales.models import Venta
+
+    retention = retention_days() if retention is None else retention
+    cutoff = (now or timezone.now()) - timedelta(days=retention)
+    return Venta.objects.filter(status__in=ARCHIVABLE_STATUSES, archived_at__isnull=True).annotate(
+        closed_at=Coalesce('completion_date', 'cancellation_date', 'updated_at')
+    ).filter(closed_at__lt=cutoff)
+
+
+def _columns(model):
+    return [field.column for field in model._meta.concrete_fields if field.name != 'archived_at']
+
+
+def _links(model):
+    """Tabla y columnas de la relación cuota-pago (ManyToMany payments)."""
+    field = model._meta.get_field('payments')
+    return field.m2m_db_table(), field.m2m_column_name(), field.m2m_reverse_name()
+
+
+def _move(cursor, venta_ids, source, target, now=None):
+    """
+    Copia las cuotas, pagos y relaciones de las ventas de un nivel (source:
+    PaymentSchedule o ArchivedPaymentSchedule) al otro y las borra del
+    origen. `now` es la fecha de archivado, solo al archivar.
+    """
+    quote = connection.ops.quote_name
+    params = {'ventas': list(venta_ids), 'now': now}
+    pairs = _TIERS if source is PaymentSchedule else [(b, a) for a, b in _TIERS]
+    moved = {}
+
+    for from_model, to_model in pairs:
+        columns = ', '.join(quote(column) for column in _columns(from_model))
+        extra_column, extra_value = (', archived_at', ', %(now)s') if now else ('', '')
+        cursor.execute(
+            f'INSERT INTO {quote(to_model._meta.db_table)} ({columns}{extra_column}) '
+            f'SELECT {columns}{extra_value} FROM {quote(from_model._meta.db_table)} '
+            f'WHERE venta_id = ANY(%(ventas)s)',
+            params,
+        )
+        moved[to_model] = cursor.rowcount
+
+    from_links, from_schedule, from_payment = _links(source)
+    to_links, to_schedule, to_payment = _links(target)
+    schedules, payments = (quote(from_model._meta.db_table) for from_model, _to in pairs)
+    # Relaciones de cualquier cuota o pago de las ventas (si alguna cruzara a
+    # otra venta, la FK del destino hace fallar el lote en lugar de perderla)
+    from_schedule, from_payment = quote(from_schedule), quote(from_payment)
+    in_ventas = (
+        f'{from_schedule} IN (SELECT id FROM {schedules} WHERE venta_id = ANY(%(ventas)s)) '
+        f'OR {from_payment} IN (SELECT id FROM {payments} WHERE venta_id = ANY(%(ventas)s))'
+    )
+    cursor.execute(
+        f'INSERT INTO {quote(to_links)} ({quote(to_schedule)}, {quote(to_payment)}) '
+        f'SELECT {from_schedule}, {from_payment} FROM {quote(from_links)} WHERE {in_ventas}',
+        params,
+    )
+    cursor.execute(f'DELETE FROM {quote(from_links)} WHERE {in_ventas}', params)
+
+    # Los pagos antes que las cuotas que referencian
+    for from_model, _to in reversed(pairs):
+        cursor.execute(
+            f'DELETE FROM {quote(from_model._meta.db_table)} WHERE venta_id = ANY(%(ventas)s)', params
+        )
+    return moved
+
+
+def archive_ventas(venta_ids):
+    """
+    Mueve al archivo las cuotas y pagos de las ventas dadas (solo las
+    cerradas y no archivadas). Retorna {'ventas', 'schedules', 'payments'}.
+    """
+    from sales.models import Venta
+
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            Venta.objects.filter(
+                pk__in=venta_ids, status__in=ARCHIVABLE_STATUSES, archived_at__isnull=True
+            ).select_for_update(skip_locked=True).values_list('pk', flat=True)
+        )
+        if not ids:
+            return {'ventas': 0, 'schedules': 0, 'payments': 0}
+        with connection.cursor() as cursor:
+            moved = _move(cursor, ids, PaymentSchedule, ArchivedPaymentSchedule, now=now)
+        # update() no toca updated_at: la venta no cambia para el estado de cuenta
+        Venta.objects.filter(pk__in=ids).update(archived_at=now)
+        transaction.on_commit(bump_totals_version)
+    return {'ventas': len(ids), 'schedules': moved[ArchivedPaymentSchedule], 'payments': moved[ArchivedPayment]}
+
+
+def restore_ventas(venta_ids):
+    """
+    Devuelve a las tablas activas las cuotas y pagos de ventas archivadas.
+    Retorna {'ventas', 'schedules', 'payments'}.
+    """
+    from sales.models import Venta
+
+    with transaction.atomic():
+        ids = list(
+            Venta.objects.filter(pk__in=venta_ids, archived_at__isnull=False)
+            .select_for_update().values_list('pk', flat=True)
+        )
+        if not ids:
+            return {'ventas': 0, 'schedules': 0, 'payments': 0}
+        with connection.cursor() as cursor:
+            moved = _move(cursor, ids, ArchivedPaymentSchedule, PaymentSchedule)
+        Venta.objects.filter(pk__in=ids).update(archived_at=None)
+        transaction.on_commit(bump_totals_version)
+    return {'ventas': len(ids), 'schedules': moved[PaymentSchedule], 'payments': moved[Payment]}
+
+
+def archive_batches(retention=None, size=None, max_batches=None):
+    """
+    Archiva por lotes de `size` ventas todas las ventas elegibles (ver
+    archivable_ventas), cada lote en su propia transacción. Genera el
+    resultado de cada lote.
+    """
+    size = size or batch_size()
+    queryset = archivable_ventas(retention).values_list('pk', flat=True)
+    batches = 0
+    last_id = None
+    while max_batches is None or batches < max_batches:
+        # Avanza por id para no reintentar ventas bloqueadas por otro proceso
+        pending = queryset if last_id is None else queryset.filter(pk__gt=last_id)
+        ids = list(pending.order_by('pk')[:size])
+        if not ids:
+            return
+        last_id = ids[-1]
+        batches += 1
+        yield archive_ventas(ids)
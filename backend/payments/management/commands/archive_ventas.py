@@ -0,0 +1,60 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from payments.archive import archivable_ventas, archive_batches, batch_size, restore_ventas, retention_days
+
+
+class Command(BaseCommand):
+    help = (
+        'Mueve al archivo, por lotes, las cuotas y pagos de las ventas completadas o canceladas hace más '
+        'de ARCHIVE_RETENTION_DAYS días. Con --restore los devuelve a las tablas activas'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--retention-days',
+            type=int,
+            help=f'Días desde el cierre de la venta (default: ARCHIVE_RETENTION_DAYS, {retention_days()})'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            help=f'Ventas por transacción (default: ARCHIVE_BATCH_SIZE, {batch_size()})'
+        )
+        parser.add_argument('--max-batches', type=int, help='Detenerse después de N lotes')
+        parser.add_argument('--dry-run', action='store_true', help='Solo contar las ventas a archivar')
+        parser.add_argument(
+            '--restore',
+            nargs='+',
+            type=int,
+            metavar='VENTA_ID',
+            help='Restaurar las cuotas y pagos de estas ventas archivadas'
+        )
+
+    def handle(self, *args, **options):
+        if options['restore']:
+            result = restore_ventas(options['restore'])
+            self.stdout.write(self.style.SUCCESS(
+                f"{result['ventas']} ventas restauradas: {result['schedules']} cuotas, {result['payments']} pagos"
+            ))
+            return
+
+        for name in ('retention_days', 'batch_size', 'max_batches'):
+            if options[name] is not None and options[name] < (0 if name == 'retention_days' else 1):
+                raise CommandError(f"--{name.replace('_', '-')} fuera de rango")
+
+        if options['dry_run']:
+            count = archivable_ventas(options['retention_days']).count()
+            self.stdout.write(f'{count} ventas para archivar')
+            return
+
+        totals = {'ventas': 0, 'schedules': 0, 'payments': 0}
+        batches = archive_batches(options['retention_days'], options['batch_size'], options['max_batches'])
+        for number, result in enumerate(batches, start=1):
+            for key in totals:
+                totals[key] += result[key]
+            self.stdout.write(
+                f"Lote {number}: {result['ventas']} ventas, {result['schedules']} cuotas, {result['payments']} pagos"
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"{totals['ventas']} ventas archivadas: {totals['schedules']} cuotas, {totals['payments']} pagos"
+        ))
@@ -0,0 +1,58 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from payments.models import Payment, PaymentSchedule
+from payments.partitioning import (
+    DEFAULT_YEARS_AHEAD, PARTITION_KEYS, ensure_partitions, is_partitioned, partition_table, partitions,
+    restore_foreign_keys, unpartition_table,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Crea por adelantado las particiones anuales de pagos y cuotas. Con --convert particiona '
+        'las tablas (copiando los datos) y con --revert vuelve a tablas sin particionar'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--years-ahead',
+            type=int,
+            default=DEFAULT_YEARS_AHEAD,
+            help=f'Años futuros con partición creada (default: {DEFAULT_YEARS_AHEAD})'
+        )
+        action = parser.add_mutually_exclusive_group()
+        action.add_argument('--convert', action='store_true', help='Particionar las tablas por año')
+        action.add_argument('--revert', action='store_true', help='Volver a tablas sin particionar')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('El particionado requiere PostgreSQL')
+        if options['years_ahead'] < 0:
+            raise CommandError('--years-ahead no puede ser negativo')
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            if options['convert']:
+                for table in PARTITION_KEYS:
+                    for referencing, name in partition_table(cursor, table, years_ahead=options['years_ahead']):
+                        self.stdout.write(self.style.WARNING(f'FK eliminada: {referencing}.{name}'))
+            elif options['revert']:
+                for table in PARTITION_KEYS:
+                    unpartition_table(cursor, table)
+                with connection.schema_editor(atomic=False) as schema_editor:
+                    restore_foreign_keys(schema_editor, [Payment, PaymentSchedule])
+                self.stdout.write(self.style.SUCCESS('Tablas de pagos y cuotas sin particionar'))
+                return
+
+            current = date.today().year
+            for table, column in PARTITION_KEYS.items():
+                if not is_partitioned(cursor, table):
+                    self.stdout.write(f'{table}: sin particionar (ver --convert)')
+                    continue
+                created = ensure_partitions(cursor, table, column, current, current + options['years_ahead'])
+                self.stdout.write(self.style.SUCCESS(
+                    f'{table}: {len(partitions(cursor, table))} particiones'
+                    + (f', creadas {", ".join(created)}' if created else '')
+                ))
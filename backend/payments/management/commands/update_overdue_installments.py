@@ -1,5 +1,8 @@
 from django.core.management.base import BaseCommand
+from django.db import transaction
 from django.utils import timezone
+from dashboard.events import publish
+from dashboard.models import DashboardCounters
 from payments.models import PaymentSchedule
 
 
@@ -18,8 +21,12 @@ class Command(BaseCommand):
         count = pending_overdue.count()
         
         if count > 0:
-            # Actualizar a 'overdue'
-            pending_overdue.update(status='overdue')
+            # Actualizar a 'overdue' y reflejarlo en los contadores del dashboard
+            with transaction.atomic():
+                active_count = pending_overdue.filter(venta__status='active').count()
+                pending_overdue.update(status='overdue')
+                DashboardCounters.apply_deltas(cuotas_vencidas=active_count)
+                publish('overdue', {'count': active_count})
             self.stdout.write(
                 self.style.SUCCESS(
                     f'[{timezone.now().strftime("%Y-%m-%d %H:%M:%S")}] '
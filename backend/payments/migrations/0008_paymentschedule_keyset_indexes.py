@@ -0,0 +1,21 @@
+# Generated by Django 4.2.10 on 2026-10-19 07:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0007_payment_boleta_image'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='paymentschedule',
+            index=models.Index(fields=['status', 'due_date', 'id'], name='schedule_status_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='paymentschedule',
+            index=models.Index(fields=['due_date', 'id'], name='schedule_due_id_idx'),
+        ),
+    ]
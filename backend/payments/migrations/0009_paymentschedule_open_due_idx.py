@@ -0,0 +1,17 @@
+# Generated by Django 4.2.10 on 2026-10-19 07:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0008_paymentschedule_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='paymentschedule',
+            index=models.Index(condition=models.Q(('is_forgiven', False), ('status__in', ['pending', 'overdue', 'partial'])), fields=['venta', 'due_date'], include=('scheduled_amount', 'paid_amount'), name='schedule_open_due_idx'),
+        ),
+    ]
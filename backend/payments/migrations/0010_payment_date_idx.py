@@ -0,0 +1,17 @@
+# Generated by Django 4.2.10 on 2026-10-19 07:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0009_paymentschedule_open_due_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['payment_date'], name='payment_date_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.10 on 2026-10-19 07:34
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0010_payment_date_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='payment',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.search.SearchVector('receipt_number', 'notes', config='simple'), name='payment_search_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='paymentschedule',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.search.SearchVector('receipt_number', 'notes', config='simple'), name='schedule_search_idx'),
+        ),
+    ]
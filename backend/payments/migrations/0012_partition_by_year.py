@@ -0,0 +1,37 @@
+from django.db import migrations
+
+
+def partition_tables(apps, schema_editor):
+    """Particiona pagos y cuotas por año si PAYMENTS_PARTITIONING está activo (ver payments/partitioning.py)."""
+    from payments.partitioning import PARTITION_KEYS, partition_table, partitioning_enabled
+
+    if schema_editor.connection.vendor != 'postgresql' or not partitioning_enabled():
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for table in PARTITION_KEYS:
+            partition_table(cursor, table)
+
+
+def unpartition_tables(apps, schema_editor):
+    """Vuelve a tablas sin particionar y recrea las claves foráneas hacia ellas."""
+    from payments.partitioning import PARTITION_KEYS, restore_foreign_keys, unpartition_table
+
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for table in PARTITION_KEYS:
+            unpartition_table(cursor, table)
+    restore_foreign_keys(
+        schema_editor, [apps.get_model('payments', 'Payment'), apps.get_model('payments', 'PaymentSchedule')]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0011_search_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_tables, unpartition_tables),
+    ]
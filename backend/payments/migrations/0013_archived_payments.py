@@ -0,0 +1,87 @@
+# Generated by Django 4.2.10 on 2026-10-19 08:13
+
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('sales', '0005_venta_archived_at'),
+        ('payments', '0012_partition_by_year'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedPayment',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12, verbose_name='Monto del Pago')),
+                ('payment_date', models.DateTimeField(verbose_name='Fecha de Pago')),
+                ('method', models.CharField(choices=[('efectivo', 'Efectivo'), ('transferencia', 'Transferencia Bancaria'), ('tarjeta', 'Tarjeta de Crédito/Débito'), ('otro', 'Otro')], max_length=20, verbose_name='Método de Pago')),
+                ('payment_type', models.CharField(choices=[('initial', 'Pago Inicial/Enganche'), ('installment', 'Cuota Mensual')], max_length=20, verbose_name='Tipo de Pago')),
+                ('receipt_number', models.CharField(blank=True, max_length=100, verbose_name='Número de Operación')),
+                ('receipt_date', models.DateField(blank=True, null=True, verbose_name='Fecha de Operación')),
+                ('receipt_image', models.ImageField(blank=True, null=True, upload_to='payment_receipts/', verbose_name='Imagen del Comprobante')),
+                ('boleta_image', models.ImageField(blank=True, null=True, upload_to='boleta_pagos/', verbose_name='Boleta de Pago')),
+                ('notes', models.TextField(blank=True, null=True, verbose_name='Notas Adicionales')),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(verbose_name='Archivado')),
+            ],
+            options={
+                'verbose_name': 'Pago Archivado',
+                'verbose_name_plural': 'Pagos Archivados',
+                'ordering': ['-payment_date', '-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedPaymentSchedule',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('installment_number', models.PositiveIntegerField(verbose_name='Número de Cuota')),
+                ('original_amount', models.DecimalField(decimal_places=2, max_digits=12, verbose_name='Monto Original')),
+                ('scheduled_amount', models.DecimalField(decimal_places=2, max_digits=12, verbose_name='Monto Programado Actual')),
+                ('paid_amount', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12, verbose_name='Monto Pagado')),
+                ('due_date', models.DateField(verbose_name='Fecha de Vencimiento')),
+                ('payment_date', models.DateTimeField(blank=True, null=True, verbose_name='Fecha de Pago')),
+                ('receipt_image', models.ImageField(blank=True, null=True, upload_to='payment_receipts/', verbose_name='Imagen del Comprobante')),
+                ('boleta_image', models.ImageField(blank=True, null=True, upload_to='boleta_pagos/', verbose_name='Boleta de Pago')),
+                ('receipt_number', models.CharField(blank=True, max_length=100, null=True, verbose_name='Número de Operación')),
+                ('receipt_date', models.DateField(blank=True, null=True, verbose_name='Fecha de Operación')),
+                ('payment_method', models.CharField(blank=True, choices=[('efectivo', 'Efectivo'), ('transferencia', 'Transferencia Bancaria'), ('tarjeta', 'Tarjeta de Crédito/Débito'), ('otro', 'Otro')], max_length=20, null=True, verbose_name='Método de Pago')),
+                ('status', models.CharField(choices=[('pending', 'Pendiente'), ('paid', 'Pagado'), ('overdue', 'Vencido'), ('partial', 'Pago Parcial'), ('forgiven', 'Absuelto')], max_length=20, verbose_name='Estado')),
+                ('is_forgiven', models.BooleanField(default=False, verbose_name='Cuota Absuelto')),
+                ('notes', models.TextField(blank=True, verbose_name='Notas')),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(verbose_name='Archivada')),
+                ('payments', models.ManyToManyField(blank=True, related_name='payment_schedules', to='payments.archivedpayment', verbose_name='Pagos Asociados')),
+                ('recorded_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Registrado por')),
+                ('venta', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_schedules', to='sales.venta', verbose_name='Venta')),
+            ],
+            options={
+                'verbose_name': 'Cuota Archivada',
+                'verbose_name_plural': 'Cuotas Archivadas',
+                'ordering': ['venta', 'installment_number'],
+            },
+        ),
+        migrations.AddField(
+            model_name='archivedpayment',
+            name='payment_schedule',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='schedule_payments', to='payments.archivedpaymentschedule', verbose_name='Cronograma de Pago'),
+        ),
+        migrations.AddField(
+            model_name='archivedpayment',
+            name='recorded_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='archivedpayment',
+            name='venta',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_payments', to='sales.venta', verbose_name='Venta'),
+        ),
+    ]
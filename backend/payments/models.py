@@ -1,3 +1,4 @@
+from django.contrib.postgres.indexes import GinIndex
 from django.db import models
 from django.conf import settings
 from django.core.validators import MinValueValidator
@@ -8,11 +9,18 @@ from dateutil.relativedelta import relativedelta
 from decimal import Decimal
 from lotes.models import Lote
 from customers.models import Customer
+from villanueva_project.search import search_vector
+
+# Campos de los documentos de búsqueda (?search=) y de sus índices GIN
+PAYMENT_SEARCH_FIELDS = ('receipt_number', 'notes')
+SCHEDULE_SEARCH_FIELDS = ('receipt_number', 'notes')
 
 class Payment(models.Model):
     """
     Modelo para representar un pago realizado por una venta.
     """
+    SEARCH_FIELDS = PAYMENT_SEARCH_FIELDS
+
     METHOD_CHOICES = [
         ('efectivo', _('Efectivo')),
         ('transferencia', _('Transferencia Bancaria')),
@@ -88,6 +96,11 @@ class Payment(models.Model):
         verbose_name = _("Pago")
         verbose_name_plural = _("Pagos")
         ordering = ['-payment_date', '-created_at']
+        indexes = [
+            # Listados por fecha y totales por rango (p. ej. el mes en curso)
+            models.Index(fields=['payment_date'], name='payment_date_idx'),
+            GinIndex(search_vector(PAYMENT_SEARCH_FIELDS), name='payment_search_idx'),
+        ]
 
     def save(self, *args, **kwargs):
         """
@@ -158,47 +171,77 @@ class PaymentPlan(models.Model):
         # Usar el método del PaymentSchedule que es la fuente de verdad
         return PaymentSchedule.generate_schedule_for_venta(self.venta)
 
-    def get_payment_status(self):
-        """
-        Retorna estadísticas del plan de pagos basado en PaymentSchedule.
-        """
-        # Usar PaymentSchedule como fuente de verdad
-        schedules = self.venta.payment_schedules.all()
-        
-        total_payments = schedules.count()
-        paid_payments = schedules.filter(status='paid').count()
-        forgiven_payments = schedules.filter(status='forgiven').count()
-        overdue_payments = schedules.filter(status='overdue').count()
-        partial_payments = schedules.filter(status='partial').count()
-        
-        # Calcular montos totales
-        from django.db.models import Sum
-        total_scheduled_amount = schedules.aggregate(
-            total=Sum('scheduled_amount')
-        )['total'] or Decimal('0.00')
-        
-        total_paid_amount = schedules.aggregate(
-            total=Sum('paid_amount')
-        )['total'] or Decimal('0.00')
-        
-        # Calcular monto restante desde la venta (excluye cuotas perdonadas)
-        remaining_amount = self.venta.remaining_balance
-        
+    @classmethod
+    def payment_statuses(cls, venta_ids):
+        """
+        Estadísticas del plan de pagos de varias ventas con una sola consulta:
+        conteos y montos de las cuotas como subconsultas por venta, del nivel
+        en que estén (tabla activa o archivo, según archived_at), y el saldo
+        de with_balances. Retorna un dict venta_id -> estado (ver
+        get_payment_status).
+        """
+        from django.db.models import Count, Q, Sum
+        from sales.models import Venta, VentaQuerySet
+
+        count = models.IntegerField()
+
+        def per_tier(archived):
+            schedules = VentaQuerySet._schedules(archived)
+            return {
+                'total': VentaQuerySet._per_venta(schedules, Count('id'), 0, count),
+                **{
+                    status: VentaQuerySet._per_venta(schedules, Count('id', filter=Q(status=status)), 0, count)
+                    for status in ('paid', 'pending', 'overdue', 'partial', 'forgiven')
+                },
+                'paid_amount': VentaQuerySet._per_venta(
+                    schedules, Sum('paid_amount'), Decimal('0.00'), VentaQuerySet.MONEY
+                ),
+            }
+
+        active, archived = per_tier(False), per_tier(True)
+        rows = (
+            Venta.objects.filter(pk__in=venta_ids)
+            .with_balances()
+            .annotate(**{
+                name: VentaQuerySet._by_tier(
+                    expression, archived[name], VentaQuerySet.MONEY if name == 'paid_amount' else count
+                )
+                for name, expression in active.items()
+            })
+            .values('pk', 'initial_payment', 'initial_paid', 'installments_remaining', *active)
+        )
+        return {row['pk']: cls._build_payment_status(row) for row in rows}
+
+    @staticmethod
+    def _build_payment_status(row):
+        total = row['total']
         # Las cuotas absueltas cuentan como "completadas" para el porcentaje
-        completed_payments = paid_payments + forgiven_payments
-        
+        completed = row['paid'] + row['forgiven']
+        # Monto restante equivalente a Venta.remaining_balance (excluye cuotas perdonadas)
+        remaining_amount = max(
+            (row['installments_remaining'] or Decimal('0.00'))
+            + (row['initial_payment'] or Decimal('0.00')) - row['initial_paid'],
+            Decimal('0.00'),
+        )
         return {
-            'total': total_payments,
-            'paid': paid_payments,
-            'pending': schedules.filter(status='pending').count(),
-            'overdue': overdue_payments,
-            'partial': partial_payments,
-            'forgiven': forgiven_payments,
-            'completion_percentage': round((completed_payments / total_payments * 100), 1) if total_payments > 0 else 0,
-            'total_installments': total_payments,
+            'total': total,
+            'paid': row['paid'],
+            'pending': row['pending'],
+            'overdue': row['overdue'],
+            'partial': row['partial'],
+            'forgiven': row['forgiven'],
+            'completion_percentage': round((completed / total * 100), 1) if total > 0 else 0,
+            'total_installments': total,
             'remaining_amount': str(remaining_amount),
-            'paid_amount': str(total_paid_amount)
+            'paid_amount': str(row['paid_amount'] or Decimal('0.00'))
         }
+
+    def get_payment_status(self):
+        """
+        Retorna estadísticas del plan de pagos basado en PaymentSchedule
+        (una consulta; para muchos planes usar payment_statuses).
+        """
+        return self.payment_statuses([self.venta_id])[self.venta_id]
     
     @property
     def is_completed(self):
@@ -213,6 +256,8 @@ class PaymentSchedule(models.Model):
     Cada registro representa una cuota específica con flexibilidad para pagos parciales,
     cuotas absueltas y modificaciones del cronograma.
     """
+    SEARCH_FIELDS = SCHEDULE_SEARCH_FIELDS
+
     STATUS_CHOICES = [
         ('pending', _('Pendiente')),
         ('paid', _('Pagado')),
@@ -365,6 +410,20 @@ class PaymentSchedule(models.Model):
                 name='unique_venta_installment'
             )
         ]
+        indexes = [
+            # Listados por cursor (due_date, id), filtrados o no por estado
+            models.Index(fields=['status', 'due_date', 'id'], name='schedule_status_due_idx'),
+            models.Index(fields=['due_date', 'id'], name='schedule_due_id_idx'),
+            # Reporte de antigüedad de saldos: solo cuotas abiertas, con los
+            # montos incluidos para filtrar por venta/cliente sin leer la tabla
+            models.Index(
+                fields=['venta', 'due_date'],
+                include=['scheduled_amount', 'paid_amount'],
+                condition=models.Q(status__in=['pending', 'overdue', 'partial'], is_forgiven=False),
+                name='schedule_open_due_idx',
+            ),
+            GinIndex(search_vector(SCHEDULE_SEARCH_FIELDS), name='schedule_search_idx'),
+        ]
 
     def __str__(self):
         return f"Cuota {self.installment_number} - Venta #{self.venta.id} ({self.venta.lote}) - Vence: {self.due_date}"
@@ -428,7 +487,6 @@ class PaymentSchedule(models.Model):
         """
         Genera el cronograma completo de pagos para una venta específica.
         """
-        lote = venta.lote
         if not venta.customer or venta.financing_months <= 0:
             return []
 
@@ -438,6 +496,19 @@ class PaymentSchedule(models.Model):
         if existing:
             return cls.objects.filter(venta=venta).order_by('installment_number')
 
+        schedules = cls.build_schedule_for_venta(venta)
+        for schedule in schedules:
+            schedule.save()
+
+        return schedules
+
+    @classmethod
+    def build_schedule_for_venta(cls, venta, today=None):
+        """
+        Cuotas del cronograma de una venta sin guardar (montos, vencimientos y
+        estado inicial), para generate_schedule_for_venta y para la
+        importación masiva con bulk_create.
+        """
         # Calcular el monto mensual basado en el precio de venta menos el pago inicial (independiente de si se pagó o no)
         # Las cuotas mensuales se calculan sobre el saldo después del pago inicial
         remaining_amount = venta.sale_price - venta.initial_payment
@@ -458,6 +529,8 @@ class PaymentSchedule(models.Model):
         else:
             start_date = venta.sale_date.date()
 
+        # Mismo estado que asigna save() a una cuota sin pagos
+        today = today or date.today()
         schedules = []
         
         for i in range(1, venta.financing_months + 1):
@@ -470,14 +543,14 @@ class PaymentSchedule(models.Model):
             else:
                 installment_amount = monthly_amount_base
             
-            schedule = cls.objects.create(
+            schedules.append(cls(
                 venta=venta,
                 installment_number=i,
                 original_amount=installment_amount,
                 scheduled_amount=installment_amount,
-                due_date=due_date
-            )
-            schedules.append(schedule)
+                due_date=due_date,
+                status='overdue' if today > due_date else 'pending',
+            ))
 
         return schedules
     
@@ -781,4 +854,115 @@ class PaymentSchedule(models.Model):
             is_forgiven=True
         ).aggregate(
             total=models.Sum('scheduled_amount')
-        )['total'] or Decimal('0.00')
\ No newline at end of file
+        )['total'] or Decimal('0.00')
+
+class ArchivedPaymentSchedule(models.Model):
+    """
+    Cuota de una venta cerrada (completada o cancelada) movida al archivo
+    (ver payments/archive.py). Conserva el id y los campos de
+    PaymentSchedule, así que los serializadores de cuotas sirven para ambas.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    venta = models.ForeignKey(
+        'sales.Venta',
+        on_delete=models.CASCADE,
+        related_name='archived_schedules',
+        verbose_name=_("Venta")
+    )
+    installment_number = models.PositiveIntegerField(_("Número de Cuota"))
+    original_amount = models.DecimalField(_("Monto Original"), max_digits=12, decimal_places=2)
+    scheduled_amount = models.DecimalField(_("Monto Programado Actual"), max_digits=12, decimal_places=2)
+    paid_amount = models.DecimalField(_("Monto Pagado"), max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    due_date = models.DateField(_("Fecha de Vencimiento"))
+    payment_date = models.DateTimeField(_("Fecha de Pago"), null=True, blank=True)
+    receipt_image = models.ImageField(_("Imagen del Comprobante"), upload_to='payment_receipts/', blank=True, null=True)
+    boleta_image = models.ImageField(_("Boleta de Pago"), upload_to='boleta_pagos/', blank=True, null=True)
+    receipt_number = models.CharField(_("Número de Operación"), max_length=100, blank=True, null=True)
+    receipt_date = models.DateField(_("Fecha de Operación"), blank=True, null=True)
+    payment_method = models.CharField(
+        _("Método de Pago"),
+        max_length=20,
+        choices=PaymentSchedule.PAYMENT_METHOD_CHOICES,
+        blank=True,
+        null=True
+    )
+    status = models.CharField(_("Estado"), max_length=20, choices=PaymentSchedule.STATUS_CHOICES)
+    is_forgiven = models.BooleanField(_("Cuota Absuelto"), default=False)
+    notes = models.TextField(_("Notas"), blank=True)
+    payments = models.ManyToManyField(
+        'ArchivedPayment',
+        blank=True,
+        related_name='payment_schedules',
+        verbose_name=_("Pagos Asociados")
+    )
+    recorded_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name=_("Registrado por")
+    )
+    # Fechas originales de la cuota (sin auto_now) y del archivado
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(_("Archivada"))
+
+    remaining_amount = PaymentSchedule.remaining_amount
+
+    class Meta:
+        verbose_name = _("Cuota Archivada")
+        verbose_name_plural = _("Cuotas Archivadas")
+        ordering = ['venta', 'installment_number']
+
+    def __str__(self):
+        return f"Cuota {self.installment_number} (archivada) - Venta #{self.venta_id} - Vence: {self.due_date}"
+
+
+class ArchivedPayment(models.Model):
+    """
+    Pago de una venta cerrada movido al archivo, con el id y los campos de
+    Payment (ver ArchivedPaymentSchedule).
+    """
+    id = models.BigIntegerField(primary_key=True)
+    venta = models.ForeignKey(
+        'sales.Venta',
+        on_delete=models.CASCADE,
+        related_name='archived_payments',
+        verbose_name=_("Venta")
+    )
+    payment_schedule = models.ForeignKey(
+        ArchivedPaymentSchedule,
+        on_delete=models.SET_NULL,
+        related_name='schedule_payments',
+        verbose_name=_("Cronograma de Pago"),
+        null=True,
+        blank=True
+    )
+    amount = models.DecimalField(_("Monto del Pago"), max_digits=12, decimal_places=2)
+    payment_date = models.DateTimeField(_("Fecha de Pago"))
+    method = models.CharField(_("Método de Pago"), max_length=20, choices=Payment.METHOD_CHOICES)
+    payment_type = models.CharField(_("Tipo de Pago"), max_length=20, choices=Payment.PAYMENT_TYPE_CHOICES)
+    receipt_number = models.CharField(_("Número de Operación"), max_length=100, blank=True)
+    receipt_date = models.DateField(_("Fecha de Operación"), blank=True, null=True)
+    receipt_image = models.ImageField(_("Imagen del Comprobante"), upload_to='payment_receipts/', blank=True, null=True)
+    boleta_image = models.ImageField(_("Boleta de Pago"), upload_to='boleta_pagos/', blank=True, null=True)
+    notes = models.TextField(_("Notas Adicionales"), blank=True, null=True)
+    recorded_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(_("Archivado"))
+
+    class Meta:
+        verbose_name = _("Pago Archivado")
+        verbose_name_plural = _("Pagos Archivados")
+        ordering = ['-payment_date', '-created_at']
+
+    def __str__(self):
+        return f"Pago de {self.amount} (archivado) para Venta #{self.venta_id} el {self.payment_date}"
@@ -1,18 +1,103 @@
-from rest_framework.pagination import PageNumberPagination
+import hashlib
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import timedelta
+from functools import partial
+from operator import attrgetter
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
 from rest_framework.response import Response
-from django.db.models import Sum
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import Paginator as DjangoPaginator
+from django.db import connections
+from django.db.models import Count, Q, Sum
 from django.utils import timezone
 
 
+TOTALS_VERSION_KEY = 'payments:totals_version'
+
+
+def totals_version():
+    return cache.get_or_set(TOTALS_VERSION_KEY, 1, None)
+
+
+def bump_totals_version():
+    """Invalida los totales de pagos en caché (se llama al crear o borrar pagos)."""
+    try:
+        cache.incr(TOTALS_VERSION_KEY)
+    except ValueError:
+        cache.set(TOTALS_VERSION_KEY, 1, None)
+
+
+class CountedPaginator(DjangoPaginator):
+    """Paginator al que se le entrega el conteo ya calculado."""
+
+    def __init__(self, *args, count=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if count is not None:
+            self.count = count
+
+
 class PaymentsPagination(PageNumberPagination):
+    """
+    Paginación de pagos con totales del queryset filtrado completo.
+
+    El conteo, el total recaudado y lo recaudado en el mes en curso salen de
+    un único aggregate, que se guarda en caché por firma del filtro (SQL y
+    parámetros) y versión de los pagos. Con ?totals=0 se omiten los totales.
+
+    Acepta también una lista de querysets, uno por nivel (tabla activa y
+    archivo, ver payments/tiers.py): los totales se suman y las páginas
+    salen de TieredPayments.
+    """
     page_size_query_param = 'page_size'
     max_page_size = 5000
+    totals_query_param = 'totals'
+    totals_cache_timeout = 60
+
+    def paginate_queryset(self, queryset, request, view=None):
+        querysets = list(queryset) if isinstance(queryset, (list, tuple)) else [queryset]
+        self.totals = None
+        if request.query_params.get(self.totals_query_param) not in ('0', 'false'):
+            from .tiers import merge_totals
+            self.totals = merge_totals(self.get_totals(queryset) for queryset in querysets)
+            self.django_paginator_class = partial(CountedPaginator, count=self.totals['count'])
+        if len(querysets) > 1:
+            from .tiers import TieredPayments
+            queryset = TieredPayments(querysets)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_totals(self, queryset):
+        queryset = queryset.order_by()
+        month_start = timezone.localtime().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        next_month_start = (month_start + timedelta(days=32)).replace(day=1)
+
+        try:
+            sql, params = queryset.query.sql_with_params()
+        except EmptyResultSet:
+            return {'count': 0, 'total': 0, 'month_total': 0}
+        signature = hashlib.sha1(f'{sql}|{params!r}|{month_start.isoformat()}'.encode()).hexdigest()
+        key = f'payments:totals:{totals_version()}:{signature}'
+
+        totals = cache.get(key)
+        if totals is None:
+            totals = queryset.aggregate(
+                count=Count('id'),
+                total=Sum('amount'),
+                # Rango de fechas (no payment_date__month) para usar el índice
+                # y no mezclar el mismo mes de otros años
+                month_total=Sum('amount', filter=Q(
+                    payment_date__gte=month_start, payment_date__lt=next_month_start
+                )),
+            )
+            cache.set(key, totals, self.totals_cache_timeout)
+        return totals
 
     def get_paginated_response(self, data):
-        # Calculamos el total recaudado del queryset completo (sin paginar)
-        queryset = self.page.paginator.object_list
-        total_recaudado = queryset.aggregate(total=Sum('amount'))['total'] or 0
-        este_mes_recaudado = queryset.filter(payment_date__month=timezone.now().month).aggregate(total=Sum('amount'))['total'] or 0
+        totals = self.totals
         return Response({
             'info': {
                 'page': self.page.number,
@@ -20,8 +105,196 @@ class PaymentsPagination(PageNumberPagination):
                 'pages': self.page.paginator.num_pages,
                 'next': self.get_next_link(),
                 'prev': self.get_previous_link(),
-                'total_recaudado': float(total_recaudado),
-                'este_mes_recaudado': float(este_mes_recaudado)
+                'total_recaudado': float(totals['total'] or 0) if totals else None,
+                'este_mes_recaudado': float(totals['month_total'] or 0) if totals else None
             },
             'results': data
-        })
\ No newline at end of file
+        })
+
+
+def approximate_count(queryset):
+    """
+    Estima el número de filas de un queryset con el planificador de PostgreSQL
+    (EXPLAIN), sin recorrer la tabla. En otros motores retorna el conteo exacto.
+    """
+    if connections[queryset.db].vendor != 'postgresql':
+        return queryset.count()
+    plan = json.loads(queryset.order_by().explain(format='json'))
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class KeysetPagination(BasePagination):
+    """
+    Paginación por cursor (keyset) sobre un orden total, p. ej. (due_date, id).
+
+    Cada página filtra a partir de la última fila vista en lugar de usar
+    OFFSET, así que una página profunda cuesta lo mismo que la primera.
+    No ejecuta COUNT salvo que se pida con ?count=exact o ?count=approx.
+
+    Acepta también una lista de querysets con los mismos campos de orden
+    (p. ej. la tabla activa y la de archivo): cada uno aporta su página y se
+    mezclan en Python.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+
+    # El último campo debe ser único para que el orden sea total
+    ordering = ('due_date', 'id')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.fields = [(field.lstrip('-'), field.startswith('-')) for field in self.ordering]
+
+        querysets = list(queryset) if isinstance(queryset, (list, tuple)) else [queryset]
+
+        position, reverse = self.decode_cursor(request, querysets[0].model)
+
+        self.count = self.get_count(querysets, request)
+
+        order_by = [self._order_expression(name, desc != reverse) for name, desc in self.fields]
+        rows = []
+        for queryset in querysets:
+            queryset = queryset.order_by(*order_by)
+            if position is not None:
+                queryset = queryset.filter(self._after_position(position, reverse))
+            rows.extend(queryset[:self.page_size + 1])
+        if len(querysets) > 1:
+            # Orden estable por cada campo, del último al primero
+            for name, desc in reversed(self.fields):
+                rows.sort(key=attrgetter(name), reverse=desc != reverse)
+            rows = rows[:self.page_size + 1]
+
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        # Hay página siguiente si avanzando quedaron filas, o si retrocedimos
+        # desde una posición; análogo para la página anterior.
+        self.has_next = has_more if not reverse else True
+        self.has_previous = (position is not None) if not reverse else has_more
+        self.first_row = rows[0] if rows else None
+        self.last_row = rows[-1] if rows else None
+        return rows
+
+    def get_page_size(self, request):
+        if self.page_size_query_param:
+            try:
+                size = int(request.query_params[self.page_size_query_param])
+                if size > 0:
+                    return min(size, self.max_page_size)
+            except (KeyError, ValueError):
+                pass
+        return self.page_size
+
+    def get_count(self, querysets, request):
+        mode = request.query_params.get(self.count_query_param)
+        if mode == 'exact':
+            return sum(queryset.count() for queryset in querysets)
+        if mode == 'approx':
+            return sum(approximate_count(queryset) for queryset in querysets)
+        return None
+
+    def get_paginated_response(self, data):
+        return Response({
+            'count': self.count,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data
+        })
+
+    def get_next_link(self):
+        if not self.has_next or self.last_row is None:
+            return None
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, self.encode_cursor(self.last_row, reverse=False)
+        )
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if self.first_row is None:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, self.encode_cursor(self.first_row, reverse=True)
+        )
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'count': {'type': 'integer', 'nullable': True},
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    # --- Cursor ---------------------------------------------------------------
+
+    def encode_cursor(self, row, reverse):
+        values = []
+        for name, _desc in self.fields:
+            value = getattr(row, name)
+            values.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+        payload = json.dumps({'p': values, 'r': int(reverse)}, separators=(',', ':'))
+        return urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            payload = json.loads(urlsafe_b64decode(padded.encode()).decode())
+            raw_values = payload['p']
+            if len(raw_values) != len(self.fields):
+                raise ValueError
+            position = [
+                model._meta.get_field(name).to_python(value)
+                for (name, _desc), value in zip(self.fields, raw_values)
+            ]
+            return position, bool(payload.get('r'))
+        except Exception:
+            raise NotFound('Cursor inválido')
+
+    # --- Filtros --------------------------------------------------------------
+
+    @staticmethod
+    def _order_expression(name, descending):
+        return f'-{name}' if descending else name
+
+    def _after_position(self, position, reverse):
+        """
+        Construye la condición "fila estrictamente después de la posición"
+        en orden lexicográfico. El primer campo se acota también con un rango
+        (>= / <=) para que PostgreSQL pueda recorrer el índice desde ahí.
+        """
+        def lookup(name, desc, strict):
+            forward = desc == reverse  # asc sin invertir o desc invertido
+            if strict:
+                return f'{name}__gt' if forward else f'{name}__lt'
+            return f'{name}__gte' if forward else f'{name}__lte'
+
+        # (a > x) OR (a = x AND b > y) OR ...
+        condition = Q()
+        for index, (name, desc) in enumerate(self.fields):
+            term = Q(**{lookup(name, desc, strict=True): position[index]})
+            for prev_index in range(index):
+                term &= Q(**{self.fields[prev_index][0]: position[prev_index]})
+            condition |= term
+
+        first_name, first_desc = self.fields[0]
+        return Q(**{lookup(first_name, first_desc, strict=False): position[0]}) & condition
+
+
+class PaymentScheduleKeysetPagination(KeysetPagination):
+    """Paginación por cursor para listados de cuotas (vencidas, pendientes)."""
+    page_size = 50
+    max_page_size = 200
+    ordering = ('due_date', 'id')
@@ -0,0 +1,283 @@
+"""
+Particionado declarativo de PostgreSQL por año (opcional).
+
+Payment se particiona por payment_date y PaymentSchedule por due_date, con
+una partición por año (PARTITION BY RANGE) y una partición por defecto para
+las fechas fuera de rango. Los reportes por rango de fechas (historial de
+pagos, cobranzas mensuales, cuotas por vencer) solo leen las particiones de
+los años consultados (partition pruning).
+
+Se activa con PAYMENTS_PARTITIONING=1 antes de aplicar la migración
+payments.0012, o después con el comando partition_payments --convert. La
+conversión copia los datos a la tabla particionada y tiene costos:
+
+- La clave primaria pasa a ser (id, fecha) y las restricciones UNIQUE
+  incluyen la fecha: unique_venta_installment ya no impide repetir el número
+  de cuota de una venta en años distintos (la aplicación regenera el
+  cronograma completo, así que no ocurre en la práctica).
+- PostgreSQL no permite claves foráneas hacia una tabla particionada cuya
+  clave única no incluya la fecha: se eliminan las FK hacia estas tablas
+  (Payment.payment_schedule y la tabla M2M de pagos de cuotas). Django
+  sigue resolviendo on_delete en Python; solo se pierde la validación de la
+  base de datos frente a SQL directo.
+
+El comando partition_payments (diario en el servicio scheduler) crea por
+adelantado las particiones de los próximos años; las filas que hubieran
+caído en la partición por defecto se mueven a la nueva.
+"""
+from datetime import date, datetime
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+
+
+# Tabla -> columna de partición
+PARTITION_KEYS = {
+    'payments_payment': 'payment_date',
+    'payments_paymentschedule': 'due_date',
+}
+
+DEFAULT_YEARS_AHEAD = 2
+
+_SOURCE_SUFFIX = '__source'
+
+
+def partitioning_enabled():
+    return getattr(settings, 'PAYMENTS_PARTITIONING', False)
+
+
+def is_partitioned(cursor, table):
+    cursor.execute('SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)', [table])
+    return cursor.fetchone() is not None
+
+
+def partition_name(table, year=None):
+    return f'{table}_{year}' if year is not None else f'{table}_default'
+
+
+def partitions(cursor, table):
+    """Particiones de la tabla: [(nombre, límites, filas estimadas)]."""
+    cursor.execute(
+        """
+        SELECT c.relname, pg_get_expr(c.relpartbound, c.oid), c.reltuples::bigint
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass(%s)
+        ORDER BY c.relname
+        """,
+        [table],
+    )
+    return cursor.fetchall()
+
+
+def _quote(cursor, name):
+    return cursor.db.ops.quote_name(name)
+
+
+def _is_timestamp(cursor, table, column):
+    cursor.execute(
+        'SELECT data_type FROM information_schema.columns WHERE table_name = %s AND column_name = %s',
+        [table, column],
+    )
+    return cursor.fetchone()[0].startswith('timestamp')
+
+
+def _year_bounds(year, timestamped):
+    """Límites [1 de enero, 1 de enero siguiente) del año, en la zona horaria del proyecto."""
+    if not timestamped:
+        return date(year, 1, 1).isoformat(), date(year + 1, 1, 1).isoformat()
+    zone = ZoneInfo(settings.TIME_ZONE)
+    return datetime(year, 1, 1, tzinfo=zone).isoformat(), datetime(year + 1, 1, 1, tzinfo=zone).isoformat()
+
+
+def _year_range(cursor, table, column, years_ahead):
+    local = f'{column} AT TIME ZONE %(tz)s' if _is_timestamp(cursor, table, column) else column
+    cursor.execute(
+        f'SELECT EXTRACT(YEAR FROM MIN({local}))::int, EXTRACT(YEAR FROM MAX({local}))::int '
+        f'FROM {_quote(cursor, table)}',
+        {'tz': settings.TIME_ZONE},
+    )
+    first, last = cursor.fetchone()
+    current = date.today().year
+    return min(first or current, current), max(last or current, current + years_ahead)
+
+
+def ensure_partitions(cursor, table, column, first_year, last_year):
+    """
+    Crea las particiones anuales faltantes entre first_year y last_year.
+    Las filas de esos años que estén en la partición por defecto se mueven
+    a la nueva partición antes de adjuntarla. Retorna los nombres creados.
+    """
+    timestamped = _is_timestamp(cursor, table, column)
+    existing = {name for name, bound, rows in partitions(cursor, table)}
+    default = partition_name(table)
+    created = []
+    for year in range(first_year, last_year + 1):
+        name = partition_name(table, year)
+        if name in existing:
+            continue
+        start, end = _year_bounds(year, timestamped)
+        cursor.execute(f'CREATE TABLE {_quote(cursor, name)} (LIKE {_quote(cursor, table)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)')
+        if default in existing:
+            cursor.execute(
+                f'WITH moved AS ('
+                f'DELETE FROM {_quote(cursor, default)} WHERE {column} >= %s AND {column} < %s RETURNING *'
+                f') INSERT INTO {_quote(cursor, name)} SELECT * FROM moved',
+                [start, end],
+            )
+        cursor.execute(
+            f'ALTER TABLE {_quote(cursor, table)} ATTACH PARTITION {_quote(cursor, name)} '
+            f'FOR VALUES FROM (%s) TO (%s)',
+            [start, end],
+        )
+        created.append(name)
+    return created
+
+
+def _indexes(cursor, table):
+    """Definiciones de los índices que no respaldan una restricción."""
+    cursor.execute(
+        """
+        SELECT pg_get_indexdef(i.indexrelid)
+        FROM pg_index i
+        WHERE i.indrelid = to_regclass(%s)
+          AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = i.indexrelid)
+        ORDER BY i.indexrelid
+        """,
+        [table],
+    )
+    return [row[0] for row in cursor.fetchall()]
+
+
+def _constraints(cursor, table, contype):
+    """Restricciones de la tabla del tipo dado: [(nombre, columnas, definición, tabla referida)]."""
+    cursor.execute(
+        """
+        SELECT c.conname,
+               ARRAY(SELECT a.attname FROM unnest(c.conkey) WITH ORDINALITY k(attnum, ord)
+                     JOIN pg_attribute a ON a.attrelid = c.conrelid AND a.attnum = k.attnum
+                     ORDER BY k.ord),
+               pg_get_constraintdef(c.oid),
+               c.confrelid::regclass::text
+        FROM pg_constraint c
+        WHERE c.conrelid = to_regclass(%s) AND c.contype = %s AND c.conparentid = 0
+        ORDER BY c.conname
+        """,
+        [table, contype],
+    )
+    return cursor.fetchall()
+
+
+def _incoming_foreign_keys(cursor, table):
+    """Claves foráneas de otras tablas hacia esta: [(tabla, nombre)]."""
+    cursor.execute(
+        """
+        SELECT conrelid::regclass::text, conname
+        FROM pg_constraint
+        WHERE confrelid = to_regclass(%s) AND contype = 'f' AND conrelid <> confrelid AND conparentid = 0
+        ORDER BY conname
+        """,
+        [table],
+    )
+    return cursor.fetchall()
+
+
+def _rebuild(cursor, table, column, partitioned, years_ahead=DEFAULT_YEARS_AHEAD):
+    """
+    Reconstruye la tabla particionada (o sin particionar) copiando los datos:
+    renombra la original, crea la nueva con las mismas columnas, copia las
+    filas y recrea clave primaria, restricciones UNIQUE, índices y FK con
+    los nombres originales. Retorna las FK hacia la tabla que se eliminaron.
+    """
+    quoted, source = _quote(cursor, table), _quote(cursor, table + _SOURCE_SUFFIX)
+
+    # Las FK diferidas con eventos pendientes impiden modificar las tablas
+    cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+
+    indexes = _indexes(cursor, table)
+    uniques = _constraints(cursor, table, 'u')
+    foreign_keys = _constraints(cursor, table, 'f')
+    incoming = _incoming_foreign_keys(cursor, table)
+    if partitioned:
+        first_year, last_year = _year_range(cursor, table, column, years_ahead)
+
+    for referencing, name in incoming:
+        cursor.execute(f'ALTER TABLE {_quote(cursor, referencing)} DROP CONSTRAINT {_quote(cursor, name)}')
+    cursor.execute(f'ALTER TABLE {quoted} RENAME TO {source}')
+    cursor.execute(
+        f'CREATE TABLE {quoted} (LIKE {source} INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING IDENTITY '
+        f'INCLUDING GENERATED INCLUDING STORAGE INCLUDING COMMENTS)'
+        + (f' PARTITION BY RANGE ({column})' if partitioned else '')
+    )
+    if partitioned:
+        cursor.execute(f'CREATE TABLE {_quote(cursor, partition_name(table))} PARTITION OF {quoted} DEFAULT')
+        ensure_partitions(cursor, table, column, first_year, last_year)
+
+    cursor.execute(f'INSERT INTO {quoted} SELECT * FROM {source}')
+    cursor.execute(f'DROP TABLE {source} CASCADE')
+
+    # La identidad de la tabla nueva continúa la numeración y recupera el nombre de la secuencia
+    cursor.execute('SELECT pg_get_serial_sequence(%s, %s)', [table, 'id'])
+    sequence, = cursor.fetchone()
+    cursor.execute(f'SELECT setval(%s, COALESCE(MAX(id), 0) + 1, false) FROM {quoted}', [sequence])
+    if sequence.split('.')[-1] != f'{table}_id_seq':
+        cursor.execute(f'ALTER SEQUENCE {sequence} RENAME TO {_quote(cursor, f"{table}_id_seq")}')
+
+    key = ['id', column] if partitioned else ['id']
+    cursor.execute(f'ALTER TABLE {quoted} ADD CONSTRAINT {_quote(cursor, table + "_pkey")} PRIMARY KEY ({", ".join(key)})')
+    for name, columns, definition, referenced in uniques:
+        if partitioned and column not in columns:
+            columns = columns + [column]
+        elif not partitioned and len(columns) > 1 and columns[-1] == column:
+            # Sin particiones, la restricción vuelve a sus columnas originales
+            columns = columns[:-1]
+        cursor.execute(
+            f'ALTER TABLE {quoted} ADD CONSTRAINT {_quote(cursor, name)} '
+            f'UNIQUE ({", ".join(_quote(cursor, unique_column) for unique_column in columns)})'
+        )
+    for definition in indexes:
+        cursor.execute(definition)
+    for name, columns, definition, referenced in foreign_keys:
+        # Hacia otra tabla particionada no es posible (ver docstring del módulo)
+        if not is_partitioned(cursor, referenced):
+            cursor.execute(f'ALTER TABLE {quoted} ADD CONSTRAINT {_quote(cursor, name)} {definition}')
+    cursor.execute(f'ANALYZE {quoted}')
+    return incoming
+
+
+def partition_table(cursor, table, years_ahead=DEFAULT_YEARS_AHEAD):
+    """Convierte la tabla en particionada por año. Retorna las FK eliminadas."""
+    if is_partitioned(cursor, table):
+        return []
+    return _rebuild(cursor, table, PARTITION_KEYS[table], partitioned=True, years_ahead=years_ahead)
+
+
+def unpartition_table(cursor, table):
+    """Vuelve a una tabla sin particionar (las FK hacia ella se recrean con restore_foreign_keys)."""
+    if is_partitioned(cursor, table):
+        _rebuild(cursor, table, PARTITION_KEYS[table], partitioned=False)
+
+
+def restore_foreign_keys(schema_editor, models):
+    """Recrea (con el esquema de Django) las FK hacia los modelos dados que falten."""
+    with schema_editor.connection.cursor() as cursor:
+        for model in models:
+            relations = [
+                relation for relation in model._meta.get_fields(include_hidden=True)
+                if relation.auto_created and not relation.concrete and relation.field.concrete
+                and (relation.one_to_many or relation.one_to_one) and relation.field.db_constraint
+            ]
+            for relation in relations:
+                related, field = relation.related_model, relation.field
+                cursor.execute(
+                    """
+                    SELECT 1 FROM pg_constraint c
+                    JOIN pg_attribute a ON a.attrelid = c.conrelid AND a.attnum = c.conkey[1]
+                    WHERE c.conrelid = to_regclass(%s) AND c.contype = 'f' AND a.attname = %s
+                    """,
+                    [related._meta.db_table, field.column],
+                )
+                if cursor.fetchone() is None:
+                    schema_editor.execute(
+                        schema_editor._create_fk_sql(related, field, '_fk_%(to_table)s_%(to_column)s')
+                    )
@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from django.db.models import Prefetch
 from .models import Payment, PaymentPlan, PaymentSchedule
 from django.utils import timezone
 from datetime import datetime
@@ -193,7 +194,83 @@ class PaymentSerializer(serializers.ModelSerializer):
         
         return instance
 
-class PaymentScheduleSerializer(serializers.ModelSerializer):
+class SchedulePaymentsMixin:
+    """
+    Campos derivados de los pagos de una cuota (último pago, conteo y
+    listado). Todos salen de una misma lista ordenada: si el queryset se
+    preparó con prefetch_payments() no se ejecuta ninguna consulta por cuota.
+    """
+    PREFETCH_ATTR = 'ordered_payments'
+
+    @classmethod
+    def prefetch_payments(cls, queryset):
+        """
+        Carga en dos consultas la venta (lote y cliente) y los pagos de cada
+        cuota. Sirve también para ArchivedPaymentSchedule.
+        """
+        payment_model = queryset.model._meta.get_field('payments').related_model
+        return queryset.select_related('venta__lote', 'venta__customer').prefetch_related(
+            Prefetch(
+                'payments',
+                queryset=payment_model.objects.order_by('-created_at', '-id'),
+                to_attr=cls.PREFETCH_ATTR,
+            )
+        )
+
+    def _payments(self, obj):
+        """Pagos de la cuota, del más reciente al más antiguo."""
+        payments = getattr(obj, self.PREFETCH_ATTR, None)
+        if payments is None:
+            payments = list(obj.payments.order_by('-created_at', '-id'))
+            setattr(obj, self.PREFETCH_ATTR, payments)
+        return payments
+
+    def _last_payment(self, obj):
+        payments = self._payments(obj)
+        return payments[0] if payments else None
+
+    def get_payments_count(self, obj):
+        """Número de pagos registrados para esta cuota"""
+        return len(self._payments(obj))
+
+    def get_payment_method(self, obj):
+        """Método de pago del último pago registrado"""
+        last_payment = self._last_payment(obj)
+        return last_payment.method if last_payment else None
+
+    def get_receipt_number(self, obj):
+        """Número de recibo del último pago registrado"""
+        last_payment = self._last_payment(obj)
+        return last_payment.receipt_number if last_payment else None
+
+    def get_receipt_image(self, obj):
+        """Imagen de recibo del último pago registrado"""
+        last_payment = self._last_payment(obj)
+        if last_payment and last_payment.receipt_image:
+            return last_payment.receipt_image.url
+        return None
+
+    def get_all_payments(self, obj):
+        """Todos los pagos asociados a esta cuota"""
+        return [
+            {
+                'id': payment.id,
+                'amount': str(payment.amount),
+                'payment_date': payment.payment_date.isoformat() if payment.payment_date else None,
+                'payment_date_display': timezone.localtime(payment.payment_date).strftime('%d/%m/%Y %H:%M') if payment.payment_date else None,
+                'method': payment.method,
+                'receipt_number': payment.receipt_number,
+                'receipt_date': payment.receipt_date.isoformat() if payment.receipt_date else None,
+                'receipt_date_display': payment.receipt_date.strftime('%d/%m/%Y') if payment.receipt_date else None,
+                'receipt_image': payment.receipt_image.url if payment.receipt_image else None,
+                'notes': payment.notes,
+                'created_at': payment.created_at.isoformat() if payment.created_at else None,
+                'updated_at': payment.updated_at.isoformat() if payment.updated_at else None
+            }
+            for payment in self._payments(obj)
+        ]
+
+class PaymentScheduleSerializer(SchedulePaymentsMixin, serializers.ModelSerializer):
     """
     Serializador para el modelo PaymentSchedule con nueva arquitectura basada en Venta.
     """
@@ -269,10 +346,6 @@ class PaymentScheduleSerializer(serializers.ModelSerializer):
             }
         return None
 
-    def get_payments_count(self, obj):
-        """Número de pagos registrados para esta cuota"""
-        return obj.payments.count()
-
     def get_total_paid(self, obj):
         """Total pagado para esta cuota"""
         return str(obj.paid_amount or 0)
@@ -281,48 +354,6 @@ class PaymentScheduleSerializer(serializers.ModelSerializer):
         """Monto restante por pagar"""
         return str(obj.remaining_amount)
 
-    def get_payment_method(self, obj):
-        """Método de pago del último pago registrado"""
-        if obj.payments.exists():
-            last_payment = obj.payments.order_by('-created_at').first()
-            return last_payment.method
-        return None
-
-    def get_receipt_number(self, obj):
-        """Número de recibo del último pago registrado"""
-        if obj.payments.exists():
-            last_payment = obj.payments.order_by('-created_at').first()
-            return last_payment.receipt_number
-        return None
-
-    def get_receipt_image(self, obj):
-        """Imagen de recibo del último pago registrado"""
-        if obj.payments.exists():
-            last_payment = obj.payments.order_by('-created_at').first()
-            return last_payment.receipt_image.url if last_payment.receipt_image else None
-        return None
-
-    def get_all_payments(self, obj):
-        """Todos los pagos asociados a esta cuota"""
-        payments = obj.payments.all().order_by('-created_at')
-        return [
-            {
-                'id': payment.id,
-                'amount': str(payment.amount),
-                'payment_date': payment.payment_date.isoformat() if payment.payment_date else None,
-                'payment_date_display': timezone.localtime(payment.payment_date).strftime('%d/%m/%Y %H:%M') if payment.payment_date else None,
-                'method': payment.method,
-                'receipt_number': payment.receipt_number,
-                'receipt_date': payment.receipt_date.isoformat() if payment.receipt_date else None,
-                'receipt_date_display': payment.receipt_date.strftime('%d/%m/%Y') if payment.receipt_date else None,
-                'receipt_image': payment.receipt_image.url if payment.receipt_image else None,
-                'notes': payment.notes,
-                'created_at': payment.created_at.isoformat() if payment.created_at else None,
-                'updated_at': payment.updated_at.isoformat() if payment.updated_at else None
-            }
-            for payment in payments
-        ]
-
     def validate(self, attrs):
         """Validar que se proporcione venta_id"""
         venta_id = attrs.get('venta_id')
@@ -348,7 +379,7 @@ class PaymentScheduleSerializer(serializers.ModelSerializer):
         
         return super().create(validated_data)
 
-class PaymentScheduleSummarySerializer(serializers.ModelSerializer):
+class PaymentScheduleSummarySerializer(SchedulePaymentsMixin, serializers.ModelSerializer):
     """
     Serializador resumido para PaymentSchedule (usado en listas)
     """
@@ -399,10 +430,6 @@ class PaymentScheduleSummarySerializer(serializers.ModelSerializer):
             return obj.venta.customer.full_name
         return None
 
-    def get_payments_count(self, obj):
-        """Número de pagos registrados"""
-        return obj.payments.count()
-
     def get_total_paid(self, obj):
         """Total pagado"""
         return str(obj.paid_amount or 0)
@@ -411,47 +438,17 @@ class PaymentScheduleSummarySerializer(serializers.ModelSerializer):
         """Monto restante"""
         return str(obj.remaining_amount)
 
-    def get_payment_method(self, obj):
-        """Método de pago del último pago registrado"""
-        if obj.payments.exists():
-            last_payment = obj.payments.order_by('-created_at').first()
-            return last_payment.method
-        return None
-
-    def get_receipt_number(self, obj):
-        """Número de recibo del último pago registrado"""
-        if obj.payments.exists():
-            last_payment = obj.payments.order_by('-created_at').first()
-            return last_payment.receipt_number
-        return None
+class PaymentPlanListSerializer(serializers.ListSerializer):
+    """
+    Calcula el estado de todos los planes de la lista con una sola consulta
+    (PaymentPlan.payment_statuses) antes de serializarlos.
+    """
 
-    def get_receipt_image(self, obj):
-        """Imagen de recibo del último pago registrado"""
-        if obj.payments.exists():
-            last_payment = obj.payments.order_by('-created_at').first()
-            return last_payment.receipt_image.url if last_payment.receipt_image else None
-        return None
+    def to_representation(self, data):
+        plans = list(data.all() if hasattr(data, 'all') else data)
+        self.child.context['payment_statuses'] = PaymentPlan.payment_statuses([plan.venta_id for plan in plans])
+        return super().to_representation(plans)
 
-    def get_all_payments(self, obj):
-        """Todos los pagos asociados a esta cuota"""
-        payments = obj.payments.all().order_by('-created_at')
-        return [
-            {
-                'id': payment.id,
-                'amount': str(payment.amount),
-                'payment_date': payment.payment_date.isoformat() if payment.payment_date else None,
-                'payment_date_display': timezone.localtime(payment.payment_date).strftime('%d/%m/%Y %H:%M') if payment.payment_date else None,
-                'method': payment.method,
-                'receipt_number': payment.receipt_number,
-                'receipt_date': payment.receipt_date.isoformat() if payment.receipt_date else None,
-                'receipt_date_display': payment.receipt_date.strftime('%d/%m/%Y') if payment.receipt_date else None,
-                'receipt_image': payment.receipt_image.url if payment.receipt_image else None,
-                'notes': payment.notes,
-                'created_at': payment.created_at.isoformat() if payment.created_at else None,
-                'updated_at': payment.updated_at.isoformat() if payment.updated_at else None
-            }
-            for payment in payments
-        ]
 
 class PaymentPlanSerializer(serializers.ModelSerializer):
     """
@@ -479,6 +476,16 @@ class PaymentPlanSerializer(serializers.ModelSerializer):
             'schedules_count'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
+        list_serializer_class = PaymentPlanListSerializer
+
+    def _payment_status(self, obj):
+        """Estado precalculado por la lista o, para un solo plan, una consulta"""
+        statuses = self.context.get('payment_statuses')
+        if statuses is not None and obj.venta_id in statuses:
+            return statuses[obj.venta_id]
+        if not hasattr(obj, '_payment_status'):
+            obj._payment_status = obj.get_payment_status()
+        return obj._payment_status
 
     def get_venta_info(self, obj):
         """Información de la venta asociada"""
@@ -519,8 +526,8 @@ class PaymentPlanSerializer(serializers.ModelSerializer):
 
     def get_payment_status(self, obj):
         """Estado del plan de pagos"""
-        return obj.get_payment_status()
+        return self._payment_status(obj)
 
     def get_schedules_count(self, obj):
         """Número de cronogramas de pago"""
-        return obj.venta.payment_schedules.count()
\ No newline at end of file
+        return self._payment_status(obj)['total']
\ No newline at end of file
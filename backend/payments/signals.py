@@ -0,0 +1,22 @@
+"""
+Invalidación de los totales de pagos que PaymentsPagination guarda en caché,
+al confirmarse la transacción que crea, modifica o borra un pago.
+Los cambios masivos (QuerySet.update(), bulk_create()) no disparan señales:
+quien los ejecute debe llamar a bump_totals_version().
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Payment
+from .pagination import bump_totals_version
+
+
+@receiver(post_save, sender=Payment)
+def payment_saved(sender, instance, **kwargs):
+    transaction.on_commit(bump_totals_version)
+
+
+@receiver(post_delete, sender=Payment)
+def payment_deleted(sender, instance, **kwargs):
+    transaction.on_commit(bump_totals_version)
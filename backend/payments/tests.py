@@ -1,3 +1,583 @@
+import gzip
+import json
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from customers.models import Customer
+from lotes.models import Lote
+from payments.archive import archivable_ventas, archive_batches
+from payments.models import ArchivedPayment, ArchivedPaymentSchedule, Payment, PaymentPlan, PaymentSchedule
+from payments.pagination import PaymentsPagination
+from payments.partitioning import (
+    PARTITION_KEYS, ensure_partitions, is_partitioned, partition_table, restore_foreign_keys, unpartition_table,
+)
+from sales.models import Venta
+from users.models import User
+
+
+class PaymentScheduleSerializerQueryTests(TestCase):
+    """
+    Los listados de cuotas cargan los pagos una sola vez: el número de
+    consultas no depende de cuántas cuotas ni cuántos pagos haya.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='cobranzas', email='cobranzas@example.com', password='x', role='admin'
+        )
+        customer = Customer.objects.create(first_name='Ana', last_name='Pérez', email='ana@example.com')
+        lote = Lote.objects.create(block='P', lot_number='1', area=Decimal('100.00'), price=Decimal('10000.00'))
+        cls.venta = Venta.create_sale(
+            lote=lote, customer=customer, sale_price=Decimal('12000.00'), payment_day=5, financing_months=12,
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def pay(self, installment_number, *amounts):
+        schedule = self.venta.payment_schedules.get(installment_number=installment_number)
+        for index, amount in enumerate(amounts):
+            schedule.register_payment(
+                amount=Decimal(amount), payment_method='efectivo', receipt_number=f'R-{installment_number}-{index}'
+            )
+        return schedule
+
+    def test_venta_payment_schedule_constant_queries(self):
+        url = f'/api/v1/sales/ventas/{self.venta.id}/payment_schedule/'
+
+        self.pay(1, '1000.00')
+        with self.assertNumQueries(3):
+            self.client.get(url)
+
+        for installment_number in range(2, 8):
+            self.pay(installment_number, '400.00', '600.00')
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+
+        self.assertEqual(len(response.data), 12)
+        second = response.data[1]
+        self.assertEqual(second['payments_count'], 2)
+        self.assertEqual(second['receipt_number'], 'R-2-1')
+        self.assertEqual(second['payment_method'], 'efectivo')
+        self.assertEqual([payment['amount'] for payment in second['all_payments']], ['600.00', '400.00'])
+        self.assertEqual(response.data[-1]['payments_count'], 0)
+        self.assertIsNone(response.data[-1]['receipt_number'])
+
+    def test_schedule_list_constant_queries(self):
+        url = '/api/v1/payments/schedules/by_venta/'
+
+        # Nivel de la venta, cuotas, sus pagos y pagos iniciales
+        with self.assertNumQueries(4):
+            self.client.get(url, {'venta_id': self.venta.id})
+
+        for installment_number in range(1, 6):
+            self.pay(installment_number, '1000.00')
+        with self.assertNumQueries(4):
+            response = self.client.get(url, {'venta_id': self.venta.id})
+
+        self.assertEqual(
+            [schedule['payments_count'] for schedule in response.data['schedules'][:6]],
+            [1, 1, 1, 1, 1, 0],
+        )
+
+
+class PaymentSearchTests(TestCase):
+    """?search= usa los índices de texto: prefijos, varios documentos y orden por relevancia."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='caja', email='caja@example.com', password='x', role='admin'
+        )
+        lote = Lote.objects.create(block='Q', lot_number='7', area=Decimal('100.00'), price=Decimal('10000.00'))
+        other_lote = Lote.objects.create(block='R', lot_number='8', area=Decimal('100.00'), price=Decimal('10000.00'))
+        customer = Customer.objects.create(first_name='Juana', last_name='Quispe', document_number='44556677')
+        other = Customer.objects.create(first_name='Mario', last_name='Rojas', document_number='11223344')
+        venta = Venta.create_sale(
+            lote=lote, customer=customer, sale_price=Decimal('12000.00'), payment_day=5, financing_months=12,
+        )
+        other_venta = Venta.create_sale(
+            lote=other_lote, customer=other, sale_price=Decimal('12000.00'), payment_day=5, financing_months=12,
+        )
+        venta.payment_schedules.get(installment_number=1).register_payment(
+            amount=Decimal('1000.00'), payment_method='efectivo', receipt_number='QUISPE-9001'
+        )
+        other_venta.payment_schedules.get(installment_number=1).register_payment(
+            amount=Decimal('1000.00'), payment_method='efectivo', receipt_number='OP-9002', notes='Referido por Quispe'
+        )
+        cls.payment = Payment.objects.get(receipt_number='QUISPE-9001')
+        cls.other_payment = Payment.objects.get(receipt_number='OP-9002')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def search(self, term):
+        response = self.client.get('/api/v1/payments/payments/', {'search': term, 'totals': 0})
+        return [payment['id'] for payment in response.data['results']]
+
+    def test_prefix_and_cross_document_terms(self):
+        self.assertEqual(self.search('juan'), [self.payment.id])
+        self.assertEqual(self.search('4455'), [self.payment.id])
+        self.assertEqual(self.search('op-9002'), [self.other_payment.id])
+        # Una palabra del cliente y otra de la manzana del lote
+        self.assertEqual(self.search('Juana Q'), [self.payment.id])
+        self.assertEqual(self.search('Juana R'), [])
+        self.assertEqual(self.search('%%'), [])
+
+    def test_ranked_by_relevance(self):
+        # Coincide en el recibo y en el cliente del primer pago; solo en las notas del segundo
+        self.assertEqual(self.search('quispe'), [self.payment.id, self.other_payment.id])
+
+
+class CompactScheduleTests(TestCase):
+    """
+    El cronograma columnar: listas paralelas en el orden de las cuotas, con
+    fechas ISO y montos como texto, comprimido si el cliente lo acepta.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='compacto', email='compacto@example.com', password='x', role='admin'
+        )
+        customer = Customer.objects.create(first_name='Noé', last_name='Salas')
+        cls.lote = Lote.objects.create(block='C', lot_number='1', area=Decimal('100.00'), price=Decimal('90000.00'))
+        cls.venta = Venta.create_sale(
+            lote=cls.lote, customer=customer, sale_price=Decimal('120000.00'), payment_day=5, financing_months=120,
+        )
+        cls.venta.payment_schedules.get(installment_number=1).register_payment(amount=Decimal('400.50'))
+        cls.venta.payment_schedules.get(installment_number=2).forgive_installment()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_payload_shape(self):
+        url = '/api/v1/payments/schedules/compact/'
+        with self.assertNumQueries(1):
+            data = self.client.get(url, {'venta_id': self.venta.id}).json()
+
+        columns = ['id', 'installment_number', 'due_date', 'scheduled_amount', 'paid_amount', 'status', 'is_forgiven']
+        self.assertEqual(data['columns'], columns)
+        self.assertEqual(set(data), {'venta_id', 'lote_id', 'count', 'columns', *columns})
+        self.assertEqual((data['venta_id'], data['lote_id'], data['count']), (self.venta.id, None, 120))
+        self.assertTrue(all(len(data[column]) == 120 for column in columns))
+
+        schedules = self.venta.payment_schedules.order_by('installment_number')
+        self.assertEqual(data['installment_number'], list(range(1, 121)))
+        self.assertEqual(data['id'], [schedule.id for schedule in schedules])
+        self.assertEqual(data['due_date'], [schedule.due_date.isoformat() for schedule in schedules])
+        self.assertEqual(data['scheduled_amount'][:2], ['1000.00', '1000.00'])
+        self.assertEqual(data['paid_amount'][:3], ['400.50', '1000.00', '0.00'])
+        self.assertEqual(data['status'][:2], ['partial', 'forgiven'])
+        self.assertEqual(data['is_forgiven'][:3], [False, True, False])
+
+        # Por lote: la venta activa
+        by_lote = self.client.get(url, {'lote_id': self.lote.id}).json()
+        self.assertEqual(by_lote['id'], data['id'])
+        self.assertEqual((by_lote['venta_id'], by_lote['lote_id']), (None, self.lote.id))
+
+        for params in ({}, {'venta_id': 'x'}):
+            self.assertEqual(self.client.get(url, params).status_code, 400)
+
+    def test_gzip_round_trip(self):
+        url = '/api/v1/payments/schedules/compact/'
+        plain = self.client.get(url, {'venta_id': self.venta.id})
+        self.assertFalse(plain.has_header('Content-Encoding'))
+
+        response = self.client.get(url, {'venta_id': self.venta.id}, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertLess(len(response.content), len(plain.content) // 4)
+        self.assertEqual(json.loads(gzip.decompress(response.content)), plain.json())
+
+
+class PaymentsPaginationTests(TestCase):
+    """
+    Totales del listado de pagos: el mes en curso por rango de fechas, la
+    caché invalidada al guardar o borrar un pago y ?totals=0 sin aggregate.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='totales', email='totales@example.com', password='x', role='admin'
+        )
+        customer = Customer.objects.create(first_name='Teo', last_name='Ríos')
+        lote = Lote.objects.create(block='T', lot_number='1', area=Decimal('100.00'), price=Decimal('10000.00'))
+        cls.venta = Venta.create_sale(
+            lote=lote, customer=customer, sale_price=Decimal('6000.00'), payment_day=5, financing_months=6,
+        )
+        month_start = timezone.localtime().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        next_month_start = (month_start + timedelta(days=32)).replace(day=1)
+        for amount, payment_date, method in (
+            ('100.00', month_start - timedelta(microseconds=1), 'efectivo'),  # fin del mes anterior
+            ('200.00', month_start, 'efectivo'),
+            ('300.00', timezone.now(), 'transferencia'),
+            ('400.00', month_start.replace(year=month_start.year - 1), 'transferencia'),  # mismo mes, otro año
+            ('800.00', next_month_start, 'transferencia'),
+        ):
+            Payment.objects.create(venta=cls.venta, amount=Decimal(amount), payment_date=payment_date, method=method)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def info(self, **params):
+        response = self.client.get('/api/v1/payments/payments/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.data['info']
+
+    def totals(self, **params):
+        info = self.info(**params)
+        return info['count'], info['total_recaudado'], info['este_mes_recaudado']
+
+    def test_month_to_date_range(self):
+        self.assertEqual(self.totals(), (5, 1800.0, 500.0))
+        self.assertEqual(self.totals(method='efectivo'), (2, 300.0, 200.0))
+
+    def test_cache_invalidated_on_save_and_delete(self):
+        self.assertEqual(self.totals(), (5, 1800.0, 500.0))
+
+        # update() no dispara señales: los totales salen de la caché
+        Payment.objects.filter(amount=Decimal('300.00')).update(amount=Decimal('350.00'))
+        self.assertEqual(self.totals(), (5, 1800.0, 500.0))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            payment = Payment.objects.create(venta=self.venta, amount=Decimal('50.00'), payment_date=timezone.now())
+        self.assertEqual(self.totals(), (6, 1900.0, 600.0))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            payment.delete()
+        self.assertEqual(self.totals(), (5, 1850.0, 550.0))
+
+    def test_totals_disabled(self):
+        with mock.patch.object(PaymentsPagination, 'get_totals') as get_totals:
+            info = self.info(totals='0', page_size=2)
+        get_totals.assert_not_called()
+        self.assertEqual((info['total_recaudado'], info['este_mes_recaudado']), (None, None))
+        # El conteo sale del paginador
+        self.assertEqual((info['count'], info['pages']), (5, 3))
+
+
+class KeysetPaginationTests(TestCase):
+    """
+    Los listados de cuotas paginan por cursor sobre (due_date, id): el cursor
+    se codifica y decodifica sin pérdida, previous recorre las mismas páginas
+    hacia atrás y las vencidas del dashboard van de la más reciente a la más
+    antigua.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='cursor', email='cursor@example.com', password='x', role='admin'
+        )
+        customer = Customer.objects.create(first_name='Rosa', last_name='Vega')
+        cls.ventas = []
+        for lot_number in ('1', '2'):
+            lote = Lote.objects.create(
+                block='K', lot_number=lot_number, area=Decimal('100.00'), price=Decimal('10000.00')
+            )
+            cls.ventas.append(Venta.create_sale(
+                lote=lote, customer=customer, sale_price=Decimal('6000.00'), payment_day=5, financing_months=6,
+            ))
+        # Cuatro fechas vencidas repetidas en ambas ventas: el id desempata
+        for venta in cls.ventas:
+            for installment_number in range(1, 5):
+                PaymentSchedule.objects.filter(venta=venta, installment_number=installment_number).update(
+                    due_date=date.today() - timedelta(days=10 * installment_number), status='overdue'
+                )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def walk(self, url, params, link='next'):
+        """Recorre las páginas siguiendo `link` y retorna los ids de cada página."""
+        pages = []
+        while url:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            pages.append([row['id'] for row in response.data['results']])
+            url, params = response.data[link], None
+        return pages, response
+
+    def test_cursor_round_trip(self):
+        from rest_framework.request import Request
+        from rest_framework.test import APIRequestFactory
+        from .pagination import PaymentScheduleKeysetPagination
+
+        schedule = PaymentSchedule.objects.filter(status='overdue').first()
+        paginator = PaymentScheduleKeysetPagination()
+        paginator.fields = [('due_date', False), ('id', False)]
+        for reverse in (False, True):
+            cursor = paginator.encode_cursor(schedule, reverse=reverse)
+            request = Request(APIRequestFactory().get('/', {'cursor': cursor}))
+            self.assertEqual(
+                paginator.decode_cursor(request, PaymentSchedule),
+                ([schedule.due_date, schedule.id], reverse),
+            )
+
+        response = self.client.get('/api/v1/payments/schedules/overdue/', {'cursor': 'no-es-un-cursor'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_overdue_forward_and_back(self):
+        expected = list(
+            PaymentSchedule.objects.filter(status='overdue').order_by('due_date', 'id').values_list('id', flat=True)
+        )
+        pages, last = self.walk('/api/v1/payments/schedules/overdue/', {'page_size': 3})
+
+        self.assertEqual([len(page) for page in pages], [3, 3, 2])
+        self.assertEqual(sum(pages, []), expected)
+        self.assertIsNone(last.data['next'])
+        self.assertIsNone(last.data['count'])
+
+        # Desde la última página, previous devuelve las mismas páginas en orden inverso
+        back, first = self.walk(last.data['previous'], None, link='previous')
+        self.assertEqual(back, pages[-2::-1])
+        self.assertIsNone(first.data['previous'])
+
+    def test_dashboard_overdue_newest_first(self):
+        expected = list(
+            PaymentSchedule.objects.filter(status='overdue').order_by('-due_date', '-id').values_list('id', flat=True)
+        )
+        pages, last = self.walk(
+            '/api/v1/dashboard/due-dates/', {'status': 'overdue', 'page_size': 3, 'count': 'exact'}
+        )
+
+        self.assertEqual(sum(pages, []), expected)
+        self.assertEqual(last.data['count'], 8)
+        back, _first = self.walk(last.data['previous'], None, link='previous')
+        self.assertEqual(back, pages[-2::-1])
+
+
+class PaymentPlanStatusTests(TestCase):
+    """El estado del plan sale de un único agregado, también para muchas ventas a la vez."""
+
+    @classmethod
+    def setUpTestData(cls):
+        customer = Customer.objects.create(first_name='Luz', last_name='Mamani')
+        lote = Lote.objects.create(block='S', lot_number='1', area=Decimal('100.00'), price=Decimal('10000.00'))
+        cls.venta = Venta.create_sale(
+            lote=lote, customer=customer, sale_price=Decimal('6000.00'), payment_day=5, financing_months=6,
+            initial_payment=Decimal('1000.00'),
+        )
+        schedules = {schedule.installment_number: schedule for schedule in cls.venta.payment_schedules.all()}
+        schedules[1].register_payment(amount=schedules[1].scheduled_amount, payment_method='efectivo')
+        schedules[2].register_payment(amount=Decimal('100.00'), payment_method='efectivo')
+        schedules[3].forgive_installment(notes='Descuento')
+
+    def test_status_single_query(self):
+        plan = self.venta.plan_pagos
+        with self.assertNumQueries(1):
+            status = plan.get_payment_status()
+
+        self.assertEqual(
+            {key: status[key] for key in ('total', 'paid', 'partial', 'forgiven', 'completion_percentage')},
+            {'total': 6, 'paid': 1, 'partial': 1, 'forgiven': 1, 'completion_percentage': 33.3},
+        )
+        self.venta.refresh_from_db()
+        self.assertEqual(status['remaining_amount'], str(self.venta.remaining_balance))
+        self.assertFalse(plan.is_completed)
+
+    def test_bulk_statuses(self):
+        with self.assertNumQueries(1):
+            statuses = PaymentPlan.payment_statuses([self.venta.id, 0])
+        self.assertEqual(list(statuses), [self.venta.id])
+        self.assertEqual(statuses[self.venta.id], self.venta.plan_pagos.get_payment_status())
+
+    def test_archived_venta_keeps_its_status(self):
+        from payments.archive import archive_ventas
+
+        user = User.objects.create_user(username='plan', email='plan@example.com', password='x', role='admin')
+        client = APIClient()
+        client.force_authenticate(user)
+        url = f'/api/v1/sales/ventas/{self.venta.id}/payment_plan/'
+        Venta.objects.filter(pk=self.venta.pk).update(status='cancelled', cancellation_date=timezone.now())
+
+        before = client.get(url).json()
+        self.assertEqual(before['payment_status']['total'], 6)
+        self.assertEqual(archive_ventas([self.venta.id])['schedules'], 6)
+
+        after = client.get(url).json()
+        self.assertEqual(after['payment_status'], before['payment_status'])
+        self.assertEqual(after['schedules_count'], 6)
+        self.assertFalse(PaymentPlan.objects.get(venta=self.venta).is_completed)
+
+
+class PartitioningTests(TestCase):
+    """Pagos y cuotas se particionan por año sin perder datos ni la numeración."""
+
+    @classmethod
+    def setUpTestData(cls):
+        customer = Customer.objects.create(first_name='Rosa', last_name='Quispe')
+        lote = Lote.objects.create(block='T', lot_number='1', area=Decimal('100.00'), price=Decimal('10000.00'))
+        cls.venta = Venta.create_sale(
+            lote=lote, customer=customer, sale_price=Decimal('12000.00'), payment_day=5, financing_months=24,
+        )
+        cls.schedule = cls.venta.payment_schedules.get(installment_number=1)
+        cls.schedule.register_payment(amount=Decimal('500.00'))
+
+    def explain_relations(self, queryset):
+        """Particiones (o la tabla) del modelo que lee el plan de la consulta."""
+        plan = json.loads(queryset.order_by().explain(format='json'))
+        table = queryset.model._meta.db_table
+        relations = set()
+
+        def walk(node):
+            if node.get('Relation Name', '').startswith(table):
+                relations.add(node['Relation Name'])
+            for child in node.get('Plans', []):
+                walk(child)
+
+        walk(plan[0]['Plan'])
+        return relations
+
+    def test_partition_and_revert(self):
+        with connection.cursor() as cursor:
+            for table in PARTITION_KEYS:
+                partition_table(cursor, table)
+                self.assertTrue(is_partitioned(cursor, table))
+
+        schedules = PaymentSchedule.objects.filter(venta=self.venta)
+        self.assertEqual(schedules.count(), 24)
+        years = {schedule.due_date.year for schedule in schedules}
+        year = min(years)
+        self.assertEqual(
+            self.explain_relations(PaymentSchedule.objects.filter(due_date__year=year)),
+            {f'payments_paymentschedule_{year}'},
+        )
+
+        # Nuevas filas: la identidad continúa y on_delete sigue resuelto por Django
+        first = Payment.objects.get()
+        self.schedule.register_payment(amount=Decimal('100.00'))
+        self.assertGreater(Payment.objects.exclude(pk=first.pk).get().id, first.id)
+        self.assertEqual(self.schedule.schedule_payments.count(), 2)
+
+        with connection.cursor() as cursor:
+            for table in PARTITION_KEYS:
+                unpartition_table(cursor, table)
+        with connection.schema_editor(atomic=False) as schema_editor:
+            restore_foreign_keys(schema_editor, [Payment, PaymentSchedule])
+        with connection.cursor() as cursor:
+            self.assertFalse(is_partitioned(cursor, 'payments_payment'))
+            cursor.execute(
+                "SELECT COUNT(*) FROM pg_constraint WHERE contype = 'f' AND confrelid = ANY(%s::regclass[])",
+                [list(PARTITION_KEYS)],
+            )
+            self.assertEqual(cursor.fetchone()[0], 3)
+        self.assertEqual(PaymentSchedule.objects.filter(venta=self.venta).count(), 24)
+
+    def test_future_partitions_take_default_rows(self):
+        with connection.cursor() as cursor:
+            partition_table(cursor, 'payments_paymentschedule', years_ahead=0)
+            PaymentSchedule.objects.filter(pk=self.schedule.pk).update(due_date=date(2090, 3, 5))
+            self.assertEqual(
+                self.explain_relations(PaymentSchedule.objects.filter(due_date__year=2090)),
+                {'payments_paymentschedule_default'},
+            )
+
+            created = ensure_partitions(cursor, 'payments_paymentschedule', 'due_date', 2089, 2090)
+
+        self.assertEqual(created, ['payments_paymentschedule_2089', 'payments_paymentschedule_2090'])
+        self.assertEqual(PaymentSchedule.objects.get(due_date__year=2090).pk, self.schedule.pk)
+        self.assertEqual(
+            self.explain_relations(PaymentSchedule.objects.filter(due_date__year=2090)),
+            {'payments_paymentschedule_2090'},
+        )
+
+
+class ArchiveTests(TestCase):
+    """
+    Las cuotas y pagos de ventas cerradas pasan al archivo y vuelven sin
+    cambios; los historiales leen de ambos niveles.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='archivo', email='archivo@example.com', password='x', role='admin'
+        )
+        customer = Customer.objects.create(first_name='Luz', last_name='Mamani')
+        cls.lote = Lote.objects.create(block='A', lot_number='9', area=Decimal('100.00'), price=Decimal('10000.00'))
+        cls.venta = Venta.create_sale(
+            lote=cls.lote, customer=customer, sale_price=Decimal('6000.00'), payment_day=5, financing_months=6,
+        )
+        schedule = cls.venta.payment_schedules.get(installment_number=1)
+        schedule.register_payment(amount=Decimal('400.00'), receipt_number='A-1')
+        schedule.payments.add(Payment.objects.get(receipt_number='A-1'))
+        Payment.objects.create(
+            venta=cls.venta, amount=Decimal('500.00'), payment_date=timezone.now() - timedelta(days=500),
+            method='efectivo', payment_type='initial', receipt_number='A-0',
+        )
+        Venta.objects.filter(pk=cls.venta.pk).update(
+            status='cancelled', cancellation_date=timezone.now() - timedelta(days=400)
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def snapshot(self):
+        listing = Venta.objects.filter(pk=self.venta.pk).for_listing().with_installment_progress().values(
+            'pending_balance', 'total_paid', 'installments_total', 'installments_paid', 'next_due_date'
+        ).get()
+        history = self.client.get('/api/v1/payments/schedules/history_by_lote/', {'lote_id': self.lote.id}).json()
+        payments = self.client.get(f'/api/v1/lotes/{self.lote.id}/payment_history/').json()['results']
+        by_venta = self.client.get('/api/v1/payments/schedules/by_venta/', {'venta_id': self.venta.id}).json()
+        compact = self.client.get('/api/v1/payments/schedules/compact/', {'venta_id': self.venta.id}).json()
+        return listing, history, payments, by_venta, compact
+
+    def test_archive_and_restore(self):
+        before = self.snapshot()
+        self.assertEqual(len(before[3]['schedules']), 6)
+        self.assertEqual(before[4]['count'], 6)
+        self.assertEqual([payment['receipt_number'] for payment in before[3]['initial_payments']], ['A-0'])
+        rows = sorted(PaymentSchedule.objects.values_list('id', 'paid_amount', 'status'))
+
+        self.assertEqual(list(archive_batches()), [{'ventas': 1, 'schedules': 6, 'payments': 2}])
+        self.assertFalse(PaymentSchedule.objects.exists() or Payment.objects.exists())
+        archived = ArchivedPaymentSchedule.objects.get(installment_number=1)
+        self.assertEqual(list(archived.payments.values_list('receipt_number', flat=True)), ['A-1'])
+        self.assertEqual(ArchivedPayment.objects.get(receipt_number='A-1').payment_schedule, archived)
+        self.assertEqual(self.snapshot(), before)
+        self.assertEqual(list(archive_batches()), [])
+
+        response = self.client.post(f'/api/v1/sales/ventas/{self.venta.id}/restore_archive/')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(ArchivedPaymentSchedule.objects.exists() or ArchivedPayment.objects.exists())
+        self.assertEqual(sorted(PaymentSchedule.objects.values_list('id', 'paid_amount', 'status')), rows)
+        payment = Payment.objects.get(receipt_number='A-1')
+        self.assertEqual(payment.payment_schedule.installment_number, 1)
+        self.assertEqual(list(payment.payment_schedules.all()), [payment.payment_schedule])
+        self.assertEqual(self.snapshot(), before)
+
+    def test_retention_and_reopening(self):
+        self.assertEqual(archivable_ventas(retention=500).count(), 0)
+        self.assertEqual(list(archive_batches(retention=500)), [])
+
+        self.client.post(f'/api/v1/sales/ventas/{self.venta.id}/archive/')
+        self.venta.refresh_from_db()
+        self.assertTrue(self.venta.is_archived)
+        self.assertEqual(self.venta.get_payment_schedules().count(), 6)
 
-# Create your tests here.
+        # Reabrir la venta devuelve sus cuotas y pagos a las tablas activas
+        self.venta.status = 'active'
+        self.venta.save()
+        self.assertIsNone(Venta.objects.get(pk=self.venta.pk).archived_at)
+        self.assertEqual(PaymentSchedule.objects.filter(venta=self.venta).count(), 6)
+        self.assertEqual(
+            self.client.post(f'/api/v1/sales/ventas/{self.venta.id}/archive/').status_code, 400
+        )
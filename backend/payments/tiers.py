@@ -0,0 +1,129 @@
+"""
+Lecturas de pagos sobre los dos niveles: la tabla activa (Payment) y el
+archivo (ArchivedPayment, ver payments/archive.py).
+
+Los pagos de una venta están en uno solo de los niveles, así que los
+reportes y totales de pagos consultan ambos con los mismos filtros:
+
+- payment_tiers(): un queryset por nivel, al que se aplican los filtros.
+- merge_totals() / merge_groups(): Count y Sum son aditivos; se calculan
+  por nivel (con aggregate o aaggregate) y se suman en memoria.
+- TieredPayments: los pagos de ambos niveles como una sola secuencia
+  ordenada, para Paginator y para los listados limitados. Cada tramo sale
+  de un UNION ALL de las claves de orden, el id y el nivel (con el ORDER BY
+  y LIMIT/OFFSET en la base de datos) y de una consulta por nivel que carga
+  las filas completas de ese tramo.
+"""
+from django.db.models import IntegerField, Value
+
+from .models import ArchivedPayment, Payment
+
+
+PAYMENT_TIERS = (Payment, ArchivedPayment)
+
+TIER_ANNOTATION = 'payment_tier'
+
+
+def payment_tiers(*select_related):
+    """Un queryset por nivel: tabla activa y archivo."""
+    return [model.objects.select_related(*select_related) for model in PAYMENT_TIERS]
+
+
+def _add(total, value):
+    if value is None:
+        return total
+    return value if total is None else total + value
+
+
+def merge_totals(results):
+    """Suma clave por clave los resultados de aggregate() de cada nivel."""
+    merged = {}
+    for result in results:
+        for name, value in result.items():
+            merged[name] = _add(merged.get(name), value)
+    return merged
+
+
+def merge_groups(groups, keys):
+    """
+    Une las filas de values(*keys).annotate(...) de cada nivel: suma las
+    anotaciones de las filas con las mismas claves y las ordena por claves.
+    """
+    merged = {}
+    for rows in groups:
+        for row in rows:
+            key = tuple(row[name] for name in keys)
+            if key not in merged:
+                merged[key] = dict(row)
+                continue
+            for name, value in row.items():
+                if name not in keys:
+                    merged[key][name] = _add(merged[key][name], value)
+    return [merged[key] for key in sorted(merged)]
+
+
+class TieredPayments:
+    """
+    Pagos de los querysets de cada nivel (con los mismos filtros y el mismo
+    orden) como una secuencia: count(), len() y rebanadas [inicio:fin]. El
+    orden es el del primer queryset (o el de su modelo), desempatado por id.
+    """
+    ordered = True  # para el aviso de Paginator sobre listas sin orden
+
+    def __init__(self, querysets):
+        self.querysets = list(querysets)
+        first = self.querysets[0]
+        ordering = [
+            term.replace('pk', 'id') for term in (first.query.order_by or first.model._meta.ordering)
+        ]
+        if not any(term.lstrip('-') == 'id' for term in ordering):
+            ordering.append('-id' if ordering and ordering[0].startswith('-') else 'id')
+        self.ordering = ordering
+        self.columns = [term.lstrip('-') for term in ordering]
+
+    def count(self):
+        return sum(queryset.count() for queryset in self.querysets)
+
+    def __len__(self):
+        return self.count()
+
+    def _keys(self):
+        """UNION ALL de (claves de orden..., nivel) de todos los niveles, ordenado."""
+        parts = [
+            queryset.order_by().annotate(**{TIER_ANNOTATION: Value(tier, output_field=IntegerField())})
+            .values_list(*self.columns, TIER_ANNOTATION)
+            for tier, queryset in enumerate(self.querysets)
+        ]
+        return parts[0].union(*parts[1:], all=True).order_by(*self.ordering)
+
+    def _ids_by_tier(self, keys):
+        position = self.columns.index('id')
+        ids_by_tier = {}
+        for row in keys:
+            ids_by_tier.setdefault(row[-1], []).append(row[position])
+        return ids_by_tier
+
+    def _in_order(self, keys, loaded):
+        """Las filas cargadas ({(nivel, id): pago}) en el orden del UNION (sin las borradas entretanto)."""
+        position = self.columns.index('id')
+        return [loaded[key] for key in ((row[-1], row[position]) for row in keys) if key in loaded]
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        keys = list(self._keys()[index])
+        loaded = {
+            (tier, payment.pk): payment
+            for tier, ids in self._ids_by_tier(keys).items()
+            for payment in self.querysets[tier].filter(pk__in=ids)
+        }
+        return self._in_order(keys, loaded)
+
+    async def aslice(self, start, stop):
+        """Igual que self[start:stop], con el ORM async."""
+        keys = [row async for row in self._keys()[start:stop]]
+        loaded = {}
+        for tier, ids in self._ids_by_tier(keys).items():
+            async for payment in self.querysets[tier].filter(pk__in=ids):
+                loaded[(tier, payment.pk)] = payment
+        return self._in_order(keys, loaded)
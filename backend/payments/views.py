@@ -4,11 +4,14 @@ from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from django.db import models
 from django.utils import timezone
-from .models import Payment, PaymentSchedule
+from customers.models import Customer
+from lotes.models import Lote
+from villanueva_project.search import RankedSearchFilter
+from .models import ArchivedPayment, ArchivedPaymentSchedule, Payment, PaymentSchedule
 from .serializers import PaymentSerializer, PaymentScheduleSerializer, PaymentScheduleSummarySerializer
 from users.permissions import IsWorkerOrAdmin
 from rest_framework.parsers import MultiPartParser, FormParser 
-from .pagination import PaymentsPagination
+from .pagination import PaymentsPagination, PaymentScheduleKeysetPagination
 
 class PaymentViewSet(viewsets.ModelViewSet):
     """
@@ -18,21 +21,17 @@ class PaymentViewSet(viewsets.ModelViewSet):
     serializer_class = PaymentSerializer
     permission_classes = [permissions.IsAuthenticated, IsWorkerOrAdmin]
     pagination_class = PaymentsPagination
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, RankedSearchFilter]
     parser_classes = [MultiPartParser, FormParser] # Para manejar la subida de archivos/imágenes
     
     # Filtros por venta_id, método de pago y tipo de pago
     filterset_fields = ['venta__id', 'method', 'payment_type']
     
-    # Búsqueda por número de recibo, notas, información del cliente y lote
-    search_fields = [
-        'receipt_number', 
-        'notes', 
-        'venta__customer__first_name', 
-        'venta__customer__last_name',
-        'venta__customer__document_number',
-        'venta__lote__block',
-        'venta__lote__lot_number'
+    # Búsqueda indexada por número de recibo, notas, información del cliente y lote
+    search_documents = [
+        ('', Payment),
+        ('venta__customer', Customer),
+        ('venta__lote', Lote),
     ]
     
     # Ordenación
@@ -47,6 +46,28 @@ class PaymentViewSet(viewsets.ModelViewSet):
             'payment_schedule',
             'recorded_by'
         ).all()
+
+    def list(self, request, *args, **kwargs):
+        """
+        Lista los pagos de la tabla activa y del archivo con los mismos
+        filtros; la paginación suma los totales de ambos niveles.
+        """
+        archived = ArchivedPayment.objects.select_related(
+            'venta',
+            'venta__lote',
+            'venta__customer',
+            'payment_schedule',
+            'recorded_by'
+        )
+        tiers = [self.filter_queryset(queryset) for queryset in (self.get_queryset(), archived)]
+        page = self.paginate_queryset(tiers)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+
+        from .tiers import TieredPayments
+        serializer = self.get_serializer(TieredPayments(tiers)[:], many=True)
+        return Response(serializer.data)
         
     def get_serializer_context(self):
         return {'request': self.request}
@@ -96,25 +117,26 @@ class PaymentScheduleViewSet(viewsets.ModelViewSet):
     serializer_class = PaymentScheduleSerializer
     permission_classes = [permissions.IsAuthenticated, IsWorkerOrAdmin]
     
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, RankedSearchFilter]
     
     # Filtros por venta_id, lote_id, customer_id, estado, número de cuota y si está perdonado
     filterset_fields = ['venta__id', 'venta__lote__id', 'venta__customer__id', 'status', 'installment_number', 'is_forgiven']
     
-    # Búsqueda por información del lote o cliente
-    search_fields = [
-        'venta__lote__block',
-        'venta__lote__lot_number',
-        'venta__customer__first_name',
-        'venta__customer__last_name',
-        'venta__customer__document_number',
-        'notes'
+    # Búsqueda indexada por información del lote o cliente y por las notas de la cuota
+    search_documents = [
+        ('', PaymentSchedule),
+        ('venta__customer', Customer),
+        ('venta__lote', Lote),
     ]
     
     # Ordenación
     ordering_fields = ['due_date', 'installment_number', 'scheduled_amount', 'status']
     ordering = ['venta__lote', 'installment_number']
 
+    def get_queryset(self):
+        # Pagos de cada cuota precargados y ordenados (evita N+1 en los serializers)
+        return PaymentScheduleSummarySerializer.prefetch_payments(super().get_queryset())
+
     def get_serializer_class(self):
         """
         Usar serializer resumido para listas y completo para detalles.
@@ -160,8 +182,17 @@ class PaymentScheduleViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Buscar por todas las ventas del lote (incluyendo canceladas y completadas)
-        schedules = self.get_queryset().filter(venta__lote_id=lote_id)
+        # Buscar por todas las ventas del lote (incluyendo canceladas y completadas),
+        # también las archivadas, en el orden del cronograma (venta, cuota)
+        schedules = sorted(
+            [
+                *self.get_queryset().filter(venta__lote_id=lote_id),
+                *PaymentScheduleSummarySerializer.prefetch_payments(
+                    ArchivedPaymentSchedule.objects.filter(venta__lote_id=lote_id)
+                ),
+            ],
+            key=lambda schedule: (schedule.venta_id, schedule.installment_number),
+        )
         serializer = PaymentScheduleSummarySerializer(schedules, many=True)
         return Response(serializer.data)
     
@@ -169,7 +200,10 @@ class PaymentScheduleViewSet(viewsets.ModelViewSet):
     def by_venta(self, request):
         """
         Obtiene el cronograma de pagos de una venta específica.
+        Si la venta está archivada, lo lee de las tablas de archivo.
         """
+        from sales.models import Venta
+
         venta_id = request.query_params.get('venta_id')
         if not venta_id:
             return Response(
@@ -177,12 +211,19 @@ class PaymentScheduleViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        schedules = self.get_queryset().filter(venta_id=venta_id)
+        venta = Venta.objects.filter(pk=venta_id).only('archived_at').first()
+        if venta is not None and venta.is_archived:
+            schedules = PaymentScheduleSummarySerializer.prefetch_payments(
+                ArchivedPaymentSchedule.objects.filter(venta_id=venta_id).select_related(
+                    'venta', 'recorded_by', 'venta__lote', 'venta__customer'
+                )
+            )
+        else:
+            schedules = self.get_queryset().filter(venta_id=venta_id)
         serializer = PaymentScheduleSummarySerializer(schedules, many=True)
         
         # Incluir información del pago inicial si existe
-        initial_payments = Payment.objects.filter(
-            venta_id=venta_id, 
+        initial_payments = (venta.get_payments() if venta is not None else Payment.objects.none()).filter(
             payment_type='initial'
         ).order_by('-created_at')
         
@@ -208,23 +249,83 @@ class PaymentScheduleViewSet(viewsets.ModelViewSet):
             'initial_payments': initial_payment_data
         })
 
+    # Columnas del cronograma compacto, en el orden de values_list
+    COMPACT_COLUMNS = ['id', 'installment_number', 'due_date', 'scheduled_amount', 'paid_amount', 'status', 'is_forgiven']
+
+    @action(detail=False, methods=['get'])
+    def compact(self, request):
+        """
+        Cronograma de una venta (?venta_id=) o de la venta activa de un lote
+        (?lote_id=) en formato columnar: una lista paralela por campo, con
+        fechas ISO y montos como texto. Pensado para las tablas de cuotas, sin
+        pasar por los serializers. Por venta lee también el archivo (UNION ALL
+        de ambas tablas, ver payments/archive.py).
+        """
+        try:
+            venta_id = int(request.query_params['venta_id']) if request.query_params.get('venta_id') else None
+            lote_id = int(request.query_params['lote_id']) if request.query_params.get('lote_id') else None
+        except ValueError:
+            return Response(
+                {'error': 'venta_id and lote_id must be integers'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not venta_id and not lote_id:
+            return Response(
+                {'error': 'venta_id or lote_id parameter is required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if venta_id:
+            # Las cuotas de una venta están en uno solo de los niveles
+            schedules, archived = (
+                model.objects.filter(venta_id=venta_id).order_by().values_list(*self.COMPACT_COLUMNS)
+                for model in (PaymentSchedule, ArchivedPaymentSchedule)
+            )
+            schedules = schedules.union(archived, all=True)
+        else:
+            # Las ventas activas nunca están archivadas
+            schedules = PaymentSchedule.objects.filter(
+                venta__lote_id=lote_id, venta__status='active'
+            ).values_list(*self.COMPACT_COLUMNS)
+
+        rows = list(schedules.order_by('installment_number'))
+        ids, numbers, due_dates, scheduled, paid, statuses, forgiven = zip(*rows) if rows else ([],) * 7
+
+        return Response({
+            'venta_id': venta_id,
+            'lote_id': lote_id,
+            'count': len(ids),
+            'columns': self.COMPACT_COLUMNS,
+            'id': list(ids),
+            'installment_number': list(numbers),
+            'due_date': [due_date.isoformat() for due_date in due_dates],
+            'scheduled_amount': [str(amount) for amount in scheduled],
+            'paid_amount': [str(amount) for amount in paid],
+            'status': list(statuses),
+            'is_forgiven': list(forgiven),
+        })
+
     @action(detail=False, methods=['get'])
     def overdue(self, request):
         """
-        Obtiene todas las cuotas vencidas.
+        Obtiene las cuotas vencidas, paginadas por cursor sobre (due_date, id).
         """
         schedules = self.get_queryset().filter(status='overdue')
-        serializer = PaymentScheduleSummarySerializer(schedules, many=True)
-        return Response(serializer.data)
+        return self._keyset_paginated_response(schedules, request)
 
     @action(detail=False, methods=['get'])
     def pending(self, request):
         """
-        Obtiene todas las cuotas pendientes.
+        Obtiene las cuotas pendientes, paginadas por cursor sobre (due_date, id).
         """
         schedules = self.get_queryset().filter(status='pending')
-        serializer = PaymentScheduleSummarySerializer(schedules, many=True)
-        return Response(serializer.data)
+        return self._keyset_paginated_response(schedules, request)
+
+    def _keyset_paginated_response(self, schedules, request):
+        paginator = PaymentScheduleKeysetPagination()
+        page = paginator.paginate_queryset(schedules, request, view=self)
+        serializer = PaymentScheduleSummarySerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
     
     @action(detail=False, methods=['post'])
     def update_overdue(self, request):
@@ -246,8 +347,16 @@ class PaymentScheduleViewSet(viewsets.ModelViewSet):
             count = pending_overdue.count()
             
             if count > 0:
-                # Actualizar a 'overdue'
-                pending_overdue.update(status='overdue')
+                # Actualizar a 'overdue' y reflejarlo en los contadores del dashboard
+                from django.db import transaction
+                from dashboard.models import DashboardCounters
+                from dashboard.events import publish
+
+                with transaction.atomic():
+                    active_count = pending_overdue.filter(venta__status='active').count()
+                    pending_overdue.update(status='overdue')
+                    DashboardCounters.apply_deltas(cuotas_vencidas=active_count)
+                    publish('overdue', {'count': active_count})
                 message = f'Se actualizaron {count} cuotas a estado "vencido"'
             else:
                 message = 'No hay cuotas pendientes vencidas para actualizar'
@@ -0,0 +1,255 @@
+"""
+Motor del reporte de antigüedad de saldos (aging) de cuentas por cobrar.
+
+Cada cuota abierta (pendiente, vencida o parcial, no perdonada) de una venta
+activa aporta su saldo (scheduled_amount - paid_amount) al tramo que le
+corresponde según su fecha de vencimiento respecto a la fecha de corte:
+
+    current   aún no vence (due_date >= corte)
+    0_30      1 a 30 días de atraso
+    31_60     31 a 60 días
+    61_90     61 a 90 días
+    90_plus   más de 90 días
+
+Los tramos se expresan como rangos de due_date (no como aritmética de fechas
+por fila). Los totales se agrupan por la expresión CASE del tramo (un solo
+GROUP BY) y se pivotan en Python; el índice parcial schedule_open_due_idx de
+PaymentSchedule limita la lectura a las cuotas abiertas.
+"""
+import csv
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db.models import Case, CharField, Count, DecimalField, F, Q, Sum, Value, When
+from django.db.models.functions import Greatest
+
+from payments.models import PaymentSchedule
+
+from .streaming import LineBuffer
+
+
+OPEN_STATUSES = ['pending', 'overdue', 'partial']
+
+# (clave, etiqueta, días mínimos de atraso, días máximos de atraso)
+BUCKETS = [
+    ('current', 'Por vencer', None, 0),
+    ('0_30', '0-30 días', 1, 30),
+    ('31_60', '31-60 días', 31, 60),
+    ('61_90', '61-90 días', 61, 90),
+    ('90_plus', 'Más de 90 días', 91, None),
+]
+
+MONEY = DecimalField(max_digits=14, decimal_places=2)
+
+EXPORT_COLUMNS = [
+    'cuota_id', 'cliente_id', 'cliente', 'manzana', 'lote', 'venta_id',
+    'numero_cuota', 'vencimiento', 'dias_atraso', 'tramo',
+    'monto_programado', 'monto_pagado', 'saldo',
+]
+
+
+class AgingReport:
+    """
+    Reporte de antigüedad de saldos a una fecha de corte, con filtros
+    opcionales por manzana y cliente.
+    """
+
+    def __init__(self, as_of=None, block=None, customer_id=None):
+        self.as_of = as_of or date.today()
+        self.block = block
+        self.customer_id = customer_id
+
+    # --- Consultas base -------------------------------------------------------
+
+    def open_schedules(self):
+        queryset = PaymentSchedule.objects.filter(
+            status__in=OPEN_STATUSES,
+            is_forgiven=False,
+            venta__status='active',
+        )
+        if self.block:
+            queryset = queryset.filter(venta__lote__block=self.block)
+        if self.customer_id:
+            queryset = queryset.filter(venta__customer_id=self.customer_id)
+        return queryset.order_by()
+
+    @staticmethod
+    def remaining_expression():
+        return Greatest(F('scheduled_amount') - F('paid_amount'), Value(Decimal('0.00')), output_field=MONEY)
+
+    def bucket_conditions(self):
+        """Condición Q sobre due_date para cada tramo, en el orden de BUCKETS."""
+        conditions = {}
+        for key, _label, min_days, max_days in BUCKETS:
+            condition = Q()
+            if min_days is not None:
+                # atraso >= min_days  <=>  due_date <= corte - min_days
+                condition &= Q(due_date__lte=self.as_of - timedelta(days=min_days))
+            if max_days is not None:
+                condition &= Q(due_date__gte=self.as_of - timedelta(days=max_days))
+            conditions[key] = condition
+        return conditions
+
+    def bucket_case(self):
+        """Expresión CASE que asigna el tramo de cada cuota."""
+        return Case(
+            *[When(condition, then=Value(key)) for key, condition in self.bucket_conditions().items()],
+            output_field=CharField(),
+        )
+
+    def bucket_aggregates(self):
+        """
+        Agregados por tramo (monto y cantidad de cuotas) más el total, todos
+        en la misma pasada con SUM/COUNT ... FILTER (WHERE <tramo>). Se usa
+        para el ranking de clientes, que necesita ordenar y limitar en SQL.
+        """
+        remaining = self.remaining_expression()
+        aggregates = {}
+        for key, condition in self.bucket_conditions().items():
+            aggregates[f'amount_{key}'] = Sum(remaining, filter=condition)
+            aggregates[f'count_{key}'] = Count('id', filter=condition)
+        aggregates['amount_total'] = Sum(remaining)
+        aggregates['count_total'] = Count('id')
+        return aggregates
+
+    def grouped_buckets(self, group_by=None):
+        """
+        Saldo y cantidad de cuotas por (grupo, tramo) en un solo GROUP BY sobre
+        la expresión CASE. Retorna {grupo: fila pivotada con amount_<tramo> y
+        count_<tramo>}; sin group_by la única clave es None.
+        """
+        fields = [group_by] if group_by else []
+        rows = (
+            self.open_schedules()
+            .values(*fields, bucket=self.bucket_case())
+            .annotate(amount=Sum(self.remaining_expression()), installments=Count('id'))
+        )
+        pivot = {}
+        for row in rows:
+            data = pivot.setdefault(row[group_by] if group_by else None, _empty_row())
+            data[f'amount_{row["bucket"]}'] += row['amount'] or 0
+            data[f'count_{row["bucket"]}'] += row['installments']
+            data['amount_total'] += row['amount'] or 0
+            data['count_total'] += row['installments']
+        return pivot
+
+    def customers_with_balance(self, group_by=None):
+        """
+        Clientes distintos con al menos una cuota abierta. Se cuenta sobre las
+        ventas (semi-join contra el índice parcial) en lugar de un
+        COUNT(DISTINCT) sobre todas las cuotas.
+        """
+        from sales.models import Venta
+
+        ventas = Venta.objects.filter(
+            status='active',
+            id__in=self.open_schedules().values('venta_id'),
+        ).order_by()
+        if not group_by:
+            return ventas.aggregate(customers=Count('customer_id', distinct=True))['customers']
+        return {
+            row[group_by]: row['customers']
+            for row in ventas.values(group_by).annotate(customers=Count('customer_id', distinct=True))
+        }
+
+    # --- Rollups --------------------------------------------------------------
+
+    def portfolio(self):
+        row = self.grouped_buckets().get(None, _empty_row())
+        row['customers'] = self.customers_with_balance()
+        return self._format(row)
+
+    def by_block(self):
+        rows = self.grouped_buckets('venta__lote__block')
+        customers = self.customers_with_balance('lote__block')
+        return [
+            {'block': block, **self._format({**row, 'customers': customers.get(block, 0)})}
+            for block, row in sorted(rows.items())
+        ]
+
+    def by_customer(self, limit=None):
+        """Clientes ordenados de mayor a menor saldo vencido a más de 90 días."""
+        from customers.models import Customer
+
+        rows = (
+            self.open_schedules()
+            .values(customer_id=F('venta__customer_id'))
+            .annotate(**self.bucket_aggregates())
+            .order_by(F('amount_90_plus').desc(nulls_last=True), '-amount_total', 'customer_id')
+        )
+        if limit:
+            rows = rows[:limit]
+        rows = list(rows)
+        # Nombres solo para los clientes del ranking, no por cada cuota
+        names = {
+            customer.id: customer.full_name
+            for customer in Customer.objects.filter(id__in=[row['customer_id'] for row in rows])
+        }
+        return [
+            {
+                'customer_id': row['customer_id'],
+                'customer_name': names.get(row['customer_id'], ''),
+                **self._format(row),
+            }
+            for row in rows
+        ]
+
+    @staticmethod
+    def _format(row):
+        buckets = [
+            {
+                'bucket': key,
+                'label': label,
+                'amount': float(row[f'amount_{key}'] or 0),
+                'installments': row[f'count_{key}'],
+            }
+            for key, label, _min_days, _max_days in BUCKETS
+        ]
+        data = {
+            'total_amount': float(row['amount_total'] or 0),
+            'total_installments': row['count_total'],
+            'overdue_amount': sum(bucket['amount'] for bucket in buckets if bucket['bucket'] != 'current'),
+            'buckets': buckets,
+        }
+        if 'customers' in row:
+            data['customers'] = row['customers']
+        return data
+
+    # --- Exportación ----------------------------------------------------------
+
+    def detail_rows(self, chunk_size=2000):
+        """Filas de detalle por cuota, leídas por bloques."""
+        rows = (
+            self.open_schedules()
+            .annotate(bucket=self.bucket_case(), remaining=self.remaining_expression())
+            .order_by('venta__customer_id', 'due_date', 'id')
+            .values_list(
+                'id', 'venta__customer_id', 'venta__customer__first_name', 'venta__customer__last_name',
+                'venta__lote__block', 'venta__lote__lot_number', 'venta_id',
+                'installment_number', 'due_date', 'bucket',
+                'scheduled_amount', 'paid_amount', 'remaining',
+            )
+        )
+        for (schedule_id, customer_id, first_name, last_name, block, lot_number, venta_id,
+             installment_number, due_date, bucket, scheduled, paid, remaining) in rows.iterator(chunk_size=chunk_size):
+            yield [
+                schedule_id, customer_id, f'{first_name} {last_name}'.strip(), block, lot_number, venta_id,
+                installment_number, due_date.isoformat(), max((self.as_of - due_date).days, 0), bucket,
+                scheduled, paid, remaining,
+            ]
+
+    def stream_csv(self):
+        """Genera el CSV de detalle línea por línea (para StreamingHttpResponse)."""
+        buffer = LineBuffer()
+        writer = csv.writer(buffer)
+        yield writer.writerow(EXPORT_COLUMNS)
+        for row in self.detail_rows():
+            yield writer.writerow(row)
+
+
+def _empty_row():
+    row = {'amount_total': Decimal('0.00'), 'count_total': 0}
+    for key, _label, _min_days, _max_days in BUCKETS:
+        row[f'amount_{key}'] = Decimal('0.00')
+        row[f'count_{key}'] = 0
+    return row
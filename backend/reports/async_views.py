@@ -0,0 +1,291 @@
+"""
+Reportes en vivo de solo lectura servidos por vistas async.
+
+Usan el ORM async (aaggregate, iteración async) y lanzan las consultas
+independientes de cada reporte con asyncio.gather. Las agrupaciones por mes
+se resuelven en la base de datos (TruncMonth) en lugar de recorrer todos los
+pagos en Python. Los reportes de pagos consultan la tabla activa y el archivo
+(payments/tiers.py) y suman los resultados de cada nivel.
+
+Nota: en Django 4.2 el ORM async delega en el hilo de la petición, así que
+las consultas de un mismo reporte se ejecutan una tras otra sobre la misma
+conexión; lo que se gana es no bloquear el event loop del worker mientras
+otras peticiones esperan. Bajo WSGI Django las ejecuta en su propio event
+loop por petición, con la misma respuesta.
+"""
+import asyncio
+from datetime import datetime
+
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+from django.http import JsonResponse
+from django.utils import timezone
+
+from lotes.models import Lote
+from payments.tiers import TieredPayments, merge_groups, merge_totals, payment_tiers
+from users.authentication import async_jwt_required
+from villanueva_project.db_router import replica_read
+
+
+async def _alist(queryset):
+    return [row async for row in queryset]
+
+
+async def _aaggregate(querysets, **aggregates):
+    """aaggregate() de cada nivel, sumados."""
+    return merge_totals(await asyncio.gather(*(queryset.aaggregate(**aggregates) for queryset in querysets)))
+
+
+async def _agroups(querysets, keys):
+    """Filas agrupadas por `keys` de cada nivel, sumadas (ver merge_groups)."""
+    return merge_groups(await asyncio.gather(*(_alist(queryset) for queryset in querysets)), keys)
+
+
+def _filter_payments(request):
+    """Un queryset de pagos filtrado por cada nivel (tabla activa y archivo)."""
+    start_date = request.GET.get('start_date')
+    end_date = request.GET.get('end_date')
+
+    querysets = payment_tiers()
+    if start_date:
+        querysets = [queryset.filter(payment_date__gte=start_date) for queryset in querysets]
+    if end_date:
+        querysets = [queryset.filter(payment_date__lte=end_date) for queryset in querysets]
+    return querysets, start_date, end_date
+
+
+@async_jwt_required
+@replica_read
+async def payments_history_live(request):
+    """
+    Genera reporte de historial de pagos en tiempo real.
+    """
+    try:
+        querysets, start_date, end_date = _filter_payments(request)
+        method_filter = request.GET.get('method')
+        if method_filter:
+            querysets = [queryset.filter(method=method_filter) for queryset in querysets]
+
+        totals, by_method, by_month, payments = await asyncio.gather(
+            _aaggregate(querysets, total_payments=Count('id'), total_amount=Sum('amount')),
+            _agroups(
+                [
+                    queryset.values('method').annotate(
+                        count=Count('id'),
+                        total=Sum('amount')
+                    ).order_by('method')
+                    for queryset in querysets
+                ],
+                ['method'],
+            ),
+            _agroups(
+                [
+                    queryset.annotate(month=TruncMonth('payment_date')).values('month').annotate(
+                        count=Count('id'),
+                        total=Sum('amount')
+                    ).order_by('month')
+                    for queryset in querysets
+                ],
+                ['month'],
+            ),
+            TieredPayments(
+                queryset.select_related(
+                    'venta', 'venta__lote', 'venta__customer', 'payment_schedule'
+                ).order_by('-payment_date', '-id')
+                for queryset in querysets
+            ).aslice(0, 500),  # Limitar para performance
+        )
+
+        return JsonResponse({
+            'total_payments': totals['total_payments'],
+            'total_amount': float(totals['total_amount'] or 0),
+            'period': {
+                'start_date': start_date,
+                'end_date': end_date
+            },
+            'by_method': [
+                {
+                    'method': item['method'],
+                    'count': item['count'],
+                    'total': float(item['total'])
+                } for item in by_method
+            ],
+            'monthly_breakdown': [
+                {
+                    'month': item['month'].strftime('%Y-%m'),
+                    'count': item['count'],
+                    'total': float(item['total'])
+                } for item in by_month
+            ],
+            'payments': [
+                {
+                    'id': payment.id,
+                    'amount': float(payment.amount),
+                    'payment_date': payment.payment_date.isoformat(),
+                    'method': payment.method,
+                    'receipt_number': payment.receipt_number,
+                    'lote': str(payment.venta.lote),
+                    'customer': payment.venta.customer.full_name if payment.venta.customer else 'Sin propietario',
+                    'installment_number': payment.payment_schedule.installment_number if payment.payment_schedule else None,
+                    'notes': payment.notes
+                } for payment in payments
+            ],
+            'generated_at': timezone.now().isoformat()
+        })
+
+    except Exception as e:
+        return JsonResponse({'error': f'Error generando historial de pagos: {str(e)}'}, status=500)
+
+
+@async_jwt_required
+@replica_read
+async def available_lots_live(request):
+    """
+    Genera reporte de lotes disponibles en tiempo real.
+    """
+    try:
+        min_price = request.GET.get('min_price')
+        max_price = request.GET.get('max_price')
+        min_area = request.GET.get('min_area')
+        max_area = request.GET.get('max_area')
+        block_filter = request.GET.get('block')
+
+        queryset = Lote.objects.filter(status='disponible')
+
+        if min_price:
+            queryset = queryset.filter(price__gte=float(min_price))
+        if max_price:
+            queryset = queryset.filter(price__lte=float(max_price))
+        if min_area:
+            queryset = queryset.filter(area__gte=float(min_area))
+        if max_area:
+            queryset = queryset.filter(area__lte=float(max_area))
+        if block_filter:
+            queryset = queryset.filter(block=block_filter)
+
+        summary, lots = await asyncio.gather(
+            queryset.aaggregate(
+                total_count=Count('id'),
+                total_area=Sum('area'),
+                total_value=Sum('price'),
+            ),
+            _alist(queryset.order_by('block', 'lot_number')),
+        )
+
+        avg_price_per_m2 = 0
+        if summary['total_area'] and summary['total_area'] > 0:
+            avg_price_per_m2 = summary['total_value'] / summary['total_area']
+
+        return JsonResponse({
+            'summary': {
+                'total_count': summary['total_count'] or 0,
+                'total_area': float(summary['total_area'] or 0),
+                'total_value': float(summary['total_value'] or 0),
+                'avg_price_per_m2': float(avg_price_per_m2)
+            },
+            'lots': [
+                {
+                    'id': lote.id,
+                    'block': lote.block,
+                    'lot_number': lote.lot_number,
+                    'area': float(lote.area),
+                    'price': float(lote.price),
+                    'price_per_m2': float(lote.price / lote.area) if lote.area > 0 else 0,
+                    'initial_payment': 0.0,  # Los lotes disponibles no tienen pago inicial
+                    'financing_months': 0  # Los lotes disponibles no tienen financiamiento
+                } for lote in lots
+            ],
+            'generated_at': timezone.now().isoformat(),
+            'filters_applied': {
+                'min_price': min_price,
+                'max_price': max_price,
+                'min_area': min_area,
+                'max_area': max_area,
+                'block': block_filter
+            }
+        })
+
+    except Exception as e:
+        return JsonResponse({'error': f'Error generando reporte de lotes: {str(e)}'}, status=500)
+
+
+@async_jwt_required
+@replica_read
+async def monthly_collections_live(request):
+    """
+    Genera reporte de cobranzas mensuales en tiempo real.
+    """
+    try:
+        querysets, start_date, end_date = _filter_payments(request)
+
+        totals, by_method, by_month_method = await asyncio.gather(
+            _aaggregate(querysets, total_transactions=Count('id'), total_collected=Sum('amount')),
+            _agroups(
+                [
+                    queryset.values('method').annotate(
+                        count=Count('id'),
+                        total=Sum('amount')
+                    ).order_by('method')
+                    for queryset in querysets
+                ],
+                ['method'],
+            ),
+            _agroups(
+                [
+                    queryset.annotate(month=TruncMonth('payment_date')).values('month', 'method').annotate(
+                        count=Count('id'),
+                        total=Sum('amount')
+                    ).order_by('month', 'method')
+                    for queryset in querysets
+                ],
+                ['month', 'method'],
+            ),
+        )
+
+        # Agrupar las filas (mes, método) por mes
+        collections_by_month = {}
+        for row in by_month_method:
+            month_key = row['month'].strftime('%Y-%m')
+            data = collections_by_month.setdefault(month_key, {'count': 0, 'total': 0, 'by_method': []})
+            data['count'] += row['count']
+            data['total'] += float(row['total'])
+            data['by_method'].append({
+                'method': row['method'],
+                'count': row['count'],
+                'total': float(row['total'])
+            })
+
+        total_collected = float(totals['total_collected'] or 0)
+
+        return JsonResponse({
+            'total_collected': total_collected,
+            'total_transactions': totals['total_transactions'],
+            'period': {
+                'start_date': start_date,
+                'end_date': end_date
+            },
+            'by_method': [
+                {
+                    'method': item['method'],
+                    'count': item['count'],
+                    'total': float(item['total']),
+                    'percentage': round((float(item['total']) / (total_collected or 1)) * 100, 2)
+                }
+                for item in by_method
+            ],
+            'monthly_breakdown': [
+                {
+                    'month': month,
+                    'month_name': datetime.strptime(month, '%Y-%m').strftime('%B %Y'),
+                    'count': data['count'],
+                    'total': data['total'],
+                    'average_per_payment': data['total'] / data['count'] if data['count'] > 0 else 0,
+                    'by_method': data['by_method']
+                }
+                for month, data in sorted(collections_by_month.items())
+            ],
+            'generated_at': timezone.now().isoformat()
+        })
+
+    except Exception as e:
+        return JsonResponse({'error': f'Error generando reporte de cobranzas: {str(e)}'}, status=500)
@@ -4,16 +4,18 @@ from rest_framework.response import Response
 from rest_framework import status as drf_status
 from django.db.models import Sum, Count
 from django.utils import timezone
-from datetime import timedelta
+from datetime import date, datetime, time, timedelta
 from decimal import Decimal
 
 from customers.models import Customer
 from lotes.models import Lote
-from payments.models import Payment
+from payments.tiers import merge_totals, payment_tiers
+from villanueva_project.db_router import replica_read
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@replica_read
 def customers_debt_live(request):
     """
     Genera reporte de clientes con deuda en tiempo real.
@@ -148,394 +150,351 @@ def customers_debt_live(request):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
-def payments_history_live(request):
+@replica_read
+def pending_installments_live(request):
     """
-    Genera reporte de historial de pagos en tiempo real.
+    Genera reporte de cuotas pendientes en tiempo real - formato legible.
+
+    Una sola consulta trae todas las ventas activas con sus conteos de cuotas,
+    próximo vencimiento y saldo ya calculados en la base de datos; la
+    agrupación por cliente y la clasificación por urgencia son una pasada
+    lineal en Python.
     """
     try:
-        start_date = request.query_params.get('start_date')
-        end_date = request.query_params.get('end_date')
-        method_filter = request.query_params.get('method')
-        
-        queryset = Payment.objects.select_related('venta', 'venta__lote', 'venta__customer', 'payment_schedule').all()
-        
-        if start_date:
-            queryset = queryset.filter(payment_date__gte=start_date)
-        if end_date:
-            queryset = queryset.filter(payment_date__lte=end_date)
-        if method_filter:
-            queryset = queryset.filter(method=method_filter)
-        
-        payments = queryset.order_by('-payment_date')
-        
-        # Agrupar por método
-        by_method = queryset.values('method').annotate(
-            count=Count('id'),
-            total=Sum('amount')
-        ).order_by('method')
-        
-        # Agrupar por mes
-        monthly_data = {}
-        for payment in payments:
-            month_key = payment.payment_date.strftime('%Y-%m')
-            if month_key not in monthly_data:
-                monthly_data[month_key] = {'count': 0, 'total': 0}
-            monthly_data[month_key]['count'] += 1
-            monthly_data[month_key]['total'] += float(payment.amount)
-        
-        monthly_breakdown = [
-            {'month': month, 'count': data['count'], 'total': data['total']}
-            for month, data in sorted(monthly_data.items())
-        ]
-        
+        from sales.models import Venta
+
+        ventas = (
+            Venta.objects.filter(status='active')
+            .select_related('customer', 'lote', 'plan_pagos')
+            .with_balances()
+            .with_installment_progress()
+            .order_by('customer__last_name', 'customer__first_name', 'customer_id', '-sale_date')
+        )
+
+        current_date = timezone.now().date()
+        customers_by_id = {}
+
+        for venta in ventas:
+            # Si el saldo pendiente es 0, el lote está completamente pagado
+            # aunque tenga cuotas pendientes, no debe aparecer en el reporte
+            remaining_balance = venta.pending_balance
+            if remaining_balance <= 0:
+                continue
+
+            # Contar pagos efectivos más cuotas perdonadas como completadas
+            total_payments = venta.installments_paid + venta.installments_forgiven
+
+            # Obtener información del plan de pagos
+            payment_plan = getattr(venta, 'plan_pagos', None)
+            if payment_plan:
+                financing_months = venta.installments_total  # Total de cuotas programadas
+                payment_day = payment_plan.payment_day
+            else:
+                financing_months = 0
+                payment_day = 15
+
+            # Pendientes = total cuotas - (pagadas + perdonadas)
+            pending = max(0, financing_months - total_payments)
+            if pending == 0:
+                continue
+
+            # Próxima cuota sin completar, solo si quedan cuotas por pagar
+            next_due_date = None
+            if financing_months > 0 and payment_day and total_payments < financing_months:
+                next_due_date = venta.next_due_date
+
+            days_overdue = 0
+            overdue_installments = 0
+            if next_due_date and next_due_date < current_date:
+                days_overdue = (current_date - next_due_date).days
+                # Cuotas vencidas: meses completos de atraso (aproximación de 30
+                # días), al menos 1, sin superar las cuotas pendientes
+                months_overdue = days_overdue // 30
+                overdue_installments = min(months_overdue, pending) if months_overdue >= 1 else 1
+
+            # Determinar estado basado en cuotas vencidas y próximo vencimiento
+            if overdue_installments > 0:
+                status = 'overdue'
+            elif next_due_date and (next_due_date - current_date).days <= 7:
+                status = 'due_soon'
+            else:
+                status = 'current'
+
+            customer = venta.customer
+            entry = customers_by_id.get(customer.id)
+            if entry is None:
+                entry = customers_by_id[customer.id] = {
+                    'customer_name': customer.full_name,
+                    'customer_email': customer.email,
+                    'customer_phone': customer.phone,
+                    'total_pending_installments': 0,
+                    'total_pending_amount': Decimal('0.00'),
+                    'lotes': []
+                }
+
+            entry['total_pending_installments'] += pending
+            entry['total_pending_amount'] += remaining_balance
+            entry['lotes'].append({
+                'lote_description': str(venta.lote),
+                'pending_installments': pending,
+                'overdue_installments': overdue_installments,
+                'remaining_balance': float(remaining_balance),
+                'monthly_payment': float(remaining_balance / pending),
+                'total_financing_months': financing_months,
+                'payments_made': total_payments,
+                'completion_percentage': round((total_payments / financing_months) * 100, 2) if financing_months > 0 else 0,
+                'payment_day': payment_day,
+                'next_due_date': next_due_date.isoformat() if next_due_date else None,
+                'days_until_due': (next_due_date - current_date).days if next_due_date else None,
+                'days_overdue': days_overdue,
+                'status': status
+            })
+
+        # Clasificar por urgencia en una sola pasada
+        pending_customers = []
+        customers_by_priority = {'overdue': [], 'due_soon': [], 'current': []}
+        total_pending_installments = 0
+        total_pending_amount = Decimal('0.00')
+        total_overdue_installments = 0
+
+        for entry in customers_by_id.values():
+            pending_amount = entry['total_pending_amount']
+            entry['total_pending_amount'] = float(pending_amount)
+            entry['average_monthly_payment'] = float(pending_amount / entry['total_pending_installments'])
+            # Mantener el orden de claves de la respuesta
+            entry['lotes'] = entry.pop('lotes')
+
+            total_pending_installments += entry['total_pending_installments']
+            total_pending_amount += pending_amount
+
+            statuses = set()
+            for lote in entry['lotes']:
+                statuses.add(lote['status'])
+                total_overdue_installments += lote['overdue_installments']
+
+            if 'overdue' in statuses:
+                customers_by_priority['overdue'].append(entry)
+            elif 'due_soon' in statuses:
+                customers_by_priority['due_soon'].append(entry)
+            else:
+                customers_by_priority['current'].append(entry)
+            pending_customers.append(entry)
+
         return Response({
-            'total_payments': payments.count(),
-            'total_amount': float(payments.aggregate(Sum('amount'))['amount__sum'] or 0),
-            'period': {
-                'start_date': start_date,
-                'end_date': end_date
+            'summary': {
+                'total_customers_with_pending': len(pending_customers),
+                'total_pending_installments': total_pending_installments,
+                'total_overdue_installments': total_overdue_installments,
+                'total_pending_amount': float(total_pending_amount),
+                'overdue_customers': len(customers_by_priority['overdue']),
+                'due_soon_customers': len(customers_by_priority['due_soon']),
+                'current_customers': len(customers_by_priority['current'])
             },
-            'by_method': [
-                {
-                    'method': item['method'],
-                    'count': item['count'],
-                    'total': float(item['total'])
-                } for item in by_method
-            ],
-            'monthly_breakdown': monthly_breakdown,
-            'payments': [
-                {
-                    'id': payment.id,
-                    'amount': float(payment.amount),
-                    'payment_date': payment.payment_date.isoformat(),
-                    'method': payment.method,
-                    'receipt_number': payment.receipt_number,
-                    'lote': str(payment.venta.lote),
-                    'customer': payment.venta.customer.full_name if payment.venta.customer else 'Sin propietario',
-                    'installment_number': payment.payment_schedule.installment_number if payment.payment_schedule else None,
-                    'notes': payment.notes
-                } for payment in payments[:500]  # Limitar para performance
-            ],
+            'customers_by_priority': customers_by_priority,
+            'all_customers': pending_customers,
             'generated_at': timezone.now().isoformat()
         })
         
     except Exception as e:
         return Response(
-            {'error': f'Error generando historial de pagos: {str(e)}'}, 
+            {'error': f'Error generando reporte de cuotas pendientes: {str(e)}'}, 
             status=drf_status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
 
+def _aging_report_from_request(request):
+    """AgingReport de los parámetros de la petición; ValueError si alguno es inválido."""
+    from .aging import AgingReport
+
+    as_of = request.query_params.get('as_of')
+    customer = request.query_params.get('customer')
+    try:
+        as_of = date.fromisoformat(as_of) if as_of else None
+    except ValueError:
+        raise ValueError('Formato de fecha inválido para as_of. Use YYYY-MM-DD')
+    try:
+        customer = int(customer) if customer else None
+    except ValueError:
+        raise ValueError('customer debe ser el id numérico del cliente')
+
+    return AgingReport(as_of=as_of, block=request.query_params.get('block'), customer_id=customer)
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
-def available_lots_live(request):
+@replica_read
+def aging_report_live(request):
     """
-    Genera reporte de lotes disponibles en tiempo real.
+    Reporte de antigüedad de saldos (por vencer, 0-30, 31-60, 61-90, 90+ días)
+    a la fecha de corte ?as_of= (por defecto hoy), con totales de cartera,
+    por manzana y por cliente (los ?limit= con mayor saldo a más de 90 días).
+    Filtros opcionales: ?block= y ?customer=.
     """
     try:
-        min_price = request.query_params.get('min_price')
-        max_price = request.query_params.get('max_price')
-        min_area = request.query_params.get('min_area')
-        max_area = request.query_params.get('max_area')
-        block_filter = request.query_params.get('block')
-        
-        queryset = Lote.objects.filter(status='disponible')
-        
-        if min_price:
-            queryset = queryset.filter(price__gte=float(min_price))
-        if max_price:
-            queryset = queryset.filter(price__lte=float(max_price))
-        if min_area:
-            queryset = queryset.filter(area__gte=float(min_area))
-        if max_area:
-            queryset = queryset.filter(area__lte=float(max_area))
-        if block_filter:
-            queryset = queryset.filter(block=block_filter)
-        
-        # Calcular resumen
-        summary = queryset.aggregate(
-            total_count=Count('id'),
-            total_area=Sum('area'),
-            total_value=Sum('price'),
-        )
-        
-        avg_price_per_m2 = 0
-        if summary['total_area'] and summary['total_area'] > 0:
-            avg_price_per_m2 = summary['total_value'] / summary['total_area']
-        
-        lots_data = []
-        for lote in queryset.order_by('block', 'lot_number'):
-            price_per_m2 = float(lote.price / lote.area) if lote.area > 0 else 0
-            lots_data.append({
-                'id': lote.id,
-                'block': lote.block,
-                'lot_number': lote.lot_number,
-                'area': float(lote.area),
-                'price': float(lote.price),
-                'price_per_m2': price_per_m2,
-                'initial_payment': 0.0,  # Los lotes disponibles no tienen pago inicial
-                'financing_months': 0  # Los lotes disponibles no tienen financiamiento
-            })
-        
+        report = _aging_report_from_request(request)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=drf_status.HTTP_400_BAD_REQUEST)
+
+    try:
+        limit = int(request.query_params.get('limit', 100))
+    except ValueError:
+        limit = 100
+
+    try:
         return Response({
-            'summary': {
-                'total_count': summary['total_count'] or 0,
-                'total_area': float(summary['total_area'] or 0),
-                'total_value': float(summary['total_value'] or 0),
-                'avg_price_per_m2': float(avg_price_per_m2)
-            },
-            'lots': lots_data,
-            'generated_at': timezone.now().isoformat(),
-            'filters_applied': {
-                'min_price': min_price,
-                'max_price': max_price,
-                'min_area': min_area,
-                'max_area': max_area,
-                'block': block_filter
-            }
+            'as_of': report.as_of.isoformat(),
+            'portfolio': report.portfolio(),
+            'by_block': report.by_block(),
+            'by_customer': report.by_customer(limit=max(limit, 1)),
+            'generated_at': timezone.now().isoformat()
         })
-        
+
     except Exception as e:
         return Response(
-            {'error': f'Error generando reporte de lotes: {str(e)}'}, 
+            {'error': f'Error generando reporte de antigüedad de saldos: {str(e)}'},
             status=drf_status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
-def pending_installments_live(request):
+@replica_read
+def aging_report_export(request):
     """
-    Genera reporte de cuotas pendientes en tiempo real - formato legible.
+    Exporta en CSV el detalle por cuota del reporte de antigüedad de saldos.
+    La respuesta se transmite por partes, sin cargar el detalle en memoria
+    (también bajo ASGI, ver reports/streaming.py).
     """
+    from .streaming import streaming_csv_response
+
     try:
-        # Obtener clientes con lotes
-        customers_with_lots = Customer.objects.filter(ventas__isnull=False).distinct()
-        pending_customers = []
-        total_pending_installments = 0
-        total_pending_amount = Decimal('0.00')
-        
-        for customer in customers_with_lots:
-            customer_pending_installments = 0
-            customer_pending_amount = Decimal('0.00')
-            customer_lotes = []
-            
-            for venta in customer.ventas.filter(status='active'):
-                lote = venta.lote
-                
-                # Obtener pagos de la venta
-                from payments.models import Payment
-                # Contar pagos efectivos más cuotas perdonadas como completadas
-                total_payments = (
-                    Payment.objects.filter(venta=venta, payment_type='installment').count()
-                    + venta.payment_schedules.filter(status='forgiven').count()
-                )
-                
-                # Obtener información del plan de pagos
-                payment_plan = getattr(venta, 'plan_pagos', None)
-                if payment_plan:
-                    financing_months = venta.payment_schedules.count()  # Total de cuotas programadas
-                    payment_day = payment_plan.payment_day
-                else:
-                    financing_months = 0
-                    payment_day = 15
-                
-                # Pendientes = total cuotas - (pagadas + perdonadas)
-                pending = max(0, financing_months - total_payments)
-                
-                # Si el saldo pendiente es 0, el lote está completamente pagado
-                # aunque tenga cuotas pendientes, no debe aparecer en el reporte
-                if venta.remaining_balance <= 0:
-                    continue
-                
-                if pending > 0:
-                    # Calcular cuota mensual real
-                    monthly_payment = float(venta.remaining_balance / pending) if pending > 0 else 0
-                    lote_pending_amount = venta.remaining_balance
-                    
-                    customer_pending_installments += pending
-                    customer_pending_amount += lote_pending_amount
-                    
-                    # Calcular información de vencimiento usando la nueva lógica del modelo Payment
-                    current_date = timezone.now().date()
-                    next_due_date = None
-                    days_overdue = 0
-                    overdue_installments = 0
-                    
-                    if financing_months > 0 and payment_day:
-                        # Obtener la próxima cuota pendiente (la que debería vencer)
-                        next_installment_number = total_payments + 1
-                        
-                        if next_installment_number <= financing_months:
-                            # Usar el método estático para calcular la fecha de vencimiento
-                            # Obtener la próxima cuota pendiente usando PaymentSchedule
-                            next_schedule = venta.payment_schedules.filter(
-                                status__in=['pending', 'overdue', 'partial']
-                            ).order_by('installment_number').first()
-                            
-                            if next_schedule:
-                                next_due_date = next_schedule.due_date
-                            else:
-                                next_due_date = None
-                            
-                            if next_due_date:
-                                # Calcular días de atraso si la fecha ya pasó
-                                if next_due_date < current_date:
-                                    days_overdue = (current_date - next_due_date).days
-                                    
-                                    # Calcular cuotas vencidas: cuántas cuotas deberían haberse pagado desde la última hasta hoy
-                                    # Si la próxima cuota vence en junio 2023 y hoy es 2025, calcular cuántos meses han pasado
-                                    months_overdue = 0
-                                    if days_overdue > 0:
-                                        # Calcular meses completos de atraso
-                                        months_overdue = days_overdue // 30  # Aproximación de meses
-                                        
-                                        # Si hay más de 30 días de atraso, al menos 1 cuota está vencida
-                                        if months_overdue >= 1:
-                                            # El número de cuotas vencidas es el mínimo entre los meses de atraso y las cuotas pendientes
-                                            overdue_installments = min(months_overdue, pending)
-                                        else:
-                                            overdue_installments = 1 if days_overdue > 0 else 0
-                                    else:
-                                        overdue_installments = 0
-                                else:
-                                    days_overdue = 0
-                                    overdue_installments = 0
-                            else:
-                                # Fallback si no se puede calcular la fecha
-                                days_overdue = 0
-                                overdue_installments = 0
-                        else:
-                            # Todas las cuotas están pagadas
-                            days_overdue = 0
-                            overdue_installments = 0
-                    
-                    # Determinar estado basado en cuotas vencidas y próximo vencimiento
-                    if overdue_installments > 0:
-                        status = 'overdue'
-                    elif next_due_date and (next_due_date - current_date).days <= 7:
-                        status = 'due_soon'
-                    else:
-                        status = 'current'
-                    
-                    customer_lotes.append({
-                        'lote_description': str(lote),
-                        'pending_installments': pending,
-                        'overdue_installments': overdue_installments,
-                        'remaining_balance': float(lote_pending_amount),
-                        'monthly_payment': float(monthly_payment),
-                        'total_financing_months': financing_months,
-                        'payments_made': total_payments,
-                        'completion_percentage': round((total_payments / financing_months) * 100, 2) if financing_months > 0 else 0,
-                        'payment_day': payment_day,
-                        'next_due_date': next_due_date.isoformat() if next_due_date else None,
-                        'days_until_due': (next_due_date - current_date).days if next_due_date else None,
-                        'days_overdue': days_overdue,
-                        'status': status
-                    })
-            
-            if customer_pending_installments > 0:
-                total_pending_installments += customer_pending_installments
-                total_pending_amount += customer_pending_amount
-                
-                pending_customers.append({
-                    'customer_name': customer.full_name,
-                    'customer_email': customer.email,
-                    'customer_phone': customer.phone,
-                    'total_pending_installments': customer_pending_installments,
-                    'total_pending_amount': float(customer_pending_amount),
-                    'average_monthly_payment': float(customer_pending_amount / customer_pending_installments) if customer_pending_installments > 0 else 0,
-                    'lotes': customer_lotes
-                })
-        
-        # Clasificar por urgencia
-        overdue_customers = [c for c in pending_customers if any(l['status'] == 'overdue' for l in c['lotes'])]
-        due_soon_customers = [c for c in pending_customers if any(l['status'] == 'due_soon' for l in c['lotes']) and c not in overdue_customers]
-        current_customers = [c for c in pending_customers if c not in overdue_customers and c not in due_soon_customers]
-        
-        # Calcular total de cuotas vencidas
-        total_overdue_installments = sum(
-            sum(lote['overdue_installments'] for lote in customer['lotes'])
-            for customer in pending_customers
+        report = _aging_report_from_request(request)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=drf_status.HTTP_400_BAD_REQUEST)
+
+    return streaming_csv_response(
+        request, report.stream_csv(), f'antiguedad_saldos_{report.as_of.isoformat()}.csv'
+    )
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@replica_read
+def cash_flow_forecast_live(request):
+    """
+    Proyección de cobranzas esperadas por semana o mes a partir del
+    cronograma de pagos, ponderada por la puntualidad histórica de cada
+    cliente. Parámetros: ?granularity=week|month (default month),
+    ?horizon= (períodos), ?block=, ?as_of= y ?refresh=1 para recalcular.
+    El resultado se guarda en caché hasta el fin del día.
+    """
+    from .forecast import CashFlowForecast
+
+    try:
+        as_of = request.query_params.get('as_of')
+        forecast = CashFlowForecast(
+            granularity=request.query_params.get('granularity', 'month'),
+            horizon=request.query_params.get('horizon'),
+            as_of=date.fromisoformat(as_of) if as_of else None,
+            block=request.query_params.get('block'),
         )
-        
-        return Response({
-            'summary': {
-                'total_customers_with_pending': len(pending_customers),
-                'total_pending_installments': total_pending_installments,
-                'total_overdue_installments': total_overdue_installments,
-                'total_pending_amount': float(total_pending_amount),
-                'overdue_customers': len(overdue_customers),
-                'due_soon_customers': len(due_soon_customers),
-                'current_customers': len(current_customers)
-            },
-            'customers_by_priority': {
-                'overdue': overdue_customers,
-                'due_soon': due_soon_customers,
-                'current': current_customers
-            },
-            'all_customers': pending_customers,
-            'generated_at': timezone.now().isoformat()
-        })
-        
+    except ValueError as e:
+        return Response({'error': str(e)}, status=drf_status.HTTP_400_BAD_REQUEST)
+
+    try:
+        refresh = request.query_params.get('refresh') in ('1', 'true')
+        return Response(forecast.get(refresh=refresh))
+
     except Exception as e:
         return Response(
-            {'error': f'Error generando reporte de cuotas pendientes: {str(e)}'}, 
+            {'error': f'Error generando proyección de flujo de caja: {str(e)}'},
             status=drf_status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
 
+def _day_range(start_date=None, end_date=None):
+    """
+    Límites con zona horaria del rango de días [start_date, end_date]
+    (YYYY-MM-DD, ambos inclusive): el inicio de start_date y el inicio del
+    día siguiente a end_date, para filtrar con >= y < sobre el índice de la
+    fecha en lugar de convertir cada fila a fecha. None donde no hay límite.
+    """
+    def day_start(value):
+        return timezone.make_aware(datetime.combine(value, time.min))
+
+    try:
+        start = day_start(date.fromisoformat(start_date)) if start_date else None
+        end = day_start(date.fromisoformat(end_date) + timedelta(days=1)) if end_date else None
+    except ValueError:
+        raise ValueError('Formato de fecha inválido. Use YYYY-MM-DD')
+    return start, end
+
+
+def _sold_ventas(start_date=None, end_date=None):
+    """
+    Ventas vigentes (activas o completadas), filtradas por fecha de venta.
+    Cada una corresponde a un lote vendido.
+    """
+    from sales.models import Venta
+
+    queryset = Venta.objects.filter(status__in=['active', 'completed']).order_by()
+    if start_date:
+        queryset = queryset.filter(sale_date__date__gte=start_date)
+    if end_date:
+        queryset = queryset.filter(sale_date__date__lte=end_date)
+    return queryset
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@replica_read
 def sales_summary_live(request):
     """
     Genera resumen de ventas en tiempo real.
+    Resuelto en dos consultas: totales y desglose mensual por fecha de venta.
     """
+    from django.db.models.functions import TruncMonth
+
     try:
         start_date = request.query_params.get('start_date')
         end_date = request.query_params.get('end_date')
-        
-        queryset = Lote.objects.filter(status='vendido')
-        
-        if start_date:
-            queryset = queryset.filter(created_at__gte=start_date)
-        if end_date:
-            queryset = queryset.filter(created_at__lte=end_date)
-        
-        # Ventas por mes
-        sales_by_month = {}
-        for lote in queryset:
-            month_key = lote.created_at.strftime('%Y-%m')
-            if month_key not in sales_by_month:
-                sales_by_month[month_key] = {
-                    'count': 0,
-                    'total_value': 0,
-                    'total_area': 0,
-                    'total_initial_payments': 0
-                }
-            sales_by_month[month_key]['count'] += 1
-            sales_by_month[month_key]['total_value'] += float(lote.price)
-            sales_by_month[month_key]['total_area'] += float(lote.area)
-            sales_by_month[month_key]['total_initial_payments'] += float(lote.active_sale.initial_payment) if lote.active_sale else 0.0
-        
+
+        queryset = _sold_ventas(start_date, end_date)
+        aggregates = {
+            'count': Count('id'),
+            'total_value': Sum('sale_price'),
+            'total_area': Sum('lote__area'),
+            'total_initial_payments': Sum('initial_payment'),
+        }
+
+        totals = queryset.aggregate(**aggregates)
+        by_month = (
+            queryset.annotate(month=TruncMonth('sale_date'))
+            .values('month')
+            .annotate(**aggregates)
+            .order_by('month')
+        )
+
         monthly_breakdown = [
             {
-                'month': month,
-                'count': data['count'],
-                'total_value': data['total_value'],
-                'total_area': data['total_area'],
-                'total_initial_payments': data['total_initial_payments'],
-                'avg_price_per_lot': data['total_value'] / data['count'] if data['count'] > 0 else 0
+                'month': row['month'].strftime('%Y-%m'),
+                'count': row['count'],
+                'total_value': float(row['total_value'] or 0),
+                'total_area': float(row['total_area'] or 0),
+                'total_initial_payments': float(row['total_initial_payments'] or 0),
+                'avg_price_per_lot': float(row['total_value'] or 0) / row['count'] if row['count'] > 0 else 0
             }
-            for month, data in sorted(sales_by_month.items())
+            for row in by_month
         ]
-        
+
+        total_sales_value = float(totals['total_value'] or 0)
+
         return Response({
-            'total_lots_sold': queryset.count(),
-            'total_area_sold': float(queryset.aggregate(Sum('area'))['area__sum'] or 0),
-            'total_sales_value': float(queryset.aggregate(Sum('price'))['price__sum'] or 0),
-            'total_initial_payments': sum(float(lote.active_sale.initial_payment) if lote.active_sale else 0.0 for lote in queryset),
-            'average_lot_price': float(queryset.aggregate(Sum('price'))['price__sum'] or 0) / queryset.count() if queryset.count() > 0 else 0,
+            'total_lots_sold': totals['count'],
+            'total_area_sold': float(totals['total_area'] or 0),
+            'total_sales_value': total_sales_value,
+            'total_initial_payments': float(totals['total_initial_payments'] or 0),
+            'average_lot_price': total_sales_value / totals['count'] if totals['count'] > 0 else 0,
             'monthly_breakdown': monthly_breakdown,
             'period': {
                 'start_date': start_date,
@@ -543,73 +502,90 @@ def sales_summary_live(request):
             },
             'generated_at': timezone.now().isoformat()
         })
-        
+
     except Exception as e:
         return Response(
-            {'error': f'Error generando resumen de ventas: {str(e)}'}, 
+            {'error': f'Error generando resumen de ventas: {str(e)}'},
             status=drf_status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@replica_read
 def financial_overview_live(request):
     """
     Genera resumen financiero general en tiempo real.
+    Cada bloque (ventas, pagos, inventario, cartera) es un único aggregate y
+    los KPIs se derivan de esos totales sin volver a consultar.
     """
+    from django.db.models import Q
+    from sales.models import Venta
+
+    start_date = request.query_params.get('start_date')
+    end_date = request.query_params.get('end_date')
     try:
-        start_date = request.query_params.get('start_date')
-        end_date = request.query_params.get('end_date')
-        
-        # Obtener datos de ventas
-        sales_queryset = Lote.objects.filter(status='vendido')
-        if start_date:
-            sales_queryset = sales_queryset.filter(created_at__gte=start_date)
-        if end_date:
-            sales_queryset = sales_queryset.filter(created_at__lte=end_date)
-        
-        # Obtener datos de pagos
-        payments_queryset = Payment.objects.all()
-        if start_date:
-            payments_queryset = payments_queryset.filter(payment_date__gte=start_date)
-        if end_date:
-            payments_queryset = payments_queryset.filter(payment_date__lte=end_date)
-        
-        # Obtener datos de inventario
-        available_lots = Lote.objects.filter(status='disponible')
-        
-        # Calcular deudas pendientes
-        total_debt = Decimal('0.00')
-        customers_with_debt = 0
-        for customer in Customer.objects.filter(ventas__isnull=False).distinct():
-            customer_debt = sum(venta.remaining_balance for venta in customer.ventas.filter(status='active') if venta.remaining_balance > 0)
-            if customer_debt > 0:
-                total_debt += customer_debt
-                customers_with_debt += 1
-        
+        start, end = _day_range(start_date, end_date)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=drf_status.HTTP_400_BAD_REQUEST)
+
+    try:
+        sales = _sold_ventas(start_date, end_date).aggregate(
+            count=Count('id'),
+            total_value=Sum('sale_price'),
+            total_initial_payments=Sum('initial_payment'),
+        )
+
+        # Pagos de la tabla activa y del archivo (payments/tiers.py)
+        payment_querysets = payment_tiers()
+        if start:
+            payment_querysets = [queryset.filter(payment_date__gte=start) for queryset in payment_querysets]
+        if end:
+            payment_querysets = [queryset.filter(payment_date__lt=end) for queryset in payment_querysets]
+        payments = merge_totals(
+            queryset.aggregate(count=Count('id'), total_amount=Sum('amount')) for queryset in payment_querysets
+        )
+
+        inventory = Lote.objects.filter(status='disponible').aggregate(
+            count=Count('id'),
+            total_value=Sum('price'),
+            total_area=Sum('area'),
+        )
+
+        # Saldo pendiente de las ventas activas (mismo cálculo que remaining_balance)
+        receivables = Venta.objects.filter(status='active').with_balances().aggregate(
+            customers_with_debt=Count('customer', distinct=True, filter=Q(pending_balance__gt=0)),
+            total_debt=Sum('pending_balance'),
+        )
+
+        total_debt = float(receivables['total_debt'] or 0)
+        total_paid = float(payments['total_amount'] or 0)
+        lots_sold = sales['count']
+        lots_available = inventory['count']
+
         return Response({
             'sales': {
-                'total_lots_sold': sales_queryset.count(),
-                'total_sales_value': float(sales_queryset.aggregate(Sum('price'))['price__sum'] or 0),
-                'total_initial_payments': sum(float(active_sale.initial_payment) if active_sale and active_sale.initial_payment else 0.0 for lote in sales_queryset for active_sale in [lote.active_sale])
+                'total_lots_sold': lots_sold,
+                'total_sales_value': float(sales['total_value'] or 0),
+                'total_initial_payments': float(sales['total_initial_payments'] or 0)
             },
             'payments': {
-                'total_payments': payments_queryset.count(),
-                'total_amount': float(payments_queryset.aggregate(Sum('amount'))['amount__sum'] or 0)
+                'total_payments': payments['count'],
+                'total_amount': total_paid
             },
             'inventory': {
-                'available_lots': available_lots.count(),
-                'available_value': float(available_lots.aggregate(Sum('price'))['price__sum'] or 0),
-                'total_available_area': float(available_lots.aggregate(Sum('area'))['area__sum'] or 0)
+                'available_lots': lots_available,
+                'available_value': float(inventory['total_value'] or 0),
+                'total_available_area': float(inventory['total_area'] or 0)
             },
             'receivables': {
-                'customers_with_debt': customers_with_debt,
-                'total_debt': float(total_debt)
+                'customers_with_debt': receivables['customers_with_debt'],
+                'total_debt': total_debt
             },
             'kpis': {
-                'conversion_rate': round((sales_queryset.count() / (sales_queryset.count() + available_lots.count())) * 100, 2) if (sales_queryset.count() + available_lots.count()) > 0 else 0,
-                'average_payment': float(payments_queryset.aggregate(Sum('amount'))['amount__sum'] or 0) / payments_queryset.count() if payments_queryset.count() > 0 else 0.0,
-                'collection_efficiency': round((float(payments_queryset.aggregate(Sum('amount'))['amount__sum'] or 0) / float(total_debt)) * 100, 2) if total_debt > 0 else 100
+                'conversion_rate': round((lots_sold / (lots_sold + lots_available)) * 100, 2) if (lots_sold + lots_available) > 0 else 0,
+                'average_payment': total_paid / payments['count'] if payments['count'] > 0 else 0.0,
+                'collection_efficiency': round((total_paid / total_debt) * 100, 2) if total_debt > 0 else 100
             },
             'period': {
                 'start_date': start_date,
@@ -617,110 +593,9 @@ def financial_overview_live(request):
             },
             'generated_at': timezone.now().isoformat()
         })
-        
-    except Exception as e:
-        return Response(
-            {'error': f'Error generando resumen financiero: {str(e)}'}, 
-            status=drf_status.HTTP_500_INTERNAL_SERVER_ERROR
-        )
-
 
-@api_view(['GET'])
-@permission_classes([IsAuthenticated])
-def monthly_collections_live(request):
-    """
-    Genera reporte de cobranzas mensuales en tiempo real.
-    """
-    try:
-        start_date = request.query_params.get('start_date')
-        end_date = request.query_params.get('end_date')
-        
-        queryset = Payment.objects.all()
-        
-        if start_date:
-            queryset = queryset.filter(payment_date__gte=start_date)
-        if end_date:
-            queryset = queryset.filter(payment_date__lte=end_date)
-        
-        # Agrupar por mes y método
-        collections_by_month = {}
-        methods_summary = {}
-        
-        for payment in queryset:
-            month_key = payment.payment_date.strftime('%Y-%m')
-            
-            # Por mes
-            if month_key not in collections_by_month:
-                collections_by_month[month_key] = {
-                    'count': 0,
-                    'total': 0,
-                    'by_method': {}
-                }
-            
-            collections_by_month[month_key]['count'] += 1
-            collections_by_month[month_key]['total'] += float(payment.amount)
-            
-            # Por método dentro del mes
-            if payment.method not in collections_by_month[month_key]['by_method']:
-                collections_by_month[month_key]['by_method'][payment.method] = {
-                    'count': 0,
-                    'total': 0
-                }
-            
-            collections_by_month[month_key]['by_method'][payment.method]['count'] += 1
-            collections_by_month[month_key]['by_method'][payment.method]['total'] += float(payment.amount)
-            
-            # Resumen general por método
-            if payment.method not in methods_summary:
-                methods_summary[payment.method] = {
-                    'count': 0,
-                    'total': 0
-                }
-            
-            methods_summary[payment.method]['count'] += 1
-            methods_summary[payment.method]['total'] += float(payment.amount)
-        
-        monthly_breakdown = [
-            {
-                'month': month,
-                'month_name': timezone.datetime.strptime(month, '%Y-%m').strftime('%B %Y'),
-                'count': data['count'],
-                'total': data['total'],
-                'average_per_payment': data['total'] / data['count'] if data['count'] > 0 else 0,
-                'by_method': [
-                    {
-                        'method': method,
-                        'count': method_data['count'],
-                        'total': method_data['total']
-                    }
-                    for method, method_data in data['by_method'].items()
-                ]
-            }
-            for month, data in sorted(collections_by_month.items())
-        ]
-        
-        return Response({
-            'total_collected': float(queryset.aggregate(Sum('amount'))['amount__sum'] or 0),
-            'total_transactions': queryset.count(),
-            'period': {
-                'start_date': start_date,
-                'end_date': end_date
-            },
-            'by_method': [
-                {
-                    'method': method,
-                    'count': data['count'],
-                    'total': data['total'],
-                    'percentage': round((data['total'] / float(queryset.aggregate(Sum('amount'))['amount__sum'] or 1)) * 100, 2)
-                }
-                for method, data in methods_summary.items()
-            ],
-            'monthly_breakdown': monthly_breakdown,
-            'generated_at': timezone.now().isoformat()
-        })
-        
     except Exception as e:
         return Response(
-            {'error': f'Error generando reporte de cobranzas: {str(e)}'}, 
+            {'error': f'Error generando resumen financiero: {str(e)}'},
             status=drf_status.HTTP_500_INTERNAL_SERVER_ERROR
         )
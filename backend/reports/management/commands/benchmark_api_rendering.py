@@ -0,0 +1,77 @@
+import gzip
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from users.models import User
+from villanueva_project.compression import brotli, compress
+from villanueva_project.renderers import ORJSONRenderer
+
+
+# Endpoints con las respuestas más grandes de la API
+ENDPOINTS = {
+    'customers': '/api/v1/customers/?page_size=100',
+    'payments': '/api/v1/payments/payments/?page_size=500',
+    'schedules': '/api/v1/payments/schedules/?page_size=500',
+    'ventas': '/api/v1/sales/ventas/?page_size=100',
+    'lotes': '/api/v1/lotes/?page_size=100',
+    'pending-installments': '/api/v1/reports/live/pending-installments/',
+}
+
+
+class Command(BaseCommand):
+    help = 'Mide el tiempo de render JSON (estándar vs orjson) y los bytes transferidos con y sin compresión'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20, help='Renders por endpoint y renderer (default: 20)')
+        parser.add_argument(
+            '--endpoint',
+            action='append',
+            choices=list(ENDPOINTS),
+            help='Endpoint a medir (repetible). Por defecto, todos.'
+        )
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(is_active=True).order_by('-is_superuser', 'id').first()
+        if user is None:
+            raise CommandError('Se necesita al menos un usuario activo para autenticar las peticiones')
+
+        client = APIClient()
+        client.force_authenticate(user)
+        iterations = options['iterations']
+
+        encodings = ['gzip'] + (['br'] if brotli is not None else [])
+        header = f'{"endpoint":22} {"json ms":>9} {"orjson ms":>10} {"KB":>9}' + ''.join(
+            f' {encoding + " KB":>9} {encoding + " ms":>8}' for encoding in encodings
+        )
+        self.stdout.write(f'{iterations} renders por endpoint\n')
+        self.stdout.write(self.style.MIGRATE_HEADING(header))
+
+        for name in options['endpoint'] or ENDPOINTS:
+            response = client.get(ENDPOINTS[name], HTTP_ACCEPT_ENCODING='identity')
+            if response.status_code != 200 or not hasattr(response, 'data'):
+                self.stdout.write(self.style.ERROR(f'{name:22} HTTP {response.status_code}'))
+                continue
+
+            data = response.data
+            standard, standard_ms = self._render(JSONRenderer(), data, iterations)
+            fast, fast_ms = self._render(ORJSONRenderer(), data, iterations)
+            if fast != standard:
+                self.stdout.write(self.style.WARNING(f'{name}: la salida de orjson difiere de JSONRenderer'))
+
+            line = f'{name:22} {standard_ms:9.2f} {fast_ms:10.2f} {len(fast) / 1024:9.1f}'
+            for encoding in encodings:
+                started = time.perf_counter()
+                compressed = compress(fast, encoding)
+                line += f' {len(compressed) / 1024:9.1f} {(time.perf_counter() - started) * 1000:8.2f}'
+            self.stdout.write(line)
+
+    @staticmethod
+    def _render(renderer, data, iterations):
+        content = renderer.render(data)
+        started = time.perf_counter()
+        for _ in range(iterations):
+            renderer.render(data)
+        return content, (time.perf_counter() - started) / iterations * 1000
@@ -0,0 +1,194 @@
+import asyncio
+import statistics
+import subprocess
+import time
+import types
+
+from django.conf import settings
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from django.urls import clear_url_caches, path
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from dashboard.views import dashboard_summary
+from reports import async_views
+from users.models import User
+
+
+# Vistas async que sirven cada reporte
+ENDPOINTS = {
+    'summary': dashboard_summary,
+    'payments-history': async_views.payments_history_live,
+    'available-lots': async_views.available_lots_live,
+    'monthly-collections': async_views.monthly_collections_live,
+}
+
+# Versiones síncronas (DRF) que reemplazaron: ya no están en el código, se
+# cargan del historial de git con --baseline <commit> (archivo relativo a
+# backend/ y nombre de la vista en ese commit)
+BASELINES = {
+    'summary': ('dashboard/views.py', 'DashboardSummaryView'),
+    'payments-history': ('reports/dynamic_views.py', 'payments_history_live'),
+    'available-lots': ('reports/dynamic_views.py', 'available_lots_live'),
+    'monthly-collections': ('reports/dynamic_views.py', 'monthly_collections_live'),
+}
+
+# URLconf propia del benchmark (/async/<reporte>/ y /sync/<reporte>/), se
+# completa en handle()
+urlpatterns = []
+
+
+def load_baseline(ref, filename, name, modules):
+    """
+    Vista `name` de `filename` tal como estaba en el commit `ref`. El módulo
+    se ejecuta como parte de su app (para sus imports relativos) y se guarda
+    en `modules` para cargarlo una sola vez por archivo.
+    """
+    if filename not in modules:
+        try:
+            source = subprocess.run(
+                ['git', 'show', f'{ref}:./{filename}'],
+                cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+            ).stdout
+        except (OSError, subprocess.CalledProcessError) as e:
+            raise CommandError(f'No se pudo leer {filename} en {ref}: {getattr(e, "stderr", "") or e}')
+        package = filename.split('/')[0]
+        module = types.ModuleType(f'{package}._baseline')
+        module.__package__ = package
+        module.__file__ = str(settings.BASE_DIR / filename)
+        exec(compile(source, f'{ref}:{filename}', 'exec'), module.__dict__)
+        modules[filename] = module
+    view = getattr(modules[filename], name, None)
+    if view is None:
+        raise CommandError(f'{name} no existe en {filename} en {ref}')
+    return view.as_view() if isinstance(view, type) else view
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide el throughput de las vistas async del dashboard y los reportes bajo carga concurrente. '
+        'Con --baseline <commit> las compara con las versiones síncronas de ese commit'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Peticiones por vista (default: 200)')
+        parser.add_argument('--concurrency', type=int, default=20, help='Peticiones simultáneas (default: 20)')
+        parser.add_argument(
+            '--endpoint',
+            action='append',
+            choices=list(ENDPOINTS),
+            help='Reporte a medir (repetible). Por defecto, todos.'
+        )
+        parser.add_argument(
+            '--baseline',
+            metavar='COMMIT',
+            help='Commit de git con las vistas síncronas a comparar (p. ej. el anterior a su eliminación)'
+        )
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(is_active=True).order_by('-is_superuser', 'id').first()
+        if user is None:
+            raise CommandError('Se necesita al menos un usuario activo para autenticar las peticiones')
+        token = str(RefreshToken.for_user(user).access_token)
+
+        names = options['endpoint'] or list(ENDPOINTS)
+        kinds = ('sync', 'async') if options['baseline'] else ('async',)
+        modules = {}
+        urlpatterns[:] = [path(f'async/{name}/', ENDPOINTS[name]) for name in names]
+        if options['baseline']:
+            urlpatterns.extend(
+                path(f'sync/{name}/', load_baseline(options['baseline'], *BASELINES[name], modules))
+                for name in names
+            )
+        clear_url_caches()
+
+        total = options['requests']
+        concurrency = options['concurrency']
+        self.stdout.write(f'{total} peticiones por vista, concurrencia {concurrency}\n')
+
+        # Se usa la aplicación ASGI real (un hilo por petición para el código
+        # síncrono, como bajo uvicorn) con la URLconf del benchmark.
+        with override_settings(ROOT_URLCONF=__name__):
+            application = get_asgi_application()
+            for name in names:
+                results = {}
+                for kind in kinds:
+                    results[kind] = asyncio.run(
+                        self._run(application, f'/{kind}/{name}/', token, total, concurrency)
+                    )
+                self._report(name, results)
+
+    async def _run(self, application, url, token, total, concurrency):
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies = []
+        errors = 0
+
+        async def one_request():
+            nonlocal errors
+            async with semaphore:
+                started = time.perf_counter()
+                status = await self._asgi_get(application, url, token)
+                latencies.append(time.perf_counter() - started)
+                if status != 200:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one_request() for _ in range(total)))
+        elapsed = time.perf_counter() - started
+
+        latencies.sort()
+        return {
+            'rps': total / elapsed,
+            'p50': statistics.median(latencies) * 1000,
+            'p95': latencies[int(len(latencies) * 0.95) - 1] * 1000,
+            'errors': errors,
+        }
+
+    @staticmethod
+    async def _asgi_get(application, url, token):
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': 'GET',
+            'scheme': 'http',
+            'path': url,
+            'raw_path': url.encode(),
+            'query_string': b'',
+            'root_path': '',
+            'headers': [
+                (b'host', b'testserver'),
+                (b'authorization', f'Bearer {token}'.encode()),
+            ],
+            'client': ('127.0.0.1', 0),
+            'server': ('testserver', 80),
+        }
+        status = None
+
+        async def receive():
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        async def send(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+
+        await application(scope, receive, send)
+        return status
+
+    def _report(self, name, results):
+        self.stdout.write(self.style.MIGRATE_HEADING(name))
+        for kind, data in results.items():
+            line = (
+                f'  {kind:<6} {data["rps"]:8.1f} req/s   '
+                f'p50 {data["p50"]:7.1f} ms   p95 {data["p95"]:7.1f} ms'
+            )
+            if data['errors']:
+                line += self.style.ERROR(f'   {data["errors"]} errores')
+            self.stdout.write(line)
+
+        if 'sync' in results:
+            speedup = results['async']['rps'] / results['sync']['rps'] if results['sync']['rps'] else 0
+            self.stdout.write(f'  async/sync: {speedup:.2f}x')
+        self.stdout.write('')
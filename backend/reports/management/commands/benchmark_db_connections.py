@@ -0,0 +1,111 @@
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connections
+from django.db.utils import load_backend
+
+
+# Cada modo simula una petición ASGI: un hilo nuevo con su propia conexión
+# de Django, una consulta corta y el cierre de fin de petición.
+MODES = {
+    'sin-pool': ('django.db.backends.postgresql', 0),
+    'persistente': ('django.db.backends.postgresql', 60),
+    'pool': ('villanueva_project.postgresql_pool', 0),
+}
+
+
+class Command(BaseCommand):
+    help = 'Mide el costo de establecer conexiones a PostgreSQL por petición, con y sin pool, bajo concurrencia'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help='Peticiones simuladas por modo (default: 500)')
+        parser.add_argument('--concurrency', type=int, default=20, help='Peticiones simultáneas (default: 20)')
+        parser.add_argument('--pool-size', type=int, default=10, help='Tamaño del pool en el modo pool (default: 10)')
+
+    def handle(self, *args, **options):
+        base_settings = connections['default'].settings_dict
+        if base_settings['ENGINE'] not in {engine for engine, _max_age in MODES.values()}:
+            raise CommandError('El benchmark requiere PostgreSQL')
+
+        total = options['requests']
+        concurrency = options['concurrency']
+        self.stdout.write(f'{total} peticiones por modo, concurrencia {concurrency}\n')
+
+        for mode, (engine, max_age) in MODES.items():
+            settings_dict = {
+                **base_settings,
+                'ENGINE': engine,
+                'CONN_MAX_AGE': max_age,
+                'POOL': {**(base_settings.get('POOL') or {}), 'MAX_SIZE': options['pool_size']},
+            }
+            result = self._run(mode, settings_dict, total, concurrency)
+            self._report(mode, result)
+
+    def _run(self, mode, settings_dict, total, concurrency):
+        backend = load_backend(settings_dict['ENGINE'])
+        alias = f'benchmark_{mode}'
+        latencies = []
+        kept_open = []
+        errors = []
+
+        def one_request(_):
+            wrapper = backend.DatabaseWrapper(settings_dict, alias)
+            started = time.perf_counter()
+            try:
+                with wrapper.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+                    cursor.fetchone()
+            except OperationalError as e:
+                # p. ej. "too many clients": se agotó max_connections
+                errors.append(str(e).strip().splitlines()[-1])
+                return
+            # Fin de petición: Django cierra la conexión si CONN_MAX_AGE = 0
+            # (con el pool, la devuelve). Con conexiones persistentes queda
+            # abierta en un hilo que no se vuelve a usar.
+            wrapper.close_if_unusable_or_obsolete()
+            latencies.append(time.perf_counter() - started)
+            if wrapper.connection is not None:
+                kept_open.append(wrapper)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(one_request, range(total)))
+        elapsed = time.perf_counter() - started
+
+        if mode == 'pool':
+            pool = backend.DatabaseWrapper(settings_dict, alias).pool
+            connections_opened = pool.connections_created
+            pool.close_all()
+        else:
+            connections_opened = total - len(errors)
+        left_open = len(kept_open)
+        for wrapper in kept_open:
+            wrapper.inc_thread_sharing()
+            wrapper.close()
+
+        latencies = sorted(latencies) or [0]
+        return {
+            'rps': (total - len(errors)) / elapsed,
+            'p50': statistics.median(latencies) * 1000,
+            'p95': latencies[int(len(latencies) * 0.95) - 1] * 1000,
+            'connections_opened': connections_opened,
+            'left_open': left_open,
+            'errors': errors,
+        }
+
+    def _report(self, mode, data):
+        self.stdout.write(self.style.MIGRATE_HEADING(mode))
+        self.stdout.write(
+            f'  {data["rps"]:8.1f} req/s   p50 {data["p50"]:6.2f} ms   p95 {data["p95"]:6.2f} ms'
+        )
+        self.stdout.write(
+            f'  conexiones abiertas: {data["connections_opened"]}'
+            f'   sin cerrar al terminar: {data["left_open"]}'
+        )
+        if data['errors']:
+            self.stdout.write(self.style.ERROR(
+                f'  {len(data["errors"])} peticiones fallidas ({data["errors"][0]})'
+            ))
+        self.stdout.write('')
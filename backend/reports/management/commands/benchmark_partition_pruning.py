@@ -0,0 +1,142 @@
+import json
+import time
+from datetime import date, datetime
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+
+from payments.models import Payment, PaymentSchedule
+from payments.partitioning import PARTITION_KEYS, is_partitioned, partition_table
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _queries(year):
+    """Consultas por rango de fechas de los reportes, acotadas al año dado."""
+    zone = ZoneInfo(settings.TIME_ZONE)
+    start, end = datetime(year, 1, 1, tzinfo=zone), datetime(year + 1, 1, 1, tzinfo=zone)
+    month_start = datetime(year, 6, 1, tzinfo=zone)
+    payments = Payment.objects.filter(payment_date__gte=start, payment_date__lt=end)
+    schedules = PaymentSchedule.objects.filter(due_date__gte=date(year, 1, 1), due_date__lt=date(year + 1, 1, 1))
+    return {
+        # Historial de pagos: totales por método en el rango
+        'pagos por método': payments.values('method').annotate(count=Count('id'), total=Sum('amount')),
+        # Cobranzas mensuales
+        'cobranza mensual': payments.annotate(month=TruncMonth('payment_date'))
+        .values('month').annotate(total=Sum('amount')).order_by('month'),
+        # Recaudado en un mes (totales de la paginación de pagos)
+        'pagos del mes': Payment.objects.filter(payment_date__gte=month_start, payment_date__lt=datetime(
+            year, 7, 1, tzinfo=zone)).values('payment_type').annotate(total=Sum('amount')),
+        # Cuotas del año por estado (pendientes, proyección)
+        'cuotas por estado': schedules.values('status').annotate(count=Count('id'), total=Sum('scheduled_amount')),
+    }
+
+
+def _scanned(plan, table):
+    """Relaciones de la tabla (o sus particiones) leídas por el plan."""
+    found = set()
+
+    def walk(node):
+        name = node.get('Relation Name', '')
+        if name == table or name.startswith(f'{table}_'):
+            found.add(name)
+        for child in node.get('Plans', []):
+            walk(child)
+
+    walk(plan[0]['Plan'])
+    return found
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide las consultas por rango de fechas de los reportes con las tablas de pagos y cuotas '
+        'sin particionar y particionadas por año (partition pruning). Los cambios se descartan al terminar'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--year', type=int, default=date.today().year, help='Año consultado (default: actual)')
+        parser.add_argument('--iterations', type=int, default=20, help='Ejecuciones por consulta (default: 20)')
+        parser.add_argument(
+            '--history-years',
+            type=int,
+            default=0,
+            help='Copias sintéticas de los pagos y cuotas desplazadas 1..N años hacia atrás'
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('El particionado requiere PostgreSQL')
+
+        try:
+            with transaction.atomic(), connection.cursor() as cursor:
+                if options['history_years']:
+                    self._seed(cursor, options['history_years'])
+
+                layouts = ['particionado']
+                if not all(is_partitioned(cursor, table) for table in PARTITION_KEYS):
+                    layouts.insert(0, 'sin particionar')
+
+                self.stdout.write(
+                    f'Año {options["year"]}, {options["iterations"]} ejecuciones por consulta; '
+                    f'{Payment.objects.count()} pagos, {PaymentSchedule.objects.count()} cuotas\n'
+                )
+                self.stdout.write(self.style.MIGRATE_HEADING(
+                    f'{"consulta":20} {"tablas":16} {"ms":>8} {"filas":>6}  relaciones leídas'
+                ))
+                for layout in layouts:
+                    if layout == 'particionado':
+                        started = time.perf_counter()
+                        for table in PARTITION_KEYS:
+                            partition_table(cursor, table)
+                        self.stdout.write(f'(conversión: {time.perf_counter() - started:.1f} s)')
+                    for table in PARTITION_KEYS:
+                        cursor.execute(f'ANALYZE {connection.ops.quote_name(table)}')
+                    self._run(layout, options)
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _seed(self, cursor, years):
+        started = time.perf_counter()
+        for model, shifted, extra in (
+            (Payment, 'payment_date - make_interval(years => %(years)s)', {}),
+            (PaymentSchedule, '(due_date - make_interval(years => %(years)s))::date', {
+                # Mantiene única la pareja (venta, cuota)
+                'installment_number': 'installment_number + 1000 * %(years)s',
+            }),
+        ):
+            table = model._meta.db_table
+            column = PARTITION_KEYS[table]
+            columns = [field.column for field in model._meta.concrete_fields if not field.primary_key]
+            values = [shifted if name == column else extra.get(name, name) for name in columns]
+            cursor.execute(f'SELECT COALESCE(MAX(id), 0) FROM {table}')
+            last_id, = cursor.fetchone()
+            for offset in range(1, years + 1):
+                # Solo se copian las filas originales
+                cursor.execute(
+                    f'INSERT INTO {table} ({", ".join(columns)}) '
+                    f'SELECT {", ".join(values)} FROM {table} WHERE id <= %(last_id)s',
+                    {'years': offset, 'last_id': last_id},
+                )
+        self.stdout.write(f'Historial sintético de {years} años insertado en {time.perf_counter() - started:.1f} s\n')
+
+    def _run(self, layout, options):
+        for name, queryset in _queries(options['year']).items():
+            table = queryset.model._meta.db_table
+            plan = json.loads(queryset.explain(format='json'))
+            rows = len(list(queryset))
+            started = time.perf_counter()
+            for _ in range(options['iterations']):
+                list(queryset.all())
+            elapsed = (time.perf_counter() - started) / options['iterations'] * 1000
+            scanned = sorted(_scanned(plan, table))
+            self.stdout.write(
+                f'{name:20} {layout:16} {elapsed:8.2f} {rows:6}  '
+                f'{len(scanned)}: {", ".join(relation.removeprefix(table) or table for relation in scanned)}'
+            )
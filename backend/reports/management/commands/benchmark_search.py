@@ -0,0 +1,150 @@
+import random
+import string
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from rest_framework import filters
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from customers.models import Customer
+from lotes.models import Lote
+from payments.models import Payment, PaymentSchedule
+from sales.models import Venta
+from villanueva_project.search import RankedSearchFilter
+
+
+# Búsquedas de los listados: campos del SearchFilter anterior (ILIKE) y
+# documentos indexados del filtro actual
+TARGETS = {
+    'customers': (
+        Customer,
+        ['first_name', 'last_name', 'email', 'document_number'],
+        [('', Customer)],
+    ),
+    'ventas': (
+        Venta,
+        ['lote__block', 'lote__lot_number', 'customer__first_name', 'customer__last_name',
+         'customer__document_number'],
+        [('lote', Lote), ('customer', Customer)],
+    ),
+    'payments': (
+        Payment,
+        ['receipt_number', 'notes', 'venta__customer__first_name', 'venta__customer__last_name',
+         'venta__customer__document_number', 'venta__lote__block', 'venta__lote__lot_number'],
+        [('', Payment), ('venta__customer', Customer), ('venta__lote', Lote)],
+    ),
+    'schedules': (
+        PaymentSchedule,
+        ['venta__lote__block', 'venta__lote__lot_number', 'venta__customer__first_name',
+         'venta__customer__last_name', 'venta__customer__document_number', 'notes'],
+        [('', PaymentSchedule), ('venta__customer', Customer), ('venta__lote', Lote)],
+    ),
+}
+
+
+class _SearchView:
+    """Vista mínima con la configuración que leen los filtros de búsqueda."""
+
+    def __init__(self, search_fields, search_documents):
+        self.search_fields = search_fields
+        self.search_documents = search_documents
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Compara la búsqueda ILIKE de SearchFilter con la búsqueda indexada (RankedSearchFilter)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('terms', nargs='*', help='Términos a buscar (por defecto, tomados de los datos)')
+        parser.add_argument('--iterations', type=int, default=10, help='Ejecuciones por búsqueda (default: 10)')
+        parser.add_argument('--page-size', type=int, default=50, help='Filas leídas por búsqueda (default: 50)')
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Clientes sintéticos a insertar antes de medir; se descartan al terminar'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                if options['seed']:
+                    self._seed(options['seed'])
+                self._run(options)
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _seed(self, count):
+        started = time.perf_counter()
+        rng = random.Random(39)
+        syllables = ['ma', 'ri', 'jo', 'sé', 'lu', 'ca', 'ro', 'an', 'te', 'pe', 'rez', 'gon', 'za', 'les', 'quis']
+
+        def word():
+            return ''.join(rng.choice(syllables) for _ in range(rng.randint(2, 4))).capitalize()
+
+        suffix = ''.join(rng.choice(string.ascii_lowercase) for _ in range(6))
+        Customer.objects.bulk_create(
+            [
+                Customer(
+                    first_name=f'{word()} {word()}',
+                    last_name=f'{word()} {word()} {suffix}{index}',
+                    document_number=f'{70000000 + index}',
+                    email=f'bench{index}.{suffix}@example.com',
+                )
+                for index in range(count)
+            ],
+            batch_size=5000,
+        )
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE customers_customer')
+        self.stdout.write(f'{count} clientes sintéticos insertados en {time.perf_counter() - started:.1f} s\n')
+
+    def _default_terms(self):
+        customer = Customer.objects.order_by('-id').values('last_name', 'document_number').first()
+        if customer is None:
+            return ['a']
+        last_name = customer['last_name'].split()[0]
+        terms = [last_name, last_name[:3], customer['document_number'], 'xyznoexiste']
+        return list(dict.fromkeys(term for term in terms if term))
+
+    def _run(self, options):
+        terms = options['terms'] or self._default_terms()
+        iterations = options['iterations']
+        page_size = options['page_size']
+        factory = APIRequestFactory()
+
+        self.stdout.write(f'{iterations} ejecuciones por búsqueda, {page_size} filas + conteo\n')
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'{"listado":10} {"término":22} {"ILIKE ms":>9} {"filas":>7} {"índice ms":>10} {"filas":>7}'
+        ))
+
+        for name, (model, search_fields, search_documents) in TARGETS.items():
+            view = _SearchView(search_fields, search_documents)
+            for term in terms:
+                request = Request(factory.get('/', {'search': term}))
+                queryset = model._default_manager.all()
+                ilike_ms, ilike_rows = self._measure(
+                    lambda: filters.SearchFilter().filter_queryset(request, queryset, view), iterations, page_size
+                )
+                ranked_ms, ranked_rows = self._measure(
+                    lambda: RankedSearchFilter().filter_queryset(request, queryset, view), iterations, page_size
+                )
+                self.stdout.write(
+                    f'{name:10} {term[:22]:22} {ilike_ms:9.2f} {ilike_rows:7} {ranked_ms:10.2f} {ranked_rows:7}'
+                )
+
+    @staticmethod
+    def _measure(build, iterations, page_size):
+        rows = build().count()
+        started = time.perf_counter()
+        for _ in range(iterations):
+            queryset = build()
+            queryset.count()
+            list(queryset.values_list('pk', flat=True)[:page_size])
+        return (time.perf_counter() - started) / iterations * 1000, rows
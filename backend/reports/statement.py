@@ -0,0 +1,257 @@
+"""
+Estado de cuenta de clientes: libro cronológico de cargos y abonos con saldo
+acumulado.
+
+Por cada venta no cancelada del cliente:
+
+    cargo_inicial  el pago inicial pactado, a la fecha de la venta (debe)
+    cuota          cada cuota del cronograma, a su vencimiento (debe)
+    pago           cada pago registrado, a su fecha (haber)
+    condonacion    lo no pagado de una cuota perdonada (haber)
+
+Los movimientos salen de una sola consulta: un UNION ALL de las cuatro
+fuentes y funciones de ventana (SUM ... OVER) para el saldo acumulado del
+cliente y de cada venta. Sin fecha de corte posterior, el saldo final de una
+venta coincide con su saldo pendiente (remaining_balance) cuando todos los
+pagos de cuota están asociados a su cuota.
+
+Las cuotas y pagos de ventas archivadas (payments/archive.py) se leen del
+archivo; archivar o restaurar no cambia la versión (ver abajo).
+
+El estado de un cliente se guarda en caché con la versión de sus datos: el
+número de ventas, cuotas y pagos y la última modificación de cualquiera de
+ellos (una consulta agregada). Un pago, una cuota regenerada o perdonada o
+una venta modificada cambian la versión, sin invalidación explícita.
+"""
+import csv
+import hashlib
+from datetime import date
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+
+from payments.models import ArchivedPayment, ArchivedPaymentSchedule, Payment, PaymentSchedule
+from lotes.models import Lote
+from sales.models import Venta
+
+from .streaming import LineBuffer
+
+
+CACHE_PREFIX = 'statement'
+CACHE_TIMEOUT = 24 * 60 * 60
+
+KIND_LABELS = {
+    'cargo_inicial': 'Pago inicial',
+    'cuota': 'Cuota',
+    'pago': 'Pago',
+    'condonacion': 'Condonación de cuota',
+}
+
+EXPORT_COLUMNS = [
+    'cliente_id', 'cliente', 'venta_id', 'lote', 'fecha', 'tipo', 'detalle', 'referencia',
+    'cargo', 'abono', 'saldo_venta', 'saldo',
+]
+
+_ENTRY_COLUMNS = [
+    'customer_id', 'venta_id', 'block', 'lot_number', 'entry_date', 'kind', 'installment_number',
+    'reference', 'debit', 'credit', 'venta_balance', 'balance',
+]
+
+_STATEMENT_SQL = """
+WITH ventas AS (
+    SELECT v.id, v.customer_id, v.initial_payment, v.sale_date, l.block, l.lot_number
+    FROM {venta} v
+    JOIN {lote} l ON l.id = v.lote_id
+    WHERE v.customer_id = ANY(%(customer_ids)s) AND v.status <> 'cancelled'
+), entries AS (
+    SELECT v.customer_id, v.id AS venta_id, v.block, v.lot_number,
+           (v.sale_date AT TIME ZONE %(tz)s)::date AS entry_date, 0 AS sort_order, v.id AS source_id,
+           'cargo_inicial' AS kind, NULL::integer AS installment_number, '' AS reference,
+           v.initial_payment AS debit, 0.00 AS credit
+    FROM ventas v
+    WHERE v.initial_payment > 0
+    UNION ALL
+    SELECT v.customer_id, v.id, v.block, v.lot_number,
+           s.due_date, 1, s.id,
+           'cuota', s.installment_number, '',
+           s.scheduled_amount, 0.00
+    FROM {schedule} s
+    JOIN ventas v ON v.id = s.venta_id
+    UNION ALL
+    SELECT v.customer_id, v.id, v.block, v.lot_number,
+           (p.payment_date AT TIME ZONE %(tz)s)::date, 2, p.id,
+           'pago', NULL, p.receipt_number,
+           0.00, p.amount
+    FROM {payment} p
+    JOIN ventas v ON v.id = p.venta_id
+    UNION ALL
+    SELECT v.customer_id, v.id, v.block, v.lot_number,
+           COALESCE((s.payment_date AT TIME ZONE %(tz)s)::date, s.due_date), 3, s.id,
+           'condonacion', s.installment_number, '',
+           0.00, GREATEST(s.scheduled_amount - COALESCE(paid.total, 0), 0.00)
+    FROM {schedule} s
+    JOIN ventas v ON v.id = s.venta_id
+    LEFT JOIN LATERAL (
+        SELECT SUM(p.amount) AS total FROM {payment} p WHERE p.payment_schedule_id = s.id
+    ) paid ON TRUE
+    WHERE s.is_forgiven
+)
+SELECT customer_id, venta_id, block, lot_number, entry_date, kind, installment_number, reference, debit, credit,
+       SUM(debit - credit) OVER (
+           PARTITION BY venta_id ORDER BY entry_date, sort_order, source_id ROWS UNBOUNDED PRECEDING
+       ) AS venta_balance,
+       SUM(debit - credit) OVER (
+           PARTITION BY customer_id ORDER BY entry_date, sort_order, source_id ROWS UNBOUNDED PRECEDING
+       ) AS balance
+FROM entries
+WHERE entry_date <= %(as_of)s
+ORDER BY customer_id, entry_date, sort_order, source_id
+"""
+
+_VERSION_SQL = """
+SELECT customer_id, COUNT(*), MAX(updated_at)
+FROM (
+    SELECT v.customer_id, v.updated_at FROM {venta} v WHERE v.customer_id = ANY(%(customer_ids)s)
+    UNION ALL
+    SELECT v.customer_id, s.updated_at FROM {schedule} s JOIN {venta} v ON v.id = s.venta_id
+    WHERE v.customer_id = ANY(%(customer_ids)s)
+    UNION ALL
+    SELECT v.customer_id, p.updated_at FROM {payment} p JOIN {venta} v ON v.id = p.venta_id
+    WHERE v.customer_id = ANY(%(customer_ids)s)
+) changes
+GROUP BY customer_id
+"""
+
+
+_SCHEDULE_COLUMNS = (
+    'id, venta_id, installment_number, scheduled_amount, due_date, payment_date, is_forgiven, updated_at'
+)
+_PAYMENT_COLUMNS = 'id, venta_id, payment_schedule_id, amount, payment_date, receipt_number, updated_at'
+
+
+def _both_tiers(model, archived_model, columns):
+    """Filas de la tabla activa y del archivo (payments/archive.py) como una sola relación."""
+    return (
+        f'(SELECT {columns} FROM {model._meta.db_table} '
+        f'UNION ALL SELECT {columns} FROM {archived_model._meta.db_table})'
+    )
+
+
+def _sql(template):
+    return template.format(
+        venta=Venta._meta.db_table,
+        lote=Lote._meta.db_table,
+        schedule=_both_tiers(PaymentSchedule, ArchivedPaymentSchedule, _SCHEDULE_COLUMNS),
+        payment=_both_tiers(Payment, ArchivedPayment, _PAYMENT_COLUMNS),
+    )
+
+
+class CustomerStatement:
+    """
+    Estado de cuenta de uno o varios clientes a una fecha de corte (por
+    defecto hoy: las cuotas futuras no se cargan todavía).
+    """
+
+    def __init__(self, customer_ids, as_of=None):
+        self.customer_ids = sorted({int(customer_id) for customer_id in customer_ids})
+        self.as_of = as_of or date.today()
+
+    def _params(self):
+        return {'customer_ids': self.customer_ids, 'tz': settings.TIME_ZONE, 'as_of': self.as_of}
+
+    # --- Movimientos ----------------------------------------------------------
+
+    def entries(self, chunk_size=2000):
+        """
+        Genera los movimientos en orden (cliente, fecha) como diccionarios.
+        Se leen con un cursor del lado del servidor, por bloques.
+        """
+        if not self.customer_ids:
+            return
+        with connection.chunked_cursor() as cursor:
+            cursor.execute(_sql(_STATEMENT_SQL), self._params())
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield _entry(dict(zip(_ENTRY_COLUMNS, row)))
+
+    def versions(self):
+        """Versión de los datos de cada cliente: {customer_id: firma}."""
+        if not self.customer_ids:
+            return {}
+        with connection.cursor() as cursor:
+            cursor.execute(_sql(_VERSION_SQL), self._params())
+            rows = cursor.fetchall()
+        versions = {customer_id: '0' for customer_id in self.customer_ids}
+        for customer_id, count, updated_at in rows:
+            versions[customer_id] = f'{count}:{updated_at.isoformat()}'
+        return versions
+
+    # --- Caché por cliente ----------------------------------------------------
+
+    def cache_key(self, customer_id, version):
+        signature = hashlib.sha1(version.encode()).hexdigest()[:16]
+        return f'{CACHE_PREFIX}:{customer_id}:{self.as_of.isoformat()}:{signature}'
+
+    def get(self):
+        """
+        Estado de cuenta de un solo cliente (movimientos y saldos), desde la
+        caché si su versión de datos no cambió.
+        """
+        customer_id, = self.customer_ids
+        key = self.cache_key(customer_id, self.versions()[customer_id])
+        data = cache.get(key)
+        if data is None:
+            entries = list(self.entries())
+            data = {
+                'customer_id': customer_id,
+                'as_of': self.as_of.isoformat(),
+                'total_debit': sum((entry['debit'] for entry in entries), Decimal('0.00')),
+                'total_credit': sum((entry['credit'] for entry in entries), Decimal('0.00')),
+                'balance': entries[-1]['balance'] if entries else Decimal('0.00'),
+                'entries': entries,
+            }
+            cache.set(key, data, CACHE_TIMEOUT)
+        return data
+
+    # --- Exportación ----------------------------------------------------------
+
+    def stream_csv(self, customer_names=None):
+        """
+        Genera el CSV de movimientos línea por línea (para
+        StreamingHttpResponse). customer_names: {customer_id: nombre}.
+        """
+        customer_names = customer_names or {}
+        buffer = LineBuffer()
+        writer = csv.writer(buffer)
+        yield writer.writerow(EXPORT_COLUMNS)
+        for entry in self.entries():
+            yield writer.writerow([
+                entry['customer_id'], customer_names.get(entry['customer_id'], ''), entry['venta_id'],
+                entry['lote'], entry['date'].isoformat(), entry['kind'], entry['description'],
+                entry['reference'], entry['debit'], entry['credit'], entry['venta_balance'], entry['balance'],
+            ])
+
+
+def _entry(row):
+    label = KIND_LABELS[row['kind']]
+    if row['installment_number'] is not None:
+        label = f"{label} {row['installment_number']}"
+    return {
+        'date': row['entry_date'],
+        'kind': row['kind'],
+        'description': label,
+        'customer_id': row['customer_id'],
+        'venta_id': row['venta_id'],
+        'lote': f"Mz. {row['block']} - Lt. {row['lot_number']}",
+        'installment_number': row['installment_number'],
+        'reference': row['reference'] or '',
+        'debit': row['debit'],
+        'credit': row['credit'],
+        'venta_balance': row['venta_balance'],
+        'balance': row['balance'],
+    }
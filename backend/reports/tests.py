@@ -1,3 +1,775 @@
-from django.test import TestCase
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase
+from rest_framework.response import Response
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+from rest_framework.views import APIView
+
+from customers.models import Customer
+from lotes.models import Lote
+from payments.models import Payment
+from sales.models import Venta
+from users.models import User
+from villanueva_project.db_router import (
+    ReplicaReadMixin, ReplicaStickinessMiddleware, mark_write, replica_read, replica_reads,
+)
+
+
+class LiveReportsQueryBudgetTests(TestCase):
+    """
+    Los reportes de ventas y resumen financiero se resuelven con un número
+    fijo de consultas, sin importar cuántas ventas existan.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='reportes', email='reportes@example.com', password='x')
+        cls.ventas = [cls.create_venta(i) for i in range(3)]
+        Lote.objects.create(block='R', lot_number='99', area=Decimal('120.00'), price=Decimal('9000.00'))
+
+    @classmethod
+    def create_venta(cls, index, sale_date=datetime(2024, 3, 10, tzinfo=dt_timezone.utc)):
+        customer = Customer.objects.create(
+            first_name='Cliente', last_name=f'R{index}', email=f'cliente{index}@example.com'
+        )
+        lote = Lote.objects.create(
+            block='R', lot_number=str(index), area=Decimal('100.00'), price=Decimal('10000.00')
+        )
+        venta = Venta.create_sale(
+            lote=lote, customer=customer, sale_price=Decimal('12000.00'), payment_day=5,
+            financing_months=12, initial_payment=Decimal('1000.00'),
+        )
+        Venta.objects.filter(pk=venta.pk).update(sale_date=sale_date)
+        Payment.objects.create(
+            venta=venta, amount=Decimal('500.00'), payment_date=sale_date,
+            method='efectivo', payment_type='initial',
+        )
+        return venta
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_sales_summary_query_budget(self):
+        with self.assertNumQueries(2):
+            first = self.client.get('/api/v1/reports/live/sales-summary/')
+
+        for index in range(3, 8):
+            self.create_venta(index, sale_date=datetime(2024, 4, 2, tzinfo=dt_timezone.utc))
+        with self.assertNumQueries(2):
+            second = self.client.get('/api/v1/reports/live/sales-summary/')
+
+        self.assertEqual(first.data['total_lots_sold'], 3)
+        self.assertEqual(second.data['total_lots_sold'], 8)
+        self.assertEqual(second.data['total_sales_value'], 8 * 12000.0)
+        self.assertEqual(second.data['total_initial_payments'], 8 * 1000.0)
+        self.assertEqual(
+            [(row['month'], row['count']) for row in second.data['monthly_breakdown']],
+            [('2024-03', 3), ('2024-04', 5)],
+        )
+
+    def test_sales_summary_filters_by_sale_date(self):
+        self.create_venta(3, sale_date=datetime(2024, 6, 1, tzinfo=dt_timezone.utc))
+
+        response = self.client.get('/api/v1/reports/live/sales-summary/', {
+            'start_date': '2024-05-01', 'end_date': '2024-06-01',
+        })
+
+        self.assertEqual(response.data['total_lots_sold'], 1)
+        self.assertEqual(response.data['monthly_breakdown'][0]['month'], '2024-06')
+
+    def test_financial_overview_query_budget(self):
+        # Ventas, pagos (un aggregate por nivel: tabla activa y archivo), inventario y cartera
+        with self.assertNumQueries(5):
+            first = self.client.get('/api/v1/reports/live/financial-overview/')
+
+        for index in range(3, 8):
+            self.create_venta(index)
+        with self.assertNumQueries(5):
+            second = self.client.get('/api/v1/reports/live/financial-overview/')
+
+        self.assertEqual(first.data['sales']['total_lots_sold'], 3)
+        self.assertEqual(second.data['sales']['total_lots_sold'], 8)
+        self.assertEqual(second.data['payments']['total_payments'], 8)
+        self.assertEqual(second.data['inventory']['available_lots'], 1)
+
+    def test_financial_overview_payment_date_range(self):
+        # Límites del día en UTC (TIME_ZONE): el último instante del día final cuenta, el siguiente no
+        venta = self.ventas[0]
+        for payment_date in (
+            datetime(2024, 5, 1, 0, 0, tzinfo=dt_timezone.utc),
+            datetime(2024, 5, 31, 23, 59, 59, tzinfo=dt_timezone.utc),
+            datetime(2024, 6, 1, 0, 0, tzinfo=dt_timezone.utc),
+        ):
+            Payment.objects.create(
+                venta=venta, amount=Decimal('100.00'), payment_date=payment_date,
+                method='efectivo', payment_type='installment',
+            )
+
+        with self.assertNumQueries(5) as queries:
+            response = self.client.get('/api/v1/reports/live/financial-overview/', {
+                'start_date': '2024-05-01', 'end_date': '2024-05-31',
+            })
+        self.assertEqual(response.data['payments'], {'total_payments': 2, 'total_amount': 200.0})
+        # Rango sobre la columna, sin convertir cada fila a fecha
+        payments_sql = [query['sql'] for query in queries.captured_queries if 'payments_payment' in query['sql']]
+        self.assertTrue(payments_sql)
+        self.assertFalse([sql for sql in payments_sql if 'AT TIME ZONE' in sql or '::date' in sql])
+
+        response = self.client.get('/api/v1/reports/live/financial-overview/', {'start_date': '2024-13-01'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_financial_overview_receivables_match_remaining_balance(self):
+        response = self.client.get('/api/v1/reports/live/financial-overview/')
+
+        expected = sum(venta.remaining_balance for venta in Venta.objects.filter(status='active'))
+        self.assertEqual(response.data['receivables']['customers_with_debt'], 3)
+        self.assertAlmostEqual(response.data['receivables']['total_debt'], float(expected), places=2)
+
+
+class CustomerStatementTests(TestCase):
+    """El estado de cuenta sale de una consulta con saldo acumulado y se cachea por versión de datos."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='estado', email='estado@example.com', password='x')
+        cls.customer = Customer.objects.create(first_name='Estado', last_name='Cuenta')
+        lote = Lote.objects.create(block='E', lot_number='1', area=Decimal('100.00'), price=Decimal('10000.00'))
+        cls.venta = Venta.create_sale(
+            lote=lote, customer=cls.customer, sale_price=Decimal('7000.00'), payment_day=10,
+            financing_months=6, initial_payment=Decimal('1000.00'),
+        )
+        Payment.objects.create(
+            venta=cls.venta, amount=Decimal('600.00'), payment_date=datetime(2024, 1, 2, tzinfo=dt_timezone.utc),
+            method='efectivo', payment_type='initial',
+        )
+        schedules = cls.venta.payment_schedules.order_by('installment_number')
+        schedules[0].register_payment(amount=Decimal('1000.00'))
+        schedules[1].register_payment(amount=Decimal('400.00'))
+        schedules[1].forgive_installment(notes='Condonada')
+
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_running_balance_matches_remaining_balance(self):
+        response = self.client.get(f'/api/v1/customers/{self.customer.id}/statement/', {'as_of': '2099-12-31'})
+
+        self.assertEqual(response.status_code, 200)
+        entries = response.data['entries']
+        self.assertEqual(
+            sorted(entry['kind'] for entry in entries),
+            ['cargo_inicial'] + ['condonacion'] + ['cuota'] * 6 + ['pago'] * 3,
+        )
+        forgiveness, = [entry for entry in entries if entry['kind'] == 'condonacion']
+        self.assertEqual(forgiveness['credit'], Decimal('600.00'))
+        self.assertEqual(response.data['total_debit'], Decimal('7000.00'))
+        self.assertEqual(response.data['total_credit'], Decimal('2600.00'))
+        self.assertEqual(response.data['balance'], self.venta.remaining_balance)
+        running = Decimal('0.00')
+        for entry in entries:
+            running += entry['debit'] - entry['credit']
+            self.assertEqual(entry['balance'], running)
+
+    def test_cache_follows_data_version(self):
+        url = f'/api/v1/customers/{self.customer.id}/statement/'
+        first = self.client.get(url, {'as_of': '2099-12-31'})
+        # Cliente + versión de los datos, sin la consulta de movimientos
+        with self.assertNumQueries(2):
+            cached = self.client.get(url, {'as_of': '2099-12-31'})
+        self.assertEqual(cached.data, first.data)
+
+        self.venta.payment_schedules.get(installment_number=3).register_payment(amount=Decimal('500.00'))
+        updated = self.client.get(url, {'as_of': '2099-12-31'})
+        self.assertEqual(updated.data['balance'], first.data['balance'] - Decimal('500.00'))
+
+    def test_batch_csv_export(self):
+        other = Customer.objects.create(first_name='Sin', last_name='Ventas')
+        response = self.client.get(
+            '/api/v1/customers/statements/export/', {'ids': f'{self.customer.id},{other.id}', 'as_of': '2099-12-31'}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertTrue(lines[0].startswith('cliente_id,cliente,venta_id'))
+        self.assertEqual(len(lines), 1 + 11)
+        self.assertTrue(all(line.split(',')[1] == 'Estado Cuenta' for line in lines[1:]))
+
+    def test_csv_export_streams_under_asgi(self):
+        from django.test import AsyncClient
+        from rest_framework_simplejwt.tokens import RefreshToken
+
+        url = f'/api/v1/customers/{self.customer.id}/statement/export/'
+        params = {'as_of': '2099-12-31'}
+        response = self.client.get(url, params)
+        self.assertFalse(response.is_async)
+        content = b''.join(response.streaming_content)
+        self.assertEqual(
+            response['Content-Disposition'], 'attachment; filename="estado_de_cuenta_2099-12-31.csv"'
+        )
+
+        token = str(RefreshToken.for_user(self.user).access_token)
+
+        async def asgi_export():
+            response = await AsyncClient().get(url, params, headers={'Authorization': f'Bearer {token}'})
+            return response, [chunk async for chunk in response.streaming_content]
+
+        # Lotes de pocas líneas: el CSV llega en varias partes, no en un solo bloque
+        with mock.patch('reports.streaming.BATCH_LINES', 4):
+            response, chunks = async_to_sync(asgi_export)()
+        self.assertTrue(response.is_async)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertEqual(len(chunks), 3)
+        self.assertEqual(b''.join(chunks), content)
+
+
+class ReplicaRoutingTests(TestCase):
+    """Los reportes leen de la réplica salvo tras una escritura del mismo usuario."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='replica', email='replica@example.com', password='x')
+
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch('villanueva_project.db_router.replica_configured', return_value=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def probe_view(self):
+        class ProbeView(ReplicaReadMixin, APIView):
+            def get(self, request):
+                return Response({'db': Lote.objects.all().db})
+
+            def post(self, request):
+                return Response({'db': Lote.objects.all().db})
+
+        return ProbeView.as_view()
+
+    def call(self, view, method='get'):
+        request = getattr(APIRequestFactory(), method)('/probe/')
+        force_authenticate(request, user=self.user)
+        return view(request).data['db']
+
+    def test_router(self):
+        self.assertEqual(Lote.objects.all().db, 'default')
+        with replica_reads():
+            self.assertEqual(Lote.objects.all().db, 'replica')
+            with mock.patch('villanueva_project.db_router.replica_configured', return_value=False):
+                self.assertEqual(Lote.objects.all().db, 'default')
+        self.assertEqual(Lote.objects.all().db, 'default')
+
+    def test_mixin_and_read_your_writes(self):
+        view = self.probe_view()
+        self.assertEqual(self.call(view), 'replica')
+        self.assertEqual(self.call(view, 'post'), 'default')
+        # El contexto se restaura al terminar la vista
+        self.assertEqual(Lote.objects.all().db, 'default')
+
+        request = RequestFactory().post('/api/v1/payments/')
+        request.user = self.user
+        ReplicaStickinessMiddleware(lambda request: HttpResponse(status=201))(request)
+
+        self.assertEqual(self.call(view), 'default')
+
+    def test_async_decorator(self):
+        @replica_read
+        async def probe(request):
+            return Lote.objects.all().db
+
+        request = RequestFactory().get('/probe/')
+        request.user = self.user
+        self.assertEqual(async_to_sync(probe)(request), 'replica')
+
+        mark_write(self.user)
+        self.assertEqual(async_to_sync(probe)(request), 'default')
+
+
+class AsyncReportViewsTests(TestCase):
+    """
+    Las vistas async del dashboard y los reportes devuelven los totales y
+    agrupaciones esperados, y los reportes exigen un JWT válido.
+    """
+    REPORTS = [
+        '/api/v1/reports/live/payments-history/',
+        '/api/v1/reports/live/available-lots/',
+        '/api/v1/reports/live/monthly-collections/',
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='async', email='async@example.com', password='x')
+        Lote.objects.create(block='A', lot_number='9', area=Decimal('80.00'), price=Decimal('8000.00'))
+        cls.payments = []
+        for index, (month, method) in enumerate([(1, 'efectivo'), (1, 'transferencia'), (3, 'efectivo')]):
+            customer = Customer.objects.create(first_name='Async', last_name=f'C{index}')
+            lote = Lote.objects.create(
+                block='A', lot_number=str(index), area=Decimal('100.00'), price=Decimal('10000.00')
+            )
+            venta = Venta.create_sale(
+                lote=lote, customer=customer, sale_price=Decimal('6000.00'), payment_day=5, financing_months=6,
+            )
+            venta.payment_schedules.get(installment_number=1).register_payment(
+                amount=Decimal('1000.00'), payment_method=method, receipt_number=f'AS-{index}',
+                payment_date=datetime(2024, month, 10 + index, tzinfo=dt_timezone.utc),
+            )
+            cls.payments.append(Payment.objects.get(receipt_number=f'AS-{index}'))
+
+    def setUp(self):
+        from rest_framework_simplejwt.tokens import RefreshToken
+
+        self.token = str(RefreshToken.for_user(self.user).access_token)
+
+    def get(self, url, params=None):
+        response = self.client.get(url, params or {}, HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        self.assertEqual(response.status_code, 200)
+        return self.strip(response.json())
+
+    @staticmethod
+    def strip(payload):
+        payload.pop('generated_at', None)
+        return payload
+
+    def test_payments_history(self):
+        data = self.get('/api/v1/reports/live/payments-history/')
+        self.assertEqual((data['total_payments'], data['total_amount']), (3, 3000.0))
+        self.assertEqual(data['by_method'], [
+            {'method': 'efectivo', 'count': 2, 'total': 2000.0},
+            {'method': 'transferencia', 'count': 1, 'total': 1000.0},
+        ])
+        self.assertEqual(data['monthly_breakdown'], [
+            {'month': '2024-01', 'count': 2, 'total': 2000.0},
+            {'month': '2024-03', 'count': 1, 'total': 1000.0},
+        ])
+        self.assertEqual([payment['id'] for payment in data['payments']], [p.id for p in reversed(self.payments)])
+        self.assertEqual(
+            {key: data['payments'][0][key] for key in ('receipt_number', 'lote', 'customer', 'installment_number')},
+            {'receipt_number': 'AS-2', 'lote': str(self.payments[2].venta.lote), 'customer': 'Async C2',
+             'installment_number': 1},
+        )
+
+        data = self.get('/api/v1/reports/live/payments-history/', {'start_date': '2024-02-01'})
+        self.assertEqual(data['period'], {'start_date': '2024-02-01', 'end_date': None})
+        self.assertEqual((data['total_payments'], data['total_amount']), (1, 1000.0))
+        self.assertEqual([payment['id'] for payment in data['payments']], [self.payments[2].id])
+
+    def test_monthly_collections(self):
+        data = self.get('/api/v1/reports/live/monthly-collections/')
+        self.assertEqual((data['total_collected'], data['total_transactions']), (3000.0, 3))
+        self.assertEqual(data['by_method'], [
+            {'method': 'efectivo', 'count': 2, 'total': 2000.0, 'percentage': 66.67},
+            {'method': 'transferencia', 'count': 1, 'total': 1000.0, 'percentage': 33.33},
+        ])
+        self.assertEqual(data['monthly_breakdown'], [
+            {
+                'month': '2024-01', 'month_name': 'January 2024', 'count': 2, 'total': 2000.0,
+                'average_per_payment': 1000.0,
+                'by_method': [
+                    {'method': 'efectivo', 'count': 1, 'total': 1000.0},
+                    {'method': 'transferencia', 'count': 1, 'total': 1000.0},
+                ],
+            },
+            {
+                'month': '2024-03', 'month_name': 'March 2024', 'count': 1, 'total': 1000.0,
+                'average_per_payment': 1000.0,
+                'by_method': [{'method': 'efectivo', 'count': 1, 'total': 1000.0}],
+            },
+        ])
+
+        data = self.get('/api/v1/reports/live/monthly-collections/', {'start_date': '2024-02-01'})
+        self.assertEqual((data['total_collected'], data['total_transactions']), (1000.0, 1))
+        self.assertEqual([month['month'] for month in data['monthly_breakdown']], ['2024-03'])
+
+    def test_available_lots(self):
+        data = self.get('/api/v1/reports/live/available-lots/')
+        self.assertEqual(
+            data['summary'],
+            {'total_count': 1, 'total_area': 80.0, 'total_value': 8000.0, 'avg_price_per_m2': 100.0},
+        )
+        self.assertEqual([(lot['block'], lot['lot_number']) for lot in data['lots']], [('A', '9')])
+        self.assertEqual(self.get('/api/v1/reports/live/available-lots/', {'block': 'Z'})['lots'], [])
+
+    def test_dashboard_summary(self):
+        from dashboard.models import DashboardCounters
+        from payments.models import PaymentSchedule
+
+        data = self.get('/api/v1/dashboard/summary/')
+        self.assertEqual(data['info'], DashboardCounters.compute())
+        self.assertEqual(
+            [payment['id'] for payment in data['results']['ultimos_pagos']], [p.id for p in reversed(self.payments)]
+        )
+        upcoming = PaymentSchedule.objects.filter(status='pending').order_by('due_date', 'id')[:5]
+        self.assertEqual(
+            [schedule['id'] for schedule in data['results']['cuotas_proximas_a_vencer']],
+            [schedule.id for schedule in upcoming],
+        )
+
+    def test_reports_require_jwt(self):
+        for url in self.REPORTS:
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 401)
+                self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION='Bearer no-es-un-jwt').status_code, 401)
+                response = self.client.post(url, HTTP_AUTHORIZATION=f'Bearer {self.token}')
+                self.assertEqual(response.status_code, 405)
+
+
+class AgingReportTests(TestCase):
+    """
+    Tramos de antigüedad en sus bordes (0/30/31/60/61/90/91 días), rollups
+    de cartera, manzana y cliente, filtros y exportación CSV.
+    """
+    AS_OF = date(2024, 6, 30)
+
+    @classmethod
+    def setUpTestData(cls):
+        from payments.models import PaymentSchedule
+
+        cls.user = User.objects.create_user(username='aging', email='aging@example.com', password='x')
+
+        def sale(block, lot_number, last_name):
+            lote = Lote.objects.create(block=block, lot_number=lot_number, area=Decimal('100.00'), price=Decimal('9000.00'))
+            return Venta.create_sale(
+                lote=lote, customer=Customer.objects.create(first_name='Aging', last_name=last_name),
+                sale_price=Decimal('6000.00'), payment_day=5, financing_months=6,
+            )
+
+        def set_due_dates(venta, days_overdue):
+            for installment_number, days in enumerate(days_overdue, start=1):
+                PaymentSchedule.objects.filter(venta=venta, installment_number=installment_number).update(
+                    due_date=cls.AS_OF - timedelta(days=days)
+                )
+
+        # Manzana N: una cuota en cada borde de los tramos vencidos
+        cls.late = sale('N', '1', 'Atrasado')
+        set_due_dates(cls.late, [91, 90, 61, 60, 31, 30])
+
+        # Manzana M: al día; una cuota parcial y una perdonada
+        cls.current = sale('M', '1', 'Puntual')
+        cls.current.payment_schedules.get(installment_number=3).register_payment(amount=Decimal('400.00'))
+        cls.current.payment_schedules.get(installment_number=4).forgive_installment()
+        set_due_dates(cls.current, [0, -10, -40, -70, -100, -130])
+
+        # Las cuotas de ventas canceladas no cuentan
+        cancelled = sale('N', '2', 'Cancelado')
+        set_due_dates(cancelled, [200] * 6)
+        cancelled.cancel_sale(reason='Desistimiento')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    @staticmethod
+    def buckets(row):
+        return {bucket['bucket']: (bucket['installments'], bucket['amount']) for bucket in row['buckets']}
+
+    def test_bucket_boundaries(self):
+        from .aging import AgingReport
+
+        # (numero_cuota, dias_atraso, tramo)
+        late = AgingReport(as_of=self.AS_OF, customer_id=self.late.customer_id).detail_rows()
+        self.assertEqual(sorted((row[6], row[8], row[9]) for row in late), [
+            (1, 91, '90_plus'), (2, 90, '61_90'), (3, 61, '61_90'),
+            (4, 60, '31_60'), (5, 31, '31_60'), (6, 30, '0_30'),
+        ])
+        # Vencer hoy aún no es atraso; la cuota perdonada no aparece
+        current = AgingReport(as_of=self.AS_OF, block='M').detail_rows()
+        self.assertEqual(sorted((row[6], row[8], row[9]) for row in current), [
+            (1, 0, 'current'), (2, 0, 'current'), (3, 0, 'current'), (5, 0, 'current'), (6, 0, 'current'),
+        ])
+
+    def test_portfolio_block_and_customer_rollups(self):
+        response = self.client.get('/api/v1/reports/live/aging/', {'as_of': self.AS_OF.isoformat()})
+        self.assertEqual(response.status_code, 200)
+
+        portfolio = response.data['portfolio']
+        self.assertEqual(self.buckets(portfolio), {
+            'current': (5, 4600.0),
+            '0_30': (1, 1000.0),
+            '31_60': (2, 2000.0),
+            '61_90': (2, 2000.0),
+            '90_plus': (1, 1000.0),
+        })
+        self.assertEqual(
+            (portfolio['total_installments'], portfolio['total_amount'], portfolio['overdue_amount']),
+            (11, 10600.0, 6000.0),
+        )
+        self.assertEqual(portfolio['customers'], 2)
+
+        self.assertEqual(
+            [(row['block'], row['total_amount'], row['overdue_amount'], row['customers'])
+             for row in response.data['by_block']],
+            [('M', 4600.0, 0.0, 1), ('N', 6000.0, 6000.0, 1)],
+        )
+        self.assertEqual(
+            [(row['customer_id'], row['customer_name'], row['total_amount'])
+             for row in response.data['by_customer']],
+            [(self.late.customer_id, 'Aging Atrasado', 6000.0), (self.current.customer_id, 'Aging Puntual', 4600.0)],
+        )
+
+    def test_filters(self):
+        url = '/api/v1/reports/live/aging/'
+        by_block = self.client.get(url, {'as_of': self.AS_OF.isoformat(), 'block': 'N'}).data
+        self.assertEqual(by_block['portfolio']['total_amount'], 6000.0)
+        self.assertEqual([row['block'] for row in by_block['by_block']], ['N'])
+
+        by_customer = self.client.get(
+            url, {'as_of': self.AS_OF.isoformat(), 'customer': self.current.customer_id}
+        ).data
+        self.assertEqual(self.buckets(by_customer['portfolio'])['current'], (5, 4600.0))
+        self.assertEqual(
+            [row['customer_id'] for row in by_customer['by_customer']], [self.current.customer_id]
+        )
+
+        for params in ({'customer': 'abc'}, {'as_of': '30/06/2024'}):
+            for endpoint in (url, '/api/v1/reports/live/aging/export/'):
+                with self.subTest(endpoint=endpoint, params=params):
+                    response = self.client.get(endpoint, params)
+                    self.assertEqual(response.status_code, 400)
+                    self.assertIn('error', response.data)
+
+    def test_export_streams_under_wsgi_and_asgi(self):
+        from asgiref.sync import async_to_sync
+        from django.test import AsyncClient
+        from rest_framework_simplejwt.tokens import RefreshToken
+
+        url = '/api/v1/reports/live/aging/export/'
+        params = {'as_of': self.AS_OF.isoformat()}
+        response = self.client.get(url, params)
+        self.assertFalse(response.is_async)
+        content = b''.join(response.streaming_content)
+
+        lines = content.decode().splitlines()
+        self.assertEqual(lines[0].split(',')[:3], ['cuota_id', 'cliente_id', 'cliente'])
+        self.assertEqual(len(lines), 1 + 11)
+
+        token = str(RefreshToken.for_user(self.user).access_token)
+
+        async def asgi_export():
+            response = await AsyncClient().get(url, params, headers={'Authorization': f'Bearer {token}'})
+            return response, b''.join([chunk async for chunk in response.streaming_content])
+
+        response, asgi_content = async_to_sync(asgi_export)()
+        self.assertTrue(response.is_async)
+        self.assertEqual(asgi_content, content)
+
+
+class CashFlowForecastTests(TestCase):
+    """
+    CashFlowForecast (consultas agrupadas + NumPy) contra una referencia en
+    Python que recorre las cuotas una por una.
+    """
+    AS_OF = date(2024, 6, 15)
+
+    @classmethod
+    def setUpTestData(cls):
+        from payments.models import PaymentSchedule
+
+        def sale(lot_number, last_name, due_dates):
+            lote = Lote.objects.create(block='F', lot_number=lot_number, area=Decimal('100.00'), price=Decimal('5000.00'))
+            venta = Venta.create_sale(
+                lote=lote, customer=Customer.objects.create(first_name='Flujo', last_name=last_name),
+                sale_price=Decimal('4000.00'), payment_day=5, financing_months=len(due_dates),
+            )
+            for installment_number, due_date in enumerate(due_dates, start=1):
+                PaymentSchedule.objects.filter(venta=venta, installment_number=installment_number).update(
+                    due_date=due_date
+                )
+            return venta
+
+        def pay(venta, installment_number, amount, day):
+            venta.payment_schedules.get(installment_number=installment_number).register_payment(
+                amount=Decimal(amount), payment_date=datetime.combine(day, datetime.min.time(), dt_timezone.utc)
+            )
+
+        # A: una a tiempo, una tarde, una vencida y una parcial (historial 1 de 3)
+        late = sale('1', 'Tardío', [date(2024, 4, 10), date(2024, 5, 10), date(2024, 6, 10), date(2024, 7, 10)])
+        pay(late, 1, '1000.00', date(2024, 4, 8))
+        pay(late, 2, '1000.00', date(2024, 5, 20))
+        pay(late, 4, '300.00', date(2024, 6, 1))
+
+        # B: puntual (1 de 1); la cuota de septiembre está perdonada
+        punctual = sale('2', 'Puntual', [date(2024, 5, 5), date(2024, 6, 20), date(2024, 8, 5), date(2024, 9, 5)])
+        pay(punctual, 1, '1000.00', date(2024, 5, 5))
+        punctual.payment_schedules.get(installment_number=4).forgive_installment()
+
+        # C: sin historial, usa la tasa de la cartera; la última cuota queda fuera del horizonte
+        sale('3', 'Nuevo', [date(2024, 6, 25), date(2024, 7, 25), date(2024, 8, 25), date(2024, 11, 25)])
+
+        # Una venta sin cuotas y una cancelada con cuotas vencidas no aportan nada
+        sale('4', 'Sin cuotas', [date(2024, 6, 5)]).payment_schedules.all().delete()
+        sale('5', 'Cancelado', [date(2024, 3, 5), date(2024, 4, 5)]).cancel_sale(reason='Desistimiento')
+
+    @staticmethod
+    def reference(forecast):
+        """La misma proyección, cuota por cuota."""
+        from payments.models import PaymentSchedule
+        from .forecast import OPEN_STATUSES, PRIOR_WEIGHT
+
+        schedules = [
+            schedule for schedule in PaymentSchedule.objects.filter(venta__status='active', is_forgiven=False)
+            .select_related('venta__lote')
+            if not forecast.block or schedule.venta.lote.block == forecast.block
+        ]
+        history = defaultdict(lambda: [0, 0])
+        for schedule in schedules:
+            customer = history[schedule.venta.customer_id]
+            if schedule.status == 'paid' and schedule.payment_date:
+                customer[0] += 1
+                customer[1] += schedule.payment_date.date() <= schedule.due_date
+            elif schedule.status in OPEN_STATUSES and schedule.due_date < forecast.as_of:
+                customer[0] += 1
+
+        total = sum(counts[0] for counts in history.values() if counts[0])
+        on_time = sum(counts[1] for counts in history.values() if counts[0])
+        portfolio = on_time / total if total else 1.0
+        ratios = {
+            customer_id: (counts[1] + PRIOR_WEIGHT * portfolio) / (counts[0] + PRIOR_WEIGHT)
+            for customer_id, counts in history.items() if counts[0]
+        }
+
+        periods = forecast.periods()
+        by_period = {start: {'scheduled': 0.0, 'overdue': 0.0, 'expected': 0.0} for start in periods[:-1]}
+        for schedule in schedules:
+            if schedule.status not in OPEN_STATUSES or schedule.due_date >= periods[-1]:
+                continue
+            remaining = float(max(schedule.scheduled_amount - schedule.paid_amount, Decimal('0.00')))
+            period = by_period[forecast.period_start(max(schedule.due_date, forecast.as_of))]
+            period['scheduled'] += remaining
+            period['expected'] += remaining * ratios.get(schedule.venta.customer_id, portfolio)
+            if schedule.due_date < forecast.as_of:
+                period['overdue'] += remaining
+        return portfolio, by_period
+
+    def assertMatchesReference(self, forecast):
+        data = forecast.compute()
+        portfolio, by_period = self.reference(forecast)
+
+        self.assertAlmostEqual(data['portfolio_on_time_ratio'], portfolio, places=4)
+        self.assertEqual(len(data['periods']), len(by_period))
+        for row, (start, expected) in zip(data['periods'], by_period.items()):
+            with self.subTest(granularity=forecast.granularity, period=row['period_start']):
+                self.assertEqual(row['period_start'], start.isoformat())
+                self.assertAlmostEqual(row['scheduled_amount'], expected['scheduled'], places=2)
+                self.assertAlmostEqual(row['overdue_amount'], expected['overdue'], places=2)
+                self.assertAlmostEqual(row['expected_amount'], expected['expected'], places=2)
+        return data
+
+    def test_monthly_matches_reference(self):
+        from .forecast import CashFlowForecast
+
+        data = self.assertMatchesReference(CashFlowForecast('month', horizon=4, as_of=self.AS_OF))
+
+        # A: 1 de 3 a tiempo, B: 1 de 1; septiembre no tiene cobranzas
+        self.assertEqual(data['portfolio_on_time_ratio'], 0.5)
+        self.assertEqual(
+            [(row['period_start'], row['scheduled_amount'], row['overdue_amount']) for row in data['periods']],
+            [('2024-06-01', 3000.0, 1000.0), ('2024-07-01', 1700.0, 0.0),
+             ('2024-08-01', 2000.0, 0.0), ('2024-09-01', 0.0, 0.0)],
+        )
+        self.assertEqual(data['periods'][-1]['expected_amount'], 0.0)
+        self.assertEqual(data['customers'], 3)
+
+    def test_weekly_and_block_match_reference(self):
+        from .forecast import CashFlowForecast
+
+        self.assertMatchesReference(CashFlowForecast('week', horizon=16, as_of=self.AS_OF))
+        empty = self.assertMatchesReference(CashFlowForecast('month', horizon=2, as_of=self.AS_OF, block='Z'))
+        self.assertEqual((empty['customers'], empty['totals']['expected_amount']), (0, 0.0))
+
+
+class ArchivedPaymentsReportTests(TestCase):
+    """
+    Archivar una venta no cambia los reportes de pagos ni el listado y los
+    totales de /payments/: todos leen la tabla activa y el archivo.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='tiers', email='tiers@example.com', password='x', role='admin'
+        )
+        ventas = []
+        for index, payments in enumerate([
+            [(1, 'efectivo', '700.00'), (2, 'transferencia', '300.00')],
+            [(1, 'transferencia', '450.00'), (3, 'efectivo', '1000.00')],
+            [(2, 'efectivo', '250.00'), (3, 'efectivo', '125.50')],
+        ]):
+            customer = Customer.objects.create(first_name='Nivel', last_name=f'C{index}')
+            lote = Lote.objects.create(
+                block='T', lot_number=str(index), area=Decimal('100.00'), price=Decimal('10000.00')
+            )
+            venta = Venta.create_sale(
+                lote=lote, customer=customer, sale_price=Decimal('6000.00'), payment_day=5, financing_months=6,
+            )
+            for number, (month, method, amount) in enumerate(payments, start=1):
+                venta.payment_schedules.get(installment_number=number).register_payment(
+                    amount=Decimal(amount), payment_method=method, receipt_number=f'T{index}-{number}',
+                    payment_date=datetime(2024, month, 10 + index, tzinfo=dt_timezone.utc),
+                )
+            ventas.append(venta)
+        # La venta del medio se cierra y es la que se archiva
+        cls.archived = ventas[1]
+        Venta.objects.filter(pk=cls.archived.pk).update(
+            status='cancelled', cancellation_date=datetime.now(dt_timezone.utc)
+        )
+
+    def setUp(self):
+        from rest_framework_simplejwt.tokens import RefreshToken
+
+        cache.clear()
+        self.token = str(RefreshToken.for_user(self.user).access_token)
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+    def snapshot(self):
+        reports = {}
+        for url in (
+            '/api/v1/reports/live/payments-history/',
+            '/api/v1/reports/live/monthly-collections/',
+            '/api/v1/reports/live/financial-overview/',
+        ):
+            for params in ({}, {'start_date': '2024-02-01'}, {'method': 'efectivo'}):
+                response = self.client.get(url, params, HTTP_AUTHORIZATION=f'Bearer {self.token}')
+                self.assertEqual(response.status_code, 200)
+                reports[url, str(params)] = AsyncReportViewsTests.strip(response.json())
+
+        listings = {}
+        for params in (
+            {}, {'method': 'efectivo'}, {'venta__id': self.archived.id}, {'search': 'T1-2'},
+            {'ordering': 'amount', 'page_size': 2, 'page': 2}, {'page_size': 4, 'page': 2},
+        ):
+            response = self.api.get('/api/v1/payments/payments/', params)
+            self.assertEqual(response.status_code, 200)
+            payload = response.json()
+            listings[str(params)] = (
+                payload['info'], [(row['id'], row['amount'], row['receipt_number']) for row in payload['results']]
+            )
+        return reports, listings
+
+    def test_archiving_keeps_report_totals(self):
+        from payments.archive import archive_ventas
+        from payments.models import ArchivedPayment
+
+        before = self.snapshot()
+        reports, listings = before
+        self.assertEqual(reports['/api/v1/reports/live/payments-history/', '{}']['total_payments'], 6)
+        self.assertEqual(
+            reports['/api/v1/reports/live/financial-overview/', '{}']['payments']['total_amount'], 2825.5
+        )
+        self.assertEqual(listings['{}'][0]['count'], 6)
+        self.assertEqual([row[2] for row in listings[str({'search': 'T1-2'})][1]], ['T1-2'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(archive_ventas([self.archived.id])['payments'], 2)
+        self.assertEqual(ArchivedPayment.objects.count(), 2)
+        self.assertEqual(Payment.objects.count(), 4)
+
+        self.assertEqual(self.snapshot(), before)
@@ -9,11 +9,17 @@ from .views import (
 )
 from .dynamic_views import (
     customers_debt_live,
-    payments_history_live,
-    available_lots_live,
     pending_installments_live,
     sales_summary_live,
     financial_overview_live,
+    aging_report_live,
+    aging_report_export,
+    cash_flow_forecast_live,
+)
+# Reportes de solo lectura servidos por vistas async (ORM async + asyncio.gather)
+from .async_views import (
+    payments_history_live,
+    available_lots_live,
     monthly_collections_live
 )
 
@@ -40,4 +46,7 @@ urlpatterns = [
     path('live/sales-summary/', sales_summary_live, name='sales-summary-live'),
     path('live/financial-overview/', financial_overview_live, name='financial-overview-live'),
     path('live/monthly-collections/', monthly_collections_live, name='monthly-collections-live'),
+    path('live/aging/', aging_report_live, name='aging-live'),
+    path('live/aging/export/', aging_report_export, name='aging-export'),
+    path('live/cash-flow-forecast/', cash_flow_forecast_live, name='cash-flow-forecast-live'),
 ]
@@ -0,0 +1,328 @@
+"""
+Importación masiva de ventas (bulk-create JSON y comando import_sales).
+
+Venta.create_sale hace, por venta, full_clean, la actualización del estado
+del lote, el INSERT del plan de pagos y un INSERT por cuota. Aquí las filas
+se validan sin consultas, las referencias (lotes por id o por manzana y
+número, clientes por id o por número de documento) y la disponibilidad de
+los lotes se resuelven con una consulta por conjunto, y cada bloque se
+guarda con un UPDATE de los lotes y bulk_create de ventas, planes y cuotas.
+Como bulk_create y update no disparan señales, los contadores del dashboard
+se ajustan una vez por bloque, en la misma transacción.
+"""
+import csv
+from datetime import datetime
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework import serializers
+
+from customers.models import Customer
+from lotes.bulk import lotes_by_pairs
+from lotes.models import Lote
+from .models import Venta
+
+
+SALE_FIELDS = (
+    'lote', 'block', 'lot_number', 'customer', 'document_number', 'sale_price', 'initial_payment',
+    'payment_day', 'financing_months', 'contract_date', 'schedule_start_date', 'notes',
+)
+
+# Campos de la fila que se copian tal cual a la venta
+VENTA_FIELDS = (
+    'sale_price', 'initial_payment', 'payment_day', 'financing_months', 'contract_date', 'schedule_start_date',
+    'notes',
+)
+
+BATCH_SIZE = 200
+SCHEDULE_BATCH_SIZE = 5000
+MAX_ERRORS = 100
+
+
+class SaleRowSerializer(serializers.Serializer):
+    """
+    Validación de una fila sin consultas. El lote se indica por id (lote) o
+    por manzana y número (block, lot_number); el cliente por id (customer) o
+    por número de documento (document_number).
+    """
+    lote = serializers.IntegerField(required=False, min_value=1)
+    block = serializers.CharField(required=False, max_length=50)
+    lot_number = serializers.CharField(required=False, max_length=50)
+    customer = serializers.IntegerField(required=False, min_value=1)
+    document_number = serializers.CharField(required=False, max_length=50)
+    sale_price = serializers.DecimalField(max_digits=12, decimal_places=2)
+    initial_payment = serializers.DecimalField(
+        max_digits=12, decimal_places=2, required=False, default=Decimal('0.00')
+    )
+    payment_day = serializers.IntegerField(min_value=1, max_value=31)
+    financing_months = serializers.IntegerField(min_value=1, max_value=120)
+    contract_date = serializers.DateField(required=False)
+    schedule_start_date = serializers.CharField(
+        required=False, help_text=_("Fecha de inicio del cronograma en formato YYYY-MM")
+    )
+    notes = serializers.CharField(required=False, default='')
+
+    def to_internal_value(self, data):
+        if not isinstance(data, dict):
+            raise serializers.ValidationError({'non_field_errors': [_("Se esperaba un objeto con los datos de la venta.")]})
+        # Celdas vacías o ausentes (CSV) como campo no informado
+        data = {
+            field: value.strip() if isinstance(value, str) else value
+            for field, value in data.items() if field in SALE_FIELDS
+        }
+        data = {field: value for field, value in data.items() if value not in ('', None)}
+        return super().to_internal_value(data)
+
+    def validate_sale_price(self, value):
+        if value <= 0:
+            raise serializers.ValidationError(_("El precio de venta debe ser mayor a cero"))
+        return value
+
+    def validate_schedule_start_date(self, value):
+        # Igual que VentaCreateSerializer: YYYY-MM -> primer día del mes
+        try:
+            return datetime.strptime(value, '%Y-%m').date()
+        except ValueError:
+            raise serializers.ValidationError(_("Formato inválido, se espera YYYY-MM."))
+
+    def validate(self, attrs):
+        if 'lote' not in attrs and not ('block' in attrs and 'lot_number' in attrs):
+            raise serializers.ValidationError({'lote': [_("Indique el lote (id) o la manzana y el número.")]})
+        if 'customer' not in attrs and 'document_number' not in attrs:
+            raise serializers.ValidationError(
+                {'customer': [_("Indique el cliente (id) o su número de documento.")]}
+            )
+        if attrs['initial_payment'] > attrs['sale_price']:
+            raise serializers.ValidationError(
+                {'initial_payment': [_("El pago inicial no puede ser mayor al precio de venta")]}
+            )
+        return attrs
+
+
+class SaleImporter:
+    """
+    Valida e inserta ventas por bloques dentro de una importación.
+
+    Los bloques sucesivos comparten los lotes vendidos en los bloques ya
+    confirmados (record_lotes), así que un mismo lote en el primer y el
+    último bloque también se detecta; los de un bloque revertido quedan libres.
+    Las posiciones de los errores son 1-based (fila del lote o del CSV).
+    """
+
+    def __init__(self):
+        self.row_serializer = SaleRowSerializer()
+        self.seen_lotes = {}
+        self.errors = []
+        # Total de errores: self.errors guarda solo los primeros MAX_ERRORS
+        self.error_count = 0
+        self.created_count = 0
+        self.schedules_count = 0
+
+    def add_error(self, position, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append(
+                _("Venta en la posición {position}: {message}").format(position=position, message=message)
+            )
+
+    def validate(self, rows, start=1):
+        """
+        Retorna las filas válidas como (posición, datos de la venta con
+        lote_id y customer_id); los errores se acumulan en self.errors.
+        """
+        cleaned_rows = []
+        for position, data in enumerate(rows, start=start):
+            try:
+                cleaned_rows.append((position, self.row_serializer.run_validation(data)))
+            except serializers.ValidationError as exc:
+                detail = exc.detail if isinstance(exc.detail, dict) else {'non_field_errors': exc.detail}
+                for field, messages in detail.items():
+                    self.add_error(position, f"{field}: {' '.join(str(message) for message in messages)}")
+        if not cleaned_rows:
+            return []
+
+        lotes, lotes_by_pair, sold_lote_ids = self._resolve_lotes([data for position, data in cleaned_rows])
+        customer_ids, customers_by_document = self._resolve_customers([data for position, data in cleaned_rows])
+
+        valid = []
+        chunk_lotes = {}
+        for position, data in cleaned_rows:
+            if 'lote' in data:
+                lote = lotes.get(data['lote'])
+                reference = f"#{data['lote']}"
+            else:
+                lote = lotes_by_pair.get((data['block'], data['lot_number']))
+                reference = f"Mz. {data['block']} - Lt. {data['lot_number']}"
+            if 'customer' in data:
+                customer_id = data['customer'] if data['customer'] in customer_ids else None
+            else:
+                customer_id = customers_by_document.get(data['document_number'])
+
+            if lote is None:
+                self.add_error(position, _("El lote {lote} no existe.").format(lote=reference))
+                continue
+            if customer_id is None:
+                self.add_error(position, _("El cliente {customer} no existe.").format(
+                    customer=f"#{data['customer']}" if 'customer' in data else data['document_number']
+                ))
+                continue
+            if lote['status'] != 'disponible' or lote['id'] in sold_lote_ids:
+                self.add_error(position, _("El lote {lote} no está disponible para venta").format(lote=reference))
+                continue
+            previous = self.seen_lotes.get(lote['id'], chunk_lotes.get(lote['id']))
+            if previous is not None:
+                self.add_error(position, _("El lote {lote} está duplicado con la posición {previous}.").format(
+                    lote=reference, previous=previous
+                ))
+                continue
+            chunk_lotes[lote['id']] = position
+
+            venta_data = {field: data[field] for field in VENTA_FIELDS if field in data}
+            valid.append((position, {'lote_id': lote['id'], 'customer_id': customer_id, **venta_data}))
+        return valid
+
+    def record_lotes(self, valid):
+        """Registra los lotes de un bloque confirmado para los bloques siguientes."""
+        self.seen_lotes.update((data['lote_id'], position) for position, data in valid)
+
+    @staticmethod
+    def _resolve_lotes(rows):
+        """Lotes referidos por id y por par (manzana, número), y los que ya tienen una venta activa."""
+        fields = ('id', 'block', 'lot_number', 'status')
+        ids = {data['lote'] for data in rows if 'lote' in data}
+        pairs = {(data['block'], data['lot_number']) for data in rows if 'lote' not in data}
+
+        lotes = {lote['id']: lote for lote in Lote.objects.filter(pk__in=ids).values(*fields)} if ids else {}
+        lotes_by_pair = {(lote['block'], lote['lot_number']): lote for lote in lotes_by_pairs(pairs, *fields)}
+
+        lote_ids = set(lotes) | {lote['id'] for lote in lotes_by_pair.values()}
+        sold_lote_ids = set(
+            Venta.objects.filter(lote_id__in=lote_ids, status='active').values_list('lote_id', flat=True)
+        ) if lote_ids else set()
+        return lotes, lotes_by_pair, sold_lote_ids
+
+    @staticmethod
+    def _resolve_customers(rows):
+        """Ids de clientes existentes y clientes por número de documento."""
+        ids = {data['customer'] for data in rows if 'customer' in data}
+        documents = {data['document_number'] for data in rows if 'customer' not in data}
+
+        customer_ids = set(Customer.objects.filter(pk__in=ids).values_list('id', flat=True)) if ids else set()
+        customers_by_document = dict(
+            Customer.objects.filter(document_number__in=documents).values_list('document_number', 'id')
+        ) if documents else {}
+        return customer_ids, customers_by_document
+
+    def save(self, valid):
+        """
+        Guarda un bloque validado: marca los lotes como vendidos, inserta
+        ventas, planes y cuotas con bulk_create y ajusta los contadores del
+        dashboard. Debe ejecutarse dentro de una transacción; retorna las
+        ventas creadas o [] si algún lote dejó de estar disponible (con el
+        error registrado, para que quien llama revierta la transacción).
+        """
+        from dashboard.events import publish
+        from dashboard.models import DashboardCounters
+        from payments.models import PaymentPlan, PaymentSchedule
+
+        if not valid:
+            return []
+
+        # UPDATE condicionado: si otra petición vendió alguno de los lotes
+        # desde la validación, el conteo no coincide
+        lote_ids = [data['lote_id'] for position, data in valid]
+        updated = Lote.objects.filter(pk__in=lote_ids, status='disponible').update(
+            status='vendido', updated_at=timezone.now()
+        )
+        if updated != len(lote_ids):
+            self.error_count += 1
+            self.errors.append(_("Algunos lotes dejaron de estar disponibles durante la importación."))
+            return []
+
+        ventas = Venta.objects.bulk_create([Venta(status='active', **data) for position, data in valid])
+        PaymentPlan.objects.bulk_create([
+            PaymentPlan(venta=venta, start_date=venta.sale_date.date(), payment_day=venta.payment_day)
+            for venta in ventas
+        ])
+
+        today = timezone.localdate()
+        overdue = 0
+        pending = []
+        for venta in ventas:
+            schedules = PaymentSchedule.build_schedule_for_venta(venta, today=today)
+            overdue += sum(1 for schedule in schedules if schedule.status == 'overdue')
+            pending.extend(schedules)
+            if len(pending) >= SCHEDULE_BATCH_SIZE:
+                self._insert_schedules(pending)
+                pending = []
+        self._insert_schedules(pending)
+
+        DashboardCounters.apply_deltas(
+            lotes_disponibles=-len(ventas), lotes_vendidos=len(ventas), cuotas_vencidas=overdue
+        )
+        if overdue:
+            publish('overdue', {'count': overdue})
+
+        self.created_count += len(ventas)
+        return ventas
+
+    def _insert_schedules(self, schedules):
+        from payments.models import PaymentSchedule
+        if schedules:
+            PaymentSchedule.objects.bulk_create(schedules, batch_size=SCHEDULE_BATCH_SIZE)
+            self.schedules_count += len(schedules)
+
+
+def compact_venta(venta):
+    """Representación reducida de una venta recién creada."""
+    return {
+        'id': venta.id,
+        'lote_id': venta.lote_id,
+        'customer_id': venta.customer_id,
+        'sale_price': venta.sale_price,
+        'financing_months': venta.financing_months,
+    }
+
+
+def import_rows(rows, batch_size=BATCH_SIZE, start=2):
+    """
+    Importa ventas desde un iterable de filas (diccionarios con los nombres
+    de SALE_FIELDS) con una transacción por bloque de batch_size filas: un
+    bloque con errores no se guarda y la importación sigue con el siguiente.
+    start es la posición de la primera fila (2 en un CSV con cabecera).
+    Retorna el importador y la lista de (primera, última posición) de los
+    bloques descartados.
+    """
+    importer = SaleImporter()
+    skipped = []
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == batch_size:
+            _import_chunk(importer, chunk, start, skipped)
+            start += len(chunk)
+            chunk = []
+    if chunk:
+        _import_chunk(importer, chunk, start, skipped)
+    return importer, skipped
+
+
+def _import_chunk(importer, chunk, start, skipped):
+    errors_before = importer.error_count
+    with transaction.atomic():
+        valid = importer.validate(chunk, start=start)
+        if importer.error_count == errors_before:
+            importer.save(valid)
+        if importer.error_count != errors_before:
+            transaction.set_rollback(True)
+            skipped.append((start, start + len(chunk) - 1))
+            return
+    importer.record_lotes(valid)
+
+
+def read_csv(path):
+    """Filas de un CSV de ventas (cabecera con los nombres de SALE_FIELDS)."""
+    with open(path, encoding='utf-8-sig', newline='') as csv_file:
+        yield from csv.DictReader(csv_file)
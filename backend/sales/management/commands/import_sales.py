@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from sales.bulk import BATCH_SIZE, SALE_FIELDS, import_rows, read_csv
+
+
+class Command(BaseCommand):
+    help = (
+        'Importa ventas desde un CSV (con plan y cronograma de pagos) con una transacción por bloque. '
+        f'Columnas: {",".join(SALE_FIELDS)}; el lote se indica por id (lote) o por block y lot_number, '
+        'y el cliente por id (customer) o por document_number'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Ruta del archivo CSV')
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help=f'Ventas por bloque/transacción (default: {BATCH_SIZE})'
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size debe ser mayor a 0')
+
+        started = time.perf_counter()
+        try:
+            importer, skipped = import_rows(read_csv(options['path']), batch_size=options['batch_size'])
+        except FileNotFoundError:
+            raise CommandError(f'No existe el archivo {options["path"]}')
+        elapsed = time.perf_counter() - started
+
+        for error in importer.errors:
+            self.stderr.write(str(error))
+        if importer.error_count > len(importer.errors):
+            self.stderr.write(f'... y {importer.error_count - len(importer.errors)} errores más')
+        for first, last in skipped:
+            self.stderr.write(self.style.WARNING(f'Bloque de filas {first}-{last} descartado por errores'))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Se crearon {importer.created_count} ventas y {importer.schedules_count} cuotas en {elapsed:.1f} s'
+        ))
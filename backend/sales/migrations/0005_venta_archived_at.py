@@ -0,0 +1,18 @@
+# Generated by Django 4.2.10 on 2026-10-19 08:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0004_venta_schedule_start_date'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='venta',
+            name='archived_at',
+            field=models.DateTimeField(blank=True, help_text='Fecha en que sus cuotas y pagos pasaron al archivo (ver payments/archive.py)', null=True, verbose_name='Fecha de Archivado'),
+        ),
+    ]
@@ -1,9 +1,139 @@
 from django.db import models
+from django.db.models.functions import Coalesce, Greatest
 from django.utils.translation import gettext_lazy as _
 from django.core.exceptions import ValidationError
 from decimal import Decimal
 
 
+class VentaQuerySet(models.QuerySet):
+    """
+    Anotaciones calculadas en la base de datos para reportes sobre muchas
+    ventas. Cada valor se obtiene con una subconsulta correlacionada, así que
+    pueden combinarse sin multiplicar filas por los joins. Las ventas
+    archivadas (archived_at) leen sus cuotas y pagos de las tablas de archivo.
+    """
+    MONEY = models.DecimalField(max_digits=14, decimal_places=2)
+
+    @staticmethod
+    def _per_venta(queryset, aggregate, default, output_field):
+        subquery = queryset.order_by().values('venta').annotate(total=aggregate).values('total')[:1]
+        return Coalesce(
+            models.Subquery(subquery), models.Value(default), output_field=output_field
+        )
+
+    @staticmethod
+    def _by_tier(active, archived, output_field):
+        """Expresión de la tabla activa o, si la venta está archivada, del archivo."""
+        return models.Case(
+            models.When(archived_at__isnull=True, then=active),
+            default=archived,
+            output_field=output_field,
+        )
+
+    @staticmethod
+    def _schedules(archived=False):
+        from payments.models import ArchivedPaymentSchedule, PaymentSchedule
+
+        model = ArchivedPaymentSchedule if archived else PaymentSchedule
+        return model.objects.filter(venta=models.OuterRef('pk'))
+
+    @staticmethod
+    def _payments(archived=False):
+        from payments.models import ArchivedPayment, Payment
+
+        model = ArchivedPayment if archived else Payment
+        return model.objects.filter(venta=models.OuterRef('pk'))
+
+    def with_balances(self):
+        """
+        Anota el saldo pendiente de cada venta, equivalente a la propiedad
+        remaining_balance:
+        - installments_remaining: saldo de cuotas no perdonadas
+        - initial_paid: total abonado al pago inicial
+        - pending_balance: cuotas + pago inicial pendiente (mínimo 0)
+        """
+        zero = Decimal('0.00')
+
+        schedule_remaining = models.Case(
+            models.When(is_forgiven=True, then=models.Value(zero)),
+            default=Greatest(
+                models.F('scheduled_amount') - models.F('paid_amount'), models.Value(zero)
+            ),
+            output_field=self.MONEY,
+        )
+
+        def per_tier(archived):
+            schedules = self._schedules(archived)
+            initial_payments = self._payments(archived).filter(payment_type='initial')
+            return {
+                'installments_remaining': self._per_venta(
+                    schedules, models.Sum(schedule_remaining), zero, self.MONEY
+                ),
+                'initial_paid': self._per_venta(initial_payments, models.Sum('amount'), zero, self.MONEY),
+            }
+
+        active, archived = per_tier(False), per_tier(True)
+        return self.annotate(**{
+            name: self._by_tier(expression, archived[name], self.MONEY) for name, expression in active.items()
+        }).annotate(
+            pending_balance=Greatest(
+                models.F('installments_remaining') + models.F('initial_payment') - models.F('initial_paid'),
+                models.Value(zero),
+                output_field=self.MONEY,
+            )
+        )
+
+    def with_installment_progress(self):
+        """
+        Anota el avance de cuotas de cada venta:
+        - installments_total: cuotas programadas
+        - installments_paid: pagos de cuota registrados
+        - installments_forgiven: cuotas perdonadas
+        - next_due_date: vencimiento de la próxima cuota sin completar
+        """
+        count = models.IntegerField()
+
+        def per_tier(archived):
+            schedules = self._schedules(archived)
+            installment_payments = self._payments(archived).filter(payment_type='installment')
+            return {
+                'installments_total': self._per_venta(schedules, models.Count('id'), 0, count),
+                'installments_paid': self._per_venta(installment_payments, models.Count('id'), 0, count),
+                'installments_forgiven': self._per_venta(
+                    schedules.filter(status='forgiven'), models.Count('id'), 0, count
+                ),
+                'next_due_date': models.Subquery(
+                    schedules.filter(
+                        status__in=['pending', 'overdue', 'partial']
+                    ).order_by('installment_number').values('due_date')[:1]
+                ),
+            }
+
+        active, archived = per_tier(False), per_tier(True)
+        return self.annotate(**{
+            name: self._by_tier(
+                expression, archived[name], models.DateField() if name == 'next_due_date' else count
+            )
+            for name, expression in active.items()
+        })
+
+    def for_listing(self):
+        """
+        Queryset de los listados de ventas (VentaSummarySerializer): lote y
+        cliente en el mismo SELECT y, anotados, el saldo pendiente
+        (with_balances), el total pagado y el día de pago del plan, sin
+        consultas por fila.
+        """
+        total_paid = [
+            self._per_venta(self._payments(archived), models.Sum('amount'), Decimal('0.00'), self.MONEY)
+            for archived in (False, True)
+        ]
+        return self.select_related('lote', 'customer').with_balances().annotate(
+            total_paid=self._by_tier(*total_paid, self.MONEY),
+            plan_payment_day=Coalesce(models.F('plan_pagos__payment_day'), models.F('payment_day')),
+        )
+
+
 class Venta(models.Model):
     """
     Modelo central que representa un contrato de venta entre un cliente y un lote.
@@ -113,6 +243,13 @@ class Venta(models.Model):
         verbose_name=_("Fecha de Finalización"),
         help_text=_("Fecha en que se completó el pago total")
     )
+
+    archived_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name=_("Fecha de Archivado"),
+        help_text=_("Fecha en que sus cuotas y pagos pasaron al archivo (ver payments/archive.py)")
+    )
     
     # Información adicional
     notes = models.TextField(
@@ -130,6 +267,8 @@ class Venta(models.Model):
     # Metadatos
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    objects = VentaQuerySet.as_manager()
     
     class Meta:
         verbose_name = _("Venta")
@@ -170,7 +309,13 @@ class Venta(models.Model):
                 raise ValidationError(_("Ya existe una venta activa para este lote"))
     
     def save(self, *args, **kwargs):
+        from payments.archive import ARCHIVABLE_STATUSES, restore_ventas
+
         self.full_clean()
+        if self.is_archived and self.status not in ARCHIVABLE_STATUSES:
+            # Una venta reabierta vuelve a trabajar sobre las tablas activas
+            restore_ventas([self.pk])
+            self.archived_at = None
         super().save(*args, **kwargs)
         
         # Actualizar el estado del lote basado en el estado de las ventas
@@ -179,9 +324,13 @@ class Venta(models.Model):
     @property
     def remaining_balance(self):
         """Saldo pendiente de la venta"""
+        # Ya calculado por VentaQuerySet.with_balances()
+        if 'pending_balance' in self.__dict__:
+            return self.pending_balance
+
         # Calcular saldo pendiente de cuotas mensuales
         total_installments_remaining = Decimal('0.00')
-        for schedule in self.payment_schedules.all():
+        for schedule in self.get_payment_schedules():
             total_installments_remaining += schedule.remaining_amount
         
         # Agregar saldo pendiente del pago inicial
@@ -195,6 +344,19 @@ class Venta(models.Model):
     def is_active(self):
         """Verifica si la venta está activa"""
         return self.status == 'active'
+
+    @property
+    def is_archived(self):
+        """Sus cuotas y pagos están en las tablas de archivo"""
+        return self.archived_at is not None
+
+    def get_payment_schedules(self):
+        """Cuotas de la venta, de la tabla activa o del archivo"""
+        return (self.archived_schedules if self.is_archived else self.payment_schedules).all()
+
+    def get_payments(self):
+        """Pagos de la venta, de la tabla activa o del archivo"""
+        return (self.archived_payments if self.is_archived else self.payments).all()
     
     @property
     def payment_plan(self):
@@ -467,7 +629,7 @@ class Venta(models.Model):
     def get_total_initial_payments(self):
         """Obtiene el total de pagos iniciales realizados"""
         from decimal import Decimal
-        total = self.payments.filter(payment_type='initial').aggregate(
+        total = self.get_payments().filter(payment_type='initial').aggregate(
             total=models.Sum('amount')
         )['total'] or Decimal('0.00')
         return total
@@ -1,8 +1,10 @@
 from rest_framework import serializers
 from django.utils.translation import gettext_lazy as _
+from django.db import transaction
 from .models import Venta
+from .bulk import SaleImporter, compact_venta
 from lotes.serializers import LoteSerializer
-from customers.serializers import CustomerSerializer
+from customers.serializers import CustomerSerializer, CustomerReferenceSerializer
 from customers.models import Customer
 
 
@@ -24,14 +26,16 @@ class VentaSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'lote', 'customer', 'status', 'sale_price', 'initial_payment',
             'sale_date', 'contract_date', 'schedule_start_date', 'contract_pdf', 'cancellation_date', 'completion_date',
-            'notes', 'cancellation_reason', 'created_at', 'updated_at',
+            'notes', 'cancellation_reason', 'archived_at', 'created_at', 'updated_at',
             # Campos calculados
             'remaining_balance', 'status_display', 'payment_day', 'financing_months',
             'total_initial_payments', 'initial_payment_balance', 'is_initial_payment_complete',
             # Información relacionada
             'lote_info', 'customer_info'
         ]
-        read_only_fields = ['sale_date', 'created_at', 'updated_at', 'cancellation_date', 'completion_date']
+        read_only_fields = [
+            'sale_date', 'created_at', 'updated_at', 'cancellation_date', 'completion_date', 'archived_at'
+        ]
 
     def get_payment_day(self, obj):
         """Obtiene el día de pago del plan de pagos asociado"""
@@ -295,12 +299,17 @@ class VentaUpdateSerializer(serializers.ModelSerializer):
 
 
 class VentaSummarySerializer(serializers.ModelSerializer):
-    """Serializer resumido para listados de ventas"""
+    """
+    Serializer resumido para listados de ventas. Espera un queryset de
+    Venta.objects.for_listing(): el saldo, el total pagado y el día de pago
+    vienen anotados y no generan consultas por fila.
+    """
     
     lote_display = serializers.SerializerMethodField()
     customer_display = serializers.SerializerMethodField()
-    customer_info = CustomerSerializer(source='customer', read_only=True)
+    customer_info = CustomerReferenceSerializer(source='customer', read_only=True)
     remaining_balance = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
+    total_paid = serializers.DecimalField(max_digits=14, decimal_places=2, read_only=True)
     status_display = serializers.CharField(source='get_status_display', read_only=True)
     payment_day = serializers.SerializerMethodField()
     financing_months = serializers.SerializerMethodField()
@@ -309,7 +318,7 @@ class VentaSummarySerializer(serializers.ModelSerializer):
         model = Venta
         fields = [
             'id', 'lote_display', 'customer_display', 'customer_info', 'sale_price', 
-            'initial_payment', 'remaining_balance', 'status', 'status_display',
+            'initial_payment', 'remaining_balance', 'total_paid', 'status', 'status_display',
             'sale_date', 'contract_date', 'contract_pdf', 'payment_day', 'financing_months',
             'cancellation_reason', 'notes'
         ]
@@ -321,13 +330,11 @@ class VentaSummarySerializer(serializers.ModelSerializer):
         return f"{obj.customer.first_name} {obj.customer.last_name}"
 
     def get_payment_day(self, obj):
-        """Obtiene el día de pago del plan de pagos asociado"""
-        try:
-            if hasattr(obj, 'plan_pagos'):
-                return obj.plan_pagos.payment_day
-            return obj.payment_day  # Usar el valor del modelo
-        except:
-            return obj.payment_day  # Usar el valor del modelo
+        """Día de pago del plan de pagos asociado (anotado en el listado)"""
+        if hasattr(obj, 'plan_payment_day'):
+            return obj.plan_payment_day
+        plan = getattr(obj, 'plan_pagos', None)
+        return plan.payment_day if plan else obj.payment_day
     
     def get_financing_months(self, obj):
         """Obtiene los meses de financiamiento de la venta"""
@@ -376,3 +383,44 @@ class InitialPaymentSerializer(serializers.Serializer):
     payment_date = serializers.DateTimeField(required=False)
     receipt_image = serializers.ImageField(required=False)
     notes = serializers.CharField(max_length=500, required=False)
+
+
+class BulkVentaCreateSerializer(serializers.Serializer):
+    """
+    Serializer para crear múltiples ventas (con su plan y cronograma) en una
+    sola petición.
+    """
+    ventas = serializers.ListField(
+        child=serializers.DictField(),
+        min_length=1,
+        max_length=1000,  # Límite para evitar sobrecarga
+        help_text=_("Lista de ventas a crear (máximo 1000)")
+    )
+
+    def validate_ventas(self, value):
+        """
+        Valida el lote de ventas por conjuntos (ver sales.bulk.SaleImporter):
+        sin consultas por venta para resolver lotes, clientes y disponibilidad.
+        """
+        self.importer = SaleImporter()
+        valid = self.importer.validate(value)
+        if self.importer.errors:
+            raise serializers.ValidationError(self.importer.errors)
+        return valid
+
+    def create(self, validated_data):
+        """
+        Crea ventas, planes y cuotas con bulk_create en una transacción y
+        responde con una representación reducida de cada venta.
+        """
+        with transaction.atomic():
+            created_ventas = self.importer.save(validated_data['ventas'])
+            if self.importer.errors:
+                raise serializers.ValidationError({'ventas': self.importer.errors})
+
+        return {
+            'message': _("Se crearon {count} ventas exitosamente.").format(count=len(created_ventas)),
+            'created_count': len(created_ventas),
+            'schedules_count': self.importer.schedules_count,
+            'ventas': [compact_venta(venta) for venta in created_ventas]
+        }
@@ -1,3 +1,326 @@
+from datetime import date
+from decimal import Decimal
+
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from customers.models import Customer
+from lotes.models import Lote
+from payments.models import PaymentSchedule
+from users.models import User
+from .models import Venta
+
+
+class VentaListQueryTests(TestCase):
+    """
+    Los listados de ventas usan Venta.objects.for_listing() y la referencia
+    compacta del cliente: conteo + página, sin consultas por venta.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='ventas', email='ventas@example.com', password='x', role='admin'
+        )
+        for number in range(4):
+            customer = Customer.objects.create(first_name='Cliente', last_name=f'Venta {number}')
+            lote = Lote.objects.create(
+                block='V', lot_number=str(number), area=Decimal('100.00'), price=Decimal('10000.00')
+            )
+            venta = Venta.create_sale(
+                lote=lote, customer=customer, sale_price=Decimal('12000.00'), payment_day=10, financing_months=12,
+            )
+            for installment_number in range(1, number + 1):
+                venta.payment_schedules.get(installment_number=installment_number).register_payment(
+                    amount=Decimal('1000.00'), payment_method='efectivo'
+                )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_list_query_budget(self):
+        for url in ('/api/v1/sales/ventas/', '/api/v1/sales/ventas/active_sales/'):
+            with self.assertNumQueries(2):
+                response = self.client.get(url)
+            self.assertEqual(response.data['count'], 4)
+
+    def test_annotated_values_match_model(self):
+        response = self.client.get('/api/v1/sales/ventas/active_sales/', {'ordering': 'created_at'})
+
+        for row in response.data['results']:
+            venta = Venta.objects.get(pk=row['id'])
+            self.assertEqual(Decimal(row['remaining_balance']), venta.remaining_balance)
+            self.assertEqual(
+                Decimal(row['total_paid']), sum((payment.amount for payment in venta.payments.all()), Decimal('0.00'))
+            )
+            self.assertEqual(row['payment_day'], 10)
+            self.assertNotIn('ventas', row['customer_info'])
+
+        self.assertEqual(
+            [row['total_paid'] for row in response.data['results']], ['0.00', '1000.00', '2000.00', '3000.00']
+        )
+
+
+class VentaBalanceAnnotationTests(TestCase):
+    """
+    with_balances() y with_installment_progress() dan, en una sola consulta,
+    lo mismo que las propiedades por venta (remaining_balance y el recorrido
+    de cuotas y pagos), también para ventas archivadas.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        from datetime import date, timedelta
+
+        from payments.archive import archive_ventas
+        from payments.models import Payment
+
+        cls.user = User.objects.create_user(
+            username='saldos', email='saldos@example.com', password='x', role='admin'
+        )
+        cls.ventas = []
+        for number in range(5):
+            customer = Customer.objects.create(first_name='Saldo', last_name=f'Cliente {number}')
+            lote = Lote.objects.create(
+                block='S', lot_number=str(number), area=Decimal('100.00'), price=Decimal('10000.00')
+            )
+            cls.ventas.append(Venta.create_sale(
+                lote=lote, customer=customer, sale_price=Decimal('7000.00'), payment_day=5,
+                financing_months=6, initial_payment=Decimal('1000.00'),
+            ))
+        fresh, mixed, settled, archived, empty = cls.ventas
+
+        # Pagada, parcial y vencida, perdonada y pago inicial incompleto
+        mixed.payment_schedules.get(installment_number=1).register_payment(amount=Decimal('1000.00'))
+        mixed.payment_schedules.get(installment_number=2).register_payment(amount=Decimal('400.00'))
+        overdue = mixed.payment_schedules.get(installment_number=2)
+        overdue.due_date = date.today() - timedelta(days=45)
+        overdue.save()
+        mixed.payment_schedules.get(installment_number=3).forgive_installment(notes='Condonada')
+        Payment.objects.create(
+            venta=mixed, amount=Decimal('600.00'), payment_date=fresh.sale_date, method='efectivo',
+            payment_type='initial',
+        )
+
+        # Todo pagado: saldo 0
+        Payment.objects.create(
+            venta=settled, amount=Decimal('1000.00'), payment_date=fresh.sale_date, method='efectivo',
+            payment_type='initial',
+        )
+        for schedule in settled.payment_schedules.all():
+            schedule.register_payment(amount=schedule.scheduled_amount)
+
+        archived.payment_schedules.get(installment_number=1).register_payment(amount=Decimal('1000.00'))
+        archived.cancel_sale(reason='Desistimiento')
+        archive_ventas([archived.id])
+
+        PaymentSchedule.objects.filter(venta=empty).delete()
+
+    def test_annotations_match_model_in_one_query(self):
+        with self.assertNumQueries(1):
+            ventas = list(Venta.objects.with_balances().with_installment_progress().order_by('pk'))
+
+        self.assertEqual([venta.id for venta in ventas], [venta.id for venta in self.ventas])
+        for annotated in ventas:
+            venta = Venta.objects.get(pk=annotated.pk)
+            schedules = list(venta.get_payment_schedules().order_by('installment_number'))
+            with self.subTest(venta=venta.lote.lot_number):
+                self.assertEqual(annotated.pending_balance, venta.remaining_balance)
+                self.assertEqual(annotated.installments_total, len(schedules))
+                self.assertEqual(
+                    annotated.installments_forgiven, sum(schedule.status == 'forgiven' for schedule in schedules)
+                )
+                self.assertEqual(
+                    annotated.installments_paid, venta.get_payments().filter(payment_type='installment').count()
+                )
+                self.assertEqual(annotated.next_due_date, next(
+                    (schedule.due_date for schedule in schedules
+                     if schedule.status in ('pending', 'overdue', 'partial')),
+                    None,
+                ))
+
+        self.assertEqual(
+            [venta.pending_balance for venta in ventas],
+            [Decimal('7000.00'), Decimal('4000.00'), Decimal('0.00'), Decimal('6000.00'), Decimal('1000.00')],
+        )
+
+    def test_pending_installments_report(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        url = '/api/v1/reports/live/pending-installments/'
+
+        with self.assertNumQueries(1):
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+        rows = {
+            lote['lote_description']: lote
+            for customer in response.data['all_customers'] for lote in customer['lotes']
+        }
+        # Las ventas activas con saldo: la pagada, la cancelada y la sin cuotas no aparecen
+        fresh, mixed = self.ventas[:2]
+        self.assertEqual(set(rows), {str(fresh.lote), str(mixed.lote)})
+        for venta in (fresh, mixed):
+            venta = Venta.objects.get(pk=venta.pk)
+            schedules = list(venta.get_payment_schedules())
+            completed = venta.get_payments().filter(payment_type='installment').count() + sum(
+                schedule.status == 'forgiven' for schedule in schedules
+            )
+            row = rows[str(venta.lote)]
+            self.assertEqual(row['remaining_balance'], float(venta.remaining_balance))
+            self.assertEqual(row['total_financing_months'], len(schedules))
+            self.assertEqual(row['payments_made'], completed)
+            self.assertEqual(row['pending_installments'], len(schedules) - completed)
+        self.assertEqual(rows[str(mixed.lote)]['status'], 'overdue')
+
+        # Más ventas no agregan consultas
+        Venta.create_sale(
+            lote=Lote.objects.create(block='S', lot_number='9', area=Decimal('90.00'), price=Decimal('9000.00')),
+            customer=fresh.customer, sale_price=Decimal('6000.00'), payment_day=5, financing_months=6,
+        )
+        with self.assertNumQueries(1):
+            self.assertEqual(len(client.get(url).data['all_customers']), 2)
+
+
+class BulkVentaCreateTests(TestCase):
+    """La importación masiva resuelve referencias por conjuntos e inserta con bulk_create."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='importador', email='importador@example.com', password='x', role='admin'
+        )
+        cls.customers = [
+            Customer.objects.create(first_name='Cliente', last_name=f'Masivo {number}', document_number=f'M{number}')
+            for number in range(3)
+        ]
+        cls.lotes = [
+            Lote.objects.create(block='I', lot_number=str(number), area=Decimal('100.00'), price=Decimal('10000.00'))
+            for number in range(4)
+        ]
+        Venta.create_sale(
+            lote=cls.lotes[3], customer=cls.customers[0], sale_price=Decimal('9000.00'), payment_day=5,
+            financing_months=6,
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    @staticmethod
+    def sale_snapshot(venta):
+        """Lo que debe coincidir entre una venta importada y una de Venta.create_sale."""
+        venta = Venta.objects.select_related('lote', 'plan_pagos').get(pk=venta.pk)
+        return {
+            'venta': Venta.objects.filter(pk=venta.pk).values(
+                'customer_id', 'sale_price', 'initial_payment', 'payment_day', 'financing_months',
+                'contract_date', 'schedule_start_date', 'notes', 'status',
+            ).get(),
+            'lote_status': venta.lote.status,
+            'plan': (venta.plan_pagos.start_date, venta.plan_pagos.payment_day),
+            'schedules': list(venta.payment_schedules.order_by('installment_number').values_list(
+                'installment_number', 'original_amount', 'scheduled_amount', 'paid_amount', 'due_date', 'status',
+                'is_forgiven',
+            )),
+            'remaining_balance': venta.remaining_balance,
+        }
+
+    def test_bulk_create_matches_create_sale(self):
+        from dashboard.models import DashboardCounters
+        DashboardCounters.reconcile()
+        rows = [
+            {'lote': self.lotes[0].id, 'customer': self.customers[0].id, 'sale_price': '12000.00',
+             'initial_payment': '1000.00', 'payment_day': 31, 'financing_months': 24, 'schedule_start_date': '2020-01',
+             'contract_date': '2019-12-20', 'notes': 'Importada'},
+            {'block': 'I', 'lot_number': '1', 'document_number': 'M1', 'sale_price': '10000.00',
+             'payment_day': 10, 'financing_months': 120},
+        ]
+
+        response = self.client.post('/api/v1/sales/ventas/bulk-create/', {'ventas': rows}, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created_count'], 2)
+        self.assertEqual(response.data['schedules_count'], 144)
+
+        # Las mismas ventas, una por una, en lotes gemelos
+        reference = [
+            Venta.create_sale(
+                lote=Lote.objects.create(block='J', lot_number='0', area=Decimal('100.00'), price=Decimal('10000.00')),
+                customer=self.customers[0], sale_price=Decimal('12000.00'), initial_payment=Decimal('1000.00'),
+                payment_day=31, financing_months=24, schedule_start_date=date(2020, 1, 1),
+                contract_date=date(2019, 12, 20), notes='Importada',
+            ),
+            Venta.create_sale(
+                lote=Lote.objects.create(block='J', lot_number='1', area=Decimal('100.00'), price=Decimal('10000.00')),
+                customer=self.customers[1], sale_price=Decimal('10000.00'), payment_day=10, financing_months=120,
+            ),
+        ]
+        for created, expected in zip(response.data['ventas'], reference):
+            with self.subTest(venta=created['id']):
+                self.assertEqual(self.sale_snapshot(Venta(pk=created['id'])), self.sale_snapshot(expected))
+        self.assertEqual(self.sale_snapshot(reference[0])['schedules'][0][4], date(2020, 1, 31))
+        self.assertEqual(Venta.objects.get(pk=response.data['ventas'][0]['id']).remaining_balance, Decimal('12000.00'))
+
+        counters = DashboardCounters.objects.get()
+        for field, value in DashboardCounters.compute().items():
+            self.assertEqual(getattr(counters, field), value, field)
+
+    def test_invalid_references_reject_whole_batch(self):
+        rows = [
+            {'lote': self.lotes[0].id, 'customer': self.customers[0].id, 'sale_price': '100', 'payment_day': 1,
+             'financing_months': 12},
+            {'lote': self.lotes[3].id, 'customer': self.customers[1].id, 'sale_price': '100', 'payment_day': 1,
+             'financing_months': 12},
+            {'block': 'I', 'lot_number': '2', 'document_number': 'NOEXISTE', 'sale_price': '100', 'payment_day': 1,
+             'financing_months': 12},
+            {'lote': self.lotes[0].id, 'customer': self.customers[2].id, 'sale_price': '100', 'payment_day': 1,
+             'financing_months': 12},
+        ]
+
+        response = self.client.post('/api/v1/sales/ventas/bulk-create/', {'ventas': rows}, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        errors = [str(error) for error in response.data['ventas']]
+        self.assertEqual(len(errors), 3)
+        self.assertIn('no está disponible', errors[0])
+        self.assertIn('NOEXISTE', errors[1])
+        self.assertIn('duplicado con la posición 1', errors[2])
+        self.assertEqual(Venta.objects.count(), 1)
+
+    def test_import_rows_skips_only_invalid_chunks(self):
+        from .bulk import import_rows
+        rows = [
+            {'block': 'I', 'lot_number': str(number), 'document_number': f'M{number}', 'sale_price': '5000',
+             'payment_day': 15, 'financing_months': 12}
+            for number in range(3)
+        ]
+        rows[2]['sale_price'] = '-1'
+
+        importer, skipped = import_rows(rows, batch_size=2)
+
+        self.assertEqual(importer.created_count, 2)
+        self.assertEqual(skipped, [(4, 4)])
+        self.assertEqual(
+            PaymentSchedule.objects.filter(venta__lote__block='I', venta__lote__lot_number__in=['0', '1']).count(), 24
+        )
+
+    def test_rolled_back_chunk_frees_its_lotes(self):
+        from .bulk import import_rows
+        row = {'block': 'I', 'lot_number': '0', 'document_number': 'M0', 'sale_price': '5000', 'payment_day': 15,
+               'financing_months': 12}
+        rows = [
+            row, {**row, 'lot_number': '1', 'sale_price': '-1'},  # bloque revertido
+            {**row, 'document_number': 'M1'}, {**row, 'lot_number': '2'},  # el lote 0 vuelve a estar libre
+            {**row, 'lot_number': '2', 'document_number': 'M2'},  # vendido en un bloque confirmado
+        ]
+
+        importer, skipped = import_rows(rows, batch_size=2)
 
-# Create your tests here.
+        self.assertEqual(skipped, [(2, 3), (6, 6)])
+        self.assertEqual(importer.created_count, 2)
+        self.assertEqual(importer.seen_lotes, {self.lotes[0].id: 4, self.lotes[2].id: 5})
+        self.assertEqual(Venta.objects.get(lote=self.lotes[0]).customer, self.customers[1])
+        self.assertEqual(len(importer.errors), 2)
+        self.assertIn('precio de venta', str(importer.errors[0]))
+        self.assertIn('posición 6', str(importer.errors[1]))
@@ -6,14 +6,17 @@ from rest_framework import filters
 from django.core.exceptions import ValidationError
 from .models import Venta
 from .serializers import VentaSerializer, VentaSummarySerializer
-from users.permissions import IsWorkerOrAdmin
+from users.permissions import IsAdminUser, IsWorkerOrAdmin
+from villanueva_project.search import RankedSearchFilter
+from customers.models import Customer
+from lotes.models import Lote
 from django.shortcuts import get_object_or_404
 from django.utils.translation import gettext_lazy as _
 
 from .models import Venta
 from .serializers import (
     VentaSerializer, VentaCreateSerializer, VentaUpdateSerializer, VentaSummarySerializer,
-    VentaCancelSerializer, VentaCompleteSerializer, InitialPaymentSerializer
+    VentaCancelSerializer, VentaCompleteSerializer, InitialPaymentSerializer, BulkVentaCreateSerializer
 )
 
 
@@ -23,9 +26,11 @@ class VentaViewSet(viewsets.ModelViewSet):
     """
     queryset = Venta.objects.all().select_related('lote', 'customer')
     permission_classes = [permissions.IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, RankedSearchFilter]
     filterset_fields = ['status', 'lote__block', 'customer']
-    search_fields = ['id', 'lote__block', 'lote__lot_number', 'customer__first_name', 'customer__last_name', 'customer__document_number']
+    # Búsqueda indexada por lote y cliente; un número también encuentra la venta por id
+    search_documents = [('lote', Lote), ('customer', Customer)]
+    search_by_pk = True
     ordering_fields = ['sale_date', 'sale_price', 'created_at']
     ordering = ['-sale_date']
     
@@ -50,9 +55,14 @@ class VentaViewSet(viewsets.ModelViewSet):
         }
         return action_serializers.get(self.action, VentaSerializer)
     
+    # Acciones que responden con VentaSummarySerializer
+    LIST_ACTIONS = ('list', 'active_sales', 'sales_by_lote')
+
     def get_queryset(self):
         """Filtrar queryset según parámetros"""
         queryset = super().get_queryset()
+        if self.action in self.LIST_ACTIONS:
+            queryset = queryset.for_listing()
         
         # Filtro por estado activo
         if self.request.query_params.get('active_only'):
@@ -177,7 +187,9 @@ class VentaViewSet(viewsets.ModelViewSet):
         # Importar aquí para evitar imports circulares
         from payments.serializers import PaymentScheduleSummarySerializer
         
-        schedules = venta.payment_schedules.all().order_by('installment_number')
+        schedules = PaymentScheduleSummarySerializer.prefetch_payments(
+            venta.get_payment_schedules()
+        ).order_by('installment_number')
         serializer = PaymentScheduleSummarySerializer(schedules, many=True)
         
         return Response(serializer.data)
@@ -201,8 +213,14 @@ class VentaViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'])
     def active_sales(self, request):
-        """Obtener todas las ventas activas"""
-        active_sales = self.get_queryset().filter(status='active')
+        """Obtener las ventas activas (paginado)"""
+        active_sales = self.filter_queryset(self.get_queryset().filter(status='active'))
+        
+        page = self.paginate_queryset(active_sales)
+        if page is not None:
+            serializer = VentaSummarySerializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        
         serializer = VentaSummarySerializer(active_sales, many=True)
         return Response(serializer.data)
     
@@ -254,3 +272,72 @@ class VentaViewSet(viewsets.ModelViewSet):
                 {'error': _('Error al regenerar el cronograma de pagos')},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+
+    @action(detail=True, methods=['post'], permission_classes=[IsAdminUser])
+    def archive(self, request, pk=None):
+        """Mueve al archivo las cuotas y pagos de una venta completada o cancelada"""
+        from payments.archive import ARCHIVABLE_STATUSES, archive_ventas
+
+        venta = self.get_object()
+        if venta.status not in ARCHIVABLE_STATUSES:
+            return Response(
+                {'error': _('Solo se pueden archivar ventas completadas o canceladas')},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if venta.is_archived:
+            return Response({'error': _('La venta ya está archivada')}, status=status.HTTP_400_BAD_REQUEST)
+
+        result = archive_ventas([venta.pk])
+        return Response({'message': _('Venta archivada exitosamente'), **result}, status=status.HTTP_200_OK)
+
+    @action(detail=True, methods=['post'], permission_classes=[IsAdminUser])
+    def restore_archive(self, request, pk=None):
+        """Devuelve a las tablas activas las cuotas y pagos de una venta archivada"""
+        from payments.archive import restore_ventas
+
+        venta = self.get_object()
+        if not venta.is_archived:
+            return Response({'error': _('La venta no está archivada')}, status=status.HTTP_400_BAD_REQUEST)
+
+        result = restore_ventas([venta.pk])
+        return Response({'message': _('Venta restaurada exitosamente'), **result}, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['post'], url_path='bulk-create')
+    def bulk_create(self, request):
+        """
+        Endpoint para crear múltiples ventas en una sola petición, con su plan
+        y cronograma de pagos. Todo o nada: si alguna venta es inválida no se
+        crea ninguna. Para archivos grandes, ver el comando import_sales.
+
+        POST /api/v1/sales/ventas/bulk-create/
+
+        Body:
+        {
+            "ventas": [
+                {
+                    "block": "A",
+                    "lot_number": "1",
+                    "document_number": "12345678",
+                    "sale_price": "50000.00",
+                    "initial_payment": "5000.00",
+                    "payment_day": 15,
+                    "financing_months": 120,
+                    "schedule_start_date": "2025-01"
+                },
+                {
+                    "lote": 12,
+                    "customer": 7,
+                    "sale_price": "45000.00",
+                    "payment_day": 5,
+                    "financing_months": 60
+                }
+            ]
+        }
+        """
+        serializer = BulkVentaCreateSerializer(data=request.data, context=self.get_serializer_context())
+
+        if serializer.is_valid():
+            result = serializer.save()
+            return Response(result, status=status.HTTP_201_CREATED)
+
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,203 @@
+"""
+Autenticación JWT sin consulta de usuario por request.
+
+CachedJWTAuthentication resuelve request.user con el rol y el estado del
+usuario guardados en la caché: un CachedUser responde pk, role, is_active,
+is_admin, is_worker e is_authenticated sin tocar la base de datos y carga el
+User completo solo si la vista usa otro atributo. Las verificaciones de
+permisos (IsWorkerOrAdmin, IsAdminUser) de los endpoints de lectura no hacen
+consultas.
+
+La base de datos es el registro de revocación; la caché solo lo copia:
+
+- Emitir un token (RoleRefreshToken.for_user) y cada refresh
+  (RoleTokenRefreshSerializer) leen el rol y el estado actuales, rechazan
+  a los usuarios inactivos y los guardan en la caché.
+- Al guardarse un usuario (señales de users.signals) su rol y estado se
+  reescriben en la caché.
+- Si la entrada no está (expiró, fue desalojada o es otro proceso), se
+  vuelve a leer de la base de datos con una consulta. Los claims role e
+  is_active del token no se usan para autorizar: un token emitido antes de
+  una desactivación no vuelve a valer al perderse la entrada.
+
+Con la caché por defecto (locmem), que es por proceso, un cambio hecho en
+otro worker se aplica en AUTH_CACHE_TIMEOUT segundos a lo sumo; con un
+backend compartido (CACHE_BACKEND=redis) se aplica de inmediato.
+"""
+from functools import partial, wraps
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.http import JsonResponse
+from django.utils.functional import SimpleLazyObject
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+
+ROLE_CLAIM = 'role'
+ACTIVE_CLAIM = 'is_active'
+
+AUTH_CACHE_PREFIX = 'users:auth'
+AUTH_CACHE_TIMEOUT = 5 * 60
+
+
+def auth_cache_key(user_id):
+    return f'{AUTH_CACHE_PREFIX}:{user_id}'
+
+
+def remember_auth_state(user_id, role, is_active):
+    """Guarda en la caché el rol y estado actuales de un usuario."""
+    cache.set(auth_cache_key(user_id), {'role': role, 'is_active': is_active}, AUTH_CACHE_TIMEOUT)
+
+
+def load_auth_state(user_id):
+    """
+    Rol y estado del usuario leídos de la base de datos (None si no existe),
+    y guardados en la caché.
+    """
+    state = get_user_model().objects.filter(pk=user_id).values('role', 'is_active').first()
+    if state is not None:
+        remember_auth_state(user_id, state['role'], state['is_active'])
+    return state
+
+
+def check_auth_state(state):
+    if state is None:
+        raise AuthenticationFailed('Usuario no encontrado', code='user_not_found')
+    if not state['is_active']:
+        raise AuthenticationFailed('El usuario está inactivo', code='user_inactive')
+
+
+class RoleRefreshToken(RefreshToken):
+    """Refresh token con el rol y el estado del usuario (se copian al access token)."""
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token[ROLE_CLAIM] = user.role
+        token[ACTIVE_CLAIM] = user.is_active
+        remember_auth_state(user.pk, user.role, user.is_active)
+        return token
+
+    def refresh_claims(self):
+        """
+        Reescribe los claims con el rol y estado actuales (una consulta);
+        falla si el usuario ya no existe o está inactivo.
+        """
+        state = load_auth_state(self[api_settings.USER_ID_CLAIM])
+        check_auth_state(state)
+        self[ROLE_CLAIM] = state['role']
+        self[ACTIVE_CLAIM] = state['is_active']
+
+
+def _load_user(user_id):
+    try:
+        return get_user_model().objects.get(pk=user_id)
+    except get_user_model().DoesNotExist:
+        raise AuthenticationFailed('Usuario no encontrado', code='user_not_found')
+
+
+class CachedUser(SimpleLazyObject):
+    """
+    request.user perezoso: los atributos usados por los permisos salen del
+    token o de la caché; cualquier otro carga el User (una consulta).
+    """
+
+    def __init__(self, user_id, role, is_active):
+        super().__init__(partial(_load_user, user_id))
+        # En __dict__ para que no pasen por __getattr__ (que cargaría el User)
+        self.__dict__.update(
+            pk=user_id,
+            id=user_id,
+            role=role,
+            is_active=is_active,
+            is_admin=role == 'admin',
+            is_worker=role == 'worker',
+            is_authenticated=True,
+            is_anonymous=False,
+        )
+
+    def __bool__(self):
+        # Los permisos evalúan bool(request.user) antes de is_authenticated
+        return True
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication que no consulta al usuario en cada request: el rol y el
+    estado salen de la caché o, si la entrada falta, de una consulta que
+    vuelve a llenarla.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken('El token no contiene un identificador de usuario reconocible')
+
+        state = cache.get(auth_cache_key(user_id))
+        if state is None:
+            state = load_auth_state(user_id)
+        check_auth_state(state)
+        return CachedUser(user_id, state['role'], state['is_active'])
+
+
+class QueryParamJWTAuthentication(CachedJWTAuthentication):
+    """
+    Autenticación JWT que acepta el token en la cabecera Authorization o en el
+    parámetro ?token=. EventSource (Server-Sent Events) no permite enviar
+    cabeceras personalizadas, por eso el stream del dashboard usa el parámetro.
+    """
+    query_param = 'token'
+
+    def authenticate(self, request):
+        header = self.get_header(request)
+        if header is not None:
+            return super().authenticate(request)
+
+        raw_token = request.GET.get(self.query_param)
+        if not raw_token:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+        return self.get_user(validated_token), validated_token
+
+
+def authenticate_request(request):
+    """
+    Retorna el usuario activo autenticado por JWT (cabecera o ?token=),
+    o None si no hay credenciales válidas. Para vistas Django que no pasan
+    por DRF, como las vistas async.
+    """
+    try:
+        auth = QueryParamJWTAuthentication().authenticate(request)
+    except (AuthenticationFailed, InvalidToken, TokenError):
+        return None
+    if auth is None or not auth[0].is_active:
+        return None
+    return auth[0]
+
+
+def async_jwt_required(view):
+    """
+    Decorador para vistas async de solo lectura: exige un JWT válido y
+    método GET. Equivale a @api_view(['GET']) + IsAuthenticated de DRF, que
+    no soporta vistas async.
+    """
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return JsonResponse({'error': f'Método "{request.method}" no permitido'}, status=405)
+
+        user = await sync_to_async(authenticate_request)(request)
+        if user is None:
+            return JsonResponse({'error': 'Autenticación requerida'}, status=401)
+
+        request.user = user
+        return await view(request, *args, **kwargs)
+
+    return wrapper
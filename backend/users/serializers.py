@@ -1,6 +1,8 @@
 from rest_framework import serializers
 from django.contrib.auth import authenticate
 from django.contrib.auth.password_validation import validate_password
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from .authentication import RoleRefreshToken
 from .models import User
 
 
@@ -82,6 +84,26 @@ class LoginSerializer(serializers.Serializer):
         return attrs
 
 
+class RoleTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """Par de tokens con los claims de rol y estado (ver users.authentication)."""
+    token_class = RoleRefreshToken
+
+
+class RoleTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Refresh que vuelve a leer el rol y el estado del usuario en la base de
+    datos: rechaza a los usuarios inactivos o eliminados y el nuevo access
+    token lleva los claims actuales.
+    """
+    token_class = RoleRefreshToken
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        refresh.refresh_claims()
+        # El mismo refresh token (jti y vencimiento) con los claims actuales
+        return super().validate({**attrs, 'refresh': str(refresh)})
+
+
 class ChangePasswordSerializer(serializers.Serializer):
     old_password = serializers.CharField(required=True)
     new_password = serializers.CharField(required=True, validators=[validate_password])
@@ -0,0 +1,26 @@
+"""
+Invalidación del rol y estado cacheados por users.authentication.
+
+Cada vez que se guarda o elimina un usuario (desactivación en
+UserDetailView.perform_destroy, cambio de rol, etc.) se publica su estado
+actual en la caché al confirmarse la transacción, para que los tokens ya
+emitidos lo vean sin esperar a que expire la entrada anterior.
+"""
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import remember_auth_state
+from .models import User
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, **kwargs):
+    transaction.on_commit(partial(remember_auth_state, instance.pk, instance.role, instance.is_active))
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    transaction.on_commit(partial(remember_auth_state, instance.pk, instance.role, False))
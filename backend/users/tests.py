@@ -1,3 +1,140 @@
+from django.core.cache import cache
 from django.test import TestCase
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
 
-# Create your tests here.
+from .authentication import auth_cache_key
+from .models import User
+
+
+class CachedJWTAuthenticationTests(TestCase):
+    """El rol y el estado viajan en el token: los permisos no consultan al usuario."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(
+            username='admin', email='admin@example.com', password='clave-segura', role='admin'
+        )
+        cls.worker = User.objects.create_user(
+            username='worker', email='worker@example.com', password='clave-segura', role='worker'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def login(self, user):
+        response = self.client.post(
+            '/api/v1/auth/login/', {'email': user.email, 'password': 'clave-segura'}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.data['tokens']
+
+    def get(self, url, access):
+        return self.client.get(url, HTTP_AUTHORIZATION=f'Bearer {access}')
+
+    def test_tokens_carry_role_claims(self):
+        tokens = self.login(self.worker)
+        access = AccessToken(tokens['access'])
+        self.assertEqual((access['role'], access['is_active']), ('worker', True))
+
+        response = self.client.post('/api/v1/auth/token/refresh/', {'refresh': tokens['refresh']}, format='json')
+        self.assertEqual(AccessToken(response.data['access'])['role'], 'worker')
+
+        response = self.client.post(
+            '/api/v1/auth/api/token/', {'email': self.admin.email, 'password': 'clave-segura'}, format='json'
+        )
+        self.assertEqual(AccessToken(response.data['access'])['role'], 'admin')
+
+    def test_permission_check_without_user_query(self):
+        access = self.login(self.worker)['access']
+
+        # Solo el COUNT de la paginación: sin SELECT del usuario
+        with self.assertNumQueries(1):
+            response = self.get('/api/v1/lotes/', access)
+        self.assertEqual(response.status_code, 200)
+
+    def test_user_loaded_lazily(self):
+        access = self.login(self.worker)['access']
+
+        with self.assertNumQueries(1):
+            response = self.get('/api/v1/auth/me/', access)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['email'], self.worker.email)
+
+    def test_token_without_claims_is_cached(self):
+        access = str(RefreshToken.for_user(self.worker).access_token)
+
+        with self.assertNumQueries(2):
+            self.assertEqual(self.get('/api/v1/lotes/', access).status_code, 200)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.get('/api/v1/lotes/', access).status_code, 200)
+
+    def test_deactivation_revokes_tokens(self):
+        access = self.login(self.worker)['access']
+        admin_access = self.login(self.admin)['access']
+        self.assertEqual(self.get('/api/v1/lotes/', access).status_code, 200)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete(
+                f'/api/v1/auth/{self.worker.id}/', HTTP_AUTHORIZATION=f'Bearer {admin_access}'
+            )
+        self.assertEqual(response.status_code, 204)
+
+        self.assertEqual(self.get('/api/v1/lotes/', access).status_code, 401)
+        self.assertFalse(cache.get(auth_cache_key(self.worker.id))['is_active'])
+
+    def test_role_change_applies_to_issued_tokens(self):
+        access = self.login(self.worker)['access']
+        self.assertEqual(self.get('/api/v1/auth/', access).status_code, 403)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.worker.role = 'admin'
+            self.worker.save()
+
+        self.assertEqual(self.get('/api/v1/auth/', access).status_code, 200)
+
+    def test_revocation_survives_cache_eviction(self):
+        access = self.login(self.worker)['access']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.worker.is_active = False
+            self.worker.save()
+        self.assertEqual(self.get('/api/v1/lotes/', access).status_code, 401)
+
+        # Sin la entrada de la caché el token (con is_active en sus claims) no vuelve a valer
+        cache.clear()
+        self.assertEqual(self.get('/api/v1/lotes/', access).status_code, 401)
+        self.assertFalse(cache.get(auth_cache_key(self.worker.id))['is_active'])
+
+    def test_cache_miss_reads_database(self):
+        access = self.login(self.worker)['access']
+        # Cambios sin señales: solo la base de datos los registra
+        User.objects.filter(pk=self.worker.pk).update(role='admin')
+        cache.clear()
+
+        # Rol y estado (una consulta, luego desde la caché) + COUNT y página del listado
+        with self.assertNumQueries(3):
+            self.assertEqual(self.get('/api/v1/auth/', access).status_code, 200)
+        with self.assertNumQueries(2):
+            self.assertEqual(self.get('/api/v1/auth/', access).status_code, 200)
+
+    def test_refresh_rereads_user(self):
+        refresh = self.login(self.worker)['refresh']
+        url = '/api/v1/auth/token/refresh/'
+
+        User.objects.filter(pk=self.worker.pk).update(role='admin')
+        response = self.client.post(url, {'refresh': refresh}, format='json')
+        self.assertEqual(response.status_code, 200)
+        access = AccessToken(response.data['access'])
+        self.assertEqual((access['role'], access['is_active']), ('admin', True))
+        self.assertEqual(cache.get(auth_cache_key(self.worker.id))['role'], 'admin')
+
+        User.objects.filter(pk=self.worker.pk).update(is_active=False)
+        response = self.client.post(url, {'refresh': refresh}, format='json')
+        self.assertEqual(response.status_code, 401)
+        self.assertFalse(cache.get(auth_cache_key(self.worker.id))['is_active'])
+
+        self.worker.delete()
+        self.assertEqual(self.client.post(url, {'refresh': refresh}, format='json').status_code, 401)
+        self.assertEqual(self.client.post(url, {'refresh': 'no-es-un-token'}, format='json').status_code, 401)
@@ -12,6 +12,7 @@ from .serializers import (
     UserSerializer, UserCreateSerializer, UserUpdateSerializer,
     LoginSerializer, ChangePasswordSerializer, PasswordResetSerializer
 )
+from .authentication import RoleRefreshToken
 from .permissions import IsAdminUser, IsOwnerOrAdmin
 
 User = get_user_model()
@@ -29,7 +30,7 @@ class LoginView(APIView):
         serializer = LoginSerializer(data=request.data)
         if serializer.is_valid():
             user = serializer.validated_data['user']
-            refresh = RefreshToken.for_user(user)
+            refresh = RoleRefreshToken.for_user(user)
             
             return Response({
                 'user': UserSerializer(user).data,
@@ -49,7 +50,7 @@ class RegisterView(generics.CreateAPIView):
         serializer = self.get_serializer(data=request.data)
         if serializer.is_valid():
             user = serializer.save()
-            refresh = RefreshToken.for_user(user)
+            refresh = RoleRefreshToken.for_user(user)
             
             return Response({
                 'user': UserSerializer(user).data,
@@ -0,0 +1,81 @@
+"""
+Compresión negociada de las respuestas de la API.
+
+Comprime con brotli (si el paquete brotli está instalado y el cliente lo
+acepta) o gzip las respuestas bajo COMPRESSION_PATH_PREFIXES que superen
+COMPRESSION_MIN_SIZE bytes. Las respuestas en streaming (stream SSE del
+dashboard, exportaciones CSV) se dejan intactas: comprimirlas retendría los
+eventos en el buffer del compresor.
+"""
+import gzip
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+try:
+    import brotli
+except ImportError:  # dependencia opcional
+    brotli = None
+
+
+DEFAULT_MIN_SIZE = 1024
+DEFAULT_PATH_PREFIXES = ('/api/',)
+
+
+def accepted_encodings(header):
+    """Codificaciones aceptadas en Accept-Encoding (descarta las de q=0)."""
+    encodings = set()
+    for item in header.split(','):
+        name, _, params = item.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                continue
+        if name and quality > 0:
+            encodings.add(name.strip().lower())
+    return encodings
+
+
+def compress(content, encoding):
+    if encoding == 'br':
+        return brotli.compress(content, quality=getattr(settings, 'COMPRESSION_BROTLI_QUALITY', 4))
+    return gzip.compress(content, compresslevel=getattr(settings, 'COMPRESSION_GZIP_LEVEL', 6), mtime=0)
+
+
+class CompressionMiddleware(MiddlewareMixin):
+
+    def process_response(self, request, response):
+        prefixes = getattr(settings, 'COMPRESSION_PATH_PREFIXES', DEFAULT_PATH_PREFIXES)
+        if not request.path.startswith(tuple(prefixes)):
+            return response
+        if response.streaming or response.has_header('Content-Encoding'):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if len(response.content) < getattr(settings, 'COMPRESSION_MIN_SIZE', DEFAULT_MIN_SIZE):
+            return response
+
+        accepted = accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if brotli is not None and 'br' in accepted:
+            encoding = 'br'
+        elif 'gzip' in accepted:
+            encoding = 'gzip'
+        else:
+            return response
+
+        compressed = compress(response.content, encoding)
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = encoding
+        # El contenido cambió: un ETag fuerte ya no lo identifica
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        return response
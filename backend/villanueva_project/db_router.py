@@ -0,0 +1,149 @@
+"""
+Lecturas de reportes y dashboard en una réplica de PostgreSQL.
+
+Los reportes en vivo y los agregados del dashboard son consultas pesadas de
+solo lectura que compiten con los cajeros que registran pagos en el
+primario. Las vistas marcadas con ReplicaReadMixin (APIView) o @replica_read
+(vistas función, sync o async) leen de la conexión REPLICA_ALIAS; el resto
+de la aplicación, y toda escritura, sigue en 'default'.
+
+- Sin réplica configurada (DB_REPLICA_HOST vacío) ReplicaRouter no elige
+  base de datos y todo va al primario.
+- Read-your-writes: ReplicaStickinessMiddleware marca durante
+  REPLICA_STICKY_SECONDS al usuario que acaba de escribir (POST, PUT, PATCH
+  o DELETE con respuesta exitosa), y sus lecturas siguen en el primario hasta
+  que la réplica tenga sus cambios. La marca vive en la caché compartida (con
+  locmem solo la ve el proceso que atendió la escritura).
+- Las consultas SQL directas con django.db.connection no pasan por el router
+  y siempre van al primario.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from inspect import iscoroutinefunction
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.deprecation import MiddlewareMixin
+from rest_framework.permissions import SAFE_METHODS
+
+
+REPLICA_ALIAS = 'replica'
+STICKY_CACHE_PREFIX = 'db:sticky'
+DEFAULT_STICKY_SECONDS = 5
+
+_replica_reads = ContextVar('replica_reads', default=False)
+
+
+def replica_configured():
+    return REPLICA_ALIAS in settings.DATABASES
+
+
+def sticky_seconds():
+    return getattr(settings, 'REPLICA_STICKY_SECONDS', DEFAULT_STICKY_SECONDS)
+
+
+def _sticky_key(user):
+    user_id = getattr(user, 'pk', None) if getattr(user, 'is_authenticated', False) else None
+    return f'{STICKY_CACHE_PREFIX}:{user_id}' if user_id is not None else None
+
+
+def mark_write(user):
+    """Mantiene en el primario las lecturas del usuario por unos segundos."""
+    key = _sticky_key(user)
+    if key and replica_configured():
+        cache.set(key, True, sticky_seconds())
+
+
+def recently_wrote(user):
+    key = _sticky_key(user)
+    return bool(key and cache.get(key))
+
+
+async def arecently_wrote(user):
+    # request.user de AuthenticationMiddleware es perezoso y puede consultar la sesión
+    key = await sync_to_async(_sticky_key)(user)
+    return bool(key and await cache.aget(key))
+
+
+@contextmanager
+def replica_reads(enabled=True):
+    """Envía a la réplica (si existe) las lecturas del ORM dentro del bloque."""
+    token = _replica_reads.set(enabled)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+class ReplicaRouter:
+    """
+    Lecturas a la réplica solo dentro de replica_reads() y si está
+    configurada; escrituras y migraciones siempre en el primario.
+    """
+
+    def db_for_read(self, model, **hints):
+        if _replica_reads.get() and replica_configured():
+            return REPLICA_ALIAS
+        return None
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Misma base de datos lógica: la réplica es una copia del primario
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != REPLICA_ALIAS
+
+
+class ReplicaReadMixin:
+    """
+    Para APIView: los GET leen de la réplica una vez autenticado el usuario,
+    salvo que haya escrito hace menos de REPLICA_STICKY_SECONDS.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        self._replica_token = None
+        super().initial(request, *args, **kwargs)
+        if request.method in SAFE_METHODS and not recently_wrote(request.user):
+            self._replica_token = _replica_reads.set(True)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if getattr(self, '_replica_token', None) is not None:
+            _replica_reads.reset(self._replica_token)
+            self._replica_token = None
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+def replica_read(view):
+    """
+    Decorador de vistas función de solo lectura (debajo de @api_view o de
+    @async_jwt_required, para que request.user ya esté autenticado).
+    """
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            enabled = request.method in SAFE_METHODS and not await arecently_wrote(getattr(request, 'user', None))
+            with replica_reads(enabled):
+                return await view(request, *args, **kwargs)
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        enabled = request.method in SAFE_METHODS and not recently_wrote(getattr(request, 'user', None))
+        with replica_reads(enabled):
+            return view(request, *args, **kwargs)
+    return wrapper
+
+
+class ReplicaStickinessMiddleware(MiddlewareMixin):
+    """Marca al usuario tras una escritura exitosa (ver mark_write)."""
+
+    def process_response(self, request, response):
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            # DRF deja en request.user el usuario autenticado por JWT
+            mark_write(getattr(request, 'user', None))
+        return response
@@ -0,0 +1,234 @@
+"""
+Backend PostgreSQL con pool de conexiones en el proceso.
+
+Bajo ASGI (gunicorn + UvicornWorker) Django ejecuta el código síncrono de
+cada petición en un hilo distinto, y las conexiones de Django son por hilo:
+con CONN_MAX_AGE > 0 cada hilo nuevo abre su propia conexión y las viejas
+quedan abiertas sin reutilizarse. Este backend mantiene en cambio un pool
+por proceso: cuando Django "cierra" la conexión al terminar la petición
+(CONN_MAX_AGE = 0) la conexión vuelve al pool, y la siguiente petición,
+desde cualquier hilo, la toma sin pagar el costo de conectarse.
+
+Configuración (settings.DATABASES[alias]['POOL']):
+    MAX_SIZE: conexiones máximas por proceso (default: 10)
+    TIMEOUT: segundos de espera por una conexión libre (default: 30)
+    HEALTH_CHECK_IDLE: si la conexión estuvo ociosa más de estos segundos se
+        verifica con SELECT 1 antes de entregarla; None desactiva la
+        verificación (default: 10)
+    MAX_LIFETIME: segundos tras los que una conexión se recicla (default: 1800)
+
+Las conexiones se reutilizan tal cual: el código no debe dejar estado de
+sesión (SET, LISTEN, tablas temporales) en la conexión de Django.
+"""
+import os
+import threading
+import time
+from collections import deque
+
+from django.db import OperationalError
+from django.db.backends.postgresql import base
+from django.db.backends.postgresql.creation import DatabaseCreation as BaseDatabaseCreation
+from django.db.backends.postgresql.psycopg_any import IsolationLevel
+from psycopg2 import extensions
+
+
+class PoolTimeout(OperationalError):
+    pass
+
+
+class ConnectionPool:
+    """Pool de conexiones psycopg2, seguro entre hilos, propio de cada proceso."""
+
+    def __init__(self, max_size=10, timeout=30, health_check_idle=10, max_lifetime=1800):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.health_check_idle = health_check_idle
+        self.max_lifetime = max_lifetime
+
+        self._idle = deque()  # (conexión, creada_en, devuelta_en)
+        self._created_at = {}
+        self._open = 0
+        self._condition = threading.Condition()
+
+        # Estadísticas para diagnóstico y benchmarks
+        self.connections_created = 0
+        self.checkouts = 0
+
+    def acquire(self, connect):
+        """
+        Entrega una conexión libre del pool o crea una nueva con connect()
+        si no se alcanzó MAX_SIZE. Espera hasta TIMEOUT segundos si el pool
+        está agotado.
+        """
+        deadline = time.monotonic() + self.timeout
+        while True:
+            candidate = None
+            with self._condition:
+                while not self._idle and self._open >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise PoolTimeout(
+                            f'No hay conexiones libres en el pool ({self.max_size}) tras {self.timeout}s'
+                        )
+                    self._condition.wait(remaining)
+
+                if self._idle:
+                    candidate = self._idle.pop()
+                else:
+                    self._open += 1
+
+            if candidate is None:
+                break
+
+            # Verificar fuera del lock: el health check hace un round-trip
+            conn, created_at, returned_at = candidate
+            if self._usable(conn, created_at, returned_at):
+                with self._condition:
+                    self.checkouts += 1
+                return conn
+            with self._condition:
+                self._discard(conn)
+                self._condition.notify()
+
+        # Conectar fuera del lock para no bloquear a los demás hilos
+        try:
+            conn = connect()
+        except Exception:
+            with self._condition:
+                self._open -= 1
+                self._condition.notify()
+            raise
+
+        with self._condition:
+            self._created_at[id(conn)] = time.monotonic()
+            self.connections_created += 1
+            self.checkouts += 1
+        return conn
+
+    def release(self, conn):
+        """Devuelve una conexión al pool, descartándola si quedó inutilizable."""
+        reusable = not conn.closed
+        if reusable:
+            try:
+                status = conn.info.transaction_status
+                if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+                    reusable = False
+                elif status != extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except Exception:
+                reusable = False
+
+        with self._condition:
+            if reusable:
+                created_at = self._created_at.get(id(conn), time.monotonic())
+                self._idle.append((conn, created_at, time.monotonic()))
+            else:
+                self._discard(conn)
+            self._condition.notify()
+
+    def close_all(self):
+        with self._condition:
+            while self._idle:
+                self._discard(self._idle.pop()[0])
+
+    def _usable(self, conn, created_at, returned_at):
+        if conn.closed:
+            return False
+        now = time.monotonic()
+        if self.max_lifetime is not None and now - created_at > self.max_lifetime:
+            return False
+        if self.health_check_idle is not None and now - returned_at > self.health_check_idle:
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+                conn.rollback()
+            except Exception:
+                return False
+        return True
+
+    def _discard(self, conn):
+        # Se llama con el lock tomado
+        self._open -= 1
+        self._created_at.pop(id(conn), None)
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+_pools_pid = os.getpid()
+
+
+def get_pool(alias, settings_dict):
+    """
+    Retorna el pool del alias en este proceso (se recrea tras un fork).
+    La clave incluye la base de datos destino, para que al cambiar NAME (p. ej.
+    al crear la base de pruebas) no se reutilicen conexiones a otra base.
+    """
+    global _pools, _pools_pid
+    key = (
+        alias,
+        settings_dict['NAME'],
+        settings_dict['USER'],
+        settings_dict['HOST'],
+        settings_dict['PORT'],
+    )
+    with _pools_lock:
+        if _pools_pid != os.getpid():
+            # Proceso hijo (fork de gunicorn): no compartir sockets del padre
+            _pools = {}
+            _pools_pid = os.getpid()
+        pool = _pools.get(key)
+        if pool is None:
+            options = settings_dict.get('POOL') or {}
+            pool = _pools[key] = ConnectionPool(
+                max_size=options.get('MAX_SIZE', 10),
+                timeout=options.get('TIMEOUT', 30),
+                health_check_idle=options.get('HEALTH_CHECK_IDLE', 10),
+                max_lifetime=options.get('MAX_LIFETIME', 1800),
+            )
+        return pool
+
+
+def close_pools(database_name):
+    """Cierra las conexiones ociosas de los pools que apuntan a database_name."""
+    with _pools_lock:
+        pools = [pool for key, pool in _pools.items() if key[1] == database_name]
+    for pool in pools:
+        pool.close_all()
+
+
+class DatabaseCreation(BaseDatabaseCreation):
+
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # Las conexiones que quedan ociosas en el pool impedirían el DROP DATABASE
+        close_pools(test_database_name)
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    creation_class = DatabaseCreation
+
+    @property
+    def pool(self):
+        return get_pool(self.alias, self.settings_dict)
+
+    def get_new_connection(self, conn_params):
+        connection = self.pool.acquire(
+            lambda: base.DatabaseWrapper.get_new_connection(self, conn_params)
+        )
+        # get_new_connection() fija el nivel de aislamiento solo al crear la
+        # conexión; para las reutilizadas lo tomamos de la configuración.
+        isolation_level = self.settings_dict['OPTIONS'].get('isolation_level')
+        self.isolation_level = (
+            IsolationLevel(isolation_level) if isolation_level is not None
+            else IsolationLevel.READ_COMMITTED
+        )
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                self.pool.release(self.connection)
@@ -0,0 +1,65 @@
+"""
+Renderer JSON de la API basado en orjson.
+
+Produce los mismos bytes que rest_framework.renderers.JSONRenderer con la
+configuración del proyecto (JSON compacto, UTF-8): los tipos que orjson no
+trata igual que DRF (Decimal, datetime, date, time, textos lazy, etc.) se
+delegan al JSONEncoder de DRF. Si orjson no está instalado, se pide salida
+indentada o los datos contienen algo que orjson no admite (p. ej. enteros de
+más de 64 bits), se usa el renderer estándar.
+
+orjson escribe NaN e infinito como null, mientras que DRF los rechaza con
+STRICT_JSON (o escribe NaN sin él): si la salida tiene algún null y los
+datos contienen un float no finito, también se usa el renderer estándar.
+"""
+import math
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # dependencia opcional
+    orjson = None
+
+
+def has_non_finite_float(data):
+    """True si data (dicts, listas y tuplas anidados) contiene NaN o infinito."""
+    pending = [data]
+    while pending:
+        value = pending.pop()
+        if isinstance(value, float):
+            if not math.isfinite(value):
+                return True
+        elif isinstance(value, dict):
+            pending.extend(value.values())
+        elif isinstance(value, (list, tuple)):
+            pending.extend(value)
+    return False
+
+
+class ORJSONRenderer(JSONRenderer):
+
+    def __init__(self):
+        super().__init__()
+        self._default = JSONEncoder().default
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+
+        try:
+            content = orjson.dumps(
+                data,
+                default=self._default,
+                option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS,
+            )
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        if b'null' in content and has_non_finite_float(data):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Igual que JSONRenderer: escapar los separadores de línea de JavaScript
+        return content.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
@@ -0,0 +1,114 @@
+"""
+Búsqueda de texto indexada para los listados de la API (?search=).
+
+Cada modelo buscable define SEARCH_FIELDS y un índice GIN sobre
+search_vector(SEARCH_FIELDS): el documento tsvector con la configuración
+'simple' (sin stemming ni stopwords, adecuada para nombres, documentos y
+números de lote o recibo). RankedSearchFilter busca cada término como
+prefijo ('juan' encuentra "Juana") con una subconsulta por tabla, de modo
+que cada una usa su índice en lugar de un ILIKE '%x%' sobre todos los
+joins, y ordena por relevancia salvo que se pida ?ordering=.
+"""
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db.models import Q
+from rest_framework import filters
+from rest_framework.settings import api_settings
+
+SEARCH_CONFIG = 'simple'
+
+# Separadores dentro de un término (espacios de frases entre comillas, apóstrofes, etc.)
+_WORD_SEPARATORS = re.compile(r"[^\w@.\-]+")
+
+
+def search_vector(fields, prefix=''):
+    """Documento de búsqueda de los campos dados (con prefijo de relación opcional)."""
+    return SearchVector(*[f'{prefix}{field}' for field in fields], config=SEARCH_CONFIG)
+
+
+def search_words(terms):
+    """Palabras buscables de los términos recibidos, en minúsculas y sin repetir."""
+    words = []
+    for term in terms:
+        for word in _WORD_SEPARATORS.split(term.lower()):
+            word = word.strip('.-')
+            if word and word not in words:
+                words.append(word)
+    return words
+
+
+def prefix_query(words, operator='&'):
+    """SearchQuery que combina las palabras con el operador dado, cada una como prefijo."""
+    return SearchQuery(
+        f' {operator} '.join(f"'{word}':*" for word in words), search_type='raw', config=SEARCH_CONFIG
+    )
+
+
+class RankedSearchFilter(filters.SearchFilter):
+    """
+    Reemplazo de SearchFilter basado en los índices de texto.
+
+    La vista declara search_documents: pares (ruta, modelo), donde ruta es
+    '' para el propio modelo o la relación hacia otro modelo buscable (p. ej.
+    'venta__customer'). Los documentos de ruta '' se buscan en el modelo del
+    queryset, que puede ser otro con los mismos campos (p. ej. el archivo de
+    pagos). Igual que SearchFilter, cada palabra debe aparecer en
+    alguno de los documentos; con search_by_pk = True una palabra numérica
+    también encuentra el registro por id. Debe ir después de OrderingFilter
+    en filter_backends para que el orden por relevancia prevalezca sobre el
+    orden por defecto.
+    """
+    rank_annotation = 'search_rank'
+
+    def filter_queryset(self, request, queryset, view):
+        documents = getattr(view, 'search_documents', None)
+        if not documents:
+            return super().filter_queryset(request, queryset, view)
+
+        terms = self.get_search_terms(request)
+        if isinstance(terms, str):
+            # DRF < 3.15.1 devuelve el parámetro sin dividir
+            terms = list(filters.search_smart_split(terms))
+        if not terms:
+            return queryset
+
+        words = search_words(terms)
+        if not words:
+            return queryset.none()
+
+        # Una subconsulta por palabra y documento: cada una se resuelve con
+        # el índice GIN de su tabla
+        condition = Q()
+        for word in words:
+            word_query = prefix_query([word])
+            word_condition = Q()
+            for path, model in documents:
+                manager = model._default_manager if path else queryset.model._default_manager
+                matching = (
+                    manager.annotate(search_document=search_vector(model.SEARCH_FIELDS))
+                    .filter(search_document=word_query)
+                    .values('pk')
+                )
+                word_condition |= Q(**{f'{path}__in' if path else 'pk__in': matching})
+            if getattr(view, 'search_by_pk', False) and word.isdigit():
+                word_condition |= Q(pk=int(word))
+            condition &= word_condition
+
+        queryset = queryset.filter(condition)
+        if request.query_params.get(api_settings.ORDERING_PARAM):
+            return queryset
+
+        rank = self.get_rank(documents, prefix_query(words, operator='|'))
+        return queryset.annotate(**{self.rank_annotation: rank}).order_by(
+            f'-{self.rank_annotation}', *queryset.query.order_by
+        )
+
+    @staticmethod
+    def get_rank(documents, query):
+        """Suma de la relevancia de cada documento (vía joins) para la consulta."""
+        rank = None
+        for path, model in documents:
+            document_rank = SearchRank(search_vector(model.SEARCH_FIELDS, f'{path}__' if path else ''), query)
+            rank = document_rank if rank is None else rank + document_rank
+        return rank
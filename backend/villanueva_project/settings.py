@@ -40,6 +40,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 
     #third party apps
     'rest_framework',
@@ -62,14 +63,23 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    # Comprime las respuestas de la API (ver villanueva_project/compression.py)
+    'villanueva_project.compression.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    # Lecturas en el primario tras una escritura del usuario (réplica de lectura)
+    'villanueva_project.db_router.ReplicaStickinessMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Compresión de respuestas de la API: gzip, o brotli si está instalado el
+# paquete brotli y el cliente lo acepta.
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', 1024))
+COMPRESSION_PATH_PREFIXES = ('/api/',)
+
 ROOT_URLCONF = 'villanueva_project.urls'
 
 TEMPLATES = [
@@ -93,14 +103,42 @@ WSGI_APPLICATION = 'villanueva_project.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+def env_bool(name, default=False):
+    return os.environ.get(name, str(default)).lower() in ('1', 'true', 'yes', 'on')
+
+
+# Conexiones a la base de datos (configurables por entorno):
+# - DB_POOL_SIZE > 0 usa el backend con pool en el proceso
+#   (villanueva_project.postgresql_pool), adecuado para los workers ASGI;
+#   0 usa el backend estándar con conexiones persistentes por hilo.
+# - DB_CONN_MAX_AGE: segundos que Django conserva una conexión por hilo. Con
+#   el pool debe ser 0 para que la conexión vuelva al pool en cada petición.
+# - DB_DISABLE_SERVER_SIDE_CURSORS: obligatorio detrás de pgbouncer en modo
+#   transaction (los cursores con nombre no sobreviven entre transacciones).
+DB_HOST = os.environ.get('DB_HOST', 'villanueva_db')
+DB_PORT = int(os.environ.get('DB_PORT', 5432))
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
-        'NAME': 'villanueva_db',
-        'USER': 'postgres',
-        'PASSWORD': 'postgres',
-        'HOST': 'villanueva_db',
-        'PORT': 5432,
+        'ENGINE': (
+            'villanueva_project.postgresql_pool' if DB_POOL_SIZE > 0
+            else 'django.db.backends.postgresql'
+        ),
+        'NAME': os.environ.get('DB_NAME', 'villanueva_db'),
+        'USER': os.environ.get('DB_USER', 'postgres'),
+        'PASSWORD': os.environ.get('DB_PASSWORD', 'postgres'),
+        'HOST': DB_HOST,
+        'PORT': DB_PORT,
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 0 if DB_POOL_SIZE > 0 else 60)),
+        'CONN_HEALTH_CHECKS': env_bool('DB_CONN_HEALTH_CHECKS', True),
+        'DISABLE_SERVER_SIDE_CURSORS': env_bool('DB_DISABLE_SERVER_SIDE_CURSORS', False),
+        'POOL': {
+            'MAX_SIZE': DB_POOL_SIZE,
+            'TIMEOUT': int(os.environ.get('DB_POOL_TIMEOUT', 30)),
+            'HEALTH_CHECK_IDLE': int(os.environ.get('DB_POOL_HEALTH_CHECK_IDLE', 10)),
+            'MAX_LIFETIME': int(os.environ.get('DB_POOL_MAX_LIFETIME', 1800)),
+        },
     },
     # 'default': {
     #     'ENGINE': 'django.db.backends.sqlite3',
@@ -108,6 +146,59 @@ DATABASES = {
     # }
 }
 
+# Réplica de lectura opcional para reportes y dashboard (ver
+# villanueva_project/db_router.py). Sin DB_REPLICA_HOST todo va al primario.
+# REPLICA_STICKY_SECONDS: segundos que las lecturas de un usuario siguen en el
+# primario después de una escritura suya (read-your-writes).
+DB_REPLICA_HOST = os.environ.get('DB_REPLICA_HOST')
+if DB_REPLICA_HOST:
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'HOST': DB_REPLICA_HOST,
+        'PORT': int(os.environ.get('DB_REPLICA_PORT', DB_PORT)),
+        'POOL': {
+            **DATABASES['default']['POOL'],
+            'MAX_SIZE': int(os.environ.get('DB_REPLICA_POOL_SIZE', DB_POOL_SIZE)),
+        },
+        # En los tests la réplica es un alias del primario
+        'TEST': {'MIRROR': 'default'},
+    }
+
+# Particionado por año de pagos y cuotas (ver payments/partitioning.py). Se
+# aplica con la migración payments.0012 o con el comando partition_payments.
+PAYMENTS_PARTITIONING = env_bool('PAYMENTS_PARTITIONING', False)
+
+# Archivo de cuotas y pagos de ventas cerradas (ver payments/archive.py y el
+# comando archive_ventas): días desde el cierre antes de archivar y ventas por
+# transacción.
+ARCHIVE_RETENTION_DAYS = int(os.environ.get('ARCHIVE_RETENTION_DAYS', 365))
+ARCHIVE_BATCH_SIZE = int(os.environ.get('ARCHIVE_BATCH_SIZE', 100))
+
+DATABASE_ROUTERS = ['villanueva_project.db_router.ReplicaRouter']
+REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', 5))
+
+# Conexión directa a PostgreSQL para LISTEN (stream del dashboard): LISTEN no
+# funciona a través de pgbouncer en modo transaction.
+DASHBOARD_EVENTS_DATABASE = {
+    **DATABASES['default'],
+    'HOST': os.environ.get('DB_DIRECT_HOST', DB_HOST),
+    'PORT': int(os.environ.get('DB_DIRECT_PORT', DB_PORT)),
+}
+
+
+# Caché (configurable por entorno). Por defecto en memoria de cada proceso;
+# con varios workers conviene una caché compartida, p. ej.
+# CACHE_BACKEND=django.core.cache.backends.redis.RedisCache y
+# CACHE_LOCATION=redis://redis:6379/1 (requiere el paquete redis).
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'villanueva'),
+        'TIMEOUT': int(os.environ.get('CACHE_TIMEOUT', 300)),
+        'KEY_PREFIX': os.environ.get('CACHE_KEY_PREFIX', 'villanueva'),
+    }
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -244,7 +335,8 @@ CORS_ALLOW_HEADERS = [
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',    
+        # JWTAuthentication sin consulta del usuario (rol y estado en los claims)
+        'users.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PARSER_CLASSES': [
         'rest_framework.parsers.JSONParser',
@@ -252,12 +344,20 @@ REST_FRAMEWORK = {
         'rest_framework.parsers.MultiPartParser',
     ],
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        # Misma salida que JSONRenderer, serializada con orjson
+        'villanueva_project.renderers.ORJSONRenderer',
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 25  # Devuelve 25 clientes por página | Puede ser ajustado según sea necesario | 
 }
 
+SIMPLE_JWT = {
+    # Tokens con claims de rol y estado (ver users/authentication.py)
+    'TOKEN_OBTAIN_SERIALIZER': 'users.serializers.RoleTokenObtainPairSerializer',
+    # El refresh vuelve a leer el rol y el estado del usuario
+    'TOKEN_REFRESH_SERIALIZER': 'users.serializers.RoleTokenRefreshSerializer',
+}
+
 SPECTACULAR_SETTINGS = {
     'TITLE': 'Villanueva API',
     'DESCRIPTION': 'API para la gestión de lotes y pagos',
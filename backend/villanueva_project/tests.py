@@ -0,0 +1,324 @@
+import gzip
+import json
+import threading
+import time
+import uuid
+from datetime import date, datetime, time as dt_time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock, skipUnless
+
+from django.core.signals import request_finished
+from django.db import connection, connections
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, TransactionTestCase, override_settings
+from django.utils.translation import gettext_lazy as _
+from psycopg2 import extensions
+from rest_framework.renderers import JSONRenderer
+
+from . import compression, renderers
+from .compression import CompressionMiddleware
+from .postgresql_pool import base as pool_base
+from .postgresql_pool.base import ConnectionPool, PoolTimeout
+from .renderers import ORJSONRenderer
+
+
+class FakeConnection:
+    """Lo mínimo de una conexión psycopg2 que usa el pool."""
+
+    def __init__(self, healthy=True):
+        self.closed = 0
+        self.healthy = healthy
+        self.queries = 0
+        self.info = mock.Mock(transaction_status=extensions.TRANSACTION_STATUS_IDLE)
+
+    def cursor(self):
+        conn = self
+
+        class Cursor:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+            def execute(self, sql):
+                if not conn.healthy:
+                    raise Exception('server closed the connection unexpectedly')
+                conn.queries += 1
+
+        return Cursor()
+
+    def rollback(self):
+        self.info.transaction_status = extensions.TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = 1
+
+
+class ConnectionPoolTests(SimpleTestCase):
+
+    def test_reuses_released_connection(self):
+        pool = ConnectionPool(max_size=2)
+        conn = pool.acquire(FakeConnection)
+        pool.release(conn)
+
+        self.assertIs(pool.acquire(FakeConnection), conn)
+        self.assertEqual((pool.connections_created, pool.checkouts), (1, 2))
+
+    def test_max_size_and_timeout(self):
+        pool = ConnectionPool(max_size=2, timeout=0.05)
+        first, _second = pool.acquire(FakeConnection), pool.acquire(FakeConnection)
+
+        started = time.monotonic()
+        with self.assertRaises(PoolTimeout):
+            pool.acquire(FakeConnection)
+        self.assertGreaterEqual(time.monotonic() - started, 0.05)
+        self.assertEqual(pool.connections_created, 2)
+
+        # Un hilo en espera recibe la conexión que se libera
+        pool.timeout = 5
+        acquired = []
+        waiter = threading.Thread(target=lambda: acquired.append(pool.acquire(FakeConnection)))
+        waiter.start()
+        time.sleep(0.05)
+        pool.release(first)
+        waiter.join(5)
+        self.assertEqual(acquired, [first])
+
+    def test_failed_connect_frees_its_slot(self):
+        pool = ConnectionPool(max_size=1, timeout=0.05)
+
+        def refuse():
+            raise RuntimeError('connection refused')
+
+        with self.assertRaises(RuntimeError):
+            pool.acquire(refuse)
+        self.assertIsInstance(pool.acquire(FakeConnection), FakeConnection)
+
+    def test_health_check_after_idle(self):
+        pool = ConnectionPool(max_size=1, health_check_idle=0)
+        conn = pool.acquire(FakeConnection)
+        pool.release(conn)
+        self.assertIs(pool.acquire(FakeConnection), conn)
+        self.assertEqual(conn.queries, 1)
+
+        # Una conexión que falla el SELECT 1 se descarta y se abre otra
+        conn.healthy = False
+        pool.release(conn)
+        replacement = pool.acquire(FakeConnection)
+        self.assertIsNot(replacement, conn)
+        self.assertTrue(conn.closed)
+
+        # Sin espera suficiente no hay round-trip
+        pool.health_check_idle = 60
+        pool.release(replacement)
+        pool.acquire(FakeConnection)
+        self.assertEqual(replacement.queries, 0)
+
+    def test_max_lifetime_recycles(self):
+        pool = ConnectionPool(max_size=1, max_lifetime=1800)
+        with mock.patch.object(pool_base.time, 'monotonic', return_value=1000.0):
+            conn = pool.acquire(FakeConnection)
+            pool.release(conn)
+        with mock.patch.object(pool_base.time, 'monotonic', return_value=2000.0):
+            self.assertIs(pool.acquire(FakeConnection), conn)
+            pool.release(conn)
+        with mock.patch.object(pool_base.time, 'monotonic', return_value=2801.0):
+            recycled = pool.acquire(FakeConnection)
+
+        self.assertIsNot(recycled, conn)
+        self.assertTrue(conn.closed)
+        self.assertEqual(pool.connections_created, 2)
+
+    def test_release_discards_broken_and_rolls_back_open_transactions(self):
+        pool = ConnectionPool(max_size=2)
+        in_transaction, broken = pool.acquire(FakeConnection), pool.acquire(FakeConnection)
+        in_transaction.info.transaction_status = extensions.TRANSACTION_STATUS_INTRANS
+        broken.info.transaction_status = extensions.TRANSACTION_STATUS_UNKNOWN
+
+        pool.release(in_transaction)
+        pool.release(broken)
+
+        self.assertEqual([item[0] for item in pool._idle], [in_transaction])
+        self.assertEqual(in_transaction.info.transaction_status, extensions.TRANSACTION_STATUS_IDLE)
+        self.assertTrue(broken.closed)
+        self.assertEqual(pool._open, 1)
+
+
+@skipUnless(
+    isinstance(connections['default'], pool_base.DatabaseWrapper),
+    'Requiere el backend villanueva_project.postgresql_pool'
+)
+class PooledDatabaseWrapperTests(TransactionTestCase):
+
+    def test_connection_returns_to_pool_after_request(self):
+        pool = connection.pool
+        self.client.get('/api/v1/dashboard/summary/')
+        raw = connection.connection
+        self.assertIsNotNone(raw)
+
+        # Con CONN_MAX_AGE = 0 Django cierra la conexión al terminar la petición
+        request_finished.send(sender=self.__class__)
+        self.assertIsNone(connection.connection)
+        self.assertIn(raw, [item[0] for item in pool._idle])
+        self.assertFalse(raw.closed)
+
+        created = pool.connections_created
+        connection.ensure_connection()
+        self.assertIs(connection.connection, raw)
+        self.assertEqual(pool.connections_created, created)
+
+    def test_destroy_database_closes_idle_pool_connections(self):
+        name = f"{connection.settings_dict['NAME']}_pool"
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP DATABASE IF EXISTS "{name}"')
+            cursor.execute(f'CREATE DATABASE "{name}"')
+        self.addCleanup(pool_base.close_pools, name)
+
+        # Mismo alias, otra base: el pool se elige por alias y NAME
+        other = pool_base.DatabaseWrapper({**connection.settings_dict, 'NAME': name}, alias=connection.alias)
+        other.ensure_connection()
+        raw = other.connection
+        other.close()
+        self.assertIn(raw, [item[0] for item in other.pool._idle])
+
+        # Sin close_pools() el DROP DATABASE fallaría por la conexión ociosa
+        connection.creation._destroy_test_db(name, verbosity=0)
+
+        self.assertTrue(raw.closed)
+        self.assertFalse(other.pool._idle)
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1 FROM pg_database WHERE datname = %s', [name])
+            self.assertIsNone(cursor.fetchone())
+
+
+@override_settings(COMPRESSION_MIN_SIZE=1024, COMPRESSION_PATH_PREFIXES=('/api/',))
+class CompressionMiddlewareTests(SimpleTestCase):
+    # Un JSON repetitivo de ~2 KB: por encima del umbral y muy compresible
+    BODY = json.dumps([{'installment_number': number, 'status': 'pending'} for number in range(50)]).encode()
+
+    def process(self, path='/api/v1/payments/schedules/compact/', body=BODY, etag=None, **headers):
+        response = HttpResponse(body, content_type='application/json')
+        if etag:
+            response['ETag'] = etag
+        request = RequestFactory().get(path, **headers)
+        return CompressionMiddleware(lambda request: response)(request)
+
+    def assertNotCompressed(self, response, body=BODY):
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response.content, body)
+
+    def test_gzip_above_threshold(self):
+        self.assertGreater(len(self.BODY), 1024)
+        response = self.process(HTTP_ACCEPT_ENCODING='gzip, deflate')
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), self.BODY)
+        self.assertEqual(response['Content-Length'], str(len(response.content)))
+        self.assertLess(len(response.content), len(self.BODY))
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+
+    def test_below_threshold(self):
+        body = self.BODY[:1023]
+        response = self.process(body=body, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertNotCompressed(response, body)
+        # La representación depende de Accept-Encoding aunque esta no se comprima
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+
+        with self.settings(COMPRESSION_MIN_SIZE=100):
+            self.assertEqual(self.process(body=body, HTTP_ACCEPT_ENCODING='gzip')['Content-Encoding'], 'gzip')
+
+    def test_only_configured_prefixes(self):
+        response = self.process(path='/admin/payments/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertNotCompressed(response)
+        self.assertFalse(response.has_header('Vary'))
+
+        with self.settings(COMPRESSION_PATH_PREFIXES=('/api/', '/admin/')):
+            self.assertEqual(self.process(path='/admin/payments/', HTTP_ACCEPT_ENCODING='gzip')['Content-Encoding'], 'gzip')
+
+    def test_client_without_accept_encoding(self):
+        for headers in ({}, {'HTTP_ACCEPT_ENCODING': 'identity'}, {'HTTP_ACCEPT_ENCODING': 'gzip;q=0, br;q=0'}):
+            with self.subTest(headers=headers):
+                response = self.process(etag='"v1"', **headers)
+                self.assertNotCompressed(response)
+                self.assertEqual(response['Vary'], 'Accept-Encoding')
+                self.assertEqual(response['ETag'], '"v1"')
+
+    def test_etag_weakened(self):
+        self.assertEqual(self.process(etag='"v1"', HTTP_ACCEPT_ENCODING='gzip')['ETag'], 'W/"v1"')
+        self.assertEqual(self.process(etag='W/"v1"', HTTP_ACCEPT_ENCODING='gzip')['ETag'], 'W/"v1"')
+
+    def test_brotli_preferred_when_installed(self):
+        fake_brotli = mock.Mock(compress=lambda content, quality: b'br:' + gzip.compress(content, mtime=0))
+        with mock.patch.object(compression, 'brotli', fake_brotli):
+            self.assertEqual(self.process(HTTP_ACCEPT_ENCODING='gzip, br')['Content-Encoding'], 'br')
+            self.assertEqual(self.process(HTTP_ACCEPT_ENCODING='gzip')['Content-Encoding'], 'gzip')
+        with mock.patch.object(compression, 'brotli', None):
+            self.assertEqual(self.process(HTTP_ACCEPT_ENCODING='br, gzip')['Content-Encoding'], 'gzip')
+
+    def test_streaming_left_alone(self):
+        response = StreamingHttpResponse(iter([self.BODY]), content_type='text/event-stream')
+        request = RequestFactory().get('/api/v1/dashboard/stream/', HTTP_ACCEPT_ENCODING='gzip')
+        response = CompressionMiddleware(lambda request: response)(request)
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(b''.join(response.streaming_content), self.BODY)
+
+
+class ORJSONRendererTests(SimpleTestCase):
+    """ORJSONRenderer produce los mismos bytes (o el mismo error) que JSONRenderer."""
+
+    DATA = {
+        'decimals': [Decimal('1234.50'), Decimal('0.10'), Decimal('-7'), Decimal('1E+2')],
+        'datetimes': [
+            datetime(2024, 6, 30, 23, 59, 59, 987654, tzinfo=dt_timezone.utc),
+            datetime(2024, 6, 30, 8, 0, tzinfo=dt_timezone(timedelta(hours=-5))),
+            datetime(2024, 6, 30, 8, 0, 0, 500),
+            date(2024, 2, 29),
+            dt_time(8, 30, 15, 123456),
+            timedelta(days=1, seconds=30),
+        ],
+        'uuid': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+        'lazy': [_('Pago'), _('Cuotas vencidas')],
+        'text': 'Año\u2028señal\u2029 "citas" \\ <b>',
+        'numbers': (0, -1, 2 ** 63 - 1, 1.5, None, True),
+        'keys': {1: 'uno', 'dos': {'tres': []}},
+    }
+
+    def assertSameRender(self, data, strict=True):
+        standard, fast = JSONRenderer(), ORJSONRenderer()
+        standard.strict = fast.strict = strict
+        self.assertEqual(fast.render(data), standard.render(data))
+
+    @skipUnless(renderers.orjson, 'Requiere orjson')
+    def test_matches_json_renderer(self):
+        with mock.patch.object(JSONRenderer, 'render', side_effect=AssertionError('sin orjson')):
+            content = ORJSONRenderer().render(self.DATA)
+        self.assertEqual(content, JSONRenderer().render(self.DATA))
+        # Los tipos delegados al JSONEncoder de DRF
+        self.assertIn(b'"2024-06-30T23:59:59.987654Z"', content)
+        self.assertIn(b'[1234.5,0.1,-7.0,100.0]', content)
+        self.assertIn(b'\\u2028', content)
+
+        for value in (*self.DATA.values(), {}, [], '', None):
+            with self.subTest(value=value):
+                self.assertSameRender(value)
+
+    def test_falls_back_to_json_renderer(self):
+        # Enteros de más de 64 bits
+        self.assertSameRender({'big': 2 ** 70})
+        # Salida indentada
+        self.assertEqual(
+            ORJSONRenderer().render(self.DATA, 'application/json; indent=2'),
+            JSONRenderer().render(self.DATA, 'application/json; indent=2'),
+        )
+
+    def test_nan_and_infinity(self):
+        for value in (float('nan'), float('inf'), -float('inf')):
+            data = {'rows': [{'ratio': value, 'note': None}]}
+            with self.subTest(value=value):
+                # STRICT_JSON: ambos rechazan el valor
+                for renderer in (JSONRenderer(), ORJSONRenderer()):
+                    with self.assertRaisesMessage(ValueError, 'Out of range float values are not JSON compliant'):
+                        renderer.render(data)
+                self.assertSameRender(data, strict=False)
+        self.assertSameRender({'ratio': 0.5, 'note': None})
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { 
   Users, 
   Home, 
@@ -16,6 +16,7 @@ import {
 } from 'lucide-react';
 import { toast } from 'react-hot-toast';
 import { dashboardSummaryService, paymentService } from '../../services';
+import { cursorFromLink } from '../../services/dashboardService';
 import { Customer, Lote, Payment } from '../../types';
 import { LoadingSpinner } from '../UI';
 import DateService from '../../services/dateService';
@@ -65,6 +66,8 @@ const Dashboard: React.FC = () => {
   const [dueDatesTotalPages, setDueDatesTotalPages] = useState(1);
   const [dueDatesTotalCount, setDueDatesTotalCount] = useState(0);
   const [dueDatesOrdering, setDueDatesOrdering] = useState<'asc' | 'desc'>('desc');
+  // Cursores de cada página ya visitada (la página N usa dueDatesCursors[N - 1])
+  const dueDatesCursors = useRef<(string | null)[]>([null]);
 
   useEffect(() => {
     loadDashboardData();
@@ -80,10 +83,20 @@ const Dashboard: React.FC = () => {
   const loadAllDueDates = async () => {
     try {
       setDueDatesLoading(true);
-      const response = await dashboardSummaryService.getAllDueDates(dueDatesFilter, dueDatesPage, 20, dueDatesOrdering);
+      if (dueDatesPage === 1) dueDatesCursors.current = [null];
+      const response = await dashboardSummaryService.getAllDueDates(
+        dueDatesFilter,
+        dueDatesCursors.current[dueDatesPage - 1] ?? null,
+        20,
+        dueDatesOrdering
+      );
+      dueDatesCursors.current[dueDatesPage] = cursorFromLink(response.next);
       setAllDueDates(response.results);
-      setDueDatesTotalCount(response.count);
-      setDueDatesTotalPages(Math.ceil(response.count / 20));
+      // El total llega solo con la primera página
+      if (response.count !== null) {
+        setDueDatesTotalCount(response.count);
+        setDueDatesTotalPages(Math.ceil(response.count / 20));
+      }
     } catch (error) {
       console.error('Error cargando cuotas:', error);
       toast.error('Error al cargar las cuotas');
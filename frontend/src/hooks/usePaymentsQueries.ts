@@ -1,5 +1,5 @@
-import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query';
-import paymentService from '../services/paymentService';
+import { keepPreviousData, useQuery, useMutation, useQueryClient } from '@tanstack/react-query';
+import paymentService, { ScheduleCursorPage } from '../services/paymentService';
 import { PaymentSchedule, PaginatedPaymentResponse } from '../types';
 import toastService from '../services/toastService';
 
@@ -24,8 +24,8 @@ export const schedulesKeys = {
   byLote: (loteId: number) => [...schedulesKeys.all, 'by-lote', loteId] as const,
   historyByLote: (loteId: number) => [...schedulesKeys.all, 'history-by-lote', loteId] as const,
   byVenta: (ventaId: number) => [...schedulesKeys.all, 'by-venta', ventaId] as const,
-  overdue: () => [...schedulesKeys.all, 'overdue'] as const,
-  pending: () => [...schedulesKeys.all, 'pending'] as const,
+  overdue: (cursor: string | null = null) => [...schedulesKeys.all, 'overdue', cursor] as const,
+  pending: (cursor: string | null = null) => [...schedulesKeys.all, 'pending', cursor] as const,
 };
 
 // Hook para obtener pagos con paginación
@@ -191,21 +191,23 @@ export const usePaymentScheduleByVenta = (ventaId: number, enabled: boolean = tr
   });
 };
 
-// Hook para obtener cronogramas vencidos
-export const useOverdueSchedules = () => {
-  return useQuery<PaymentSchedule[]>({
-    queryKey: schedulesKeys.overdue(),
-    queryFn: () => paymentService.getOverdueSchedules(),
+// Hook para obtener cronogramas vencidos, una página por cursor (null = primera página)
+export const useOverdueSchedules = (cursor: string | null = null) => {
+  return useQuery<ScheduleCursorPage>({
+    queryKey: schedulesKeys.overdue(cursor),
+    queryFn: () => paymentService.getOverdueSchedules(cursor),
+    placeholderData: keepPreviousData,
     staleTime: 1000 * 60 * 2, // 2 minutos (más corto porque son datos críticos)
     gcTime: 1000 * 60 * 5, // 5 minutos
   });
 };
 
-// Hook para obtener cronogramas pendientes
-export const usePendingSchedules = () => {
-  return useQuery<PaymentSchedule[]>({
-    queryKey: schedulesKeys.pending(),
-    queryFn: () => paymentService.getPendingSchedules(),
+// Hook para obtener cronogramas pendientes, una página por cursor (null = primera página)
+export const usePendingSchedules = (cursor: string | null = null) => {
+  return useQuery<ScheduleCursorPage>({
+    queryKey: schedulesKeys.pending(cursor),
+    queryFn: () => paymentService.getPendingSchedules(cursor),
+    placeholderData: keepPreviousData,
     staleTime: 1000 * 60 * 2, // 2 minutos
     gcTime: 1000 * 60 * 5, // 5 minutos
   });
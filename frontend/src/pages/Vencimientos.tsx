@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { 
   AlertTriangle, 
   Calendar, 
@@ -12,6 +12,7 @@ import {
 import { toast } from 'react-hot-toast';
 import { useNavigate } from 'react-router-dom';
 import { dashboardSummaryService, paymentService } from '../services';
+import { cursorFromLink } from '../services/dashboardService';
 import { LoadingSpinner } from '../components/UI';
 import PaymentForm from '../components/Payments/PaymentForm';
 import DateService from '../services/dateService';
@@ -42,6 +43,8 @@ const Vencimientos: React.FC = () => {
   const [dueDates, setDueDates] = useState<DueDateItem[]>([]);
   const [totalPages, setTotalPages] = useState(1);
   const [currentPage, setCurrentPage] = useState(1);
+  // Cursores de cada página ya visitada (la página N usa pageCursors[N - 1])
+  const pageCursors = useRef<(string | null)[]>([null]);
   
   // Filtros
   const [searchTerm, setSearchTerm] = useState('');
@@ -59,14 +62,17 @@ const Vencimientos: React.FC = () => {
   const loadDueDates = async () => {
     try {
       setLoading(true);
+      if (currentPage === 1) pageCursors.current = [null];
       const response = await dashboardSummaryService.getAllDueDates(
         statusFilter, 
-        currentPage, 
+        pageCursors.current[currentPage - 1] ?? null, 
         20, 
         dueDatesOrdering
       );
+      pageCursors.current[currentPage] = cursorFromLink(response.next);
       setDueDates(response.results);
-      setTotalPages(Math.ceil(response.count / 20));
+      // El total llega solo con la primera página
+      if (response.count !== null) setTotalPages(Math.ceil(response.count / 20));
     } catch (error) {
       console.error('Error cargando vencimientos:', error);
       toast.error('Error al cargar los vencimientos');
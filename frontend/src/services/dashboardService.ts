@@ -1,12 +1,19 @@
 import api from './api';
 
 export interface DueDatesResponse {
-  count: number;
+  // Solo en la primera página (sin cursor); en las siguientes es null
+  count: number | null;
   next: string | null;
   previous: string | null;
   results: any[];
 }
 
+// Extrae el cursor de un enlace next/previous de la paginación por cursor
+export const cursorFromLink = (link: string | null): string | null => {
+  if (!link) return null;
+  return new URL(link, window.location.origin).searchParams.get('cursor');
+};
+
 class DashboardSummaryService {
   async getDashboardSummary(): Promise<any> {
     const response = await api.get('/dashboard/summary/');
@@ -15,13 +22,16 @@ class DashboardSummaryService {
 
   async getAllDueDates(
     status: 'all' | 'pending' | 'overdue' = 'all',
-    page: number = 1,
+    cursor: string | null = null,
     pageSize: number = 20,
     ordering: 'asc' | 'desc' = 'asc'
   ): Promise<DueDatesResponse> {
-    const response = await api.get('/dashboard/due-dates/', {
-      params: { status, page, page_size: pageSize, ordering }
-    });
+    // El total (COUNT) solo se pide en la primera página; las siguientes
+    // avanzan por cursor sin recorrer la tabla
+    const params: any = { status, page_size: pageSize, ordering };
+    if (cursor) params.cursor = cursor;
+    else params.count = 'exact';
+    const response = await api.get('/dashboard/due-dates/', { params });
     return response.data;
   }
 }
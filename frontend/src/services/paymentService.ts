@@ -1,7 +1,14 @@
 // villanueva/frontend/src/services/paymentService.ts
 import api from './api';
+import { cursorFromLink } from './dashboardService';
 import { Info, PaginatedPaymentResponse, Payment, PaymentSchedule, PaymentScheduleSummary } from '../types';
 
+// Página de cuotas paginada por cursor; nextCursor es null en la última
+export interface ScheduleCursorPage {
+  results: PaymentSchedule[];
+  nextCursor: string | null;
+}
+
 // Helper para manejar respuestas paginadas
 const handlePaginatedResponse = (data: any): any[] => {
   // Si la respuesta tiene estructura paginada, devolver solo los resultados
@@ -208,14 +215,24 @@ class PaymentService {
     };
   }
 
-  async getOverdueSchedules(): Promise<PaymentSchedule[]> {
-    const response = await api.get('/payments/schedules/overdue/');
-    return handlePaginatedResponse(response.data);
+  // Cuotas vencidas, una página por cursor: la UI guarda nextCursor para pedir la siguiente
+  async getOverdueSchedules(cursor: string | null = null, pageSize: number = 50): Promise<ScheduleCursorPage> {
+    return this.getSchedulePage('/payments/schedules/overdue/', cursor, pageSize);
   }
 
-  async getPendingSchedules(): Promise<PaymentSchedule[]> {
-    const response = await api.get('/payments/schedules/pending/');
-    return handlePaginatedResponse(response.data);
+  async getPendingSchedules(cursor: string | null = null, pageSize: number = 50): Promise<ScheduleCursorPage> {
+    return this.getSchedulePage('/payments/schedules/pending/', cursor, pageSize);
+  }
+
+  // Una página de un listado paginado por cursor (sin count: no recorre la tabla)
+  private async getSchedulePage(url: string, cursor: string | null, pageSize: number): Promise<ScheduleCursorPage> {
+    const params: any = { page_size: pageSize };
+    if (cursor) params.cursor = cursor;
+    const response = await api.get(url, { params });
+    return {
+      results: handlePaginatedResponse(response.data),
+      nextCursor: cursorFromLink(response.data?.next ?? null),
+    };
   }
 
   async generateScheduleForLote(loteId: number): Promise<{ message: string; schedules: PaymentScheduleSummary[] }> {
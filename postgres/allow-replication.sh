@@ -0,0 +1,8 @@
+#!/bin/sh
+# Permite conexiones de replicación desde la red de docker compose (réplica de
+# lectura, profile "replica"). Solo se ejecuta al inicializar db_data; en una
+# base existente agregar la misma línea a pg_hba.conf y recargar:
+#   docker compose exec db sh /docker-entrypoint-initdb.d/allow-replication.sh
+#   docker compose exec db psql -U postgres -c "SELECT pg_reload_conf()"
+set -e
+echo "host replication all all scram-sha-256" >> "$PGDATA/pg_hba.conf"
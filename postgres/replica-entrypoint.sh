@@ -0,0 +1,22 @@
+#!/bin/sh
+# Réplica de lectura (hot standby) del servicio db: en el primer arranque
+# clona el primario con pg_basebackup (-R configura el streaming) y luego
+# inicia PostgreSQL en modo solo lectura.
+set -e
+
+PGDATA="${PGDATA:-/var/lib/postgresql/data}"
+
+if [ ! -s "$PGDATA/PG_VERSION" ]; then
+    mkdir -p "$PGDATA"
+    chown postgres:postgres "$PGDATA"
+    chmod 700 "$PGDATA"
+    until su-exec postgres pg_basebackup \
+        -h "$PRIMARY_HOST" -p "${PRIMARY_PORT:-5432}" -U "$PRIMARY_USER" \
+        -D "$PGDATA" -R -X stream; do
+        echo "Esperando al primario $PRIMARY_HOST..."
+        rm -rf "${PGDATA:?}"/*
+        sleep 2
+    done
+fi
+
+exec su-exec postgres postgres -c hot_standby=on